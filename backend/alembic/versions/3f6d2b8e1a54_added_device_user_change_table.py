@@ -0,0 +1,40 @@
+"""added device user change table
+
+Revision ID: 3f6d2b8e1a54
+Revises: 7b1e5d3a9c62
+Create Date: 2026-10-19 18:05:41.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6d2b8e1a54'
+down_revision = '7b1e5d3a9c62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('device_user_change',
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('device_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('change', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['device_id'], ['device.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_device_user_change_device_id_id', 'device_user_change', ['device_id', 'id'], unique=False)
+    # the users already assigned are where every device starts syncing from
+    op.execute(
+        "INSERT INTO device_user_change (device_id, user_id, change) "
+        "SELECT device_id, user_id, 'added' FROM device_user ORDER BY device_id, user_id"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_device_user_change_device_id_id', table_name='device_user_change')
+    op.drop_table('device_user_change')
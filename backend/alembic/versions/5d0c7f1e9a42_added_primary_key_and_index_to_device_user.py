@@ -0,0 +1,42 @@
+"""added primary key and index to device_user table
+
+Revision ID: 5d0c7f1e9a42
+Revises: 471caecad289
+Create Date: 2026-10-19 14:20:11.402133
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0c7f1e9a42'
+down_revision = '471caecad289'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # links with a missing side are meaningless and would block the primary key
+    op.execute("DELETE FROM device_user WHERE device_id IS NULL OR user_id IS NULL")
+    # keep a single row of every duplicated (device_id, user_id) pair
+    op.execute(
+        """
+        DELETE FROM device_user a
+        USING device_user b
+        WHERE a.ctid < b.ctid
+        AND a.device_id = b.device_id
+        AND a.user_id = b.user_id
+        """
+    )
+    op.alter_column('device_user', 'device_id', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('device_user', 'user_id', existing_type=sa.Integer(), nullable=False)
+    op.create_primary_key('device_user_pkey', 'device_user', ['device_id', 'user_id'])
+    op.create_index('ix_device_user_user_id_device_id', 'device_user', ['user_id', 'device_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_device_user_user_id_device_id', table_name='device_user')
+    op.drop_constraint('device_user_pkey', 'device_user', type_='primary')
+    op.alter_column('device_user', 'user_id', existing_type=sa.Integer(), nullable=True)
+    op.alter_column('device_user', 'device_id', existing_type=sa.Integer(), nullable=True)
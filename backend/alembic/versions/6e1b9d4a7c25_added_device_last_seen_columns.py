@@ -0,0 +1,28 @@
+"""added device last seen columns
+
+Revision ID: 6e1b9d4a7c25
+Revises: b7e2d94c1a38
+Create Date: 2026-10-20 16:12:07.554219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e1b9d4a7c25'
+down_revision = 'b7e2d94c1a38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('device', sa.Column('last_seen_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('device', sa.Column('battery_level', sa.Integer(), nullable=True))
+    op.add_column('device', sa.Column('app_version', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('device', 'app_version')
+    op.drop_column('device', 'battery_level')
+    op.drop_column('device', 'last_seen_at')
@@ -0,0 +1,34 @@
+"""added device notification outbox table
+
+Revision ID: 7b1e5d3a9c62
+Revises: c4a81f2e7b90
+Create Date: 2026-10-19 16:40:12.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1e5d3a9c62'
+down_revision = 'c4a81f2e7b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('device_notification_outbox',
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('mac_id', sa.String(), nullable=False),
+    sa.Column('body', sa.String(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_device_notification_outbox_pending', 'device_notification_outbox', ['id'], unique=False, postgresql_where=sa.text('sent_at IS NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_device_notification_outbox_pending', table_name='device_notification_outbox')
+    op.drop_table('device_notification_outbox')
@@ -0,0 +1,58 @@
+"""added indexes to foreign key and lookup columns
+
+Revision ID: 9e3b2a6c4d17
+Revises: 5d0c7f1e9a42
+Create Date: 2026-10-19 14:41:37.118204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3b2a6c4d17'
+down_revision = '5d0c7f1e9a42'
+branch_labels = None
+depends_on = None
+
+# (table, column) pairs reported by backend.app.commands.audit_indexes
+INDEXED_COLUMNS = [
+    ('agent', 'created_by_id'),
+    ('agent', 'name'),
+    ('agent', 'user_type_id'),
+    ('apikey', 'hashed_key'),
+    ('apikey', 'user_id'),
+    ('device', 'agent_id'),
+    ('device', 'creator_id'),
+    ('passwordresettoken', 'token'),
+    ('passwordresettoken', 'user_id'),
+    ('user', 'agent_id'),
+    ('user', 'created_by_id'),
+    ('user', 'user_type_id'),
+    ('userhistory', 'agent_id'),
+    ('userhistory', 'user_id'),
+    ('userhistory', 'user_type_id'),
+]
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY does not lock out writes but can not run inside a
+    # transaction, hence the autocommit block
+    with op.get_context().autocommit_block():
+        for table, column in INDEXED_COLUMNS:
+            op.create_index(
+                op.f(f'ix_{table}_{column}'),
+                table,
+                [column],
+                unique=False,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table, column in INDEXED_COLUMNS:
+            op.drop_index(
+                op.f(f'ix_{table}_{column}'),
+                table_name=table,
+                postgresql_concurrently=True,
+            )
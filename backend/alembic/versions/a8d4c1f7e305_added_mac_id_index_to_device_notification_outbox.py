@@ -0,0 +1,23 @@
+"""added mac_id index to device notification outbox
+
+Revision ID: a8d4c1f7e305
+Revises: 3f6d2b8e1a54
+Create Date: 2026-10-19 19:12:07.554920
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d4c1f7e305'
+down_revision = '3f6d2b8e1a54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_device_notification_outbox_mac_id_id', 'device_notification_outbox', ['mac_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_device_notification_outbox_mac_id_id', table_name='device_notification_outbox')
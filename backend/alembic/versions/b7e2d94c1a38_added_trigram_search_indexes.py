@@ -0,0 +1,50 @@
+"""added trigram search indexes
+
+Revision ID: b7e2d94c1a38
+Revises: e3c9a7b15f20
+Create Date: 2026-10-20 11:40:52.308816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d94c1a38'
+down_revision = 'e3c9a7b15f20'
+branch_labels = None
+depends_on = None
+
+# (index, table, column or expression) searched by backend.app.db.search
+TRIGRAM_INDEXES = [
+    ('ix_agent_name_trgm', 'agent', 'name'),
+    ('ix_device_mac_id_trgm', 'device', 'mac_id'),
+    ('ix_device_name_trgm', 'device', 'name'),
+    ('ix_user_email_trgm', 'user', 'email'),
+    ('ix_user_full_name_trgm', 'user', "(first_name || ' ' || last_name)"),
+    ('ix_user_lasrra_id_trgm', 'user', 'lasrra_id'),
+    ('ix_user_phone_trgm', 'user', 'phone'),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CREATE INDEX CONCURRENTLY does not lock out writes but can not run inside a
+    # transaction, hence the autocommit block
+    with op.get_context().autocommit_block():
+        for name, table, column in TRIGRAM_INDEXES:
+            op.create_index(
+                name,
+                table,
+                [sa.text(f'{column} gin_trgm_ops')],
+                unique=False,
+                postgresql_using='gin',
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in TRIGRAM_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    # the extension is left installed, other objects may have come to use it
@@ -0,0 +1,31 @@
+"""turned email table into an outbox
+
+Revision ID: c4a81f2e7b90
+Revises: 9e3b2a6c4d17
+Create Date: 2026-10-19 15:02:54.671390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a81f2e7b90'
+down_revision = '9e3b2a6c4d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('email', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    # existing rows are left without a next attempt so that the dispatcher does not
+    # resend emails that were already handled by the old inline sender
+    op.add_column('email', sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=True))
+    op.alter_column('email', 'next_attempt_at', server_default=sa.text('now()'))
+    op.create_index('ix_email_pending', 'email', ['next_attempt_at'], unique=False, postgresql_where=sa.text('next_attempt_at IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_email_pending', table_name='email')
+    op.drop_column('email', 'next_attempt_at')
+    op.drop_column('email', 'attempts')
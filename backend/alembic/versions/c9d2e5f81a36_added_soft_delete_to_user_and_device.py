@@ -0,0 +1,198 @@
+"""added soft delete to user and device
+
+Revision ID: c9d2e5f81a36
+Revises: 6e1b9d4a7c25
+Create Date: 2026-10-21 10:04:51.306118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d2e5f81a36'
+down_revision = '6e1b9d4a7c25'
+branch_labels = None
+depends_on = None
+
+NOT_DELETED = sa.text('NOT deleted')
+
+# (name, table, column, unique, where) of the indexes that replace the unique
+# constraints and the agent_id indexes, leaving deleted rows out
+PARTIAL_INDEXES = [
+    ('ix_user_email_not_deleted', 'user', 'email', True, NOT_DELETED),
+    ('ix_user_phone_not_deleted', 'user', 'phone', True, NOT_DELETED),
+    ('ix_user_lasrra_id_not_deleted', 'user', 'lasrra_id', True, NOT_DELETED),
+    ('ix_user_agent_id_not_deleted', 'user', 'agent_id', False, NOT_DELETED),
+    ('ix_user_deleted_at', 'user', 'deleted_at', False, sa.text('deleted')),
+    ('ix_device_mac_id_not_deleted', 'device', 'mac_id', True, NOT_DELETED),
+    ('ix_device_name_not_deleted', 'device', 'name', True, NOT_DELETED),
+    ('ix_device_agent_id_not_deleted', 'device', 'agent_id', False, NOT_DELETED),
+    ('ix_device_deleted_at', 'device', 'deleted_at', False, sa.text('deleted')),
+]
+
+# (name, table, column, unique) of the indexes they replace
+REPLACED_INDEXES = [
+    ('ix_user_email', 'user', 'email', True),
+    ('ix_user_agent_id', 'user', 'agent_id', False),
+    ('ix_device_mac_id', 'device', 'mac_id', True),
+    ('ix_device_name', 'device', 'name', True),
+    ('ix_device_agent_id', 'device', 'agent_id', False),
+]
+REPLACED_CONSTRAINTS = [
+    ('user_phone_key', 'user', 'phone'),
+    ('user_lasrra_id_key', 'user', 'lasrra_id'),
+]
+
+# The agent_summary functions, as added with the agent_summary table, with deleted
+# devices left out of the counts like deleted users already are. Soft deleting a
+# device counts as removing it, and purging it later changes nothing.
+COUNT_DEVICES = """
+CREATE OR REPLACE FUNCTION agent_summary_count_devices() RETURNS trigger AS $$
+DECLARE
+    changed text;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := 'SELECT new_rows.*, 1 AS sign FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changed := 'SELECT old_rows.*, -1 AS sign FROM old_rows';
+    ELSE
+        changed := format(
+            'SELECT old_rows.*, -1 AS sign FROM old_rows JOIN new_rows USING (id) '
+            'WHERE (%1$s) IS DISTINCT FROM (%2$s) '
+            'UNION ALL '
+            'SELECT new_rows.*, 1 AS sign FROM new_rows JOIN old_rows USING (id) '
+            'WHERE (%1$s) IS DISTINCT FROM (%2$s)',
+            '{old_columns}',
+            '{new_columns}'
+        );
+    END IF;
+    EXECUTE format(
+        'INSERT INTO agent_summary AS summary '
+        '(agent_id, active_devices, inactive_devices, unassigned_devices) '
+        'SELECT agent_id, '
+        'coalesce(sum(sign) FILTER (WHERE is_active IS TRUE), 0), '
+        'coalesce(sum(sign) FILTER (WHERE is_active IS NOT TRUE), 0), '
+        'coalesce(sum(sign) FILTER (WHERE NOT EXISTS ('
+        'SELECT 1 FROM device_user WHERE device_user.device_id = changed.id'
+        ')), 0) '
+        'FROM (%s) AS changed {where}GROUP BY agent_id '
+        'ON CONFLICT (agent_id) DO UPDATE SET '
+        'active_devices = summary.active_devices + excluded.active_devices, '
+        'inactive_devices = summary.inactive_devices + excluded.inactive_devices, '
+        'unassigned_devices = '
+        'summary.unassigned_devices + excluded.unassigned_devices',
+        changed
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+COUNT_DEVICE_USERS = """
+CREATE OR REPLACE FUNCTION agent_summary_count_device_users() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM device
+        WHERE id IN (SELECT device_id FROM new_rows)
+        ORDER BY id
+        FOR UPDATE;
+        -- a device was unassigned if the statement added all of its links
+        INSERT INTO agent_summary AS summary (agent_id, unassigned_devices)
+        SELECT device.agent_id, -count(*)
+        FROM (
+            SELECT device_id, count(*) AS added FROM new_rows GROUP BY device_id
+        ) AS linked
+        JOIN device ON device.id = linked.device_id
+        WHERE linked.added = (
+            SELECT count(*) FROM device_user
+            WHERE device_user.device_id = linked.device_id
+        ){and_device_not_deleted}
+        GROUP BY device.agent_id
+        ON CONFLICT (agent_id) DO UPDATE SET
+            unassigned_devices =
+                summary.unassigned_devices + excluded.unassigned_devices;
+    ELSE
+        PERFORM 1 FROM device
+        WHERE id IN (SELECT device_id FROM old_rows)
+        ORDER BY id
+        FOR UPDATE;
+        INSERT INTO agent_summary AS summary (agent_id, unassigned_devices)
+        SELECT device.agent_id, count(*)
+        FROM device
+        WHERE device.id IN (SELECT device_id FROM old_rows)
+        AND NOT EXISTS (
+            SELECT 1 FROM device_user WHERE device_user.device_id = device.id
+        ){and_device_not_deleted}
+        GROUP BY device.agent_id
+        ON CONFLICT (agent_id) DO UPDATE SET
+            unassigned_devices =
+                summary.unassigned_devices + excluded.unassigned_devices;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def _replace_agent_summary_functions(soft_delete: bool):
+    columns = ['agent_id', 'is_active'] + (['deleted'] if soft_delete else [])
+    op.execute(
+        COUNT_DEVICES.format(
+            old_columns=', '.join('old_rows.' + column for column in columns),
+            new_columns=', '.join('new_rows.' + column for column in columns),
+            where="WHERE changed.deleted IS NOT TRUE " if soft_delete else '',
+        )
+    )
+    op.execute(
+        COUNT_DEVICE_USERS.format(
+            and_device_not_deleted='\n        AND NOT device.deleted' if soft_delete else ''
+        )
+    )
+
+
+def upgrade():
+    op.execute('UPDATE "user" SET deleted = false WHERE deleted IS NULL')
+    op.alter_column('user', 'deleted', nullable=False, server_default=sa.false())
+    op.add_column('user', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column(
+        'device',
+        sa.Column('deleted', sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+    op.add_column('device', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    _replace_agent_summary_functions(soft_delete=True)
+
+    # like the foreign key indexes, built without locking out writes
+    with op.get_context().autocommit_block():
+        for name, table, column, unique, where in PARTIAL_INDEXES:
+            op.create_index(
+                name,
+                table,
+                [column],
+                unique=unique,
+                postgresql_where=where,
+                postgresql_concurrently=True,
+            )
+        for name, table, _, _ in REPLACED_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    for name, table, _ in REPLACED_CONSTRAINTS:
+        op.drop_constraint(name, table, type_='unique')
+
+
+def downgrade():
+    # fails while a deleted row shares a value with one that is not, which the
+    # purge job clears up once the deleted row is old enough
+    for name, table, column in REPLACED_CONSTRAINTS:
+        op.create_unique_constraint(name, table, [column])
+    with op.get_context().autocommit_block():
+        for name, table, column, unique in REPLACED_INDEXES:
+            op.create_index(
+                name, table, [column], unique=unique, postgresql_concurrently=True
+            )
+        for name, table, _, _, _ in PARTIAL_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+    _replace_agent_summary_functions(soft_delete=False)
+    op.drop_column('device', 'deleted_at')
+    op.drop_column('device', 'deleted')
+    op.drop_column('user', 'deleted_at')
+    op.alter_column('user', 'deleted', nullable=True, server_default=None)
@@ -0,0 +1,29 @@
+"""added seed version table
+
+Revision ID: d51f0c8b2e76
+Revises: a8d4c1f7e305
+Create Date: 2026-10-19 21:04:33.180142
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd51f0c8b2e76'
+down_revision = 'a8d4c1f7e305'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('seed_version',
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('fingerprint', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('fingerprint')
+    )
+
+
+def downgrade():
+    op.drop_table('seed_version')
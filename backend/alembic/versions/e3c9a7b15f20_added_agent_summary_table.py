@@ -0,0 +1,237 @@
+"""added agent summary table
+
+Revision ID: e3c9a7b15f20
+Revises: d51f0c8b2e76
+Create Date: 2026-10-20 09:12:27.514093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3c9a7b15f20'
+down_revision = 'd51f0c8b2e76'
+branch_labels = None
+depends_on = None
+
+
+# The counters are adjusted once per statement, from the rows the statement changed,
+# so a bulk insert of devices or links adds to each agent's row once. Old rows are
+# taken away (sign -1) and new rows added (sign 1), which also covers rows moving
+# from one agent to another; updates leave out the rows whose counted columns did
+# not change, so that touching a row does not lock its agent's counters.
+# The transition tables a statement has depend on its event, hence the dynamic SQL.
+CHANGED_ROWS = """
+    IF TG_OP = 'INSERT' THEN
+        changed := 'SELECT new_rows.*, 1 AS sign FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        changed := 'SELECT old_rows.*, -1 AS sign FROM old_rows';
+    ELSE
+        changed := format(
+            'SELECT old_rows.*, -1 AS sign FROM old_rows JOIN new_rows USING (id) '
+            'WHERE (%1$s) IS DISTINCT FROM (%2$s) '
+            'UNION ALL '
+            'SELECT new_rows.*, 1 AS sign FROM new_rows JOIN old_rows USING (id) '
+            'WHERE (%1$s) IS DISTINCT FROM (%2$s)',
+            '{old_columns}',
+            '{new_columns}'
+        );
+    END IF;
+"""
+
+COUNT_DEVICES = """
+CREATE FUNCTION agent_summary_count_devices() RETURNS trigger AS $$
+DECLARE
+    changed text;
+BEGIN
+""" + CHANGED_ROWS.format(
+    old_columns="old_rows.agent_id, old_rows.is_active",
+    new_columns="new_rows.agent_id, new_rows.is_active",
+) + """
+    EXECUTE format(
+        'INSERT INTO agent_summary AS summary '
+        '(agent_id, active_devices, inactive_devices, unassigned_devices) '
+        'SELECT agent_id, '
+        'coalesce(sum(sign) FILTER (WHERE is_active IS TRUE), 0), '
+        'coalesce(sum(sign) FILTER (WHERE is_active IS NOT TRUE), 0), '
+        'coalesce(sum(sign) FILTER (WHERE NOT EXISTS ('
+        'SELECT 1 FROM device_user WHERE device_user.device_id = changed.id'
+        ')), 0) '
+        'FROM (%s) AS changed GROUP BY agent_id '
+        'ON CONFLICT (agent_id) DO UPDATE SET '
+        'active_devices = summary.active_devices + excluded.active_devices, '
+        'inactive_devices = summary.inactive_devices + excluded.inactive_devices, '
+        'unassigned_devices = '
+        'summary.unassigned_devices + excluded.unassigned_devices',
+        changed
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# Adding and removing links first locks the devices, as the device user change log
+# does, so that of two transactions linking the same device one after the other the
+# second sees the first one's links, and only the first counts the device as no
+# longer unassigned.
+COUNT_DEVICE_USERS = """
+CREATE FUNCTION agent_summary_count_device_users() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM device
+        WHERE id IN (SELECT device_id FROM new_rows)
+        ORDER BY id
+        FOR UPDATE;
+        -- a device was unassigned if the statement added all of its links
+        INSERT INTO agent_summary AS summary (agent_id, unassigned_devices)
+        SELECT device.agent_id, -count(*)
+        FROM (
+            SELECT device_id, count(*) AS added FROM new_rows GROUP BY device_id
+        ) AS linked
+        JOIN device ON device.id = linked.device_id
+        WHERE linked.added = (
+            SELECT count(*) FROM device_user
+            WHERE device_user.device_id = linked.device_id
+        )
+        GROUP BY device.agent_id
+        ON CONFLICT (agent_id) DO UPDATE SET
+            unassigned_devices =
+                summary.unassigned_devices + excluded.unassigned_devices;
+    ELSE
+        PERFORM 1 FROM device
+        WHERE id IN (SELECT device_id FROM old_rows)
+        ORDER BY id
+        FOR UPDATE;
+        INSERT INTO agent_summary AS summary (agent_id, unassigned_devices)
+        SELECT device.agent_id, count(*)
+        FROM device
+        WHERE device.id IN (SELECT device_id FROM old_rows)
+        AND NOT EXISTS (
+            SELECT 1 FROM device_user WHERE device_user.device_id = device.id
+        )
+        GROUP BY device.agent_id
+        ON CONFLICT (agent_id) DO UPDATE SET
+            unassigned_devices =
+                summary.unassigned_devices + excluded.unassigned_devices;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+COUNT_USERS = """
+CREATE FUNCTION agent_summary_count_users() RETURNS trigger AS $$
+DECLARE
+    changed text;
+BEGIN
+""" + CHANGED_ROWS.format(
+    old_columns="old_rows.agent_id, old_rows.user_type_id, old_rows.deleted",
+    new_columns="new_rows.agent_id, new_rows.user_type_id, new_rows.deleted",
+) + """
+    EXECUTE format(
+        'INSERT INTO agent_summary AS summary (agent_id, officers, supervisors) '
+        'SELECT changed.agent_id, '
+        'coalesce(sum(sign) FILTER (WHERE usertype.name = %1$L), 0), '
+        'coalesce(sum(sign) FILTER (WHERE usertype.name = %2$L), 0) '
+        'FROM (%3$s) AS changed '
+        'JOIN usertype ON usertype.id = changed.user_type_id '
+        'WHERE changed.agent_id IS NOT NULL AND changed.deleted IS NOT TRUE '
+        'AND usertype.name IN (%1$L, %2$L) '
+        'GROUP BY changed.agent_id '
+        'ON CONFLICT (agent_id) DO UPDATE SET '
+        'officers = summary.officers + excluded.officers, '
+        'supervisors = summary.supervisors + excluded.supervisors',
+        'AGENT_OFFICER',
+        'AGENT_SUPERVISOR',
+        changed
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+TRIGGERS = [
+    ("device", "agent_summary_count_devices"),
+    ("device_user", "agent_summary_count_device_users"),
+    ('"user"', "agent_summary_count_users"),
+]
+
+BACKFILL = """
+INSERT INTO agent_summary (
+    agent_id, active_devices, inactive_devices, unassigned_devices, officers,
+    supervisors
+)
+SELECT
+    agent.id,
+    (SELECT count(*) FROM device
+     WHERE device.agent_id = agent.id AND device.is_active IS TRUE),
+    (SELECT count(*) FROM device
+     WHERE device.agent_id = agent.id AND device.is_active IS NOT TRUE),
+    (SELECT count(*) FROM device
+     WHERE device.agent_id = agent.id
+     AND NOT EXISTS (SELECT 1 FROM device_user WHERE device_id = device.id)),
+    (SELECT count(*) FROM "user" JOIN usertype ON usertype.id = "user".user_type_id
+     WHERE "user".agent_id = agent.id AND "user".deleted IS NOT TRUE
+     AND usertype.name = 'AGENT_OFFICER'),
+    (SELECT count(*) FROM "user" JOIN usertype ON usertype.id = "user".user_type_id
+     WHERE "user".agent_id = agent.id AND "user".deleted IS NOT TRUE
+     AND usertype.name = 'AGENT_SUPERVISOR')
+FROM agent
+"""
+
+
+def _trigger_name(function_name, event):
+    return "{}_after_{}".format(function_name, event.lower())
+
+
+def upgrade():
+    op.create_table('agent_summary',
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('agent_id', sa.Integer(), nullable=False),
+    sa.Column('active_devices', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('inactive_devices', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('unassigned_devices', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('officers', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('supervisors', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.ForeignKeyConstraint(['agent_id'], ['agent.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('agent_id')
+    )
+    for statement in (COUNT_DEVICES, COUNT_DEVICE_USERS, COUNT_USERS):
+        op.execute(statement)
+    # nothing can change the counted tables between the backfill and the triggers
+    for table, _ in TRIGGERS:
+        op.execute("LOCK TABLE {} IN SHARE MODE".format(table))
+    op.execute(BACKFILL)
+    for table, function_name in TRIGGERS:
+        # a trigger with transition tables can only be for one event
+        for event, transition_tables in (
+            ("INSERT", "NEW TABLE AS new_rows"),
+            ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+            ("DELETE", "OLD TABLE AS old_rows"),
+        ):
+            if table == "device_user" and event == "UPDATE":
+                continue
+            op.execute(
+                "CREATE TRIGGER {} AFTER {} ON {} REFERENCING {} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION {}()".format(
+                    _trigger_name(function_name, event),
+                    event,
+                    table,
+                    transition_tables,
+                    function_name,
+                )
+            )
+
+
+def downgrade():
+    for table, function_name in TRIGGERS:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            op.execute(
+                "DROP TRIGGER IF EXISTS {} ON {}".format(
+                    _trigger_name(function_name, event), table
+                )
+            )
+        op.execute("DROP FUNCTION {}()".format(function_name))
+    op.drop_table('agent_summary')
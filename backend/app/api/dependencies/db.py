@@ -1,11 +1,14 @@
-from typing import Generator
+from typing import AsyncGenerator
 
 from backend.app.db.session import SessionLocal
 
 
-def get_db() -> Generator:
+async def get_db() -> AsyncGenerator:
+    # closed on the event loop rather than on the threadpool: a session keeps its
+    # connection until it is closed, and once every thread is waiting on the
+    # connection pool, closing it on the threadpool would never happen
+    db = SessionLocal()
     try:
-        db = SessionLocal()
         yield db
     finally:
         db.close()
@@ -15,3 +15,19 @@ NOT_AN_AGENT_EMPLOYEE_ERROR = "user not an agent employee"
 NOT_AN_AGENT_OFFICER_ERROR = "user not an agent Officer"
 AGENT_EMPLOYEE_USER_NOT_SELECTED_ERROR ="UserType needs to be either an Agent's Supervisor or an Agent's Officer"
 INVALID_API_KEY = "invalid api key"
+DUPLICATED_IN_BATCH = "{} appears more than once in this batch"
+DOES_NOT_EXIST = "{} does not exist"
+INVALID_CSV_FILE = "the file is not a UTF-8 encoded CSV file"
+TOO_MANY_ROWS = "the file has more than {} rows"
+
+# answered, through the IntegrityError handler, when a write violates the constraint,
+# "{}" stands for the offending value
+CONSTRAINT_MESSAGES = {
+    "ix_device_mac_id_not_deleted": ALREADY_EXISTS.format("device with mac id {}"),
+    "ix_device_name_not_deleted": ALREADY_EXISTS.format("device with name {}"),
+    "device_agent_id_fkey": DOES_NOT_EXIST.format("agent with id {}"),
+    "ix_user_email_not_deleted": ALREADY_EXISTS.format("user with email {}"),
+    "ix_user_lasrra_id_not_deleted": ALREADY_EXISTS.format("user with lasrra_id {}"),
+    "ix_user_phone_not_deleted": ALREADY_EXISTS.format("user with phone {}"),
+    "ix_agent_email": ALREADY_EXISTS.format("agent with email {}"),
+}
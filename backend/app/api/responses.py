@@ -0,0 +1,33 @@
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, installed with the fast-json extra
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Renders JSON-ready content with orjson when it is installed, which is several
+    times faster than the json module on the large listings, and the way
+    JSONResponse does otherwise.
+    """
+    if orjson is None:
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    The application's default response class, rendering with `dumps`.
+    FastAPI passes it content that jsonable_encoder has already made JSON-ready,
+    and the serializers hand it plain dicts, so both encoders see the same values.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
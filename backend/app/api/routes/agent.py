@@ -1,6 +1,5 @@
-from datetime import datetime
-from typing import List
-from app.schemas.device import DeviceInDB
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 
 from backend.app.schemas.email import (
     ResetPasswordEmailTemplateVariables,
@@ -8,7 +7,6 @@ from backend.app.schemas.email import (
     UserCreationTemplateVariables,
     UserDeactivationTemplateVariables,
 )
-from backend.app.tasks import devices
 from backend.app.api.dependencies.authentication import (
     get_currently_authenticated_user,
     superuser_permission_dependency,
@@ -22,9 +20,17 @@ from backend.app.api.errors.exceptions import (
     ServerException,
     UnauthorizedEndpointException,
 )
+from backend.app.api.serializers import (
+    render,
+    serialize_agent,
+    serialize_device_status,
+    serialize_devices,
+    serialize_users,
+)
 from backend.app.core.settings import settings
 from backend.app.db.repositories.device import device_repo
 from backend.app.db.repositories.agent import agent_repo
+from backend.app.db.repositories.agent_summary import agent_summary_repo
 from backend.app.db.repositories.reset_token import reset_token_repo
 from backend.app.db.repositories.user import user_repo
 from backend.app.db.repositories.user_type import user_type as user_type_repo
@@ -35,27 +41,25 @@ from backend.app.schemas.user import (
 
     AgentEmployeeUserCreateForm,
     ResetPasswordSchema,
-    SlimUserInResponse,
     UserCreate,
     UserCreateForm,
-    UserInResponse,
     UserUpdate,
 )
 
 from backend.app.schemas.agent import (
     Agent,
+    AgentDevicesStatus,
     AgentCreate,
     AgentCreateForm,
     AgentUpdate,
     AgentProfile,
-    AgentInResponse
+    AgentInResponse,
+    AgentSummary,
+    SystemSummary,
 )
-from backend.app.schemas.user_type import UserTypeInDB
-from backend.app.services.email import send_email_with_template
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, Query
 from fastapi.exceptions import HTTPException
 from itsdangerous.exc import BadSignature
-from postmarker import core
 from pydantic.networks import EmailStr
 from sqlalchemy.orm import Session
 from starlette.status import HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN
@@ -65,6 +69,7 @@ AGENT = settings.AGENT
 REGULAR_USER_TYPE = settings.REGULAR_USER_TYPE
 SUPERUSER_USER_TYPE = settings.SUPERUSER_USER_TYPE
 AGENT_MANAGER = settings.AGENT_MANAGER
+DEVICE_OFFLINE_AFTER_SECONDS = settings.DEVICE_OFFLINE_AFTER_SECONDS
 
 
 
@@ -80,12 +85,7 @@ router = APIRouter()
 
 
 def check_unique_agent(db: Session, agent_in: AgentCreateForm):
-    agent_with_same_email = agent_repo.get_by_email(db, email=agent_in.email)
-    if agent_with_same_email:
-        raise AlreadyExistsException(
-            entity_name="agent with email {}".format(agent_in.email)
-        )
-    
+    # the email is left to its unique index, the name has no constraint to rely on
     agent_with_same_name = agent_repo.get_by_name(db, name=agent_in.name)
     if agent_with_same_name:
         raise AlreadyExistsException()
@@ -121,14 +121,7 @@ def create_agent(
         ),
     )
     
-    return AgentInResponse(
-        id=agent.id,
-        name=agent_in.name,
-        email=agent_in.email,
-        address=agent_in.address,
-        user_type=UserTypeInDB(id=user_type.id, name=user_type.name),
-        created_by_id=current_user.id,
-    )
+    return render(serialize_agent(agent))
 
 
 
@@ -154,18 +147,7 @@ def get_all_agent(
     allagents = agent_repo.get_all(db)
     
 
-    return [
-        AgentInResponse(
-        id=agent.id,
-        name=agent.name,
-        email=agent.email,
-        address=agent.address,
-        user_type=UserTypeInDB(id=agent.user_type.id, name=agent.user_type.name),
-        created_by_id=current_user.id,
-    )
-    for agent in allagents
-            
-     ]
+    return render([serialize_agent(agent) for agent in allagents])
 
         
     
@@ -224,60 +206,107 @@ def get_an_agent_profile(
     assigned_users = user_repo.get_all_users_with_agent_id(db, agent_id=agent_id)
     owned_devices = device_repo.get_all_devices_with_agent_id(db, agent_id=agent_id)
 
-    employees = [
-        UserInResponse(
-            id=user.id,
-            email=user.email,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            address=user.address,
-            phone=user.phone,
-            lasrra_id=user.lasrra_id,
-            is_active=user.is_active,
-            agent_id=user.agent_id,
-            is_superuser=user.is_superuser,
-            user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            created_by_id=current_user.id,
-        )
-        for user in assigned_users
-    ]
-    devices = [
-        DeviceInDB(
-            id=device.id,
-            name=device.name,
-            mac_id=device.mac_id,      
-            creator_id=device.creator_id,
-            is_active=device.is_active,
-            agent_id=device.agent_id,
-            agent_name=agent.name,
-            assigned_users=[
-                SlimUserInResponse(
-                    id=user.id,
-                    email=user.email,
-                    lasrra_id=user.lasrra_id,
-                    user_type=UserTypeInDB(
-                        id=user.user_type.id, name=user.user_type.name
-                    ),
-                )
-                for user in device.assigned_users
-            ],
-        )
-        for device in owned_devices
-    ]
-
-    return AgentProfile(
-        agent=AgentInResponse(
-            id=agent.id,
-            name=agent.name,
-            email=agent.email,
-            address=agent.address,
-            user_type=UserTypeInDB(
-                id=agent.user_type_id,
-                name=agent.user_type.name,
+    return render(
+        {
+            "agent": serialize_agent(agent),
+            "devices": serialize_devices(
+                owned_devices, agent_names={agent.id: agent.name}
             ),
-        ),
-        devices=devices,
-        employees=employees,
+            "employees": serialize_users(assigned_users),
+        }
     )
 
 
+
+@router.get(
+    "/summary",
+    response_model=SystemSummary,
+    dependencies=[Depends(superuser_permission_dependency)],
+)
+def get_system_summary(*, db: Session = Depends(get_db)) -> SystemSummary:
+    """
+    This endpoint returns how many agents there are and, across all of them, how many
+    devices are active, inactive and unassigned, and how many officers and
+    supervisors there are.
+    Only a superuser can access this endpoint.
+    """
+    return render(agent_summary_repo.get_total_counts(db))
+
+
+@router.get(
+    "/agent_summary/{agent_id}",
+    response_model=AgentSummary,
+    dependencies=[Depends(manager_and_supervisor_and_superuser_permission_dependency)],
+)
+def get_an_agent_summary(
+    agent_id: int,
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_currently_authenticated_user),
+) -> AgentSummary:
+    """
+    This endpoint returns how many of an agent's devices are active, inactive and
+    unassigned, and how many officers and supervisors the agent has.
+    You can view only your own agent's summary if you are a manager or a supervisor.
+    """
+    if (
+        current_user.user_type.name != SUPERUSER_USER_TYPE
+        and current_user.agent_id != agent_id
+    ):
+        raise HTTPException(
+            HTTP_403_FORBIDDEN, detail="you can only view your own agent summary"
+        )
+    if not agent_repo.get(db, id=agent_id):
+        raise ObjectNotFoundException(detail=f"agent with id {agent_id} was not found")
+
+    return render(
+        {"agent_id": agent_id, **agent_summary_repo.get_counts(db, agent_id=agent_id)}
+    )
+
+
+@router.get(
+    "/agent_devices_status/{agent_id}",
+    response_model=AgentDevicesStatus,
+    dependencies=[Depends(manager_and_supervisor_and_superuser_permission_dependency)],
+)
+def get_an_agent_devices_status(
+    agent_id: int,
+    *,
+    online: Optional[bool] = Query(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_currently_authenticated_user),
+) -> AgentDevicesStatus:
+    """
+    This endpoint returns how many of an agent's devices are online and offline, and the devices, offline ones first, with when each was last seen and the status it last reported.
+    A device is online if it sent a heartbeat within the last DEVICE_OFFLINE_AFTER_SECONDS. Pass online=true or online=false to list only the online or only the offline devices, the counts are always for all of them.
+    You can view only your own agent's devices if you are a manager or a supervisor.
+    """
+    if (
+        current_user.user_type.name != SUPERUSER_USER_TYPE
+        and current_user.agent_id != agent_id
+    ):
+        raise HTTPException(
+            HTTP_403_FORBIDDEN, detail="you can only view your own agent's devices"
+        )
+    if not agent_repo.get(db, id=agent_id):
+        raise ObjectNotFoundException(detail=f"agent with id {agent_id} was not found")
+
+    online_since = datetime.now(timezone.utc) - timedelta(
+        seconds=DEVICE_OFFLINE_AFTER_SECONDS
+    )
+    devices = device_repo.get_last_seen_by_agent_id(
+        db, agent_id=agent_id, online_since=online_since
+    )
+    online_count = sum(1 for _, is_online in devices if is_online)
+    return render(
+        {
+            "agent_id": agent_id,
+            "online": online_count,
+            "offline": len(devices) - online_count,
+            "devices": [
+                serialize_device_status(device, online=is_online)
+                for device, is_online in devices
+                if online is None or is_online == online
+            ],
+        }
+    )
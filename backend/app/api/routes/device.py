@@ -1,13 +1,21 @@
-from typing import List
+from datetime import datetime, timezone
+from typing import List, Optional
 from backend.app.schemas.email import (
     DeviceActivationTemplateVariables,
     DeviceDeactivationTemplateVariables,
 )
-from backend.app.services.email import send_email_with_template
-from backend.app.tasks.devices import send_notification_to_devices
-from postmarker import core
-
-from starlette.background import BackgroundTasks
+from backend.app.services.email import queue_email_with_template
+from backend.app.services.assignment import (
+    assign_devices,
+    can_access_device_obj,
+    unassign_devices,
+)
+from backend.app.services.device_metadata import get_device_metadata_batch
+from backend.app.services.device_heartbeats import device_heartbeat_buffer
+from backend.app.services.device_metadata_cache import device_metadata_cache
+from backend.app.services.device_updates import device_update_hub
+from backend.app.services.csv_upload import TooManyRowsError
+from backend.app.services.provisioning import parse_devices_csv, provision_devices
 
 from backend.app.api.dependencies.authentication import (
     DeviceAPIKeyHeader,
@@ -31,55 +39,62 @@ from backend.app.api.errors.exceptions import (
     ObjectNotFoundException,
     UnauthorizedEndpointException,
 )
+from backend.app.api.responses import dumps
+from backend.app.api.serializers import render, serialize_device, serialize_devices
 from backend.app.core.settings import settings
 from backend.app.db.repositories.api_key import api_key_repository
 from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.device_notification import device_notification_repo
+from backend.app.db.repositories.device_user_change import device_user_change_repo
 from backend.app.db.repositories.user import user_repo
 from backend.app.db.repositories.agent import agent_repo
-from backend.app.models.device import Device
+from backend.app.db.session import SessionLocal
 from backend.app.models.user import User
 from backend.app.schemas.device import (
+    DeviceAssignment,
+    DeviceAssignmentBulkReport,
+    DeviceBulkReport,
     DeviceConfig,
     DeviceCreate,
+    DeviceHeartbeat,
     DeviceInBody,
     DeviceInDB,
     DeviceMetaData,
+    DeviceMetaDataBatch,
+    DeviceMetaDataBatchRequest,
+    DeviceMetaDataCacheStats,
     DeviceUpdate,
     DeviceUser,
+    DeviceUserChanges,
     DeviceUserUpdate,
 )
-from backend.app.schemas.user import SlimUserInResponse
-from backend.app.schemas.user_type import UserTypeInDB
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, File, Query, UploadFile
+from pydantic import conlist
 from fastapi.exceptions import HTTPException
 from fastapi.param_functions import Security
 from sqlalchemy.orm import Session
-from starlette.status import HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.status import (
+    HTTP_202_ACCEPTED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_403_FORBIDDEN,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
 
 AGENT = settings.AGENT
 SUPERUSER_USER_TYPE = settings.SUPERUSER_USER_TYPE
 # AGENT_EMPLOYEE_USER_TYPE = settings.AGENT_EMPLOYEE_TYPE
 AGENT_OFFICER =settings.AGENT_OFFICER
 API_KEY_AUTH_ENABLED = settings.API_KEY_AUTH_ENABLED
+BULK_MAX_ROWS = settings.BULK_MAX_ROWS
 
 DEACTIVATE_DEVICE_TEMPLATE_ID = settings.DEACTIVATE_DEVICE_TEMPLATE_ID
 ACTIVATE_DEVICE_TEMPLATE_ID = settings.ACTIVATE_DEVICE_TEMPLATE_ID
 
 
-def can_access_device_obj(device: Device, user: User):
-    """
-    The user can access this device on 3 conditions
-    1. the user is a superuser
-    2. the user created this device
-    3. the user is currently assigned to the agent of the device
-    """
-    return (
-        user.user_type.name == 'SUPERUSER'
-        or device.creator_id == user.id
-        or device.agent_id == user.agent_id
-    )
-
-
 router = APIRouter()
 
 
@@ -97,58 +112,64 @@ def create_device(
     This endpoint is used to create a device.
     You need to be an agent's manager, or superuser to create a device.
     """
-    mac_id_exists = device_repo.get_by_field(
-        db, field_name="mac_id", field_value=device_in.mac_id
-    )
-    if mac_id_exists:
-        raise AlreadyExistsException(
-            detail=ALREADY_EXISTS.format(f"device with mac id {device_in.mac_id}")
-        )
-
-    name_exists = device_repo.get_by_field(
-        db, field_name="name", field_value=device_in.name
+    # the unique indexes on mac_id and name and the agent foreign key reject what
+    # looking the rows up first would, without a round trip or a race, and the
+    # IntegrityError handler answers with the message registered for the constraint
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=device_in.mac_id,
+            name=device_in.name,
+            creator_id=current_user.id,
+            agent_id=device_in.agent_id,
+        ),
     )
 
-    if name_exists:
-        raise AlreadyExistsException(
-            detail=ALREADY_EXISTS.format(f"device with name {device_in.name}")
-        )
+    return render(serialize_device(device))
 
 
+@router.post(
+    "/bulk",
+    response_model=DeviceBulkReport,
+    dependencies=[Depends(manager_and_superuser_permission_dependency)],
+)
+def bulk_create_devices(
+    devices_in: conlist(DeviceInBody, max_items=BULK_MAX_ROWS),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_currently_authenticated_user),
+) -> DeviceBulkReport:
+    """
+    This endpoint is used to create many devices in one request.
+    It takes a JSON array of up to BULK_MAX_ROWS devices and returns a report with one result per device, in the same order.
+    A device which fails validation does not stop the rest of the batch from being created.
+    You need to be an agent's manager, or superuser to create devices.
+    """
+    return provision_devices(db, devices_in=devices_in, creator=current_user)
 
-    agent = agent_repo.get(db, id=device_in.agent_id)
-    
-    if not agent:
-        raise HTTPException(
-            HTTP_400_BAD_REQUEST,
-            detail=f"agent with id {device_in.agent_id} does not exist",
-        )
-
-    # if agent.user_type.name != AGENT:
-    #     raise UnauthorizedEndpointException(detail=f"the user with id {agent.id} is not an agent")
-
-
-    device = device_repo.create(
-        db, obj_in=DeviceCreate(mac_id=device_in.mac_id, name=device_in.name, creator_id=current_user.id,agent_id=agent.id)
-    )
 
-    return DeviceInDB(
-        id=device.id,
-        name=device.name,
-        mac_id=device.mac_id,
-        creator_id=device.creator_id,
-        is_active=device.is_active,
-        agent_id=device.agent_id,
-        assigned_users=[
-            SlimUserInResponse(
-                id=user.id,
-                email=user.email,
-                lasrra_id=user.lasrra_id,
-                user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            )
-            for user in device.assigned_users
-        ],
-    )
+@router.post(
+    "/bulk/csv",
+    response_model=DeviceBulkReport,
+    dependencies=[Depends(manager_and_superuser_permission_dependency)],
+)
+def bulk_create_devices_from_csv(
+    devices_csv: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_currently_authenticated_user),
+) -> DeviceBulkReport:
+    """
+    This endpoint does the same thing as /bulk but takes a CSV file upload.
+    The first line of the file must be the header name,mac_id,agent_id.
+    A row that fails validation is reported like any other failed row, a file which is not UTF-8 encoded CSV gets a 400, and one with more than BULK_MAX_ROWS rows a 413.
+    You need to be an agent's manager, or superuser to create devices.
+    """
+    try:
+        devices_in = parse_devices_csv(devices_csv.file.read())
+    except TooManyRowsError as e:
+        raise HTTPException(status_code=HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    return provision_devices(db, devices_in=devices_in, creator=current_user)
 
 
 @router.get(
@@ -166,29 +187,8 @@ def get_all_existing_devices(
 
     """
     devices = device_repo.get_all(db)
-    return [
-        DeviceInDB(
-            id=device.id,
-            name=device.name,
-            mac_id=device.mac_id,
-            creator_id=device.creator_id,
-            is_active=device.is_active,
-            agent_id=device.agent_id,
-            agent_name=agent_repo.get_name(db, id=device.agent_id),
-            assigned_users=[
-                SlimUserInResponse(
-                    id=user.id,
-                    email=user.email,
-                    lasrra_id=user.lasrra_id,
-                    user_type=UserTypeInDB(
-                        id=user.user_type.id, name=user.user_type.name
-                    ),
-                )
-                for user in device.assigned_users
-            ],
-        )
-        for device in devices
-    ]
+    agent_names = agent_repo.get_names(db, ids=[device.agent_id for device in devices])
+    return render(serialize_devices(devices, agent_names=agent_names))
 
 
 @router.get(
@@ -206,28 +206,7 @@ def get_all_devices_owned_by_current_user(
     """
 
     devices = device_repo.get_all_devices_with_agent_id(db, agent_id=current_user.agent_id)
-    return [
-        DeviceInDB(
-            id=device.id,
-            name=device.name,
-            mac_id=device.mac_id,
-            creator_id=device.creator_id,
-            is_active=device.is_active,
-            agent_id=device.agent_id,
-            assigned_users=[
-                SlimUserInResponse(
-                    id=user.id,
-                    email=user.email,
-                    lasrra_id=user.lasrra_id,
-                    user_type=UserTypeInDB(
-                        id=user.user_type.id, name=user.user_type.name
-                    ),
-                )
-                for user in device.assigned_users
-            ],
-        )
-        for device in devices
-    ]
+    return render(serialize_devices(devices))
 
 
 @router.get("/{mac_id}/metadata", response_model=DeviceMetaData)
@@ -248,12 +227,21 @@ def get_device_metadata(
     ):
         raise UnauthorizedEndpointException(detail=INVALID_API_KEY)
 
+    cache_version = device_notification_repo.get_version(db, mac_id=mac_id)
+    cache_generation = device_metadata_cache.generation
+    content = device_metadata_cache.get(mac_id, cache_version)
+    if content is not None:
+        return Response(content, media_type="application/json")
+
     device = device_repo.get_by_field(db, field_name="mac_id", field_value=mac_id)
     if not device:
         raise ObjectNotFoundException(detail=f"device with mac_id {mac_id} not found")
     if not device.is_active:
         raise InactiveDeviceException()
 
+    # read before the users, so that the users are at least as new as the version
+    # and syncing from it can only replay changes the device already has
+    version = device_user_change_repo.get_version(db, device_id=device.id)
     config = device_repo.get_device_config(db, device_obj=device)
 
     assigned_users = [
@@ -264,10 +252,162 @@ def get_device_metadata(
     config = DeviceConfig(**config)
     device_agent_json = device_agent.to_json()
 
-    return DeviceMetaData(
-        config=config,
-        assigned_users=assigned_users,
-        agent=device_agent_json,
+    content = dumps(
+        DeviceMetaData(
+            config=config,
+            assigned_users=assigned_users,
+            agent=device_agent_json,
+            version=version,
+        ).dict()
+    )
+    device_metadata_cache.put(
+        mac_id, cache_version, content, generation=cache_generation
+    )
+    return Response(content, media_type="application/json")
+
+
+@router.post("/{mac_id}/heartbeat", status_code=HTTP_202_ACCEPTED)
+def record_device_heartbeat(
+    mac_id: str,
+    heartbeat_in: Optional[DeviceHeartbeat] = None,
+    *,
+    db: Session = Depends(get_db),
+    api_key: str = Security(DeviceAPIKeyHeader(name="X-API-KEY")),
+):
+    """
+    This endpoint records that the device with mac_id is alive, and optionally its battery level and app version.
+    Heartbeats are kept in memory and written a few seconds later, together with every other device's, so last_seen_at lags behind by up to DEVICE_HEARTBEAT_FLUSH_SECONDS. A mac_id without a device is ignored when they are written.
+    You need an API Key in the header to use this endpoint.
+    This API Key goes in the header like this X-API-Key: "<API-KEY>"
+    If the process is holding too many heartbeats to take another, you get a 503 and should send it again later.
+    """
+    if API_KEY_AUTH_ENABLED and not api_key_repository.verify_api_key(
+        db, plain_api_key=api_key
+    ):
+        raise UnauthorizedEndpointException(detail=INVALID_API_KEY)
+
+    heartbeat_in = heartbeat_in or DeviceHeartbeat()
+    if not device_heartbeat_buffer.record(
+        mac_id,
+        datetime.now(timezone.utc),
+        battery_level=heartbeat_in.battery_level,
+        app_version=heartbeat_in.app_version,
+    ):
+        raise HTTPException(
+            HTTP_503_SERVICE_UNAVAILABLE, detail="too many heartbeats, try again later"
+        )
+    return Response(status_code=HTTP_202_ACCEPTED)
+
+
+@router.get(
+    "/metadata/cache",
+    response_model=DeviceMetaDataCacheStats,
+    dependencies=[Depends(superuser_permission_dependency)],
+)
+def get_device_metadata_cache_stats():
+    """
+    This endpoint gets the hits and misses of the device metadata cache of the process that serves the request, every API process keeps its own cache.
+    You need to be a superuser to use this endpoint.
+    """
+    return device_metadata_cache.stats()
+
+
+@router.post("/metadata:batch", response_model=DeviceMetaDataBatch)
+def get_many_devices_metadata(
+    batch_in: DeviceMetaDataBatchRequest,
+    db: Session = Depends(get_db),
+    api_key: str = Security(DeviceAPIKeyHeader(name="X-API-KEY")),
+):
+    """
+    This endpoint gets the metadata of many devices in one request, for gateways that proxy for several devices.
+    It takes up to DEVICE_METADATA_BATCH_MAX_SIZE mac_ids and returns the metadata of each device keyed by mac_id, a device that does not exist or is inactive is keyed in errors instead.
+    You need an API Key in the header to use this endpoint.
+    This API Key goes in the header like this X-API-Key: "<API-KEY>"
+    """
+    if API_KEY_AUTH_ENABLED and not api_key_repository.verify_api_key(
+        db, plain_api_key=api_key
+    ):
+        raise UnauthorizedEndpointException(detail=INVALID_API_KEY)
+
+    return get_device_metadata_batch(db, mac_ids=list(dict.fromkeys(batch_in.mac_ids)))
+
+
+@router.get("/{mac_id}/users/changes", response_model=DeviceUserChanges)
+def get_device_user_changes(
+    mac_id: str,
+    *,
+    since: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    api_key: str = Security(DeviceAPIKeyHeader(name="X-API-KEY")),
+):
+    """
+    This endpoint gets the users assigned to, modified on or unassigned from the device with mac_id since the version `since`.
+    A device keeps the version from its metadata or from its last sync, and sends it back as `since` to get only what changed after it, a device without one sends 0 to get all of its users.
+    You need an API Key in the header to use this endpoint.
+    This API Key goes in the header like this X-API-Key: "<API-KEY>"
+    If a device is inactive, you get a 403.
+    """
+    if API_KEY_AUTH_ENABLED and not api_key_repository.verify_api_key(
+        db, plain_api_key=api_key
+    ):
+        raise UnauthorizedEndpointException(detail=INVALID_API_KEY)
+
+    device = device_repo.get_by_field(db, field_name="mac_id", field_value=mac_id)
+    if not device:
+        raise ObjectNotFoundException(detail=f"device with mac_id {mac_id} not found")
+    if not device.is_active:
+        raise InactiveDeviceException()
+
+    version, users, removed_user_ids = device_repo.get_assigned_user_changes(
+        db, device_obj=device, since=since
+    )
+    return DeviceUserChanges(
+        version=version,
+        users=[user.to_json() for user in users],
+        removed_user_ids=removed_user_ids,
+    )
+
+
+def _check_device_can_listen(mac_id: str, api_key: str):
+    # the session is closed before the stream starts, rather than held for as long
+    # as the device stays connected like a get_db session would be
+    db = SessionLocal()
+    try:
+        if API_KEY_AUTH_ENABLED and not api_key_repository.verify_api_key(
+            db, plain_api_key=api_key
+        ):
+            raise UnauthorizedEndpointException(detail=INVALID_API_KEY)
+
+        device = device_repo.get_by_field(db, field_name="mac_id", field_value=mac_id)
+        if not device:
+            raise ObjectNotFoundException(
+                detail=f"device with mac_id {mac_id} not found"
+            )
+        if not device.is_active:
+            raise InactiveDeviceException()
+    finally:
+        db.close()
+
+
+@router.get("/{mac_id}/updates")
+async def stream_device_updates(
+    mac_id: str,
+    request: Request,
+    api_key: str = Security(DeviceAPIKeyHeader(name="X-API-KEY")),
+):
+    """
+    This endpoint streams server-sent events to the device with mac_id.
+    A device_updated event is sent whenever the device's config changes, its id is the version of the change.
+    The device should fetch its metadata when it connects and again on every event, it does not need a RabbitMQ connection for this.
+    You need an API Key in the header to use this endpoint.
+    This API Key goes in the header like this X-API-Key: "<API-KEY>"
+    If a device is inactive, you get a 403.
+    """
+    await run_in_threadpool(_check_device_can_listen, mac_id, api_key)
+    return StreamingResponse(
+        device_update_hub.stream(mac_id, is_disconnected=request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -279,7 +419,6 @@ def update_device_user(
     db: Session = Depends(get_db),
     device_user_update_input: DeviceUserUpdate,
     api_key: str = Security(DeviceAPIKeyHeader(name="X-API-KEY")),
-    background_tasks: BackgroundTasks,
 ):
     """
     This endpoint is used to update the details for the device user with user_id of user_id.
@@ -305,12 +444,12 @@ def update_device_user(
             detail="device user with id {} not found".format(user_id)
         )
 
-    if device_user in device.assigned_users:
+    if device_repo.has_assigned_user(db, device_id=device.id, user_id=device_user.id):
+        device_notification_repo.queue(db, mac_ids=[device.mac_id])
         device_user = user_repo.update(
             db, db_obj=device_user, obj_in={**device_user_update_input.dict()}
         )
 
-        background_tasks.add_task(send_notification_to_devices, device.mac_id, " ")
         return DeviceUser(**device_user.to_json())
 
     raise UnauthorizedEndpointException()
@@ -336,28 +475,11 @@ def get_device(
 
     if not device:
         raise ObjectNotFoundException()
-    if (
-        not can_access_device_obj(device, current_user)
-        and device not in current_user.devices
+    if not can_access_device_obj(device, current_user) and not (
+        device_repo.has_assigned_user(db, device_id=device.id, user_id=current_user.id)
     ):
         raise UnauthorizedEndpointException()
-    return DeviceInDB(
-        id=device.id,
-        name=device.name,
-        mac_id=device.mac_id,
-        creator_id=device.creator_id,
-        is_active=device.is_active,
-        agent_id=device.agent_id,
-        assigned_users=[
-            SlimUserInResponse(
-                id=user.id,
-                email=user.email,
-                lasrra_id=user.lasrra_id,
-                user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            )
-            for user in device.assigned_users
-        ],
-    )
+    return render(serialize_device(device))
 
 
 @router.put("/{device_id}", response_model=DeviceInDB)
@@ -367,7 +489,6 @@ def update_device(
     db: Session = Depends(get_db),
     device_in: DeviceUpdate,
     current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ):
     """
     This endpoint updates the device with device_id.
@@ -392,27 +513,11 @@ def update_device(
     if not can_access_device_obj(device, current_user):
         raise UnauthorizedEndpointException()
 
+    # the device still listening on the old mac id has to hear that it was renamed
+    device_notification_repo.queue(db, mac_ids=[device.mac_id, device_in.mac_id])
     updated_device = device_repo.update(db, db_obj=device, obj_in=device_in)
 
-    background_tasks.add_task(send_notification_to_devices, device.mac_id, " ")
-
-    return DeviceInDB(
-        id=updated_device.id,
-        name=device.name,
-        mac_id=updated_device.mac_id,
-        creator_id=updated_device.creator_id,
-        is_active=device.is_active,
-        agent_id=device.agent_id,
-        assigned_users=[
-            SlimUserInResponse(
-                id=user.id,
-                email=user.email,
-                lasrra_id=user.lasrra_id,
-                user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            )
-            for user in updated_device.assigned_users
-        ],
-    )
+    return render(serialize_device(updated_device))
 
 
 @router.delete("/{device_id}", response_model=DeviceInDB)
@@ -424,7 +529,8 @@ def delete_device(
 ):
     device = device_repo.get(db, id=device_id)
     """
-    This endpoint deletes the device with device_id. 
+    This endpoint deletes the device with device_id.
+    The device is only marked as deleted, and is removed for good by the purge job once the retention window has passed.
     The user can access this device on 3 conditions
     1. the user is a superuser
     2. the user created this device
@@ -436,25 +542,10 @@ def delete_device(
     if not can_access_device_obj(device, current_user):
         raise UnauthorizedEndpointException()
 
-    deleted_device = device_repo.remove(db, id=device.id)
-
-    return DeviceInDB(
-        id=deleted_device.id,
-        name=device.name,
-        mac_id=deleted_device.mac_id,
-        creator_id=deleted_device.creator_id,
-        is_active=device.is_active,
-        agent_id=device.agent_id,
-        assigned_users=[
-            SlimUserInResponse(
-                id=user.id,
-                email=user.email,
-                lasrra_id=user.lasrra_id,
-                user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            )
-            for user in deleted_device.assigned_users
-        ],
-    )
+    device_notification_repo.queue(db, mac_ids=[device.mac_id])
+    deleted_device = device_repo.soft_delete(db, db_obj=device)
+
+    return render(serialize_device(deleted_device))
 
 
 @router.post(
@@ -467,7 +558,6 @@ def activate_device(
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ):
     """
     This endpoint allows you to activate a device. <br/> You've to be a superuser to use this endpoint.
@@ -479,39 +569,20 @@ def activate_device(
     if not can_access_device_obj(device, current_user):
         raise UnauthorizedEndpointException()
 
-    updated_device = device_repo.activate_device(db, device_obj=device)
-
     template_dict = DeviceActivationTemplateVariables(
         name=f"{current_user.first_name} {current_user.last_name}", mac_id=device.mac_id
     ).dict()
 
-    background_tasks.add_task(
-        send_email_with_template,
-        client=core.PostmarkClient(server_token=settings.POSTMARK_API_TOKEN),
+    queue_email_with_template(
+        db,
         template_id=ACTIVATE_DEVICE_TEMPLATE_ID,
         template_dict=template_dict,
         recipient=current_user.email,
     )
+    device_notification_repo.queue(db, mac_ids=[device.mac_id])
+    updated_device = device_repo.activate_device(db, device_obj=device)
 
-    background_tasks.add_task(send_notification_to_devices, device.mac_id, " ")
-
-    return DeviceInDB(
-        id=updated_device.id,
-        name=device.name,
-        mac_id=updated_device.mac_id,
-        creator_id=updated_device.creator_id,
-        is_active=updated_device.is_active,
-        agent_id=device.agent_id,
-        assigned_users=[
-            SlimUserInResponse(
-                id=user.id,
-                email=user.email,
-                lasrra_id=user.lasrra_id,
-                user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            )
-            for user in updated_device.assigned_users
-        ],
-    )
+    return render(serialize_device(updated_device))
 
 
 @router.post(
@@ -524,7 +595,6 @@ def deactivate_device(
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ):
     """
     This endpoint allows you to deactivate a device. <br/> You've to be a superuser to use this endpoint.
@@ -536,39 +606,57 @@ def deactivate_device(
     if not can_access_device_obj(device, current_user):
         raise UnauthorizedEndpointException()
 
-    updated_device = device_repo.deactivate_device(db, device_obj=device)
-
     template_dict = DeviceDeactivationTemplateVariables(
         name=f"{current_user.first_name} {current_user.last_name}", mac_id=device.mac_id
     ).dict()
 
-    background_tasks.add_task(
-        send_email_with_template,
-        client=core.PostmarkClient(server_token=settings.POSTMARK_API_TOKEN),
+    queue_email_with_template(
+        db,
         template_id=DEACTIVATE_DEVICE_TEMPLATE_ID,
         template_dict=template_dict,
         recipient=current_user.email,
     )
+    device_notification_repo.queue(db, mac_ids=[device.mac_id])
+    updated_device = device_repo.deactivate_device(db, device_obj=device)
 
-    background_tasks.add_task(send_notification_to_devices, device.mac_id, " ")
-
-    return DeviceInDB(
-        id=updated_device.id,
-        name=device.name,
-        mac_id=updated_device.mac_id,
-        creator_id=updated_device.creator_id,
-        is_active=device.is_active,
-        agent_id=device.agent_id,
-        assigned_users=[
-            SlimUserInResponse(
-                id=user.id,
-                email=user.email,
-                lasrra_id=user.lasrra_id,
-                user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            )
-            for user in updated_device.assigned_users
-        ],
-    )
+    return render(serialize_device(updated_device))
+
+
+@router.post(
+    "/assign/bulk",
+    response_model=DeviceAssignmentBulkReport,
+    dependencies=[Depends(manager_and_supervisor_and_superuser_permission_dependency)],
+)
+def bulk_assign_devices(
+    assignments: conlist(DeviceAssignment, max_items=BULK_MAX_ROWS),
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_currently_authenticated_user),
+) -> DeviceAssignmentBulkReport:
+    """
+    This endpoint assigns many devices to agent officers at once, given a list of up to BULK_MAX_ROWS device_id and user_id pairs.
+    The same rules as the single assign endpoint apply to every pair, the response reports which pairs failed and why.
+    Every device whose assigned users changed is notified once.
+    """
+    return assign_devices(db, assignments=assignments, current_user=current_user)
+
+
+@router.post(
+    "/unassign/bulk",
+    response_model=DeviceAssignmentBulkReport,
+    dependencies=[Depends(manager_and_supervisor_and_superuser_permission_dependency)],
+)
+def bulk_unassign_devices(
+    assignments: conlist(DeviceAssignment, max_items=BULK_MAX_ROWS),
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_currently_authenticated_user),
+) -> DeviceAssignmentBulkReport:
+    """
+    This endpoint unassigns many devices from users at once, given a list of up to BULK_MAX_ROWS device_id and user_id pairs.
+    Every device whose assigned users changed is notified once.
+    """
+    return unassign_devices(db, assignments=assignments, current_user=current_user)
 
 
 @router.post(
@@ -581,7 +669,6 @@ def assign_device(
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ):
     """
     This endpoint assigns the device with device_id to the given user_id.
@@ -608,27 +695,11 @@ def assign_device(
     if not device.is_active:
         raise InactiveDeviceException()
 
+    device_notification_repo.queue(db, mac_ids=[device.mac_id])
     updated_device = device_repo.add_assigned_user(db, device_obj=device, user_obj=user)
 
-    background_tasks.add_task(send_notification_to_devices, device.mac_id, " ")
-
-    return DeviceInDB(
-        id=updated_device.id,
-        name=device.name,
-        mac_id=updated_device.mac_id,
-        creator_id=updated_device.creator_id,
-        is_active=updated_device.is_active,
-        agent_id=updated_device.agent_id,
-        assigned_users=[
-            SlimUserInResponse(
-                id=user.id,
-                email=user.email,
-                lasrra_id=user.lasrra_id,
-                user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            )
-            for user in updated_device.assigned_users
-        ],
-    )
+
+    return render(serialize_device(updated_device))
 
 
 @router.post(
@@ -641,7 +712,6 @@ def unassign_device_from_user(
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ):
     """
     This endpoint unassigns the device with device_id from the given user_id.
@@ -658,29 +728,13 @@ def unassign_device_from_user(
     if not can_access_device_obj(device, current_user):
         raise UnauthorizedEndpointException()
 
+    device_notification_repo.queue(db, mac_ids=[device.mac_id])
     updated_device = device_repo.remove_assigned_user(
         db, device_obj=device, user_obj=user
     )
 
-    background_tasks.add_task(send_notification_to_devices, device.mac_id, " ")
-
-    return DeviceInDB(
-        id=updated_device.id,
-        name=device.name,
-        mac_id=updated_device.mac_id,
-        creator_id=updated_device.creator_id,
-        is_active=device.is_active,
-        agent_id=device.agent_id,
-        assigned_users=[
-            SlimUserInResponse(
-                id=user.id,
-                email=user.email,
-                lasrra_id=user.lasrra_id,
-                user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            )
-            for user in updated_device.assigned_users
-        ],
-    )
+
+    return render(serialize_device(updated_device))
 
 
 @router.get("/assigned/{user_id}", response_model=List[DeviceInDB])
@@ -711,29 +765,7 @@ def get_all_devices_assigned_to_user_with_user_id(
         db, user_id=user_id
     )
 
-    return [
-        DeviceInDB(
-            id=device.id,
-            name=device.name,
-            mac_id=device.mac_id,
-            creator_id=device.creator_id,
-            is_active=device.is_active,
-            agent_id=device.agent_id,
-            assigned_users=[
-                SlimUserInResponse(
-                    id=user.id,
-                    email=user.email,
-                    lasrra_id=user.lasrra_id,
-                    user_type=UserTypeInDB(
-                        id=user.user_type.id, name=user.user_type.name
-                    ),
-                    created_by_id=current_user.id,
-                )
-                for user in device.assigned_users
-            ],
-        )
-        for device in devices
-    ]
+    return render(serialize_devices(devices))
 
 
 
@@ -769,23 +801,7 @@ def allocate_device_to_agent(
         raise HTTPException(HTTP_403_FORBIDDEN, detail=NOT_AN_AGENT_ERROR)
 
     device.agent_id = agent_user.id
+    device_notification_repo.queue(db, mac_ids=[device.mac_id])
     device = device_repo.update(db, db_obj=device, obj_in={})
 
-    return DeviceInDB(
-        id=device.id,
-        name=device.name,
-        mac_id=device.mac_id,
-        creator_id=device.creator_id,
-        is_active=device.is_active,
-        agent_id=device.agent_id,
-        assigned_users=[
-            SlimUserInResponse(
-                id=user.id,
-                email=user.email,
-                lasrra_id=user.lasrra_id,
-                user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-                created_by_id=current_user.id,
-            )
-            for user in device.assigned_users
-        ],
-    )
+    return render(serialize_device(device))
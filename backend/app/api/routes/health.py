@@ -0,0 +1,32 @@
+from backend.app.api.dependencies.db import get_db
+from backend.app.api.serializers import render
+from backend.app.schemas.health import Readiness
+from backend.app.services.device_updates import device_update_hub
+from fastapi import APIRouter, Depends
+from loguru import logger
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_200_OK, HTTP_503_SERVICE_UNAVAILABLE
+
+router = APIRouter()
+
+
+@router.get("/ready", response_model=Readiness)
+def get_readiness(db: Session = Depends(get_db)) -> Readiness:
+    """
+    This endpoint tells you whether the process can reach the database, and whether
+    it is consuming device updates from the broker.
+    It responds with a 503 when the database is unreachable. A broker that is down
+    only holds back device updates, so the process still reports ready with it.
+    No authentication is needed to use this endpoint.
+    """
+    try:
+        db.execute("SELECT 1")
+        database = True
+    except Exception as e:
+        logger.error(f"readiness check could not reach the database: {e}")
+        database = False
+    readiness = Readiness(database=database, broker=device_update_hub.broker_ready)
+    return render(
+        readiness.dict(),
+        status_code=HTTP_200_OK if database else HTTP_503_SERVICE_UNAVAILABLE,
+    )
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from backend.app.api.routes import authentication, users, user_types, device, api_key,agent
+from backend.app.api.routes import authentication, users, user_types, device, api_key,agent, health, search
 
 router = APIRouter()
 router.include_router(authentication.router, tags=["Authentication"], prefix="/auth")
@@ -8,4 +8,5 @@ router.include_router(users.router, tags=["User"], prefix="/users")
 router.include_router(user_types.router, tags=["User Types"], prefix="/user_types")
 router.include_router(device.router, tags=["Devices"], prefix="/devices")
 router.include_router(api_key.router, tags=["API Keys"], prefix="/api_keys")
-
+router.include_router(health.router, tags=["Health"], prefix="/health")
+router.include_router(search.router, tags=["Search"], prefix="/search")
@@ -0,0 +1,135 @@
+from typing import Any, Dict, List, Optional
+
+from backend.app.api.dependencies.authentication import (
+    get_currently_authenticated_user,
+    manager_and_supervisor_and_superuser_permission_dependency,
+)
+from backend.app.api.dependencies.db import get_db
+from backend.app.api.serializers import (
+    render,
+    serialize_agent,
+    serialize_devices,
+    serialize_users,
+)
+from backend.app.core.settings import settings
+from backend.app.db.repositories.agent import agent_repo
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.models.user import User
+from backend.app.schemas.search import AgentSearchPage, DeviceSearchPage, UserSearchPage
+from fastapi import APIRouter, Depends, Query
+from fastapi.exceptions import HTTPException
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_403_FORBIDDEN
+
+SEARCH_MAX_PAGE_SIZE = settings.SEARCH_MAX_PAGE_SIZE
+SEARCH_PAGE_SIZE = settings.SEARCH_PAGE_SIZE
+
+router = APIRouter()
+
+
+def get_search_scope(
+    current_user: User = Depends(get_currently_authenticated_user),
+) -> Optional[int]:
+    """
+    Returns the id of the agent the current user can search within, or None for a
+    superuser, who can search everything.
+    """
+    if current_user.is_superuser:
+        return None
+    if current_user.agent_id is None:
+        raise HTTPException(
+            HTTP_403_FORBIDDEN, detail="you need to belong to an agent to search"
+        )
+    return current_user.agent_id
+
+
+def _page(results: List[Dict[str, Any]], page: int, page_size: int, has_more: bool):
+    return render(
+        {
+            "page": page,
+            "page_size": page_size,
+            "has_more": has_more,
+            "results": results,
+        }
+    )
+
+
+@router.get(
+    "/devices",
+    response_model=DeviceSearchPage,
+    dependencies=[Depends(manager_and_supervisor_and_superuser_permission_dependency)],
+)
+def search_devices(
+    *,
+    q: str = Query(..., min_length=2),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    agent_id: Optional[int] = Depends(get_search_scope),
+) -> DeviceSearchPage:
+    """
+    This endpoint finds the devices whose mac id or name starts with or resembles q,
+    best matches first, a page at a time.
+    A superuser searches every device, a manager or a supervisor their agent's.
+    """
+    devices, has_more = device_repo.search(
+        db, text=q, agent_id=agent_id, page=page, page_size=page_size
+    )
+    agent_names = agent_repo.get_names(db, ids=[device.agent_id for device in devices])
+    return _page(
+        serialize_devices(devices, agent_names=agent_names), page, page_size, has_more
+    )
+
+
+@router.get(
+    "/users",
+    response_model=UserSearchPage,
+    dependencies=[Depends(manager_and_supervisor_and_superuser_permission_dependency)],
+)
+def search_users(
+    *,
+    q: str = Query(..., min_length=2),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    agent_id: Optional[int] = Depends(get_search_scope),
+) -> UserSearchPage:
+    """
+    This endpoint finds the users whose name, email, phone number or lasrra id starts
+    with or resembles q, best matches first, a page at a time.
+    A superuser searches every user, a manager or a supervisor their agent's.
+    """
+    users, has_more = user_repo.search(
+        db, text=q, agent_id=agent_id, page=page, page_size=page_size
+    )
+    agent_names = agent_repo.get_names(db, ids=[user.agent_id for user in users])
+    return _page(
+        serialize_users(users, agent_names=agent_names), page, page_size, has_more
+    )
+
+
+@router.get(
+    "/agents",
+    response_model=AgentSearchPage,
+    dependencies=[Depends(manager_and_supervisor_and_superuser_permission_dependency)],
+)
+def search_agents(
+    *,
+    q: str = Query(..., min_length=2),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(SEARCH_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+    agent_id: Optional[int] = Depends(get_search_scope),
+) -> AgentSearchPage:
+    """
+    This endpoint finds the agents whose name starts with or resembles q, best
+    matches first, a page at a time.
+    A superuser searches every agent, a manager or a supervisor only their own.
+    """
+    agents, has_more = agent_repo.search(
+        db, text=q, agent_id=agent_id, page=page, page_size=page_size
+    )
+    return _page(
+        [serialize_agent(agent) for agent in agents], page, page_size, has_more
+    )
@@ -13,14 +13,20 @@ from backend.app.api.errors.exceptions import (
     AlreadyExistsException,
     ObjectNotFoundException,
 )
+from backend.app.api.serializers import (
+    render,
+    serialize_agent,
+    serialize_user_type,
+    serialize_users,
+)
 from backend.app.core.settings import settings
 from backend.app.models import User
 from backend.app.models.agent import Agent
+from backend.app.db.repositories.user import user_repo
 from backend.app.db.repositories.user_type import user_type as user_type_repo
 from backend.app.db.repositories.agent import agent_repo
 from backend.app.schemas.user_type import UserTypeCreate, UserTypeInDB
 from backend.app.schemas.user import UserInResponse
-from backend.app.schemas.agent import AgentInResponse
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from backend.app.api.errors import error_strings
@@ -28,6 +34,7 @@ from backend.app.api.errors import error_strings
 
 AGENT = settings.AGENT
 SUPERUSER_USER_TYPE = settings.SUPERUSER_USER_TYPE
+REGULAR_USER_TYPE = settings.REGULAR_USER_TYPE
 DEFAULT_USER_TYPES = settings.USER_TYPES
 
 router = APIRouter()
@@ -50,9 +57,7 @@ def retrieve_all_user_types(
     """
 
     user_types = user_type_repo.get_all(db)
-    return [
-        UserTypeInDB(id=user_type.id, name=user_type.name) for user_type in user_types
-    ]
+    return render([serialize_user_type(user_type) for user_type in user_types])
 
 
 @router.post(
@@ -81,7 +86,7 @@ def create_user_type(
         )
 
     user_type = user_type_repo.create(db, obj_in=user_type_in)
-    return UserTypeInDB(id=user_type.id, name=user_type.name)
+    return render(serialize_user_type(user_type))
 
 
 @router.put(
@@ -124,7 +129,7 @@ def update_user_type(
     updated_user_type = user_type_repo.update(
         db, db_obj=target_user_type, obj_in=user_type_in
     )
-    return UserTypeInDB(id=updated_user_type.id, name=updated_user_type.name)
+    return render(serialize_user_type(updated_user_type))
 
 
 @router.delete(
@@ -154,14 +159,19 @@ def delete_user_type(
             detail=f"you can not delete user type {target_user_type.name} as it is a default user type",
         )
 
-    if len(target_user_type.users) > 0:
+    if user_repo.has_users_with_user_type_id(db, user_type_id=target_user_type.id):
         raise HTTPException(
             status_code=HTTP_400_BAD_REQUEST,
             detail="you can not delete this user type because it has users associated to it",
         )
 
+    # deleted users are left until they are purged, they can do without their type
+    regular_user_type = user_type_repo.get_by_name(db, name=REGULAR_USER_TYPE)
+    user_repo.move_deleted_users_to_user_type(
+        db, from_user_type_id=target_user_type.id, to_user_type_id=regular_user_type.id
+    )
     deleted_user_type = user_type_repo.remove(db, id=target_user_type.id)
-    return UserTypeInDB(id=deleted_user_type.id, name=deleted_user_type.name)
+    return render(serialize_user_type(deleted_user_type))
 
 
 @router.get(
@@ -188,39 +198,13 @@ def get_all_users_of_user_type(
 
     if target_user_type.name == AGENT:
         agents = agent_repo.get_all(db)
-        return [
-            AgentInResponse(
-            id=agent.id,
-            name=agent.name,
-            email=agent.email,
-            user_type=UserTypeInDB(id=agent.user_type.id, name=agent.user_type.name),
-            address=agent.address,
-            )
-             for agent in agents
-        ]
+        return render([serialize_agent(agent) for agent in agents])
 
-
-    return [
-       
-        
-        UserInResponse(
-            id=user.id,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            address=user.address,
-            phone=user.phone,
-            email=user.email,
-            lasrra_id=user.lasrra_id,
-            is_active=user.is_active,
-            is_superuser=user.is_superuser,
-            user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            created_by_id=user.created_by_id,
-            agent_id=user.agent_id,
-            agent_name=agent_repo.get_name(db, id=user.agent_id)
-        )
-        
-        for user in target_user_type.users
-    ]
+    users = user_repo.get_all_users_with_user_type_id(
+        db, user_type_id=target_user_type.id
+    )
+    agent_names = agent_repo.get_names(db, ids=[user.agent_id for user in users])
+    return render(serialize_users(users, agent_names=agent_names))
 
 
 # @router.get(
@@ -8,7 +8,6 @@ from backend.app.schemas.email import (
     UserCreationTemplateVariables,
     UserDeactivationTemplateVariables,
 )
-from backend.app.tasks import devices
 from backend.app.api.dependencies.authentication import (
     manager_and_superuser_permission_dependency,
     manager_and_supervisor_and_superuser_permission_dependency,
@@ -25,8 +24,10 @@ from backend.app.api.errors.exceptions import (
     AgentEmployeeUserNotSelectedException,
     UnauthorizedEndpointException,
 )
+from backend.app.api.serializers import render, serialize_user, serialize_users
 from backend.app.core.settings import settings
 from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.device_notification import device_notification_repo
 from backend.app.db.repositories.reset_token import reset_token_repo
 from backend.app.db.repositories.user import user_repo
 from backend.app.db.repositories.agent import agent_repo
@@ -38,18 +39,21 @@ from backend.app.schemas.user import (
     MangerCreateForm,
     AgentEmployeeUserCreateForm,
     ResetPasswordSchema,
-    SlimUserInResponse,
+    UserAgentChangeReport,
+    UserBulkReport,
     UserCreate,
     UserCreateForm,
     UserInResponse,
     UserUpdate,
 )
-from backend.app.schemas.user_type import UserTypeInDB
-from backend.app.services.email import send_email_with_template
-from fastapi import APIRouter, BackgroundTasks, Depends
+from backend.app.services.email import queue_email_with_template
+from backend.app.services.assignment import change_agent_of_users
+from backend.app.services.onboarding import onboard_agent_employee_users
+from backend.app.services.security import generate_reset_token
+from fastapi import APIRouter, Depends
+from pydantic import conlist
 from fastapi.exceptions import HTTPException
 from itsdangerous.exc import BadSignature
-from postmarker import core
 from pydantic.networks import EmailStr
 from sqlalchemy.orm import Session
 from starlette.status import HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN
@@ -69,34 +73,11 @@ CREATE_ACCOUNT_TEMPLATE_ID = settings.CREATE_ACCOUNT_TEMPLATE_ID
 DEACTIVATE_ACCOUNT_TEMPLATE_ID = settings.DEACTIVATE_ACCOUNT_TEMPLATE_ID
 RESET_PASSWORD_TEMPLATE_ID = settings.RESET_PASSWORD_TEMPLATE_ID
 RESET_PASSWORD_URL = settings.RESET_PASSWORD_URL
+BULK_MAX_ROWS = settings.BULK_MAX_ROWS
 
 router = APIRouter()
 
 
-def check_unique_user(db: Session, user_in: UserCreate):
-    user_with_same_email = user_repo.get_by_email(db, email=user_in.email)
-    if user_with_same_email:
-        raise AlreadyExistsException(
-            entity_name="user with email {}".format(user_in.email)
-        )
-
-    user_with_same_lasrra_id = user_repo.get_by_field(
-        db, field_name="lasrra_id", field_value=user_in.lasrra_id
-    )
-    if user_with_same_lasrra_id:
-        raise AlreadyExistsException(
-            entity_name="user with lasrra_id {}".format(user_in.lasrra_id)
-        )
-
-    user_with_same_phone = user_repo.get_by_field(
-        db, field_name="phone", field_value=user_in.phone
-    )
-    if user_with_same_phone:
-        raise AlreadyExistsException(
-            entity_name="user with phone {}".format(user_in.phone)
-        )
-
-
 @router.get("/me")
 def retrieve_current_user(
     current_user: User = Depends(get_currently_authenticated_user),
@@ -107,22 +88,7 @@ def retrieve_current_user(
     You send the token in as a header of the form \n
     <b>Authorization</b> : 'Token <b> {JWT} </b>'
     """
-    return UserInResponse(
-        id=current_user.id,
-        first_name=current_user.first_name,
-        last_name=current_user.last_name,
-        address=current_user.address,
-        phone=current_user.phone,
-        email=current_user.email,
-        lasrra_id=current_user.lasrra_id,
-        is_active=current_user.is_active,
-        is_superuser=current_user.is_superuser,
-        agent_id=current_user.agent_id,
-        user_type=UserTypeInDB(
-            id=current_user.user_type.id,
-            name=current_user.user_type.name,
-        ),
-    )
+    return render(serialize_user(current_user))
 
 
 
@@ -137,14 +103,12 @@ def create_agent_employee_user(
     db: Session = Depends(get_db),
     user_in: AgentEmployeeUserCreateForm,
     current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ) -> UserInResponse:
     """
     Create a new agent employee user.
     You need to be a manager or a superuser to create a user
     The email,lasrra ID & phone number must have never been used before on the platform.
     """
-    check_unique_user(db, user_in)
     user_type = user_type_repo.get_by_id(db, id=user_in.user_type_id)
     if user_type.name in [AGENT_SUPERVISOR, AGENT_OFFICER]:
         user_type_name =user_type_repo.get_by_name(db, name=user_type.name)
@@ -153,6 +117,19 @@ def create_agent_employee_user(
 
     if not user_type:
         raise ServerException()
+
+    template_dict = UserCreationTemplateVariables(
+        name=f"{user_in.first_name} {user_in.last_name}",
+    ).dict()
+
+    queue_email_with_template(
+        db,
+        template_id=CREATE_ACCOUNT_TEMPLATE_ID,
+        template_dict=template_dict,
+        recipient=user_in.email,
+    )
+    # a reused email, lasrra_id or phone is rejected by its unique constraint, and
+    # answered with the message CONSTRAINT_MESSAGES has for it, the email going with it
     user = user_repo.create(
         db,
         obj_in=UserCreate(
@@ -161,34 +138,32 @@ def create_agent_employee_user(
         ),
     )
 
-    template_dict = UserCreationTemplateVariables(
-        name=f"{user.first_name} {user.last_name}",
-    ).dict()
+    return render(serialize_user(user))
 
-    background_tasks.add_task(
-        send_email_with_template,
-        client=core.PostmarkClient(server_token=settings.POSTMARK_API_TOKEN),
-        template_id=CREATE_ACCOUNT_TEMPLATE_ID,
-        template_dict=template_dict,
-        recipient=user.email,
-    )
 
-    return UserInResponse(
-        id=user.id,
-        email=user_in.email,
-        first_name=user_in.first_name,
-        last_name=user_in.last_name,
-        address=user_in.address,
-        phone=user_in.phone,
-        lasrra_id=user_in.lasrra_id,
-        is_active=user.is_active,
-        agent_id=user.agent_id,
-        is_superuser=user.is_superuser,
-        user_type=UserTypeInDB(id=user_type.id, name=user_type.name),
-        created_by_id=current_user.id,
-    )
 
 
+@router.post(
+    "/bulk_create_agent_employee_users",
+    response_model=UserBulkReport,
+    dependencies=[Depends(manager_and_superuser_permission_dependency)],
+)
+def bulk_create_agent_employee_users(
+    *,
+    db: Session = Depends(get_db),
+    users_in: conlist(AgentEmployeeUserCreateForm, max_items=BULK_MAX_ROWS),
+    current_user: User = Depends(get_currently_authenticated_user),
+) -> UserBulkReport:
+    """
+    Create up to BULK_MAX_ROWS agent employee users at once.
+    You need to be a manager or a superuser to create users.
+    Every row is checked on its own, the response reports which rows were created and why the others were not.
+    The welcome emails for the created users are queued together.
+    """
+    report, _ = onboard_agent_employee_users(
+        db, users_in=users_in, creator=current_user
+    )
+    return report
 
 
 @router.post(
@@ -201,17 +176,26 @@ def create_agent_manager_user(
     db: Session = Depends(get_db),
     user_in: MangerCreateForm,
     current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ) -> UserInResponse:
     """
     Create a new agent manager user.
     You need to be a superuser to create an agent manager
     The email,lasrra ID & phone number must have never been used before on the platform.
     """
-    check_unique_user(db, user_in)
     user_type = user_type_repo.get_by_name(db, name=AGENT_MANAGER)
     if not user_type:
         raise ServerException()
+
+    template_dict = UserCreationTemplateVariables(
+        name=f"{user_in.first_name} {user_in.last_name}",
+    ).dict()
+
+    queue_email_with_template(
+        db,
+        template_id=CREATE_ACCOUNT_TEMPLATE_ID,
+        template_dict=template_dict,
+        recipient=user_in.email,
+    )
     user = user_repo.create(
         db,
         obj_in=UserCreate(
@@ -221,32 +205,7 @@ def create_agent_manager_user(
         ),
     )
 
-    template_dict = UserCreationTemplateVariables(
-        name=f"{user.first_name} {user.last_name}",
-    ).dict()
-
-    background_tasks.add_task(
-        send_email_with_template,
-        client=core.PostmarkClient(server_token=settings.POSTMARK_API_TOKEN),
-        template_id=CREATE_ACCOUNT_TEMPLATE_ID,
-        template_dict=template_dict,
-        recipient=user.email,
-    )
-
-    return UserInResponse(
-        id=user.id,
-        email=user_in.email,
-        first_name=user_in.first_name,
-        last_name=user_in.last_name,
-        address=user_in.address,
-        phone=user_in.phone,
-        lasrra_id=user_in.lasrra_id,
-        is_active=user.is_active,
-        agent_id=user.agent_id,
-        is_superuser=user.is_superuser,
-        user_type=UserTypeInDB(id=user_type.id, name=user_type.name),
-        created_by_id=current_user.id,
-    )
+    return render(serialize_user(user))
 
 
 
@@ -259,7 +218,6 @@ def update_user(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_currently_authenticated_user),
     user_in: UserUpdate,
-    background_tasks: BackgroundTasks,
 ) -> UserInResponse:
     """
     This endpoint is used to make changes to the user's profile
@@ -278,27 +236,12 @@ def update_user(
             entity_name="user with phone {}".format(user_in.phone)
         )
 
+    device_notification_repo.queue(
+        db, mac_ids=[device.mac_id for device in current_user.devices]
+    )
     user = user_repo.update(db, db_obj=current_user, obj_in=user_in)
 
-    concerned_devices = user.devices
-    for device in concerned_devices:
-        background_tasks.add_task(
-            devices.send_notification_to_devices, device.mac_id, " "
-        )
-
-    return UserInResponse(
-        id=user.id,
-        email=user.email,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        address=user.address,
-        phone=user.phone,
-        lasrra_id=user.lasrra_id,
-        is_active=user.is_active,
-        agent_id=user.agent_id,
-        is_superuser=user.is_superuser,
-        user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-    )
+    return render(serialize_user(user))
 
 
 @router.get(
@@ -311,7 +254,6 @@ def activate_user(
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ) -> UserInResponse:
     """
     This endpoint activates a user.
@@ -326,38 +268,22 @@ def activate_user(
     ):
         raise UnauthorizedEndpointException()
 
-    user = user_repo.activate(db, db_obj=user)
+    device_notification_repo.queue(
+        db, mac_ids=[device.mac_id for device in user.devices]
+    )
     template_dict = UserActivationTemplateVariables(
         name=f"{user.first_name} {user.last_name}",
     ).dict()
 
-    background_tasks.add_task(
-        send_email_with_template,
-        client=core.PostmarkClient(server_token=settings.POSTMARK_API_TOKEN),
+    queue_email_with_template(
+        db,
         template_id=ACTIVATE_ACCOUNT_TEMPLATE_ID,
         template_dict=template_dict,
         recipient=user.email,
     )
+    user = user_repo.activate(db, db_obj=user)
 
-    concerned_devices = user.devices
-    for device in concerned_devices:
-        background_tasks.add_task(
-            devices.send_notification_to_devices, device.mac_id, " "
-        )
-
-    return UserInResponse(
-        id=user.id,
-        email=user.email,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        address=user.address,
-        phone=user.phone,
-        lasrra_id=user.lasrra_id,
-        is_active=user.is_active,
-        agent_id=user.agent_id,
-        is_superuser=user.is_superuser,
-        user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-    )
+    return render(serialize_user(user))
 
 
 @router.get(
@@ -370,7 +296,6 @@ def deactivate_user(
     *,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ) -> UserInResponse:
     """
     This endpoint de-activates a user.
@@ -386,38 +311,22 @@ def deactivate_user(
     ):
         raise UnauthorizedEndpointException()
 
-    user = user_repo.deactivate(db, db_obj=user)
+    device_notification_repo.queue(
+        db, mac_ids=[device.mac_id for device in user.devices]
+    )
     template_dict = UserDeactivationTemplateVariables(
         name=f"{user.first_name} {user.last_name}",
     ).dict()
 
-    background_tasks.add_task(
-        send_email_with_template,
-        client=core.PostmarkClient(server_token=settings.POSTMARK_API_TOKEN),
+    queue_email_with_template(
+        db,
         template_id=DEACTIVATE_ACCOUNT_TEMPLATE_ID,
         template_dict=template_dict,
         recipient=user.email,
     )
+    user = user_repo.deactivate(db, db_obj=user)
 
-    concerned_devices = user.devices
-    for device in concerned_devices:
-        background_tasks.add_task(
-            devices.send_notification_to_devices, device.mac_id, " "
-        )
-
-    return UserInResponse(
-        id=user.id,
-        email=user.email,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        address=user.address,
-        phone=user.phone,
-        lasrra_id=user.lasrra_id,
-        is_active=user.is_active,
-        agent_id=user.agent_id,
-        is_superuser=user.is_superuser,
-        user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-    )
+    return render(serialize_user(user))
 
 
 @router.get(
@@ -438,20 +347,11 @@ def grant_superuser_status(
     if not user:
         raise ObjectNotFoundException()
 
-    user = user_repo.set_as_superuser(db, db_obj=user)
-    return UserInResponse(
-        id=user.id,
-        email=user.email,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        address=user.address,
-        phone=user.phone,
-        lasrra_id=user.lasrra_id,
-        is_active=user.is_active,
-        agent_id=user.agent_id,
-        is_superuser=user.is_superuser,
-        user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
+    device_notification_repo.queue(
+        db, mac_ids=[device.mac_id for device in user.devices]
     )
+    user = user_repo.set_as_superuser(db, db_obj=user)
+    return render(serialize_user(user))
 
 
 @router.get(
@@ -482,100 +382,98 @@ def remove_superuser_status(
     if user.user_type_id != superuser_user_type_obj.id:
         raise HTTPException(HTTP_400_BAD_REQUEST, "user is not a superuser")
 
+    device_notification_repo.queue(
+        db, mac_ids=[device.mac_id for device in user.devices]
+    )
     user = user_repo.set_usertype(db, db_obj=user, user_type=regular_user_type_obj)
 
-    return UserInResponse(
-        id=user.id,
-        email=user.email,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        address=user.address,
-        phone=user.phone,
-        lasrra_id=user.lasrra_id,
-        is_active=user.is_active,
-        agent_id=user.agent_id,
-        is_superuser=user.is_superuser,
-        user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-    )
+    return render(serialize_user(user))
 
 
 @router.post(
-    "/{user_id}/change_agent/{agent_id}",
+    "/change_agent/{agent_id}",
     dependencies=[Depends(superuser_permission_dependency)],
-    response_model=UserInResponse,
+    response_model=UserAgentChangeReport,
 )
+def bulk_change_agent(
+    agent_id: int,
+    user_ids: conlist(int, max_items=BULK_MAX_ROWS),
+    *,
+    db: Session = Depends(get_db),
+) -> UserAgentChangeReport:
+    """
+    This endpoint moves many agent employees to the agent with id of agent_id at once, given a list of up to BULK_MAX_ROWS user ids.
+    You need to be a superuser to use this endpoint.
+    The users that change agent lose all the devices they were previously assigned to, and every one of those devices is notified once.
+    The response reports which users could not be moved and why.
+    """
+    if not agent_repo.get(db, id=agent_id):
+        raise ObjectNotFoundException(detail=f"agent with id {agent_id} not found")
+    return change_agent_of_users(db, user_ids=user_ids, agent_id=agent_id)
 
 
+@router.post(
+    "/{user_id}/change_agent/{agent_id}",
+    dependencies=[Depends(superuser_permission_dependency)],
+    response_model=UserInResponse,
+)
 def change_agent(
     *,
     user_id: int,
     agent_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_currently_authenticated_user),
-    background_tasks: BackgroundTasks,
 ) -> UserInResponse:
     """
-    This endpoint changes the agent of the user with user_id, to the agent with id of agent_id, .
+    This endpoint changes the agent of the user with user_id, to the agent with id of agent_id.
     You need to be a superuser to use this endpoint.
-    When you change the agent of a user, he loses all the devices he was previosuly assigned to
+    When you change the agent of a user, they lose all the devices they were previously assigned to
     """
-    user = user_repo.get(db, id=agent_id)
     user_to_be_reassigned = user_repo.get(db, id=user_id)
 
-    if not user:
-        raise ObjectNotFoundException(detail=f"user with id {agent_id} not found")
+    if not agent_repo.get(db, id=agent_id):
+        raise ObjectNotFoundException(detail=f"agent with id {agent_id} not found")
     if not user_to_be_reassigned:
         raise ObjectNotFoundException(detail=f"user with id {user_id} not found")
 
-    if user is user_to_be_reassigned:
-        raise HTTPException(
-            status_code=HTTP_400_BAD_REQUEST, detail="can not assign to self"
+    if user_to_be_reassigned.user_type.name not in (AGENT_OFFICER, AGENT_SUPERVISOR):
+        raise UnauthorizedEndpointException(
+            detail=f"user with id {user_id} is not agent employee"
         )
 
-    user_is_not_agent_user = user.user_type.name != AGENT
-    user_to_be_reassigned_is_not_agent_employee = (
-        user_to_be_reassigned.user_type.name != AGENT_EMPLOYEE_TYPE
-    )
+    change_agent_of_users(db, user_ids=[user_id], agent_id=agent_id)
+    db.refresh(user_to_be_reassigned)
 
-    if user_is_not_agent_user or user_to_be_reassigned_is_not_agent_employee:
-        detail = "user with id {} is not {}"
-        if user_is_not_agent_user:
-            detail = detail.format(user.id, "agent user")
-        else:
-            detail = detail.format(user_to_be_reassigned.id, "agent employee")
-        raise UnauthorizedEndpointException(detail=detail)
-
-    user_to_be_reassigned.agent_id = user.id
-    user_to_be_reassigned = user_repo.update(
-        db, db_obj=user_to_be_reassigned, obj_in={}
-    )
+    return render(serialize_user(user_to_be_reassigned))
 
-    concerned_devices = user_to_be_reassigned.devices
 
-    for device in concerned_devices:
-        background_tasks.add_task(
-            device_repo.remove_assigned_user,
-            db=db,
-            device_obj=device,
-            user_obj=user_to_be_reassigned,
-        )
+@router.delete(
+    "/{user_id}",
+    dependencies=[Depends(superuser_permission_dependency)],
+    response_model=UserInResponse,
+)
+def delete_user(
+    user_id: int,
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_currently_authenticated_user),
+) -> UserInResponse:
+    """
+    This endpoint deletes the user with user_id, who loses all the devices they were assigned to.
+    You need to be a superuser to use this endpoint.
+    The user is only marked as deleted, and is removed for good by the purge job once the retention window has passed.
+    Their email, phone and lasrra_id can be used by a new user straight away.
+    """
+    user = user_repo.get(db, id=user_id)
+    if not user:
+        raise ObjectNotFoundException(detail=f"user with id {user_id} not found")
+    if user.id == current_user.id:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="can not delete self")
 
-    return UserInResponse(
-        id=user_to_be_reassigned.id,
-        first_name=user_to_be_reassigned.first_name,
-        last_name=user_to_be_reassigned.last_name,
-        address=user_to_be_reassigned.address,
-        phone=user_to_be_reassigned.phone,
-        email=user_to_be_reassigned.email,
-        lasrra_id=user_to_be_reassigned.lasrra_id,
-        is_active=user_to_be_reassigned.is_active,
-        agent_id=user_to_be_reassigned.agent_id,
-        is_superuser=user_to_be_reassigned.is_superuser,
-        user_type=UserTypeInDB(
-            id=user_to_be_reassigned.user_type.id,
-            name=user_to_be_reassigned.user_type.name,
-        ),
-    )
+    removed = device_repo.unassign_users_from_all_devices(db, user_ids=[user.id])
+    device_notification_repo.queue(db, mac_ids=removed.values())
+    user = user_repo.soft_delete(db, db_obj=user)
+
+    return render(serialize_user(user))
 
 
 @router.get(
@@ -598,23 +496,7 @@ def get_all_current_user_employees(
         db, agent_id=current_user.agent_id
     )
 
-    return [
-        UserInResponse(
-            id=user.id,
-            email=user.email,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            address=user.address,
-            phone=user.phone,
-            lasrra_id=user.lasrra_id,
-            is_active=user.is_active,
-            agent_id=user.agent_id,
-            is_superuser=user.is_superuser,
-            user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            created_by_id=current_user.id,
-        )
-        for user in agent_employees
-    ]
+    return render(serialize_users(agent_employees))
 
 
 @router.get("/reset_password/{email}")
@@ -622,7 +504,6 @@ def reset_user_password(
     email: EmailStr,
     *,
     db: Session = Depends(get_db),
-    background_tasks: BackgroundTasks,
 ) -> GenericMessageResponse:
     """
     This endpoint requests a reset of the password for the given email.
@@ -632,20 +513,21 @@ def reset_user_password(
     if not user:
         raise ObjectNotFoundException()
 
-    reset_token = user.generate_password_reset_token(db)
-    # reset_link = RESET_PASSWORD_URL + reset_token.token
-    reset_link = RESET_PASSWORD_URL+'?k=' + reset_token.token
+    token = generate_reset_token(user.email)
+    # reset_link = RESET_PASSWORD_URL + token
+    reset_link = RESET_PASSWORD_URL+'?k=' + token
     template_dict = ResetPasswordEmailTemplateVariables(
         name=f"{user.first_name} {user.last_name}", reset_link=reset_link
     ).dict()
 
-    background_tasks.add_task(
-        send_email_with_template,
-        client=core.PostmarkClient(server_token=settings.POSTMARK_API_TOKEN),
+    queue_email_with_template(
+        db,
         template_id=RESET_PASSWORD_TEMPLATE_ID,
         template_dict=template_dict,
         recipient=user.email,
     )
+    # the token is committed along with the email that carries it
+    user.generate_password_reset_token(db, token=token)
 
     return GenericMessageResponse(message="password reset link sent to " + email)
 
@@ -655,7 +537,6 @@ def reset_user_password(
     *,
     db: Session = Depends(get_db),
     reset_info: ResetPasswordSchema,
-    background_tasks: BackgroundTasks,
 ) -> GenericMessageResponse:
     try:
         token = reset_token_repo.get_by_field(
@@ -670,14 +551,12 @@ def reset_user_password(
             raise ValueError("expired token")
 
         user = token.user
+        device_notification_repo.queue(
+            db, mac_ids=[device.mac_id for device in user.devices]
+        )
         user_repo.update(db, db_obj=user, obj_in={"password": reset_info.password})
 
         reset_token_repo.mark_as_used(db, token_obj=token)
-        concerned_devices = user.devices
-        for device in concerned_devices:
-            background_tasks.add_task(
-                devices.send_notification_to_devices, device.mac_id, " "
-            )
 
         return GenericMessageResponse(
             message="password of user with email {} reset succesfully".format(
@@ -720,21 +599,7 @@ def get_user_profile(*,
     # if not agent:
     #     agent = {'name':'SuperUser'}
 
-    return UserInResponse(
-            id=user.id,
-            email=user.email,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            address=user.address,
-            phone=user.phone,
-            lasrra_id=user.lasrra_id,
-            is_active=user.is_active,
-            agent_id=user.agent_id,
-            is_superuser=user.is_superuser,
-            user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            created_by_id=current_user.id,
-            agent_name = agent.name if agent else 'Super-User'
-    )
+    return render(serialize_user(user, agent_name=agent.name if agent else 'Super-User'))
 
 
 
@@ -752,22 +617,5 @@ def get_all_users_in_system(
     This endpoint gets all the users in the system, you need to be a superuser to access this endpoint
     """
     all_users = user_repo.get_all(db)
-
-    return [
-        UserInResponse(
-            id=user.id,
-            email=user.email,
-            first_name=user.first_name,
-            last_name=user.last_name,
-            address=user.address,
-            phone=user.phone,
-            lasrra_id=user.lasrra_id,
-            is_active=user.is_active,  
-            is_superuser=user.is_superuser,
-            user_type=UserTypeInDB(id=user.user_type.id, name=user.user_type.name),
-            created_by_id=user.created_by_id,
-            agent_id=user.agent_id,
-            agent_name=agent_repo.get_name(db, id=user.agent_id)
-        )
-        for user in all_users
-    ]
\ No newline at end of file
+    agent_names = agent_repo.get_names(db, ids=[user.agent_id for user in all_users])
+    return render(serialize_users(all_users, agent_names=agent_names))
\ No newline at end of file
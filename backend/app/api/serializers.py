@@ -0,0 +1,115 @@
+"""
+Turns ORM rows into the JSON-ready dicts the routes respond with, in the shape of the
+response schemas (DeviceInDB, DeviceStatus, UserInResponse, AgentInResponse,
+SlimUserInResponse, UserTypeInDB), and renders them.
+
+The rows come out of the database already valid, so building the response schemas
+from them, and then having FastAPI validate the result again against the
+response_model, only costs CPU for every row of a listing. The routes keep their
+response_model for the OpenAPI schema, but return `render(...)`, which FastAPI sends
+as it is, rendered by FastJSONResponse.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from backend.app.api.responses import FastJSONResponse
+from backend.app.models.agent import Agent
+from backend.app.models.device import Device
+from backend.app.models.user import User
+from backend.app.models.user_type import UserType
+from starlette.status import HTTP_200_OK
+
+
+def render(content: Any, status_code: int = HTTP_200_OK) -> FastJSONResponse:
+    return FastJSONResponse(content, status_code=status_code)
+
+
+def serialize_user_type(user_type: UserType) -> Dict[str, Any]:
+    return {"id": user_type.id, "name": user_type.name}
+
+
+def serialize_slim_user(user: User) -> Dict[str, Any]:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "lasrra_id": user.lasrra_id,
+        "user_type": serialize_user_type(user.user_type),
+    }
+
+
+def serialize_user(user: User, *, agent_name: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "id": user.id,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "address": user.address,
+        "phone": user.phone,
+        "email": user.email,
+        "lasrra_id": user.lasrra_id,
+        "is_active": user.is_active,
+        "is_superuser": user.is_superuser,
+        "user_type": serialize_user_type(user.user_type),
+        "created_by_id": user.created_by_id,
+        "agent_id": user.agent_id,
+        "agent_name": agent_name,
+    }
+
+
+def serialize_users(
+    users: Iterable[User], *, agent_names: Optional[Dict[int, str]] = None
+) -> List[Dict[str, Any]]:
+    agent_names = agent_names or {}
+    return [
+        serialize_user(user, agent_name=agent_names.get(user.agent_id))
+        for user in users
+    ]
+
+
+def serialize_device(
+    device: Device, *, agent_name: Optional[str] = None
+) -> Dict[str, Any]:
+    return {
+        "id": device.id,
+        "name": device.name,
+        "mac_id": device.mac_id,
+        "creator_id": device.creator_id,
+        "is_active": device.is_active,
+        "agent_id": device.agent_id,
+        "agent_name": agent_name,
+        "assigned_users": [serialize_slim_user(user) for user in device.assigned_users],
+    }
+
+
+def serialize_devices(
+    devices: Iterable[Device], *, agent_names: Optional[Dict[int, str]] = None
+) -> List[Dict[str, Any]]:
+    agent_names = agent_names or {}
+    return [
+        serialize_device(device, agent_name=agent_names.get(device.agent_id))
+        for device in devices
+    ]
+
+
+def serialize_device_status(device: Device, *, online: bool) -> Dict[str, Any]:
+    return {
+        "id": device.id,
+        "name": device.name,
+        "mac_id": device.mac_id,
+        "is_active": device.is_active,
+        "online": online,
+        # rendered the way jsonable_encoder would, the json module can not
+        "last_seen_at": device.last_seen_at and device.last_seen_at.isoformat(),
+        "battery_level": device.battery_level,
+        "app_version": device.app_version,
+    }
+
+
+def serialize_agent(agent: Agent) -> Dict[str, Any]:
+    return {
+        "id": agent.id,
+        "name": agent.name,
+        "email": agent.email,
+        "address": agent.address,
+        "user_type": serialize_user_type(agent.user_type),
+        "created_by_id": agent.created_by_id,
+        "agent_id": None,
+    }
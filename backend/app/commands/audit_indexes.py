@@ -0,0 +1,45 @@
+"""
+Lists the columns the application filters on that have no index in the database.
+
+    python -m backend.app.commands.audit_indexes [--sql]
+
+Exits with status 1 when an index is missing, so it can run in CI after the migrations.
+"""
+import argparse
+import sys
+
+from backend.app.db.index_audit import find_missing_indexes
+from backend.app.db.session import SessionLocal
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sql",
+        action="store_true",
+        help="print the statements that would create the missing indexes",
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        missing = find_missing_indexes(db)
+    finally:
+        db.close()
+
+    for (table, column), sources in sorted(missing.items()):
+        if args.sql:
+            print(
+                f'CREATE INDEX CONCURRENTLY ix_{table}_{column} ON "{table}" ({column});'
+            )
+        else:
+            print(f"{table}.{column} has no index, looked up in:")
+            for source in sorted(set(sources)):
+                print(f"    {source}")
+    if not missing:
+        print("every looked up column is indexed")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""
+Seeds the user types and the default users, unless the database already has them.
+
+    python -m backend.app.commands.bootstrap_db
+
+Meant to run once per deploy, after the migrations, so that the API processes can
+start with DB_BOOTSTRAP_MODE=off.
+"""
+import argparse
+import time
+
+import backend.app.db.base  # noqa: F401, maps every model
+from backend.app.db.bootstrap import bootstrap
+from backend.app.db.session import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.parse_args()
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        seeded = bootstrap(db)
+    finally:
+        db.close()
+    print(
+        f"{'seeded' if seeded else 'already seeded'} "
+        f"in {time.perf_counter() - start:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Sends the emails waiting in the outbox through Postmark.
+
+    python -m backend.app.commands.dispatch_emails [--once]
+
+Runs until stopped, unless --once is given, in which case it exits as soon as nothing
+is due, e.g. when run from cron.
+"""
+import argparse
+
+from backend.app.tasks.emails import run_email_dispatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--once", action="store_true", help="exit once the outbox has nothing due"
+    )
+    args = parser.parse_args()
+    run_email_dispatcher(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Onboards agent employee users from a CSV file.
+
+    python -m backend.app.commands.import_users users.csv --created-by admin@example.com
+
+The CSV needs the header row
+first_name,last_name,address,phone,email,password,lasrra_id,user_type_id,agent_id.
+"""
+import argparse
+import sys
+
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.session import SessionLocal
+from backend.app.services.onboarding import (
+    onboard_agent_employee_users,
+    parse_users_csv,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("csv_file", type=argparse.FileType("rb"))
+    parser.add_argument(
+        "--created-by",
+        required=True,
+        help="email of the manager or superuser the users are created on behalf of",
+    )
+    parser.add_argument(
+        "--no-emails", action="store_true", help="do not queue the welcome emails"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        creator = user_repo.get_by_email(db, email=args.created_by)
+        if not creator:
+            parser.error(f"no user with email {args.created_by}")
+        try:
+            users_in = parse_users_csv(args.csv_file.read())
+        except ValueError as e:
+            parser.error(str(e))
+        report, _ = onboard_agent_employee_users(
+            db,
+            users_in=users_in,
+            creator=creator,
+            queue_welcome_emails=not args.no_emails,
+        )
+    finally:
+        db.close()
+
+    for result in report.results:
+        if not result.success:
+            print(f"row {result.row} ({result.email}): {result.detail}")
+    print(f"{report.succeeded} users created, {report.failed} rows failed")
+    return 0 if report.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
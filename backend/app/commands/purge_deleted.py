@@ -0,0 +1,24 @@
+"""
+Deletes for good the users and devices soft deleted over SOFT_DELETE_RETENTION_DAYS ago.
+
+    python -m backend.app.commands.purge_deleted [--once]
+
+Runs until stopped, unless --once is given, in which case it exits as soon as
+nothing is left to purge.
+"""
+import argparse
+
+from backend.app.tasks.purge import run_purge
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--once", action="store_true", help="exit once nothing is left to purge"
+    )
+    args = parser.parse_args()
+    run_purge(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Publishes the device notifications waiting in the outbox to RabbitMQ.
+
+    python -m backend.app.commands.relay_device_notifications [--once]
+
+Runs until stopped, unless --once is given, in which case it exits as soon as the
+outbox is drained.
+"""
+import argparse
+
+from backend.app.tasks.devices import run_device_notification_relay
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--once", action="store_true", help="exit once the outbox is drained"
+    )
+    args = parser.parse_args()
+    run_device_notification_relay(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
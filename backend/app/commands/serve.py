@@ -0,0 +1,64 @@
+"""
+Serves the API with a gunicorn master and a number of uvicorn workers.
+
+    python -m backend.app.commands.serve --workers 4 --max-memory-mb 512
+
+Every option defaults to its SERVER_* setting, and --threadpool-size to THREADPOOL_SIZE.
+Without a worker count, one worker per CPU is started.
+"""
+import argparse
+import os
+
+from backend.app.core.server import APIServer
+from backend.app.core.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bind", default=settings.SERVER_BIND)
+    parser.add_argument(
+        "--workers", type=int, default=settings.SERVER_WORKERS or os.cpu_count()
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=settings.SERVER_MAX_REQUESTS,
+        help="requests a worker serves before it is replaced, 0 to never replace it",
+    )
+    parser.add_argument(
+        "--max-requests-jitter",
+        type=int,
+        default=settings.SERVER_MAX_REQUESTS_JITTER,
+        help="a random extra number of requests, so workers are not all replaced at once",
+    )
+    parser.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=settings.SERVER_MAX_MEMORY_MB,
+        help="resident memory past which a worker is replaced",
+    )
+    parser.add_argument(
+        "--threadpool-size",
+        type=int,
+        default=settings.THREADPOOL_SIZE,
+        help="threads running the sync endpoints of each worker",
+    )
+    parser.add_argument("--timeout", type=int, default=settings.SERVER_TIMEOUT_SECONDS)
+    args = parser.parse_args()
+
+    # read by the workers when they start, after the master has forked them
+    settings.THREADPOOL_SIZE = args.threadpool_size
+    APIServer(
+        {
+            "bind": args.bind,
+            "workers": args.workers,
+            "max_requests": args.max_requests,
+            "max_requests_jitter": args.max_requests_jitter,
+            "timeout": args.timeout,
+        },
+        max_memory_mb=args.max_memory_mb,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,17 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Callable
 
 from fastapi import FastAPI
+from loguru import logger
 
+from backend.app.core.settings import settings
 from backend.app.db.utils import close_db_connection, connect_to_db
+from backend.app.services.device_heartbeats import device_heartbeat_buffer
+from backend.app.services.device_updates import device_update_hub
+from backend.app.services.postmark import close_async_postmark_client
+from backend.app.services.security import shutdown_password_hashing_pool
 
 
 START_EVENT = "startup"
@@ -12,13 +21,26 @@ SHUTDOWN_EVENT = "shutdown"
 
 def create_start_app_handler(app: FastAPI) -> Callable:  # type: ignore
     async def start_app() -> None:
+        start = time.perf_counter()
+        if settings.THREADPOOL_SIZE:
+            # starlette runs the sync endpoints on the loop's default executor
+            asyncio.get_event_loop().set_default_executor(
+                ThreadPoolExecutor(max_workers=settings.THREADPOOL_SIZE)
+            )
         await connect_to_db(app)
+        device_update_hub.start()
+        device_heartbeat_buffer.start()
+        logger.info(f"Application started in {time.perf_counter() - start:.3f}s")
 
     return start_app
 
 
 def create_stop_app_handler(app: FastAPI) -> Callable:  # type: ignore
     async def stop_app() -> None:
+        device_update_hub.stop()
+        device_heartbeat_buffer.stop()
         await close_db_connection(app)
+        await close_async_postmark_client()
+        shutdown_password_hashing_pool()
 
     return stop_app
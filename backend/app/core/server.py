@@ -0,0 +1,78 @@
+"""
+Runs the API as a gunicorn master managing uvicorn workers.
+
+The master imports the application before forking (preload), so the workers start
+with the imported code and settings already in memory, shared copy-on-write instead
+of imported once per worker. Workers are replaced after serving a number of requests,
+as gunicorn does, or once their memory grows past a ceiling.
+"""
+import asyncio
+import os
+from typing import Any, Dict, Optional
+
+from backend.app.db.session import engine
+from gunicorn.app.base import BaseApplication
+from loguru import logger
+from uvicorn.main import Server
+from uvicorn.workers import UvicornWorker
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def _resident_memory_mb() -> float:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * PAGE_SIZE / (1024 * 1024)
+
+
+class RecyclingUvicornWorker(UvicornWorker):
+    """
+    A uvicorn worker that exits gracefully, to be replaced by the master, once its
+    resident memory goes over `max_memory_mb`. The memory is checked every time the
+    worker notifies the master that it is alive, every half of the gunicorn timeout.
+    """
+
+    # uvloop and httptools when they are installed, like plain uvicorn
+    CONFIG_KWARGS = {"loop": "auto", "http": "auto"}
+    max_memory_mb: Optional[int] = None
+
+    def run(self):
+        self.config.app = self.wsgi
+        self._server = Server(config=self.config)
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(self._server.serve(sockets=self.sockets))
+
+    async def callback_notify(self):
+        self.notify()
+        if self.max_memory_mb is None or self._server.should_exit:
+            return
+        memory_mb = _resident_memory_mb()
+        if memory_mb > self.max_memory_mb:
+            logger.info(
+                f"worker {self.pid} uses {memory_mb:.0f} MB, over the "
+                f"{self.max_memory_mb} MB ceiling, recycling it"
+            )
+            self._server.should_exit = True
+
+
+def _post_fork(server, worker):
+    # connections pooled by the master must not be shared by the workers
+    engine.dispose()
+
+
+class APIServer(BaseApplication):
+    def __init__(self, options: Dict[str, Any], *, max_memory_mb: Optional[int]):
+        self.options = options
+        RecyclingUvicornWorker.max_memory_mb = max_memory_mb
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set("worker_class", f"{__name__}.RecyclingUvicornWorker")
+        self.cfg.set("preload_app", True)
+        self.cfg.set("post_fork", _post_fork)
+
+    def load(self):
+        from backend.app.main import app
+
+        return app
@@ -1,7 +1,7 @@
 import collections
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 from pydantic import BaseSettings, EmailStr, validator
 from pydantic.networks import EmailStr
 from starlette.datastructures import CommaSeparatedStrings
@@ -21,8 +21,29 @@ class CustomBaseSettings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     HEADER_KEY: str = "Authorization"
     API_KEY_AUTH_ENABLED: bool = True
+    BULK_INSERT_CHUNK_SIZE: int = 500
+    # the most rows a single bulk request or CSV upload may carry
+    BULK_MAX_ROWS: int = 1000
+    PASSWORD_HASHING_WORKERS: Optional[int] = None
     VERSION: str = "0.1.0"
     DEBUG: bool = False
+    # how a starting process seeds the user types and default users:
+    # "bootstrap", "initializer" (the DataInitializer replay) or "off"
+    DB_BOOTSTRAP_MODE: str = "bootstrap"
+
+    # the process launcher, see backend.app.commands.serve
+    SERVER_BIND: str = "0.0.0.0:8000"
+    SERVER_WORKERS: Optional[int] = None
+    SERVER_MAX_REQUESTS: int = 10000
+    SERVER_MAX_REQUESTS_JITTER: int = 1000
+    SERVER_MAX_MEMORY_MB: Optional[int] = None
+    SERVER_TIMEOUT_SECONDS: int = 60
+    # threads running the sync endpoints of each process, Python's default when unset
+    THREADPOOL_SIZE: Optional[int] = None
+
+    # the search endpoints, see backend.app.db.search
+    SEARCH_PAGE_SIZE: int = 20
+    SEARCH_MAX_PAGE_SIZE: int = 100
 
     FIRST_SUPERUSER_EMAIL: EmailStr
     FIRST_SUPERUSER_PASSWORD: str
@@ -129,7 +150,14 @@ class CustomBaseSettings(BaseSettings):
     RESET_PASSWORD_URL: str
 
     POSTMARK_API_TOKEN: str
+    POSTMARK_API_URL: str = "https://api.postmarkapp.com/"
+    POSTMARK_CONNECT_TIMEOUT_SECONDS: float = 5
+    POSTMARK_TIMEOUT_SECONDS: float = 30
+    POSTMARK_MAX_CONNECTIONS: int = 10
     DEFAULT_EMAIL_SENDER: EmailStr
+    EMAIL_MAX_ATTEMPTS: int = 5
+    EMAIL_RETRY_BACKOFF_SECONDS: int = 30
+    EMAIL_DISPATCH_POLL_SECONDS: float = 5
     RESET_PASSWORD_TEMPLATE_ID: int
     ACTIVATE_ACCOUNT_TEMPLATE_ID: int
     DEACTIVATE_ACCOUNT_TEMPLATE_ID: int
@@ -138,6 +166,19 @@ class CustomBaseSettings(BaseSettings):
     DEACTIVATE_DEVICE_TEMPLATE_ID: int
 
     RABBIT_MQ_URI: str
+    DEVICE_NOTIFICATION_RELAY_BATCH_SIZE: int = 500
+    DEVICE_NOTIFICATION_RELAY_POLL_SECONDS: float = 1
+    DEVICE_NOTIFICATION_RETENTION_DAYS: int = 7
+    DEVICE_NOTIFICATION_PRUNE_SECONDS: float = 3600
+    DEVICE_UPDATES_KEEPALIVE_SECONDS: float = 15
+    DEVICE_METADATA_BATCH_MAX_SIZE: int = 100
+    DEVICE_METADATA_CACHE_SIZE: int = 10000
+    DEVICE_HEARTBEAT_FLUSH_SECONDS: float = 5
+    DEVICE_HEARTBEAT_BUFFER_SIZE: int = 100000
+    DEVICE_OFFLINE_AFTER_SECONDS: int = 180
+    SOFT_DELETE_RETENTION_DAYS: int = 30
+    PURGE_BATCH_SIZE: int = 500
+    PURGE_POLL_SECONDS: float = 3600
     EXTERNAL_RABBIT_MQ_URI: str
 
     RESET_PASSWORD_URL: str
@@ -0,0 +1,158 @@
+"""
+Seeds the user types and the default users a fresh database needs, the same rows
+DataInitializer creates, but in one transaction and with one multi-row insert per
+table. A digest of what was seeded is kept in seed_version, so that once a database
+has been seeded, every later start only runs the one query that finds it there.
+"""
+import hashlib
+from typing import Any, Dict, List, Tuple
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.user import user_repo
+from backend.app.models.seed_version import SeedVersion
+from backend.app.models.user import User
+from backend.app.models.user_type import UserType
+from backend.app.services.security import get_password_hashes
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+AGENT_MANAGER = settings.AGENT_MANAGER
+AGENT_OFFICER = settings.AGENT_OFFICER
+AGENT_SUPERVISOR = settings.AGENT_SUPERVISOR
+AgentManagerUser = settings.AgentManagerUser
+AgentOfficerUser = settings.AgentOfficerUser
+AgentSupervisorUser = settings.AgentSupervisorUser
+FIRST_SUPERUSER_ADDRESS = settings.FIRST_SUPERUSER_ADDRESS
+FIRST_SUPERUSER_EMAIL = settings.FIRST_SUPERUSER_EMAIL
+FIRST_SUPERUSER_FIRSTNAME = settings.FIRST_SUPERUSER_FIRSTNAME
+FIRST_SUPERUSER_LASSRA_ID = settings.FIRST_SUPERUSER_LASSRA_ID
+FIRST_SUPERUSER_LASTNAME = settings.FIRST_SUPERUSER_LASTNAME
+FIRST_SUPERUSER_PASSWORD = settings.FIRST_SUPERUSER_PASSWORD
+FIRST_SUPERUSER_PHONE = settings.FIRST_SUPERUSER_PHONE
+SecondSuperUser = settings.SecondSuperUser
+SUPERUSER_USER_TYPE = settings.SUPERUSER_USER_TYPE
+USER_TYPES = settings.USER_TYPES
+
+# bump when what gets seeded changes in a way the settings do not show
+SEED_VERSION = 1
+# processes starting together take turns, the first one seeds and the rest find
+# its marker once they get the lock
+BOOTSTRAP_LOCK_ID = 7304511
+
+
+def _from_settings(user_type: str, user: Any) -> Tuple[str, Dict[str, Any]]:
+    return (
+        user_type,
+        {
+            "first_name": user.FIRSTNAME,
+            "last_name": user.LASTNAME,
+            "address": user.ADDRESS,
+            "phone": user.PHONE,
+            "email": user.EMAIL,
+            "password": user.PASSWORD,
+            "lasrra_id": user.LASSRA_ID,
+        },
+    )
+
+
+def get_default_users() -> List[Tuple[str, Dict[str, Any]]]:
+    """Returns the name of the user type and the fields of every default user."""
+    return [
+        (
+            SUPERUSER_USER_TYPE,
+            {
+                "first_name": FIRST_SUPERUSER_FIRSTNAME,
+                "last_name": FIRST_SUPERUSER_LASTNAME,
+                "address": FIRST_SUPERUSER_ADDRESS,
+                "phone": FIRST_SUPERUSER_PHONE,
+                "email": FIRST_SUPERUSER_EMAIL,
+                "password": FIRST_SUPERUSER_PASSWORD,
+                "lasrra_id": FIRST_SUPERUSER_LASSRA_ID,
+            },
+        ),
+        _from_settings(SUPERUSER_USER_TYPE, SecondSuperUser),
+        _from_settings(AGENT_MANAGER, AgentManagerUser),
+        _from_settings(AGENT_SUPERVISOR, AgentSupervisorUser),
+        _from_settings(AGENT_OFFICER, AgentOfficerUser),
+    ]
+
+
+def get_seed_fingerprint(
+    user_types: List[str], users: List[Tuple[str, Dict[str, Any]]]
+) -> str:
+    # passwords stay out of it, the digest is stored in the clear
+    seeded = [str(SEED_VERSION), *sorted(user_types)]
+    seeded.extend(
+        sorted(f"{user_type}:{fields['email']}" for user_type, fields in users)
+    )
+    return hashlib.sha256("\n".join(seeded).encode()).hexdigest()
+
+
+def is_seeded(db: Session, *, fingerprint: str) -> bool:
+    return db.query(
+        db.query(SeedVersion).filter(SeedVersion.fingerprint == fingerprint).exists()
+    ).scalar()
+
+
+def _seed(
+    db: Session, *, user_types: List[str], users: List[Tuple[str, Dict[str, Any]]]
+):
+    db.execute(
+        insert(UserType)
+        .values([{"name": name} for name in user_types])
+        .on_conflict_do_nothing(index_elements=[UserType.name])
+    )
+    user_type_ids = dict(
+        db.query(UserType.name, UserType.id).filter(UserType.name.in_(user_types))
+    )
+
+    # the users are left as they are if they exist, like DataInitializer does, which
+    # also spares hashing their passwords again
+    existing = user_repo.get_existing_field_values(
+        db, field_name="email", field_values=[fields["email"] for _, fields in users]
+    )
+    missing = [
+        (user_type, fields)
+        for user_type, fields in users
+        if fields["email"] not in existing
+    ]
+    if not missing:
+        return
+    hashed_passwords = get_password_hashes(
+        [fields["password"] for _, fields in missing]
+    )
+    rows = []
+    for (user_type, fields), hashed_password in zip(missing, hashed_passwords):
+        row = {key: value for key, value in fields.items() if key != "password"}
+        row.update(
+            hashed_password=hashed_password,
+            user_type_id=user_type_ids[user_type],
+            is_active=True,
+        )
+        rows.append(row)
+    db.execute(insert(User).values(rows).on_conflict_do_nothing())
+
+
+def bootstrap(db: Session) -> bool:
+    """
+    Seeds the database unless it was already seeded with the same user types and
+    default users, and returns whether it did.
+    """
+    user_types = sorted(set(USER_TYPES.values()))
+    users = get_default_users()
+    fingerprint = get_seed_fingerprint(user_types, users)
+    if is_seeded(db, fingerprint=fingerprint):
+        db.rollback()
+        return False
+
+    db.execute(select([func.pg_advisory_xact_lock(BOOTSTRAP_LOCK_ID)]))
+    if is_seeded(db, fingerprint=fingerprint):
+        db.rollback()
+        return False
+    _seed(db, user_types=user_types, users=users)
+    db.execute(
+        insert(SeedVersion).values(fingerprint=fingerprint).on_conflict_do_nothing()
+    )
+    db.commit()
+    return True
@@ -1,2 +0,0 @@
-class DBViolationError(Exception):
-    pass
\ No newline at end of file
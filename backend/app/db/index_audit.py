@@ -0,0 +1,197 @@
+import ast
+import importlib
+import pkgutil
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Set, Tuple
+
+from backend.app import models  # noqa: F401 registers every model on the declarative Base
+from backend.app.db import repositories
+from backend.app.db.base_class import Base
+from commonlib.repositories import Base as BaseRepository
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.schema import Table
+
+APP_DIR = Path(__file__).resolve().parents[1]
+# the code whose queries the indexes have to serve
+SCANNED_DIRS = ["db/repositories", "api/routes", "services"]
+FIELD_LOOKUP_METHODS = {"get_by_field", "get_existing_field_values"}
+FOREIGN_KEY = "foreign key"
+# ends the lines of comparisons that are computed on rows found by other means,
+# e.g. a flag selected along with the rows, rather than used to find them
+NOT_A_LOOKUP_MARKER = "# index-audit: not a lookup"
+
+INDEX_COLUMNS_REGEX = re.compile(r"USING \w+ \(([^)]*)\)")
+
+
+class Lookup(NamedTuple):
+    table: str
+    column: str
+    source: str
+
+
+def _model_tables() -> Dict[str, Table]:
+    return {
+        cls.__name__: cls.__table__
+        for cls in Base._decl_class_registry.values()
+        if hasattr(cls, "__table__")
+    }
+
+
+def _repository_tables() -> Dict[Tuple[str, str], Table]:
+    """
+    Maps (module, name) of every repository instance, e.g.
+    ("backend.app.db.repositories.device", "device_repo"), to the table it queries.
+    """
+    tables = {}
+    for module_info in pkgutil.iter_modules(repositories.__path__):
+        module_name = f"{repositories.__name__}.{module_info.name}"
+        module = importlib.import_module(module_name)
+        for name, value in vars(module).items():
+            if isinstance(value, BaseRepository):
+                tables[(module_name, name)] = value.model.__table__
+                tables[(module_name, type(value).__name__)] = value.model.__table__
+    return tables
+
+
+def _module_name(path: Path) -> str:
+    relative = path.with_suffix("").relative_to(APP_DIR.parent.parent)
+    return ".".join(relative.parts)
+
+
+def _lookups_in_file(
+    path: Path,
+    model_tables: Dict[str, Table],
+    repository_tables: Dict[Tuple[str, str], Table],
+) -> Iterator[Lookup]:
+    text = path.read_text()
+    tree = ast.parse(text)
+    lines = text.splitlines()
+    module_name = _module_name(path)
+
+    imported: Dict[str, Tuple[str, str]] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom) and node.module:
+            for alias in node.names:
+                imported[alias.asname or alias.name] = (node.module, alias.name)
+
+    def source(node: ast.AST) -> str:
+        return f"{path.relative_to(APP_DIR.parent)}:{node.lineno}"
+
+    def column_of(node: ast.AST):
+        # Model.column
+        if (
+            isinstance(node, ast.Attribute)
+            and isinstance(node.value, ast.Name)
+            and node.value.id in model_tables
+        ):
+            table = model_tables[node.value.id]
+            if node.attr in table.c:
+                return table, node.attr
+        return None
+
+    classes = [node for node in ast.walk(tree) if isinstance(node, ast.ClassDef)]
+
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, (ast.Compare, ast.Call))
+            and lines[node.lineno - 1].rstrip().endswith(NOT_A_LOOKUP_MARKER)
+        ):
+            continue
+        # Model.column == value, Model.column.in_(values)
+        if isinstance(node, ast.Compare):
+            found = column_of(node.left)
+            if found:
+                yield Lookup(found[0].name, found[1], source(node))
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            if node.func.attr == "in_":
+                found = column_of(node.func.value)
+                if found:
+                    yield Lookup(found[0].name, found[1], source(node))
+            elif node.func.attr in FIELD_LOOKUP_METHODS:
+                # some_repo.get_by_field(db, field_name="column", ...)
+                field_names = [
+                    keyword.value.value
+                    for keyword in node.keywords
+                    if keyword.arg == "field_name"
+                    and isinstance(keyword.value, ast.Constant)
+                ]
+                table = _resolve_repository(
+                    node, module_name, classes, imported, repository_tables
+                )
+                if table is not None:
+                    for field_name in field_names:
+                        yield Lookup(table.name, field_name, source(node))
+
+
+def _resolve_repository(
+    node: ast.Call,
+    module_name: str,
+    classes: List[ast.ClassDef],
+    imported: Dict[str, Tuple[str, str]],
+    repository_tables: Dict[Tuple[str, str], Table],
+):
+    receiver = node.func.value
+    if not isinstance(receiver, ast.Name):
+        return None
+    if receiver.id == "self":
+        for cls in classes:
+            if cls.lineno <= node.lineno <= cls.end_lineno:
+                return repository_tables.get((module_name, cls.name))
+        return None
+    if receiver.id in imported:
+        return repository_tables.get(imported[receiver.id])
+    return repository_tables.get((module_name, receiver.id))
+
+
+def collect_lookups() -> List[Lookup]:
+    """
+    Lists the columns the application looks rows up by: every foreign key, since
+    relationship loads and joins filter on them, and every column the repositories,
+    routes and services filter on, except on lines ending with NOT_A_LOOKUP_MARKER.
+    """
+    # importing the repositories also registers the models backend.app.models leaves out
+    repository_tables = _repository_tables()
+    model_tables = _model_tables()
+
+    lookups = [
+        Lookup(table.name, column.name, FOREIGN_KEY)
+        for table in Base.metadata.tables.values()
+        for column in table.columns
+        if column.foreign_keys
+    ]
+    for scanned_dir in SCANNED_DIRS:
+        for path in sorted((APP_DIR / scanned_dir).glob("*.py")):
+            lookups.extend(_lookups_in_file(path, model_tables, repository_tables))
+    return lookups
+
+
+def get_indexed_columns(db: Session) -> Set[Tuple[str, str]]:
+    """
+    Returns the (table, column) pairs that lead at least one index, read from pg_indexes.
+    Only the leading column counts, as that is the one a btree index can seek on.
+    """
+    rows = db.execute(
+        "SELECT tablename, indexdef FROM pg_indexes WHERE schemaname = current_schema()"
+    )
+    indexed = set()
+    for table_name, index_definition in rows:
+        match = INDEX_COLUMNS_REGEX.search(index_definition)
+        if match:
+            leading_column = match.group(1).split(",")[0].strip().strip('"')
+            indexed.add((table_name, leading_column))
+    return indexed
+
+
+def find_missing_indexes(db: Session) -> Dict[Tuple[str, str], List[str]]:
+    """
+    Returns the looked up (table, column) pairs that no index leads with, along with
+    where each lookup happens.
+    """
+    indexed = get_indexed_columns(db)
+    missing: Dict[Tuple[str, str], List[str]] = {}
+    for lookup in collect_lookups():
+        key = (lookup.table, lookup.column)
+        if key not in indexed:
+            missing.setdefault(key, []).append(lookup.source)
+    return missing
@@ -1,18 +1,19 @@
 from backend.app.models.user_type import UserType
 from backend.app.models.device import Device
 from backend.app.schemas.email import EmailTemplateVariables
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from backend.app.core.settings import settings
 from backend.app.models.user import User
 from backend.app.models.agent import Agent
 from backend.app.db.repositories.base import Base
+from backend.app.db.search import search
 from backend.app.db.repositories.user_type import user_type as user_type_repo
 from backend.app.schemas.user import UserCreate, UserUpdate
 from backend.app.schemas.agent import AgentCreateForm, AgentCreate
 from backend.app.services import email
 from backend.app.services.security import get_password_hash
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 REGULAR_USER_TYPE = settings.REGULAR_USER_TYPE
 SUPERUSER_USER_TYPE = settings.SUPERUSER_USER_TYPE
@@ -33,9 +34,38 @@ class AgentRepository(Base[Agent]):
             return None
         return agent.name
 
+    def get_names(self, db: Session, *, ids: List[int]) -> Dict[int, str]:
+        """Returns the names of the agents with the ids, in one query."""
+        return dict(db.query(Agent.id, Agent.name).filter(Agent.id.in_(set(ids))).all())
+
     def get_by_name(self,db:Session,*, name: str) -> Agent:
         agent= db.query(Agent).filter(Agent.name == name). first()
 
+    def search(
+        self,
+        db: Session,
+        *,
+        text: str,
+        agent_id: Optional[int],
+        page: int,
+        page_size: int,
+    ) -> Tuple[List[Agent], bool]:
+        """
+        Matches the text against the agents' names, only the agent `agent_id` is
+        searched unless it is None.
+        """
+        query = db.query(Agent).options(joinedload(Agent.user_type))
+        if agent_id is not None:
+            query = query.filter(Agent.id == agent_id)
+        return search(
+            query,
+            columns=[Agent.name],
+            id_column=Agent.id,
+            text=text,
+            page=page,
+            page_size=page_size,
+        )
+
     def create(self, db: Session, *, obj_in: AgentCreate) -> Agent:
         db_obj = Agent(
             name=obj_in.name,
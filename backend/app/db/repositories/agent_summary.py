@@ -0,0 +1,46 @@
+from typing import Dict
+
+from backend.app.db.repositories.base import Base
+from backend.app.models.agent import Agent
+from backend.app.models.agent_summary import AgentSummary
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+COUNTERS = (
+    "active_devices",
+    "inactive_devices",
+    "unassigned_devices",
+    "officers",
+    "supervisors",
+)
+
+
+class AgentSummaryRepository(Base[AgentSummary]):
+    """
+    Reads the counters the database keeps in agent_summary. Nothing writes to the
+    table from here, the triggers on the counted tables do.
+    """
+
+    def get_counts(self, db: Session, *, agent_id: int) -> Dict[str, int]:
+        summary = (
+            db.query(*(getattr(AgentSummary, counter) for counter in COUNTERS))
+            .filter(AgentSummary.agent_id == agent_id)
+            .first()
+        )
+        # an agent nothing was counted for yet has no row
+        return dict(zip(COUNTERS, summary or [0] * len(COUNTERS)))
+
+    def get_total_counts(self, db: Session) -> Dict[str, int]:
+        """Adds up the counters of every agent, one row per agent rather than per device."""
+        totals = db.query(
+            *(
+                func.coalesce(func.sum(getattr(AgentSummary, counter)), 0)
+                for counter in COUNTERS
+            )
+        ).one()
+        counts = {counter: int(total) for counter, total in zip(COUNTERS, totals)}
+        counts["agents"] = db.query(func.count(Agent.id)).scalar()
+        return counts
+
+
+agent_summary_repo = AgentSummaryRepository(AgentSummary)
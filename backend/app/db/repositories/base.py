@@ -1 +1,10 @@
+from typing import Iterator, List, Sequence, TypeVar
+
 from commonlib.repositories import Base
+
+T = TypeVar("T")
+
+
+def chunks(items: Sequence[T], size: int) -> Iterator[List[T]]:
+    for start in range(0, len(items), size):
+        yield list(items[start : start + size])
@@ -1,19 +1,34 @@
 from backend.app.core.settings import settings
 from backend.app.models.user import User
-from backend.app.db.errors import DBViolationError
+from datetime import datetime
 from loguru import logger
-from typing import Any, Dict, List
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
 
 
-from backend.app.models.device import Device
-from backend.app.db.repositories.base import Base
+from backend.app.models.device import Device, device_user_link
+from backend.app.db.repositories.base import Base, chunks
+from backend.app.db.search import search
 from backend.app.schemas.device import DeviceCreate, DeviceUser
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, exists, func, text, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session, selectinload
 from backend.app.services import email
 from backend.app.db.repositories.user import user_repo
+from backend.app.db.repositories.device_user_change import device_user_change_repo
+from backend.app.models.device_user_change import DEVICE_USER_ADDED, DEVICE_USER_REMOVED
 
 DEACTIVATE_DEVICE_TEMPLATE_ID = settings.DEACTIVATE_DEVICE_TEMPLATE_ID
 ACTIVATE_DEVICE_TEMPLATE_ID = settings.ACTIVATE_DEVICE_TEMPLATE_ID
+BULK_INSERT_CHUNK_SIZE = settings.BULK_INSERT_CHUNK_SIZE
+
+DeviceUserPair = Tuple[int, int]
+
+
+class DeviceLastSeen(NamedTuple):
+    mac_id: str
+    seen_at: datetime
+    battery_level: Optional[int]
+    app_version: Optional[str]
 
 
 class DeviceRepository(Base[Device]):
@@ -25,21 +40,88 @@ class DeviceRepository(Base[Device]):
     def add_assigned_users(
         self, db: Session, *, device_obj: Device, user_objs: List[User]
     ) -> Device:
-        device_obj.assigned_users.extend(user_objs)
-        db.add(device_obj)
+        """
+        Links the users to the device and commits, without loading the users the
+        device already has, see bulk_add_assigned_users.
+        """
+        self.bulk_add_assigned_users(
+            db, pairs=[(device_obj.id, user.id) for user in user_objs]
+        )
         db.commit()
-        db.refresh(device_obj)
         return device_obj
 
+    def has_assigned_user(self, db: Session, *, device_id: int, user_id: int) -> bool:
+        """
+        Whether the user is assigned to the device, one EXISTS on the device_user
+        primary key rather than loading either side's collection.
+        """
+        return db.query(
+            exists().where(
+                and_(
+                    device_user_link.c.device_id == device_id,
+                    device_user_link.c.user_id == user_id,
+                )
+            )
+        ).scalar()
+
     def get_all_devices_with_creator_id(
         self, db: Session, *, creator_id: int
     ) -> List[Device]:
-        return db.query(Device).filter(Device.creator_id == creator_id).all()
+        return self.query(db).filter(Device.creator_id == creator_id).all()
 
     def get_all_devices_with_agent_id(
         self, db: Session, *, agent_id: int
     ) -> List[Device]:
-        return db.query(Device).filter(Device.agent_id == agent_id).all()
+        return self.query(db).filter(Device.agent_id == agent_id).all()
+
+    def search(
+        self,
+        db: Session,
+        *,
+        text: str,
+        agent_id: Optional[int],
+        page: int,
+        page_size: int,
+    ) -> Tuple[List[Device], bool]:
+        """
+        Matches the text against the devices' mac ids and names, only among the
+        devices of the agent `agent_id` unless it is None. The assigned users of the
+        page are loaded along with it.
+        """
+        query = self.query(db).options(
+            selectinload(Device.assigned_users).joinedload(User.user_type)
+        )
+        if agent_id is not None:
+            query = query.filter(Device.agent_id == agent_id)
+        return search(
+            query,
+            columns=[Device.mac_id, Device.name],
+            id_column=Device.id,
+            text=text,
+            page=page,
+            page_size=page_size,
+        )
+
+    def get_all_by_mac_ids(self, db: Session, *, mac_ids: List[str]) -> List[Device]:
+        return self.query(db).filter(Device.mac_id.in_(mac_ids)).all()
+
+    def get_assigned_users_by_device_id(
+        self, db: Session, *, device_ids: List[int]
+    ) -> Dict[int, List[User]]:
+        """
+        Loads the users assigned to all of the devices with one query over device_user,
+        rather than one assigned_users collection per device.
+        """
+        assigned_users: Dict[int, List[User]] = {device_id: [] for device_id in device_ids}
+        rows = (
+            db.query(device_user_link.c.device_id, User)
+            .join(User, User.id == device_user_link.c.user_id)
+            .filter(device_user_link.c.device_id.in_(device_ids))
+            .order_by(device_user_link.c.device_id, User.id)
+        )
+        for device_id, user in rows:
+            assigned_users[device_id].append(user)
+        return assigned_users
 
     def get_device_config(self, db: Session, *, device_obj: Device) -> Dict[str, Any]:
         users = []
@@ -58,6 +140,33 @@ class DeviceRepository(Base[Device]):
             "api_base_uri": settings.API_BASE_URL,
         }
 
+    def get_assigned_user_changes(
+        self, db: Session, *, device_obj: Device, since: int
+    ) -> Tuple[int, List[User], List[int]]:
+        """
+        Returns the device's version, the users that were assigned or modified since
+        the version `since` and are still assigned, and the ids of the users that were
+        unassigned since then.
+        """
+        version, changes = device_user_change_repo.get_changes_since(
+            db, device_id=device_obj.id, since=since
+        )
+        if not changes:
+            return version, [], []
+        users = (
+            db.query(User)
+            .join(device_user_link)
+            .filter(
+                device_user_link.c.device_id == device_obj.id,
+                User.id.in_(list(changes)),
+            )
+            .order_by(User.id)
+            .all()
+        )
+        assigned = {user.id for user in users}
+        removed = sorted(user_id for user_id in changes if user_id not in assigned)
+        return version, users, removed
+
     def remove_assigned_user(
         self, db: Session, *, device_obj: Device, user_obj: User
     ) -> Device:
@@ -68,36 +177,240 @@ class DeviceRepository(Base[Device]):
     def remove_assigned_users(
         self, db: Session, *, device_obj: Device, user_objs: List[User]
     ) -> Device:
-        user_obj_set = set(user_objs)
-
-        device_obj.assigned_users = [
-            user for user in device_obj.assigned_users if user not in user_obj_set
-        ]
-
-        db.add(device_obj)
+        """
+        Unlinks the users from the device and commits, without loading the users the
+        device has, see bulk_remove_assigned_users.
+        """
+        self.bulk_remove_assigned_users(
+            db, pairs=[(device_obj.id, user.id) for user in user_objs]
+        )
         db.commit()
-        db.refresh(device_obj)
         return device_obj
 
+    def bulk_add_assigned_users(
+        self,
+        db: Session,
+        *,
+        pairs: List[DeviceUserPair],
+        chunk_size: int = BULK_INSERT_CHUNK_SIZE,
+    ) -> Set[DeviceUserPair]:
+        """
+        Links the (device_id, user_id) pairs with a set-based
+        INSERT ... ON CONFLICT DO NOTHING per chunk, written straight to device_user
+        without loading any assigned_users collection.
+        Returns the pairs that were actually linked, pairs that were already linked are
+        left out. The linked pairs are recorded in the device user change log, but
+        nothing is committed, so that the caller can record what changed in the same
+        transaction.
+        """
+        added: Set[DeviceUserPair] = set()
+        for chunk in chunks(sorted(set(pairs)), chunk_size):
+            statement = (
+                insert(device_user_link)
+                .values([{"device_id": d, "user_id": u} for d, u in chunk])
+                .on_conflict_do_nothing()
+                .returning(device_user_link.c.device_id, device_user_link.c.user_id)
+            )
+            added.update(
+                (device_id, user_id) for device_id, user_id in db.execute(statement)
+            )
+        device_user_change_repo.record(db, pairs=added, change=DEVICE_USER_ADDED)
+        return added
+
+    def bulk_remove_assigned_users(
+        self,
+        db: Session,
+        *,
+        pairs: List[DeviceUserPair],
+        chunk_size: int = BULK_INSERT_CHUNK_SIZE,
+    ) -> Set[DeviceUserPair]:
+        """
+        Unlinks the (device_id, user_id) pairs with one
+        DELETE ... WHERE (device_id, user_id) IN (...) per chunk.
+        Returns the pairs that were actually unlinked. Like bulk_add_assigned_users, it
+        leaves committing to the caller.
+        """
+        columns = (device_user_link.c.device_id, device_user_link.c.user_id)
+        removed: Set[DeviceUserPair] = set()
+        for chunk in chunks(sorted(set(pairs)), chunk_size):
+            statement = (
+                device_user_link.delete()
+                .where(tuple_(*columns).in_(chunk))
+                .returning(*columns)
+            )
+            removed.update(
+                (device_id, user_id) for device_id, user_id in db.execute(statement)
+            )
+        device_user_change_repo.record(db, pairs=removed, change=DEVICE_USER_REMOVED)
+        return removed
+
+    def unassign_users_from_all_devices(
+        self, db: Session, *, user_ids: List[int]
+    ) -> Dict[DeviceUserPair, str]:
+        """
+        Unlinks the users from every device they are assigned to with one
+        DELETE ... USING device ... RETURNING, instead of loading each user's devices.
+        Returns the unlinked (device_id, user_id) pairs with the mac_id of their
+        device. Like bulk_remove_assigned_users, it leaves committing to the caller.
+        """
+        if not user_ids:
+            return {}
+        statement = (
+            device_user_link.delete()
+            .where(
+                and_(
+                    device_user_link.c.device_id == Device.id,
+                    device_user_link.c.user_id.in_(sorted(set(user_ids))),
+                )
+            )
+            .returning(
+                device_user_link.c.device_id, device_user_link.c.user_id, Device.mac_id
+            )
+        )
+        removed = {
+            (device_id, user_id): mac_id
+            for device_id, user_id, mac_id in db.execute(statement)
+        }
+        device_user_change_repo.record(db, pairs=removed, change=DEVICE_USER_REMOVED)
+        return removed
+
+    def record_last_seen(
+        self, db: Session, *, heartbeats: List[DeviceLastSeen]
+    ) -> int:
+        """
+        Writes when the devices were last seen, and the status they last reported,
+        with one UPDATE device ... FROM unnest(...), the heartbeats going in as one
+        array per column. A status the heartbeat left out keeps its previous value,
+        and a device that was already seen later, through another process, is left
+        as it is. Mac ids without a device, or of a deleted one, are skipped.
+        The rows are locked in id order first, as the device user change log locks
+        them, so that flushes running at the same time in other processes can not
+        deadlock with them.
+        Returns how many devices were updated, and leaves committing to the caller.
+        """
+        mac_ids = [heartbeat.mac_id for heartbeat in heartbeats]
+        db.execute(
+            text(
+                "SELECT 1 FROM device WHERE mac_id = ANY(:mac_ids) AND NOT deleted "
+                "ORDER BY id FOR UPDATE"
+            ),
+            {"mac_ids": mac_ids},
+        )
+        return db.execute(
+            text(
+                "UPDATE device SET last_seen_at = heartbeat.seen_at, "
+                "battery_level = coalesce(heartbeat.battery_level, device.battery_level), "
+                "app_version = coalesce(heartbeat.app_version, device.app_version) "
+                "FROM unnest(CAST(:mac_ids AS varchar[]), "
+                "CAST(:seen_ats AS timestamptz[]), CAST(:battery_levels AS integer[]), "
+                "CAST(:app_versions AS varchar[])) "
+                "AS heartbeat (mac_id, seen_at, battery_level, app_version) "
+                "WHERE device.mac_id = heartbeat.mac_id AND NOT device.deleted AND "
+                "(device.last_seen_at IS NULL OR device.last_seen_at < heartbeat.seen_at)"
+            ),
+            {
+                "mac_ids": mac_ids,
+                "seen_ats": [heartbeat.seen_at for heartbeat in heartbeats],
+                "battery_levels": [heartbeat.battery_level for heartbeat in heartbeats],
+                "app_versions": [heartbeat.app_version for heartbeat in heartbeats],
+            },
+        ).rowcount
+
+    def get_last_seen_by_agent_id(
+        self, db: Session, *, agent_id: int, online_since: datetime
+    ) -> List[Tuple[Device, bool]]:
+        """
+        Returns the devices of the agent, offline ones first, with whether each was
+        seen after `online_since`. A device that was never seen is offline.
+        """
+        # the devices are found by agent_id, last_seen_at is only compared
+        is_online = func.coalesce(
+            Device.last_seen_at >= online_since,  # index-audit: not a lookup
+            False,
+        )
+        return (
+            self.query(db)
+            .add_columns(is_online)
+            .filter(Device.agent_id == agent_id)
+            .order_by(is_online, Device.last_seen_at.desc().nullslast(), Device.id)
+            .all()
+        )
+
     def activate_device(self, db: Session, *, device_obj: Device) -> Device:
-        return super().update(db, db_obj=device_obj, obj_in={"is_active": True})
+        return super().update(
+            db, db_obj=device_obj, obj_in={"is_active": True}, returning=True
+        )
 
     def deactivate_device(self, db: Session, *, device_obj: Device) -> Device:
-        return super().update(db, db_obj=device_obj, obj_in={"is_active": False})
+        return super().update(
+            db, db_obj=device_obj, obj_in={"is_active": False}, returning=True
+        )
+
+    def soft_delete(self, db: Session, *, db_obj: Device) -> Device:
+        """
+        Unlinks the device's users, recording it in the device user change log, and
+        marks the device as deleted, in one transaction. Its mac_id and name are free
+        for a new device from then on.
+        """
+        statement = (
+            device_user_link.delete()
+            .where(device_user_link.c.device_id == db_obj.id)
+            .returning(device_user_link.c.device_id, device_user_link.c.user_id)
+        )
+        removed = {(device_id, user_id) for device_id, user_id in db.execute(statement)}
+        device_user_change_repo.record(db, pairs=removed, change=DEVICE_USER_REMOVED)
+        return super().soft_delete(db, db_obj=db_obj)
+
+    def purge_deleted(
+        self, db: Session, *, deleted_before: datetime, limit: int
+    ) -> List[int]:
+        """
+        Deletes for good up to `limit` of the devices that were soft deleted before
+        `deleted_before`, skipping the ones another purge has locked, and returns
+        their ids. Their change log goes with them. Leaves committing to the caller.
+        """
+        ids = [
+            id
+            for id, in db.query(Device.id)
+            .filter(Device.deleted, Device.deleted_at < deleted_before)
+            .order_by(Device.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ]
+        if ids:
+            # soft deleting unlinked them, unless a link was added concurrently
+            db.execute(
+                device_user_link.delete().where(device_user_link.c.device_id.in_(ids))
+            )
+            db.query(Device).filter(Device.id.in_(ids)).delete(synchronize_session=False)
+        return ids
 
     def mac_id_exists(self, db: Session, mac_id: str) -> bool:
         return bool(self.get_by_field(db, field_name="mac_id", field_value=mac_id))
 
-    def create(self, db: Session, *, obj_in: DeviceCreate) -> Device:
-        if self.mac_id_exists(db, mac_id=obj_in.mac_id):
-            raise DBViolationError(
-                "device with mac id {} already exists".format(obj_in.mac_id)
+    def bulk_create(
+        self,
+        db: Session,
+        *,
+        objs_in: List[DeviceCreate],
+        chunk_size: int = BULK_INSERT_CHUNK_SIZE,
+    ) -> Dict[str, int]:
+        """
+        Inserts the devices with one multi-row INSERT ... ON CONFLICT DO NOTHING per chunk.
+        Returns a mapping of mac_id to id for the rows that were actually inserted,
+        rows that collided with an existing mac_id or name are left out.
+        """
+        created: Dict[str, int] = {}
+        for chunk in chunks(objs_in, chunk_size):
+            statement = (
+                insert(Device)
+                .values([obj_in.dict() for obj_in in chunk])
+                .on_conflict_do_nothing()
+                .returning(Device.id, Device.mac_id)
             )
-            if self.name_exists(db, name=obj_in.name):
-                raise DBViolationError(
-                    "device with name {} already exists".format(obj_in.name)
-                )
-        return super().create(db, obj_in=obj_in)
+            created.update({mac_id: id for id, mac_id in db.execute(statement)})
+        db.commit()
+        return created
 
 
 device_repo = DeviceRepository(Device)
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import Iterable, List
+
+from backend.app.db.repositories.base import Base
+from backend.app.models.device_notification import DeviceNotification
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import func
+
+# devices only need to hear that something changed, they fetch the details themselves
+DEVICE_UPDATED = " "
+
+
+class DeviceNotificationRepository(Base[DeviceNotification]):
+    def queue(
+        self, db: Session, *, mac_ids: Iterable[str], body: str = DEVICE_UPDATED
+    ) -> List[DeviceNotification]:
+        """
+        Adds one notification per distinct device to the session without committing.
+        They are committed along with the change they are about, so a device hears
+        about every change that was committed and about none that was rolled back,
+        which is why this has to be called before the change is committed.
+        """
+        db_objs = [
+            DeviceNotification(mac_id=mac_id, body=body)
+            for mac_id in sorted(set(mac_ids))
+        ]
+        db.add_all(db_objs)
+        return db_objs
+
+    def get_version(self, db: Session, *, mac_id: str) -> int:
+        """Returns the id of the newest notification queued for the device, or 0."""
+        return (
+            db.query(func.coalesce(func.max(DeviceNotification.id), 0))
+            .filter(DeviceNotification.mac_id == mac_id)
+            .scalar()
+        )
+
+    def claim_pending(self, db: Session, *, limit: int) -> List[DeviceNotification]:
+        """
+        Locks and returns up to `limit` unsent notifications, oldest first, skipping
+        the ones another relay has locked. The rows stay locked until the caller
+        commits.
+        """
+        return (
+            db.query(DeviceNotification)
+            .filter(DeviceNotification.sent_at.is_(None))
+            .order_by(DeviceNotification.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    def mark_as_sent(self, db: Session, *, db_objs: List[DeviceNotification]):
+        sent_at = func.now()
+        for db_obj in db_objs:
+            db_obj.sent_at = sent_at
+
+    def delete_sent(self, db: Session, *, sent_before: datetime, limit: int) -> int:
+        """
+        Deletes up to `limit` of the notifications sent before `sent_before`, skipping
+        the ones another relay has locked, and returns how many it deleted.
+        The newest notification of each device is kept whatever its age, since its
+        id is the version get_version reads. Leaves committing to the caller.
+        """
+        newer = aliased(DeviceNotification)
+        ids = [
+            id
+            for id, in db.query(DeviceNotification.id)
+            .filter(
+                DeviceNotification.sent_at < sent_before,
+                db.query(newer)
+                .filter(
+                    newer.mac_id == DeviceNotification.mac_id,
+                    newer.id > DeviceNotification.id,
+                )
+                .exists(),
+            )
+            .order_by(DeviceNotification.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ]
+        if ids:
+            db.query(DeviceNotification).filter(DeviceNotification.id.in_(ids)).delete(
+                synchronize_session=False
+            )
+        return len(ids)
+
+
+device_notification_repo = DeviceNotificationRepository(DeviceNotification)
@@ -0,0 +1,112 @@
+from typing import Dict, Iterable, List, Tuple
+
+from backend.app.db.repositories.base import Base
+from backend.app.models.device import Device, device_user_link
+from backend.app.models.device_user_change import (
+    DEVICE_USER_MODIFIED,
+    DeviceUserChange,
+)
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+
+DeviceUserPair = Tuple[int, int]
+
+
+class DeviceUserChangeRepository(Base[DeviceUserChange]):
+    """
+    The change log devices sync their users from. Every change gets the next id,
+    which is the version a device asks for the changes since.
+    Writers lock the rows of the devices they record changes for until they commit,
+    so the changes of one device are committed in the order of their ids and a
+    device that has seen some version can never miss a lower one committed later.
+    None of the methods commit, the changes go in the transaction they are about.
+    """
+
+    def _lock_devices(self, db: Session, *, device_ids: Iterable[int]):
+        db.execute(
+            select([Device.id])
+            .where(Device.id.in_(sorted(set(device_ids))))
+            .order_by(Device.id)
+            .with_for_update()
+        )
+
+    def record(self, db: Session, *, pairs: Iterable[DeviceUserPair], change: str):
+        pairs = sorted(set(pairs))
+        if not pairs:
+            return
+        self._lock_devices(db, device_ids=[device_id for device_id, _ in pairs])
+        db.execute(
+            DeviceUserChange.__table__.insert().values(
+                [
+                    {"device_id": device_id, "user_id": user_id, "change": change}
+                    for device_id, user_id in pairs
+                ]
+            )
+        )
+
+    def record_user_modified(self, db: Session, *, user_id: int):
+        """Records the user as modified on every device it is assigned to."""
+        self.record_users_modified(db, user_ids=[user_id])
+
+    def record_users_modified(self, db: Session, *, user_ids: Iterable[int]):
+        """Records each user as modified on every device it is assigned to."""
+        user_ids = sorted(set(user_ids))
+        if not user_ids:
+            return
+        device_ids = db.execute(
+            select([device_user_link.c.device_id]).where(
+                device_user_link.c.user_id.in_(user_ids)
+            )
+        )
+        self._lock_devices(db, device_ids=[device_id for device_id, in device_ids])
+        db.execute(
+            DeviceUserChange.__table__.insert().from_select(
+                ["device_id", "user_id", "change"],
+                select(
+                    [
+                        device_user_link.c.device_id,
+                        device_user_link.c.user_id,
+                        literal(DEVICE_USER_MODIFIED),
+                    ]
+                ).where(device_user_link.c.user_id.in_(user_ids)),
+            )
+        )
+
+    def get_version(self, db: Session, *, device_id: int) -> int:
+        return db.query(
+            func.coalesce(func.max(DeviceUserChange.id), 0)
+        ).filter(DeviceUserChange.device_id == device_id).scalar()
+
+    def get_versions(self, db: Session, *, device_ids: List[int]) -> Dict[int, int]:
+        """Returns the version of each device, devices without changes are left out."""
+        return dict(
+            db.query(DeviceUserChange.device_id, func.max(DeviceUserChange.id))
+            .filter(DeviceUserChange.device_id.in_(device_ids))
+            .group_by(DeviceUserChange.device_id)
+            .all()
+        )
+
+    def get_changes_since(
+        self, db: Session, *, device_id: int, since: int
+    ) -> Tuple[int, Dict[int, str]]:
+        """
+        Returns the device's version and the latest change to each user since the
+        version `since`, in one query. A device that is already up to date gets
+        `since` back and no changes.
+        """
+        latest = (
+            db.query(
+                DeviceUserChange.id, DeviceUserChange.user_id, DeviceUserChange.change
+            )
+            .filter(
+                DeviceUserChange.device_id == device_id, DeviceUserChange.id > since
+            )
+            .order_by(DeviceUserChange.user_id, DeviceUserChange.id.desc())
+            .distinct(DeviceUserChange.user_id)
+            .all()
+        )
+        version = max((id for id, _, _ in latest), default=since)
+        return version, {user_id: change for _, user_id, change in latest}
+
+
+device_user_change_repo = DeviceUserChangeRepository(DeviceUserChange)
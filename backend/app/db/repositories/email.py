@@ -2,12 +2,38 @@ from typing import Any, Dict, List, Optional, Union
 
 from backend.app.models.email import Email
 from backend.app.db.repositories.base import Base
+from backend.app.schemas.email import EmailCreate
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
 
 
 class EmailRepository(Base[Email]):
-    def mark_as_delivered(self, db: Session, *, db_obj: Email) -> Email:
-        return super().update(db, db_obj=db_obj, obj_in={"delivered": True})
+    def queue(self, db: Session, *, objs_in: List[EmailCreate]) -> List[Email]:
+        """
+        Adds the emails to the session without committing.
+        They are committed along with the change they are about, so an email goes out
+        for every change that was committed and for none that was rolled back, which
+        is why this has to be called before the change is committed.
+        """
+        db_objs = [Email(**obj_in.dict()) for obj_in in objs_in]
+        db.add_all(db_objs)
+        return db_objs
+
+    def claim_pending(self, db: Session, *, limit: int) -> List[Email]:
+        """
+        Locks and returns up to `limit` emails that are due to be sent, oldest first.
+        Rows locked by another dispatcher are skipped rather than waited on, so several
+        dispatchers can drain the outbox at once without sending an email twice.
+        The rows stay locked until the caller commits.
+        """
+        return (
+            db.query(Email)
+            .filter(Email.next_attempt_at <= func.now())
+            .order_by(Email.next_attempt_at, Email.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
 
 
 email_repo = EmailRepository(Email)
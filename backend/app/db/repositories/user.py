@@ -1,16 +1,27 @@
+from datetime import datetime
+
 from backend.app.models.user_type import UserType
-from backend.app.models.device import Device
+from backend.app.models.agent import Agent
+from backend.app.models.api_key import APIKey
+from backend.app.models.device import Device, device_user_link
+from backend.app.models.reset_token import PasswordResetToken
+from backend.app.models.user_history import UserHistory
 from backend.app.schemas.email import EmailTemplateVariables
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from backend.app.core.settings import settings
 from backend.app.models.user import User
-from backend.app.db.repositories.base import Base
+from backend.app.db.repositories.base import Base, chunks
+from backend.app.db.repositories.device_user_change import device_user_change_repo
 from backend.app.db.repositories.user_type import user_type as user_type_repo
+from backend.app.db.search import search
 from backend.app.schemas.user import UserCreate, UserUpdate
 from backend.app.services import email
-from backend.app.services.security import get_password_hash
-from sqlalchemy.orm import Session
+from backend.app.services.security import get_password_hash, get_password_hashes
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import exists
+from sqlalchemy.orm import Session, aliased, joinedload
 
 REGULAR_USER_TYPE = settings.REGULAR_USER_TYPE
 SUPERUSER_USER_TYPE = settings.SUPERUSER_USER_TYPE
@@ -18,11 +29,12 @@ USER_TYPES = settings.USER_TYPES
 ACTIVATE_ACCOUNT_TEMPLATE_ID = settings.ACTIVATE_ACCOUNT_TEMPLATE_ID
 DEACTIVATE_ACCOUNT_TEMPLATE_ID = settings.DEACTIVATE_ACCOUNT_TEMPLATE_ID
 CREATE_ACCOUNT_TEMPLATE_ID = settings.CREATE_ACCOUNT_TEMPLATE_ID
+BULK_INSERT_CHUNK_SIZE = settings.BULK_INSERT_CHUNK_SIZE
 
 
 class UserRepository(Base[User]):
     def get_by_email(self, db: Session, *, email: str) -> User:
-        user = db.query(User).filter(User.email == email).first()
+        user = self.query(db).filter(User.email == email).first()
         return user
 
     def create(self, db: Session, *, obj_in: UserCreate) -> User:
@@ -40,10 +52,48 @@ class UserRepository(Base[User]):
         
         db_obj.set_password(obj_in.password)
         db.add(db_obj)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise
         db.refresh(db_obj)
         return db_obj
 
+    def bulk_create(
+        self,
+        db: Session,
+        *,
+        objs_in: List[UserCreate],
+        chunk_size: int = BULK_INSERT_CHUNK_SIZE,
+    ) -> Dict[str, int]:
+        """
+        Inserts the users with one multi-row INSERT ... ON CONFLICT DO NOTHING per chunk,
+        hashing all the passwords in parallel beforehand.
+        Returns a mapping of email to id for the rows that were actually inserted,
+        rows that collided with an existing email, phone or lasrra_id are left out.
+        Leaves committing to the caller.
+        """
+        hashed_passwords = get_password_hashes([obj_in.password for obj_in in objs_in])
+        rows = [
+            {
+                **obj_in.dict(exclude={"password"}),
+                "hashed_password": hashed_password,
+            }
+            for obj_in, hashed_password in zip(objs_in, hashed_passwords)
+        ]
+
+        created: Dict[str, int] = {}
+        for chunk in chunks(rows, chunk_size):
+            statement = (
+                insert(User)
+                .values(chunk)
+                .on_conflict_do_nothing()
+                .returning(User.id, User.email)
+            )
+            created.update({email: id for id, email in db.execute(statement)})
+        return created
+
     def update(
         self, db: Session, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
     ) -> User:
@@ -55,7 +105,20 @@ class UserRepository(Base[User]):
             hashed_password = get_password_hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        return self._update(db, db_obj=db_obj, obj_in=update_data)
+
+    def _update(
+        self,
+        db: Session,
+        *,
+        db_obj: User,
+        obj_in: Dict[str, Any],
+        returning: bool = False,
+    ) -> User:
+        # devices hold a copy of the users assigned to them, and sync it from the
+        # device user change log
+        device_user_change_repo.record_user_modified(db, user_id=db_obj.id)
+        return super().update(db, db_obj=db_obj, obj_in=obj_in, returning=returning)
 
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
         user = self.get_by_email(db, email=email)
@@ -76,7 +139,9 @@ class UserRepository(Base[User]):
     ) -> User:
         if db_obj.is_active == status:
             return db_obj
-        return super().update(db, db_obj=db_obj, obj_in={"is_active": status})
+        return self._update(
+            db, db_obj=db_obj, obj_in={"is_active": status}, returning=True
+        )
 
     def get_all_devices_assigned_to_user_with_user_id(
         self, db: Session, *, user_id: int
@@ -85,7 +150,115 @@ class UserRepository(Base[User]):
         return user.devices
 
     def get_all_users_with_agent_id(self, db: Session, *, agent_id: int) -> List[User]:
-        return db.query(self.model).filter(User.agent_id == agent_id).all()
+        return self.query(db).filter(User.agent_id == agent_id).all()
+
+    def set_agent_id(
+        self, db: Session, *, user_ids: List[int], agent_id: int
+    ) -> List[int]:
+        """
+        Moves the users to the agent with one UPDATE ... RETURNING, and returns the
+        ids of the users that actually moved, users already with the agent are left
+        out. The moved users are recorded as modified on their devices, like any
+        other update.
+        Nothing is committed, and users loaded in the session are not updated.
+        """
+        if not user_ids:
+            return []
+        statement = (
+            User.__table__.update()
+            .where(User.id.in_(sorted(set(user_ids))))
+            .where(User.agent_id.is_distinct_from(agent_id))
+            .values(agent_id=agent_id)
+            .returning(User.id)
+        )
+        moved = sorted(id for id, in db.execute(statement))
+        device_user_change_repo.record_users_modified(db, user_ids=moved)
+        return moved
+
+    def has_users_with_user_type_id(self, db: Session, *, user_type_id: int) -> bool:
+        return db.query(
+            self.query(db).filter(User.user_type_id == user_type_id).exists()
+        ).scalar()
+
+    def get_all_users_with_user_type_id(
+        self, db: Session, *, user_type_id: int
+    ) -> List[User]:
+        return self.query(db).filter(User.user_type_id == user_type_id).all()
+
+    def move_deleted_users_to_user_type(
+        self, db: Session, *, from_user_type_id: int, to_user_type_id: int
+    ) -> None:
+        """
+        Moves the soft deleted users of a user type to another one, so that the user
+        type can be removed before they are purged. Leaves committing to the caller.
+        """
+        db.query(User).filter(
+            User.user_type_id == from_user_type_id, User.deleted
+        ).update({"user_type_id": to_user_type_id}, synchronize_session=False)
+
+    def purge_deleted(
+        self, db: Session, *, deleted_before: datetime, limit: int
+    ) -> List[int]:
+        """
+        Deletes for good up to `limit` of the users that were soft deleted before
+        `deleted_before`, along with their reset tokens and history, skipping the
+        ones another purge has locked, and returns their ids.
+        Users still recorded as the creator of a device, agent, user or api key are
+        kept as they are, for those records to keep their creator.
+        Leaves committing to the caller.
+        """
+        sub_user = aliased(User)
+        ids = [
+            id
+            for id, in db.query(User.id)
+            .filter(
+                User.deleted,
+                User.deleted_at < deleted_before,
+                ~exists().where(Device.creator_id == User.id),
+                ~exists().where(Agent.created_by_id == User.id),
+                ~exists().where(APIKey.user_id == User.id),
+                ~exists().where(sub_user.created_by_id == User.id),
+            )
+            .order_by(User.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ]
+        if ids:
+            # soft deleting unlinked them, unless a link was added concurrently
+            db.execute(
+                device_user_link.delete().where(device_user_link.c.user_id.in_(ids))
+            )
+            for model in (PasswordResetToken, UserHistory):
+                db.query(model).filter(model.user_id.in_(ids)).delete(
+                    synchronize_session=False
+                )
+            db.query(User).filter(User.id.in_(ids)).delete(synchronize_session=False)
+        return ids
+
+    def search(
+        self,
+        db: Session,
+        *,
+        text: str,
+        agent_id: Optional[int],
+        page: int,
+        page_size: int,
+    ) -> Tuple[List[User], bool]:
+        """
+        Matches the text against the users' full names, emails, phone numbers and
+        lasrra ids, only among the users of the agent `agent_id` unless it is None.
+        """
+        query = self.query(db).options(joinedload(User.user_type))
+        if agent_id is not None:
+            query = query.filter(User.agent_id == agent_id)
+        return search(
+            query,
+            columns=[User.full_name, User.email, User.phone, User.lasrra_id],
+            id_column=User.id,
+            text=text,
+            page=page,
+            page_size=page_size,
+        )
 
     def set_as_superuser(self, db: Session, db_obj: User) -> User:
         superuser_type = user_type_repo.get_by_name(
@@ -94,8 +267,7 @@ class UserRepository(Base[User]):
         return self.set_usertype(db, db_obj=db_obj, user_type=superuser_type)
 
     def set_usertype(self, db: Session, db_obj: User, user_type: UserType) -> User:
-        db_obj.user_type = user_type
-        return super().update(db, db_obj=db_obj, obj_in={})
+        return self._update(db, db_obj=db_obj, obj_in={"user_type_id": user_type.id})
 
 
 user_repo = UserRepository(User)
@@ -0,0 +1,50 @@
+"""
+Prefix and fuzzy matching for the search endpoints, on the columns the pg_trgm GIN
+indexes were added for (see the migration that added the trigram search indexes).
+
+A row matches when one of the columns starts with the text, case insensitively, or
+contains a word similar to it (the pg_trgm `%>` operator, word_similarity over
+pg_trgm.word_similarity_threshold). The trigram indexes serve both, so neither
+scans the table. Rows are ranked prefix matches first, then by how similar the most
+similar column is, then by id, so that pages do not shift between requests.
+"""
+from typing import List, Sequence, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import ColumnElement
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search(
+    query: Query,
+    *,
+    columns: Sequence[ColumnElement],
+    id_column: ColumnElement,
+    text: str,
+    page: int,
+    page_size: int,
+) -> Tuple[List, bool]:
+    """
+    Returns the `page`th page, counting from 1, of the rows of `query` that match
+    `text`, and whether there are more pages after it.
+    Nothing is counted, one row more than the page holds is read instead.
+    """
+    prefix = _escape_like(text) + "%"
+    starts_with = [column.ilike(prefix, escape="\\") for column in columns]
+    # doubled for the driver, which formats the statement with % placeholders
+    resembles = [column.op("%%>")(text) for column in columns]
+    similarity = func.greatest(
+        *(func.word_similarity(text, column) for column in columns)
+    )
+    rows = (
+        query.filter(or_(*starts_with, *resembles))
+        .order_by(or_(*starts_with).desc(), similarity.desc(), id_column)
+        .offset((page - 1) * page_size)
+        .limit(page_size + 1)
+        .all()
+    )
+    return rows[:page_size], len(rows) > page_size
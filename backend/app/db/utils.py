@@ -1,5 +1,8 @@
+import time
+
 from backend.app.core.settings import settings
 from backend.app.db import session
+from backend.app.db.bootstrap import bootstrap
 from backend.app.db.repositories.user import user_repo
 from backend.app.db.repositories.agent import agent_repo
 from backend.app.db.repositories.user_type import user_type as user_type_repository
@@ -30,6 +33,7 @@ AgentSupervisorUser = settings.AgentSupervisorUser
 AgentManagerUser = settings.AgentManagerUser
 AgentOfficerUser = settings.AgentOfficerUser
 DATABASE_URI = settings.DATABASE_URI
+DB_BOOTSTRAP_MODE = settings.DB_BOOTSTRAP_MODE
 FIRST_SUPERUSER_ADDRESS = settings.FIRST_SUPERUSER_ADDRESS
 FIRST_SUPERUSER_EMAIL = settings.FIRST_SUPERUSER_EMAIL
 FIRST_SUPERUSER_FIRSTNAME = settings.FIRST_SUPERUSER_FIRSTNAME
@@ -223,10 +227,19 @@ class DataInitializer:
 
 async def connect_to_db(app: FastAPI) -> None:
     logger.info("Initializing DB")
-
-    DataInitializer(session.SessionLocal())
-
-    logger.info("DB initialized")
+    start = time.perf_counter()
+
+    db = session.SessionLocal()
+    try:
+        if DB_BOOTSTRAP_MODE == "bootstrap":
+            seeded = bootstrap(db)
+            logger.info("DB seeded" if seeded else "DB already seeded")
+        elif DB_BOOTSTRAP_MODE == "initializer":
+            DataInitializer(db)
+    finally:
+        db.close()
+
+    logger.info(f"DB initialized in {time.perf_counter() - start:.3f}s")
 
 
 def build_custom_regex_pattern(
@@ -1,6 +1,11 @@
+from backend.app.api.responses import FastJSONResponse
 from backend.app.api.routes.routes import router as global_router
 from backend.app.core.settings import settings
-from commonlib.errors.db_error_handlers import db_error_handler
+from backend.app.api.errors.error_strings import CONSTRAINT_MESSAGES
+from commonlib.errors.db_error_handlers import (
+    db_error_handler,
+    register_constraint_messages,
+)
 from commonlib.errors.http_error_handlers import (
     generic_http_error_handler,
     http422_error_handler,
@@ -38,7 +43,12 @@ from backend.app.core.events import (
 
 
 def create_application_instance() -> FastAPI:
-    application = FastAPI(title=PROJECT_NAME, debug=DEBUG, version="0.1")
+    application = FastAPI(
+        title=PROJECT_NAME,
+        debug=DEBUG,
+        version="0.1",
+        default_response_class=FastJSONResponse,
+    )
     application.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -60,6 +70,7 @@ def create_application_instance() -> FastAPI:
         (IntegrityError, db_error_handler),
     ]:
         application.add_exception_handler(exception, handler)
+    register_constraint_messages(CONSTRAINT_MESSAGES)
 
     application.include_router(global_router, prefix=API_URL_PREFIX)
 
@@ -4,4 +4,8 @@ from .user_history  import UserHistory
 from .device import Device, device_user_link
 from .email import Email
 from .reset_token import PasswordResetToken
-from .api_key import APIKey
\ No newline at end of file
+from .api_key import APIKey
+from .device_notification import DeviceNotification
+from .device_user_change import DeviceUserChange
+from .seed_version import SeedVersion
+from .agent_summary import AgentSummary
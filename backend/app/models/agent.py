@@ -6,7 +6,7 @@ from backend.app.core.settings import settings
 from backend.app.db.base_class import Base
 from backend.app.schemas.jwt import JWTUser
 from backend.app.services import email, security
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 from backend.app.schemas.email import ResetPasswordEmailTemplateVariables
 from backend.app.models.device import device_user_link
@@ -27,18 +27,28 @@ RESET_TOKEN_EXPIRE_MINUTES = settings.RESET_TOKEN_EXPIRE_MINUTES
 class Agent(Base):
     __tablename__ = "agent"
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     address = Column(String, nullable=False)
     # is_active = Column(Boolean(), default=False)
-    created_by_id = Column(Integer, ForeignKey("user.id"))
+    created_by_id = Column(Integer, ForeignKey("user.id"), index=True)
     created_by= relationship('User', foreign_keys=[created_by_id])
     # created_by = relationship(
     #     lambda: User, remote_side=id, backref="sub_users", foreign_keys=[created_by_id]
     # )
-    user_type_id = Column(Integer, ForeignKey("usertype.id"), nullable=False)
+    user_type_id = Column(Integer, ForeignKey("usertype.id"), nullable=False, index=True)
     user_type = relationship("UserType",foreign_keys=[user_type_id])
     user_history=relationship('UserHistory', back_populates='agent')
+
+    # a trigram index for the prefix and fuzzy matching of the search
+    __table_args__ = (
+        Index(
+            "ix_agent_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
     # devices = relationship(
     #     "Device", secondary=device_user_link, back_populates="assigned_users"
     # )
@@ -0,0 +1,22 @@
+from backend.app.db.base_class import Base
+from sqlalchemy import Column, ForeignKey, Integer, text
+
+
+class AgentSummary(Base):
+    """
+    What the dashboards count for an agent, kept up to date by triggers on device,
+    device_user and user (see the migration that added the table), so reading it
+    does not depend on how many devices or users the agent has.
+    """
+
+    __tablename__ = "agent_summary"
+
+    agent_id = Column(
+        Integer, ForeignKey("agent.id", ondelete="CASCADE"), primary_key=True
+    )
+    active_devices = Column(Integer, nullable=False, server_default=text("0"))
+    inactive_devices = Column(Integer, nullable=False, server_default=text("0"))
+    # devices without any assigned user
+    unassigned_devices = Column(Integer, nullable=False, server_default=text("0"))
+    officers = Column(Integer, nullable=False, server_default=text("0"))
+    supervisors = Column(Integer, nullable=False, server_default=text("0"))
@@ -10,9 +10,9 @@ import secrets
 class APIKey(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
-    hashed_key = Column(String, nullable=False)
+    hashed_key = Column(String, nullable=False, index=True)
     is_active = Column(Boolean, default=True)
-    user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("user.id"), nullable=False, index=True)
     user = relationship("User", back_populates="api_keys")
 
     @staticmethod
@@ -1,27 +1,81 @@
 from sqlalchemy.sql.schema import Table
 from backend.app.db.base_class import Base
-from sqlalchemy import Column, ForeignKey, Integer, Boolean, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    false,
+    text,
+)
 from sqlalchemy.orm import relationship
 
 
 device_user_link = Table(
     "device_user",
     Base.metadata,
-    Column("device_id", Integer, ForeignKey("device.id")),
-    Column("user_id", Integer, ForeignKey("user.id")),
+    Column("device_id", Integer, ForeignKey("device.id"), primary_key=True),
+    Column("user_id", Integer, ForeignKey("user.id"), primary_key=True),
+    Index("ix_device_user_user_id_device_id", "user_id", "device_id"),
 )
 
 
 class Device(Base):
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True,unique=True,nullable=False)
-    mac_id = Column(String, index=True, unique=True, nullable=False)
+    # unique among the devices that are not deleted, see __table_args__
+    name = Column(String, nullable=False)
+    mac_id = Column(String, nullable=False)
 
     is_active = Column(Boolean(), default=False)
-    creator_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    creator_id = Column(Integer, ForeignKey("user.id"), nullable=False, index=True)
 
     agent_id = Column(Integer, ForeignKey("agent.id"), nullable=False)
 
+    # like User.deleted
+    deleted = Column(Boolean(), nullable=False, default=False, server_default=false())
+    deleted_at = Column(DateTime(timezone=True))
+
+    # written from the heartbeats, a few seconds behind them, and left unindexed so
+    # that the flushes can update the rows in place
+    last_seen_at = Column(DateTime(timezone=True))
+    battery_level = Column(Integer)
+    app_version = Column(String)
+
     assigned_users = relationship(
         "User", secondary=device_user_link, back_populates="devices"
     )
+
+    __table_args__ = (
+        # partial, like the unique indexes of user
+        *(
+            Index(
+                f"ix_device_{column}_not_deleted",
+                column,
+                unique=True,
+                postgresql_where=text("NOT deleted"),
+            )
+            for column in ("mac_id", "name")
+        ),
+        Index(
+            "ix_device_agent_id_not_deleted",
+            "agent_id",
+            postgresql_where=text("NOT deleted"),
+        ),
+        Index("ix_device_deleted_at", "deleted_at", postgresql_where=text("deleted")),
+        # trigram indexes for the prefix and fuzzy matching of the search
+        Index(
+            "ix_device_mac_id_trgm",
+            "mac_id",
+            postgresql_using="gin",
+            postgresql_ops={"mac_id": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_device_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
@@ -0,0 +1,21 @@
+from backend.app.db.base_class import Base
+from sqlalchemy import Column, DateTime, Index, Integer, String, text
+
+
+class DeviceNotification(Base):
+    __tablename__ = "device_notification_outbox"
+
+    id = Column(Integer, primary_key=True)
+    mac_id = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    # the notification is waiting in the outbox until the relay has published it
+    sent_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index(
+            "ix_device_notification_outbox_pending",
+            "id",
+            postgresql_where=text("sent_at IS NULL"),
+        ),
+        Index("ix_device_notification_outbox_mac_id_id", "mac_id", "id"),
+    )
@@ -0,0 +1,23 @@
+from backend.app.db.base_class import Base
+from sqlalchemy import BigInteger, Column, ForeignKey, Index, Integer, String
+
+DEVICE_USER_ADDED = "added"
+DEVICE_USER_REMOVED = "removed"
+DEVICE_USER_MODIFIED = "modified"
+
+
+class DeviceUserChange(Base):
+    __tablename__ = "device_user_change"
+
+    # doubles as the version devices sync from
+    id = Column(BigInteger, primary_key=True)
+    device_id = Column(
+        Integer, ForeignKey("device.id", ondelete="CASCADE"), nullable=False
+    )
+    # no foreign key, the change has to outlive the user it is about
+    user_id = Column(Integer, nullable=False)
+    change = Column(String, nullable=False)
+
+    __table_args__ = (
+        Index("ix_device_user_change_device_id_id", "device_id", "id"),
+    )
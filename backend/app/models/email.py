@@ -1,6 +1,7 @@
 from sqlalchemy.sql.sqltypes import JSON
 from backend.app.db.base_class import Base
-from sqlalchemy import Column, ForeignKey, Integer, Boolean, String
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, Boolean, String, text
+from sqlalchemy.sql import func
 
 
 class Email(Base):
@@ -11,3 +12,15 @@ class Email(Base):
     template_dict = Column(String, nullable=False)
     sender = Column(String, nullable=False)
     extra_data = Column(String, default="")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # the email is waiting in the outbox for as long as this is set,
+    # it is cleared once the email is delivered or runs out of attempts
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index(
+            "ix_email_pending",
+            "next_attempt_at",
+            postgresql_where=text("next_attempt_at IS NOT NULL"),
+        ),
+    )
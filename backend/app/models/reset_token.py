@@ -6,9 +6,9 @@ from backend.app.db.base_class import Base
 
 class PasswordResetToken(Base):
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("user.id"), nullable=False, index=True)
     user = relationship("User", back_populates="password_reset_tokens")
-    token = Column(String, nullable=False)
+    token = Column(String, nullable=False, index=True)
     used_at = Column(DateTime)
     expires_at = Column(DateTime, nullable=False)
 
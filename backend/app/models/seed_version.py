@@ -0,0 +1,9 @@
+from backend.app.db.base_class import Base
+from sqlalchemy import Column, String
+
+
+class SeedVersion(Base):
+    __tablename__ = "seed_version"
+
+    # a digest of what the bootstrap seeded, see backend.app.db.bootstrap
+    fingerprint = Column(String, primary_key=True)
@@ -6,7 +6,18 @@ from backend.app.core.settings import settings
 from backend.app.db.base_class import Base
 from backend.app.schemas.jwt import JWTUser
 from backend.app.services import email, security
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    false,
+    text,
+)
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from backend.app.schemas.email import ResetPasswordEmailTemplateVariables
 from backend.app.models.device import device_user_link
@@ -28,14 +39,18 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
-    email = Column(String, unique=True, index=True, nullable=False)
-    phone = Column(String, unique=True, nullable=False)
-    lasrra_id = Column(String, unique=True, nullable=False)
+    # unique among the users that are not deleted, see __table_args__
+    email = Column(String, nullable=False)
+    phone = Column(String, nullable=False)
+    lasrra_id = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
     address = Column(String, nullable=False)
     is_active = Column(Boolean(), default=False)
-    deleted = Column(Boolean(), default=False)
-    created_by_id = Column(Integer, ForeignKey("user.id"))
+    # soft deleted users are left out by the repositories, and purged for good once
+    # deleted_at is older than SOFT_DELETE_RETENTION_DAYS
+    deleted = Column(Boolean(), nullable=False, default=False, server_default=false())
+    deleted_at = Column(DateTime(timezone=True))
+    created_by_id = Column(Integer, ForeignKey("user.id"), index=True)
     created_by = relationship(
         lambda: User, remote_side=id, backref="sub_users", foreign_keys=[created_by_id]
     )
@@ -43,7 +58,7 @@ class User(Base):
     agent_id = Column(Integer, ForeignKey("agent.id"))
     agent=relationship('Agent', foreign_keys=[agent_id])
 
-    user_type_id = Column(Integer, ForeignKey("usertype.id"), nullable=False)
+    user_type_id = Column(Integer, ForeignKey("usertype.id"), nullable=False, index=True)
     user_type = relationship("UserType", back_populates="users")
     user_history = relationship("UserHistory", back_populates='user')
 
@@ -55,6 +70,54 @@ class User(Base):
 
     api_keys = relationship("APIKey", back_populates="user")
 
+    __table_args__ = (
+        # partial, so that a deleted user's email, phone and lasrra_id can be reused,
+        # and so that the lookups and listings, which leave deleted users out, never
+        # go through their rows. Agents are never deleted, so no foreign key check
+        # has to find the deleted users of an agent either.
+        *(
+            Index(
+                f"ix_user_{column}_not_deleted",
+                column,
+                unique=True,
+                postgresql_where=text("NOT deleted"),
+            )
+            for column in ("email", "phone", "lasrra_id")
+        ),
+        Index(
+            "ix_user_agent_id_not_deleted",
+            "agent_id",
+            postgresql_where=text("NOT deleted"),
+        ),
+        # the purge job's lookup
+        Index("ix_user_deleted_at", "deleted_at", postgresql_where=text("deleted")),
+        # trigram indexes for the prefix and fuzzy matching of the search
+        Index(
+            "ix_user_full_name_trgm",
+            (first_name + " " + last_name).label("full_name"),
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ),
+        *(
+            Index(
+                f"ix_user_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            )
+            for column in ("email", "phone", "lasrra_id")
+        ),
+    )
+
+    @hybrid_property
+    def full_name(self) -> str:
+        return f"{self.first_name} {self.last_name}"
+
+    @full_name.expression
+    def full_name(cls):
+        # the expression ix_user_full_name_trgm is on
+        return cls.first_name + " " + cls.last_name
+
     @property
     def is_superuser(self):
         return self.user_type.name == SUPERUSER_USER_TYPE
@@ -85,9 +148,10 @@ class User(Base):
         return encoded_token.decode()
 
     def generate_password_reset_token(
-        self, db: Session, expires_delta: timedelta = None
+        self, db: Session, expires_delta: timedelta = None, token: str = None
     ) -> PasswordResetToken:
-        token = security.generate_reset_token(self.email)
+        if token is None:
+            token = security.generate_reset_token(self.email)
         if expires_delta is None:
             expires_delta = timedelta(minutes=RESET_TOKEN_EXPIRE_MINUTES)
 
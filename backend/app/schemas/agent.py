@@ -4,7 +4,7 @@ from pydantic import BaseModel, EmailStr, validator
 from backend.app.schemas.user import UserInResponse
 
 from backend.app.schemas.user_type import UserTypeInDB
-from backend.app.schemas.device import DeviceInDB
+from backend.app.schemas.device import DeviceInDB, DeviceStatus
 from commonlib.models import Base
 from commonlib.validators import lasrra as lasrra_validators
 from backend.app.services.validators import phone as phone_validators
@@ -45,3 +45,31 @@ class AgentProfile(BaseModel):
     employees: List[UserInResponse]
 
 
+
+
+class AgentSummary(BaseModel):
+    agent_id: int
+    active_devices: int
+    inactive_devices: int
+    # devices without any assigned user
+    unassigned_devices: int
+    officers: int
+    supervisors: int
+
+
+class SystemSummary(BaseModel):
+    agents: int
+    active_devices: int
+    inactive_devices: int
+    unassigned_devices: int
+    officers: int
+    supervisors: int
+
+
+class AgentDevicesStatus(BaseModel):
+    agent_id: int
+    online: int
+    offline: int
+    # devices that have not sent a heartbeat within DEVICE_OFFLINE_AFTER_SECONDS,
+    # or never sent one, are offline
+    devices: List[DeviceStatus]
@@ -1,6 +1,9 @@
-from typing import List, Optional
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Dict, List, Optional
+from backend.app.core.settings import settings
+from pydantic import BaseModel, conint, conlist, constr
 from pydantic.networks import EmailStr
+from backend.app.schemas.generic import BulkReport, BulkRowResult
 
 
 class Device(BaseModel):
@@ -19,6 +22,29 @@ class DeviceInBody(BaseModel):
     agent_id: int
 
 
+class DeviceBulkRowResult(BulkRowResult):
+    mac_id: str
+    name: str
+
+
+class DeviceBulkReport(BulkReport):
+    results: List[DeviceBulkRowResult]
+
+
+class DeviceAssignment(BaseModel):
+    device_id: int
+    user_id: int
+
+
+class DeviceAssignmentBulkRowResult(BulkRowResult):
+    device_id: int
+    user_id: int
+
+
+class DeviceAssignmentBulkReport(BulkReport):
+    results: List[DeviceAssignmentBulkRowResult]
+
+
 class DeviceUpdate(BaseModel):
     mac_id: str
 
@@ -60,6 +86,47 @@ class DeviceMetaData(BaseModel):
     config: DeviceConfig
     assigned_users: List[DeviceUser]
     agent: Optional[DeviceAgent]
+    version: int
+
+
+class DeviceMetaDataBatchRequest(BaseModel):
+    mac_ids: conlist(str, min_items=1, max_items=settings.DEVICE_METADATA_BATCH_MAX_SIZE)
+
+
+class DeviceMetaDataBatch(BaseModel):
+    # keyed by mac_id, a device is in exactly one of the two
+    metadata: Dict[str, DeviceMetaData]
+    errors: Dict[str, str]
+
+
+class DeviceMetaDataCacheStats(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+    size: int
+    max_size: int
+
+
+class DeviceHeartbeat(BaseModel):
+    battery_level: Optional[conint(ge=0, le=100)]
+    app_version: Optional[constr(max_length=50)]
+
+
+class DeviceStatus(BaseModel):
+    id: int
+    name: str
+    mac_id: str
+    is_active: bool
+    online: bool
+    last_seen_at: Optional[datetime]
+    battery_level: Optional[int]
+    app_version: Optional[str]
+
+
+class DeviceUserChanges(BaseModel):
+    version: int
+    users: List[DeviceUser]
+    removed_user_ids: List[int]
 
 
 class DeviceInDB(Device):
@@ -1,6 +1,19 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 
 class GenericMessageResponse(BaseModel):
     message: str
+
+
+class BulkRowResult(BaseModel):
+    row: int
+    success: bool
+    id: Optional[int]
+    detail: Optional[str]
+
+
+class BulkReport(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkRowResult]
@@ -0,0 +1,9 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class Readiness(BaseModel):
+    database: bool
+    # None when the process runs without a broker, as it does in debug mode
+    broker: Optional[bool]
@@ -0,0 +1,26 @@
+from typing import List
+
+from pydantic import BaseModel
+
+from backend.app.schemas.agent import AgentInResponse
+from backend.app.schemas.device import DeviceInDB
+from backend.app.schemas.user import UserInResponse
+
+
+class SearchPage(BaseModel):
+    page: int
+    page_size: int
+    # whether the next page has any results, nothing is counted
+    has_more: bool
+
+
+class DeviceSearchPage(SearchPage):
+    results: List[DeviceInDB]
+
+
+class UserSearchPage(SearchPage):
+    results: List[UserInResponse]
+
+
+class AgentSearchPage(SearchPage):
+    results: List[AgentInResponse]
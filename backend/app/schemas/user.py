@@ -4,6 +4,7 @@ from pydantic import BaseModel, EmailStr, validator
 
 from backend.app.schemas.user_type import UserTypeInDB
 from backend.app.schemas.device import DeviceInDB
+from backend.app.schemas.generic import BulkReport, BulkRowResult
 from commonlib.models import Base
 from commonlib.validators import lasrra as lasrra_validators
 
@@ -73,6 +74,24 @@ class AgentEmployeeUserCreateForm(UserCreateForm):
     agent_id: int
 
 
+class UserBulkRowResult(BulkRowResult):
+    # as given, an invalid email is what makes some rows fail
+    email: str
+
+
+class UserBulkReport(BulkReport):
+    results: List[UserBulkRowResult]
+
+
+class UserAgentChangeRowResult(BulkRowResult):
+    user_id: int
+
+
+class UserAgentChangeReport(BulkReport):
+    agent_id: int
+    results: List[UserAgentChangeRowResult]
+
+
 class UserInResponse(User):
     id: int
     email: EmailStr
@@ -0,0 +1,225 @@
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from backend.app.api.errors.error_strings import (
+    DUPLICATED_IN_BATCH,
+    INACTIVE_DEVICE_ERROR,
+    NOT_AN_AGENT_EMPLOYEE_ERROR,
+    NOT_AN_AGENT_OFFICER_ERROR,
+    NOT_FOUND,
+    UNAUTHORIZED_ACTION,
+)
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.device_notification import device_notification_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.models.device import Device
+from backend.app.models.user import User
+from backend.app.schemas.device import (
+    DeviceAssignment,
+    DeviceAssignmentBulkReport,
+    DeviceAssignmentBulkRowResult,
+)
+from backend.app.schemas.user import UserAgentChangeReport, UserAgentChangeRowResult
+from sqlalchemy.orm import Session, joinedload
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+AGENT_SUPERVISOR = settings.AGENT_SUPERVISOR
+SUPERUSER_USER_TYPE = settings.SUPERUSER_USER_TYPE
+
+
+def can_access_device_obj(device: Device, user: User):
+    """
+    The user can access this device on 3 conditions
+    1. the user is a superuser
+    2. the user created this device
+    3. the user is currently assigned to the agent of the device
+    """
+    return (
+        user.user_type.name == SUPERUSER_USER_TYPE
+        or device.creator_id == user.id
+        or device.agent_id == user.agent_id
+    )
+
+
+def _check_assignment_row(
+    assignment: DeviceAssignment,
+    *,
+    pair_counts: Counter,
+    devices: Dict[int, Device],
+    users: Dict[int, User],
+    current_user: User,
+    assigning: bool,
+) -> Optional[str]:
+    device = devices.get(assignment.device_id)
+    user = users.get(assignment.user_id)
+    if pair_counts[(assignment.device_id, assignment.user_id)] > 1:
+        return DUPLICATED_IN_BATCH.format(
+            f"device {assignment.device_id} and user {assignment.user_id}"
+        )
+    if not device:
+        return f"device with id {assignment.device_id} {NOT_FOUND}"
+    if not user:
+        return f"user with id {assignment.user_id} {NOT_FOUND}"
+    if not can_access_device_obj(device, current_user):
+        return UNAUTHORIZED_ACTION
+    if assigning and user.user_type.name != AGENT_OFFICER:
+        return NOT_AN_AGENT_OFFICER_ERROR
+    if assigning and not device.is_active:
+        return INACTIVE_DEVICE_ERROR
+    return None
+
+
+def _update_assignments(
+    db: Session,
+    *,
+    assignments: List[DeviceAssignment],
+    current_user: User,
+    assigning: bool,
+    apply: Callable[..., Set[Tuple[int, int]]],
+) -> DeviceAssignmentBulkReport:
+    pair_counts = Counter(
+        (assignment.device_id, assignment.user_id) for assignment in assignments
+    )
+    devices = {
+        device.id: device
+        for device in device_repo.get_multi_by_ids(
+            db, ids=list({assignment.device_id for assignment in assignments})
+        )
+    }
+    users = {
+        user.id: user
+        for user in user_repo.query(db)
+        .options(joinedload(User.user_type))
+        .filter(User.id.in_({assignment.user_id for assignment in assignments}))
+    }
+
+    results: List[DeviceAssignmentBulkRowResult] = []
+    for row, assignment in enumerate(assignments):
+        detail = _check_assignment_row(
+            assignment,
+            pair_counts=pair_counts,
+            devices=devices,
+            users=users,
+            current_user=current_user,
+            assigning=assigning,
+        )
+        results.append(
+            DeviceAssignmentBulkRowResult(
+                row=row,
+                device_id=assignment.device_id,
+                user_id=assignment.user_id,
+                success=detail is None,
+                detail=detail,
+            )
+        )
+
+    changed_pairs = apply(
+        db,
+        pairs=[(result.device_id, result.user_id) for result in results if result.success],
+    )
+
+    device_notification_repo.queue(
+        db, mac_ids=[devices[device_id].mac_id for device_id, _ in changed_pairs]
+    )
+    db.commit()
+
+    succeeded = sum(1 for result in results if result.success)
+    return DeviceAssignmentBulkReport(
+        succeeded=succeeded, failed=len(results) - succeeded, results=results
+    )
+
+
+def assign_devices(
+    db: Session, *, assignments: List[DeviceAssignment], current_user: User
+) -> DeviceAssignmentBulkReport:
+    """
+    Assigns many devices to agent officers at once.
+    The devices and users are loaded with one IN query each and the valid pairs are
+    linked in chunks. Pairs that were already linked count as successful.
+    Every device whose assigned users actually changed gets one notification,
+    committed along with the links.
+    """
+    return _update_assignments(
+        db,
+        assignments=assignments,
+        current_user=current_user,
+        assigning=True,
+        apply=device_repo.bulk_add_assigned_users,
+    )
+
+
+def unassign_devices(
+    db: Session, *, assignments: List[DeviceAssignment], current_user: User
+) -> DeviceAssignmentBulkReport:
+    """
+    Unassigns many devices from users at once, the counterpart of assign_devices.
+    Pairs that were not linked count as successful.
+    """
+    return _update_assignments(
+        db,
+        assignments=assignments,
+        current_user=current_user,
+        assigning=False,
+        apply=device_repo.bulk_remove_assigned_users,
+    )
+
+
+def _check_agent_change_row(
+    user_id: int, *, user_id_counts: Counter, users: Dict[int, User]
+) -> Optional[str]:
+    user = users.get(user_id)
+    if user_id_counts[user_id] > 1:
+        return DUPLICATED_IN_BATCH.format(f"user {user_id}")
+    if not user:
+        return f"user with id {user_id} {NOT_FOUND}"
+    if user.user_type.name not in (AGENT_OFFICER, AGENT_SUPERVISOR):
+        return NOT_AN_AGENT_EMPLOYEE_ERROR
+    return None
+
+
+def change_agent_of_users(
+    db: Session, *, user_ids: List[int], agent_id: int
+) -> UserAgentChangeReport:
+    """
+    Moves many agent employees to the agent with agent_id at once.
+    The users are moved with one UPDATE, and the users that actually moved lose all
+    their devices with one DELETE, in the same transaction. Every device that lost a
+    user gets one notification, committed along with the move.
+    Users that were already with the agent count as successful and keep their devices.
+    """
+    user_id_counts = Counter(user_ids)
+    users = {
+        user.id: user
+        for user in user_repo.query(db)
+        .options(joinedload(User.user_type))
+        .filter(User.id.in_(set(user_ids)))
+    }
+
+    results: List[UserAgentChangeRowResult] = []
+    for row, user_id in enumerate(user_ids):
+        detail = _check_agent_change_row(
+            user_id, user_id_counts=user_id_counts, users=users
+        )
+        results.append(
+            UserAgentChangeRowResult(
+                row=row, user_id=user_id, success=detail is None, detail=detail
+            )
+        )
+
+    moved_user_ids = user_repo.set_agent_id(
+        db,
+        user_ids=[result.user_id for result in results if result.success],
+        agent_id=agent_id,
+    )
+    removed = device_repo.unassign_users_from_all_devices(db, user_ids=moved_user_ids)
+    device_notification_repo.queue(db, mac_ids=removed.values())
+    db.commit()
+
+    succeeded = sum(1 for result in results if result.success)
+    return UserAgentChangeReport(
+        agent_id=agent_id,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results,
+    )
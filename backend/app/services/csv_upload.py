@@ -0,0 +1,45 @@
+import csv
+import io
+from typing import Dict, List
+
+from backend.app.api.errors.error_strings import INVALID_CSV_FILE, TOO_MANY_ROWS
+from backend.app.core.settings import settings
+from pydantic import ValidationError
+
+BULK_MAX_ROWS = settings.BULK_MAX_ROWS
+
+
+class TooManyRowsError(ValueError):
+    pass
+
+
+def read_csv_rows(
+    content: bytes, *, max_rows: int = BULK_MAX_ROWS
+) -> List[Dict[str, str]]:
+    """
+    Reads the rows of a CSV upload as dicts keyed by the header row.
+    Cells past the header's columns are dropped, and missing ones are None.
+    Raises a ValueError when the file is not UTF-8 encoded CSV, and a TooManyRowsError
+    as soon as it gets past `max_rows` rows.
+    """
+    rows: List[Dict[str, str]] = []
+    try:
+        reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+        for row in reader:
+            if len(rows) == max_rows:
+                raise TooManyRowsError(TOO_MANY_ROWS.format(max_rows))
+            rows.append({key: value for key, value in row.items() if key is not None})
+    except (UnicodeDecodeError, csv.Error):
+        raise ValueError(INVALID_CSV_FILE)
+    return rows
+
+
+def validation_error_detail(error: ValidationError) -> str:
+    """
+    Sums up the errors of a row that failed validation on one line, for its entry in
+    a bulk report.
+    """
+    return "; ".join(
+        "{}: {}".format(".".join(str(loc) for loc in e["loc"]), e["msg"])
+        for e in error.errors()
+    )
@@ -0,0 +1,126 @@
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import DeviceLastSeen, device_repo
+from backend.app.db.session import SessionLocal
+from loguru import logger
+
+DEVICE_HEARTBEAT_FLUSH_SECONDS = settings.DEVICE_HEARTBEAT_FLUSH_SECONDS
+DEVICE_HEARTBEAT_BUFFER_SIZE = settings.DEVICE_HEARTBEAT_BUFFER_SIZE
+
+
+class DeviceHeartbeatBuffer:
+    """
+    Keeps the latest heartbeat of every device that sent one since the last flush,
+    and writes them all to the device table every DEVICE_HEARTBEAT_FLUSH_SECONDS, so
+    that a heartbeat costs the database nothing but its share of the flush.
+    A device heartbeating faster than the flushes take up one entry, the newest
+    heartbeat wins and a status it left out is kept from the one before it.
+    Heartbeats arrive on the threadpool and are flushed from the flusher's thread,
+    hence the lock. A flush that fails puts back what it took, unless newer
+    heartbeats arrived meanwhile, and the next flush tries again.
+    """
+
+    def __init__(self, max_size: int = DEVICE_HEARTBEAT_BUFFER_SIZE):
+        self.max_size = max_size
+        self.dropped = 0
+        self._heartbeats: Dict[str, DeviceLastSeen] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heartbeats)
+
+    def record(
+        self,
+        mac_id: str,
+        seen_at: datetime,
+        *,
+        battery_level: Optional[int] = None,
+        app_version: Optional[str] = None,
+    ) -> bool:
+        """Returns False when the buffer is full and the heartbeat was dropped."""
+        with self._lock:
+            return self._merge(
+                DeviceLastSeen(mac_id, seen_at, battery_level, app_version)
+            )
+
+    def flush(self) -> int:
+        """Writes the buffered heartbeats, and returns how many devices were updated."""
+        with self._lock:
+            heartbeats, self._heartbeats = self._heartbeats, {}
+        if not heartbeats:
+            return 0
+        db = SessionLocal()
+        try:
+            updated = device_repo.record_last_seen(
+                db, heartbeats=list(heartbeats.values())
+            )
+            db.commit()
+            return updated
+        except Exception:
+            db.rollback()
+            with self._lock:
+                # older than whatever arrived meanwhile, so merged in first
+                newer, self._heartbeats = self._heartbeats, heartbeats
+                for heartbeat in newer.values():
+                    self._merge(heartbeat)
+            raise
+        finally:
+            db.close()
+
+    def start(self):
+        self._stopping.clear()
+        self._flusher = threading.Thread(
+            target=self._run, name="device-heartbeat-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def stop(self):
+        if self._flusher is None:
+            return
+        self._stopping.set()
+        self._flusher.join(timeout=DEVICE_HEARTBEAT_FLUSH_SECONDS + 5)
+        self._flusher = None
+
+    def _run(self):
+        while not self._stopping.wait(DEVICE_HEARTBEAT_FLUSH_SECONDS):
+            self._flush_logged()
+        # what arrived since the last flush would be lost with the process
+        self._flush_logged()
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"flushing device heartbeats failed: {e}")
+
+    def _merge(self, heartbeat: DeviceLastSeen) -> bool:
+        previous = self._heartbeats.get(heartbeat.mac_id)
+        if previous is None:
+            if len(self._heartbeats) >= self.max_size:
+                self.dropped += 1
+                return False
+            self._heartbeats[heartbeat.mac_id] = heartbeat
+            return True
+        newer, older = (
+            (heartbeat, previous)
+            if heartbeat.seen_at >= previous.seen_at
+            else (previous, heartbeat)
+        )
+        self._heartbeats[heartbeat.mac_id] = newer._replace(
+            battery_level=(
+                newer.battery_level
+                if newer.battery_level is not None
+                else older.battery_level
+            ),
+            app_version=newer.app_version or older.app_version,
+        )
+        return True
+
+
+device_heartbeat_buffer = DeviceHeartbeatBuffer()
@@ -0,0 +1,66 @@
+from typing import Dict, List
+
+from backend.app.api.errors.error_strings import INACTIVE_DEVICE_ERROR, NOT_FOUND
+from backend.app.core.settings import settings
+from backend.app.db.repositories.agent import agent_repo
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.device_user_change import device_user_change_repo
+from backend.app.schemas.device import (
+    DeviceConfig,
+    DeviceMetaData,
+    DeviceMetaDataBatch,
+)
+from sqlalchemy.orm import Session
+
+
+def get_device_metadata_batch(db: Session, *, mac_ids: List[str]) -> DeviceMetaDataBatch:
+    """
+    Builds the metadata of every device in `mac_ids` the way /{mac_id}/metadata does
+    for one, with four queries however many devices there are: the devices, their
+    versions, their assigned users and their agents.
+    A device that does not exist or is not active gets an error instead.
+    """
+    errors: Dict[str, str] = {}
+    devices = {
+        device.mac_id: device
+        for device in device_repo.get_all_by_mac_ids(db, mac_ids=mac_ids)
+    }
+    for mac_id in mac_ids:
+        device = devices.get(mac_id)
+        if not device:
+            errors[mac_id] = f"device with mac_id {mac_id} {NOT_FOUND}"
+        elif not device.is_active:
+            errors[mac_id] = INACTIVE_DEVICE_ERROR
+            del devices[mac_id]
+    if not devices:
+        return DeviceMetaDataBatch(metadata={}, errors=errors)
+
+    device_ids = [device.id for device in devices.values()]
+    # read before the users, like the version of a single device's metadata
+    versions = device_user_change_repo.get_versions(db, device_ids=device_ids)
+    assigned_users = device_repo.get_assigned_users_by_device_id(
+        db, device_ids=device_ids
+    )
+    agents = {
+        agent.id: agent
+        for agent in agent_repo.get_multi_by_ids(
+            db, ids=list({device.agent_id for device in devices.values()})
+        )
+    }
+
+    metadata = {}
+    for mac_id, device in devices.items():
+        agent = agents.get(device.agent_id)
+        metadata[mac_id] = DeviceMetaData(
+            config=DeviceConfig(
+                device_id=device.id,
+                is_active=device.is_active,
+                rabbitmq_uri=settings.EXTERNAL_RABBIT_MQ_URI,
+                secret_key=settings.SECRET_KEY,
+                api_base_uri=settings.API_BASE_URL,
+            ),
+            assigned_users=[user.to_json() for user in assigned_users[device.id]],
+            agent=agent.to_json() if agent else None,
+            version=versions.get(device.id, 0),
+        )
+    return DeviceMetaDataBatch(metadata=metadata, errors=errors)
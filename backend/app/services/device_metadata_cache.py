@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from backend.app.core.settings import settings
+from backend.app.schemas.device import DeviceMetaDataCacheStats
+
+DEVICE_METADATA_CACHE_SIZE = settings.DEVICE_METADATA_CACHE_SIZE
+
+
+class DeviceMetadataCache:
+    """
+    A bounded LRU of device metadata rendered to JSON, keyed by mac_id and the
+    device's version, which is the id of the newest notification queued for it.
+    Every change to a device's metadata queues a notification in the transaction
+    that makes it, so the version moves on as soon as the change is committed and a
+    stale entry is never looked up again.
+    Notifications whose transactions commit out of order can leave an entry built
+    without the change that committed last under the newest version, so entries
+    are also dropped whenever the relay broadcasts that it sent a notification.
+    Route handlers run in the threadpool and invalidations arrive on the device
+    updates consumer's thread, hence the lock.
+    """
+
+    def __init__(self, max_size: int = DEVICE_METADATA_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """
+        Counts the invalidations, read it before building an entry and pass it to
+        put, so that an entry built while the device was invalidated is not kept.
+        """
+        return self._generation
+
+    def get(self, mac_id: str, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(mac_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(mac_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, mac_id: str, version: int, content: bytes, *, generation: int):
+        with self._lock:
+            if generation != self._generation:
+                return
+            # only the newest version of a device is worth keeping
+            self._entries[mac_id] = (version, content)
+            self._entries.move_to_end(mac_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, mac_ids: Iterable[str]):
+        with self._lock:
+            self._generation += 1
+            for mac_id in mac_ids:
+                self._entries.pop(mac_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> DeviceMetaDataCacheStats:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return DeviceMetaDataCacheStats(
+                hits=self.hits,
+                misses=self.misses,
+                hit_ratio=self.hits / lookups if lookups else 0,
+                size=len(self._entries),
+                max_size=self.max_size,
+            )
+
+
+device_metadata_cache = DeviceMetadataCache()
@@ -0,0 +1,255 @@
+import asyncio
+import threading
+from functools import partial
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+)
+
+import pika
+from backend.app.core.settings import settings
+from backend.app.services.device_metadata_cache import device_metadata_cache
+from loguru import logger
+
+RABBIT_MQ_URI = settings.RABBIT_MQ_URI
+DEVICE_UPDATES_KEEPALIVE_SECONDS = settings.DEVICE_UPDATES_KEEPALIVE_SECONDS
+DEVICE_UPDATES_EXCHANGE = "device_updates"
+DEVICE_UPDATED_EVENT = "device_updated"
+# bound by every process, the body lists the mac_ids whose metadata changed
+DEVICE_METADATA_INVALIDATED = "device_metadata.invalidated"
+
+MAX_RECONNECT_DELAY_SECONDS = 60
+
+
+class DeviceUpdate(NamedTuple):
+    # the id of the newest outbox notification behind this update,
+    # devices can send it back as Last-Event-ID
+    version: Optional[int]
+    body: str
+
+    def to_event(self) -> str:
+        lines = [f"event: {DEVICE_UPDATED_EVENT}"]
+        if self.version is not None:
+            lines.append(f"id: {self.version}")
+        lines.extend(f"data: {line}" for line in self.body.split("\n"))
+        return "\n".join(lines) + "\n\n"
+
+
+class DeviceUpdateConsumer(threading.Thread):
+    """
+    Consumes device_updates for one process, through an exclusive queue that is
+    bound to the exchange once for every device with a listener in the process, and
+    for the metadata invalidations that every process hears about.
+    pika connections are not thread-safe, so bindings requested from other threads
+    are handed to the consumer's thread with add_callback_threadsafe.
+    """
+
+    def __init__(
+        self,
+        on_update: Callable[[str, DeviceUpdate], None],
+        on_invalidated: Callable[[Optional[List[str]]], None],
+    ):
+        super().__init__(name="device-updates-consumer", daemon=True)
+        self._on_update = on_update
+        self._on_invalidated = on_invalidated
+        self._lock = threading.Lock()
+        self._mac_ids: Set[str] = set()
+        self._connection: Optional[pika.BlockingConnection] = None
+        self._channel = None
+        self._queue: Optional[str] = None
+        self._stopping = threading.Event()
+
+    @property
+    def connected(self) -> bool:
+        with self._lock:
+            return self._connection is not None
+
+    def bind(self, mac_id: str):
+        with self._lock:
+            self._mac_ids.add(mac_id)
+            connection = self._connection
+        if connection is not None:
+            connection.add_callback_threadsafe(partial(self._sync_binding, mac_id))
+
+    def unbind(self, mac_id: str):
+        with self._lock:
+            self._mac_ids.discard(mac_id)
+            connection = self._connection
+        if connection is not None:
+            connection.add_callback_threadsafe(partial(self._sync_binding, mac_id))
+
+    def stop(self):
+        self._stopping.set()
+        self.join(timeout=5)
+
+    def run(self):
+        delay = 1
+        while not self._stopping.is_set():
+            try:
+                self._consume()
+                delay = 1
+            except Exception as e:
+                logger.error(f"device updates consumer failed: {e}")
+            finally:
+                with self._lock:
+                    self._connection = self._channel = self._queue = None
+            self._stopping.wait(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY_SECONDS)
+
+    def _consume(self):
+        connection = pika.BlockingConnection(pika.URLParameters(RABBIT_MQ_URI))
+        channel = connection.channel()
+        channel.exchange_declare(
+            exchange=DEVICE_UPDATES_EXCHANGE, exchange_type="direct"
+        )
+        queue = channel.queue_declare("", exclusive=True, auto_delete=True).method.queue
+        with self._lock:
+            self._connection, self._channel, self._queue = connection, channel, queue
+            mac_ids = set(self._mac_ids)
+        channel.queue_bind(
+            queue, DEVICE_UPDATES_EXCHANGE, routing_key=DEVICE_METADATA_INVALIDATED
+        )
+        # whatever changed while the process was disconnected was not heard of
+        self._on_invalidated(None)
+        for mac_id in mac_ids:
+            channel.queue_bind(queue, DEVICE_UPDATES_EXCHANGE, routing_key=mac_id)
+        channel.basic_consume(queue, self._on_message, auto_ack=True)
+        logger.info("Consuming device updates [*]")
+        try:
+            while not self._stopping.is_set():
+                connection.process_data_events(time_limit=1)
+        finally:
+            connection.close()
+
+    def _sync_binding(self, mac_id: str):
+        # runs on the consumer's thread, and settles the binding to whatever the
+        # latest bind or unbind asked for
+        with self._lock:
+            wanted = mac_id in self._mac_ids
+            channel, queue = self._channel, self._queue
+        if channel is None:
+            return
+        if wanted:
+            channel.queue_bind(queue, DEVICE_UPDATES_EXCHANGE, routing_key=mac_id)
+        else:
+            channel.queue_unbind(queue, DEVICE_UPDATES_EXCHANGE, routing_key=mac_id)
+
+    def _on_message(self, channel, method, properties, body: bytes):
+        if method.routing_key == DEVICE_METADATA_INVALIDATED:
+            self._on_invalidated(body.decode().split("\n"))
+            return
+        version = (properties.headers or {}).get("version")
+        self._on_update(method.routing_key, DeviceUpdate(version, body.decode()))
+
+
+class DeviceUpdateHub:
+    """
+    Fans the device updates consumed once per process out to every connection
+    listening for them. Each connection gets a queue holding at most one update,
+    a newer update replaces one the device has not read yet, since only the latest
+    version matters to it.
+    Everything but the consumer runs on the event loop, which is what makes the
+    subscriber sets safe to share without locks.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._consumer: Optional[DeviceUpdateConsumer] = None
+
+    @property
+    def connections(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    @property
+    def broker_ready(self) -> Optional[bool]:
+        """Whether updates are being consumed, None when there is no broker to use."""
+        if self._consumer is None:
+            return None
+        return self._consumer.connected
+
+    def start(self):
+        # the consumer connects on its own thread, the process serves requests
+        # meanwhile and reports whether it is connected through broker_ready
+        self._loop = asyncio.get_event_loop()
+        if settings.DEBUG:
+            # like the relay, debug mode runs without a broker
+            return
+        self._consumer = DeviceUpdateConsumer(
+            self._publish_threadsafe, self._invalidate_metadata
+        )
+        for mac_id in self._subscribers:
+            self._consumer.bind(mac_id)
+        self._consumer.start()
+
+    def stop(self):
+        if self._consumer is not None:
+            self._consumer.stop()
+            self._consumer = None
+
+    def subscribe(self, mac_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        queues = self._subscribers.setdefault(mac_id, set())
+        if not queues and self._consumer is not None:
+            self._consumer.bind(mac_id)
+        queues.add(queue)
+        return queue
+
+    def unsubscribe(self, mac_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(mac_id, set())
+        queues.discard(queue)
+        if not queues:
+            self._subscribers.pop(mac_id, None)
+            if self._consumer is not None:
+                self._consumer.unbind(mac_id)
+
+    def publish(self, mac_id: str, update: DeviceUpdate):
+        for queue in self._subscribers.get(mac_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+    def _publish_threadsafe(self, mac_id: str, update: DeviceUpdate):
+        self._loop.call_soon_threadsafe(self.publish, mac_id, update)
+
+    def _invalidate_metadata(self, mac_ids: Optional[List[str]]):
+        if mac_ids is None:
+            device_metadata_cache.clear()
+        else:
+            device_metadata_cache.invalidate(mac_ids)
+
+    async def stream(
+        self,
+        mac_id: str,
+        *,
+        is_disconnected: Callable[[], Awaitable[bool]],
+        keepalive_seconds: float = DEVICE_UPDATES_KEEPALIVE_SECONDS,
+    ) -> AsyncIterator[str]:
+        """
+        Yields the updates for the device as server-sent events, with a comment every
+        `keepalive_seconds` in between so that proxies keep the connection open and
+        a device that went away is noticed. Updates published while the device was
+        not connected are not replayed, devices re-fetch their metadata on connecting.
+        """
+        queue = self.subscribe(mac_id)
+        try:
+            while True:
+                try:
+                    update = await asyncio.wait_for(queue.get(), keepalive_seconds)
+                except asyncio.TimeoutError:
+                    if await is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                else:
+                    yield update.to_event()
+        finally:
+            self.unsubscribe(mac_id, queue)
+
+
+device_update_hub = DeviceUpdateHub()
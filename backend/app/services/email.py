@@ -1,18 +1,14 @@
 import json
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Tuple
 
-from backend.app.api.dependencies.db import get_db
 from backend.app.core.settings import settings
 from backend.app.db.repositories.email import email_repo
 from backend.app.models.email import Email
-from backend.app.schemas.email import EmailCreate, EmailUpdate
-from loguru import logger
-from postmarker.core import PostmarkClient
+from backend.app.schemas.email import EmailCreate
 from pydantic import EmailStr
 from sqlalchemy.orm.session import Session
 
 DEFAULT_EMAIL_SENDER = settings.DEFAULT_EMAIL_SENDER
-POSTMARK_API_TOKEN = settings.POSTMARK_API_TOKEN
 
 
 EMAIL_OK = "OK"
@@ -27,55 +23,52 @@ def is_success_response(response):
     )
 
 
-def send_email_with_template(
-    client: PostmarkClient,
+def queue_email_with_template(
+    db: Session,
+    *,
     template_id: int,
     template_dict: Dict[str, Any],
-    recipient: Union[List[EmailStr], EmailStr],
-):
-    db: Session = next(get_db())
-
-    email: Email = email_repo.create(
+    recipient: EmailStr,
+) -> Email:
+    """
+    Adds the email to the outbox, it is sent by the email dispatcher
+    (backend.app.tasks.emails) rather than during the request.
+    Nothing is committed, so this is called before the change the email is about is
+    committed, and the email is only sent if that change is.
+    """
+    (email,) = email_repo.queue(
         db,
-        obj_in=EmailCreate(
-            template_id=template_id,
-            template_dict=json.dumps(template_dict),
-            recipient=recipient,
-            sender=DEFAULT_EMAIL_SENDER,
-        ),
-    )
-    return _send_email_with_template(
-        client, db=db, email=email, template_dict=template_dict
+        objs_in=[
+            EmailCreate(
+                template_id=template_id,
+                template_dict=json.dumps(template_dict),
+                recipient=recipient,
+                sender=DEFAULT_EMAIL_SENDER,
+            )
+        ],
     )
+    return email
 
 
-def _send_email_with_template(
-    client: PostmarkClient, *, db: Session, email: Email, template_dict: Dict[str, Any]
-):
-    try:
-        response = client.emails.send_with_template(
-            TemplateId=email.template_id,
-            TemplateModel=template_dict,
-            From=DEFAULT_EMAIL_SENDER,
-            To=email.recipient,
-        )
-        if is_success_response(response):
-            email_repo.mark_as_delivered(db, db_obj=email)
-        else:
-            email_repo.update(
-                db,
-                db_obj=email,
-                obj_in=EmailUpdate(delivered=False, extra_data=response["Message"]),
+def queue_emails_with_template(
+    db: Session,
+    *,
+    template_id: int,
+    messages: List[Tuple[EmailStr, Dict[str, Any]]],
+) -> List[Email]:
+    """
+    Adds one email per (recipient, template_dict) pair to the outbox in one go,
+    without committing, like queue_email_with_template.
+    """
+    return email_repo.queue(
+        db,
+        objs_in=[
+            EmailCreate(
+                template_id=template_id,
+                template_dict=json.dumps(template_dict),
+                recipient=recipient,
+                sender=DEFAULT_EMAIL_SENDER,
             )
-        if settings.DEBUG:
-            logger.info("***EMAIL****")
-            logger.info(f"Recipient : {email.recipient}")
-            logger.info(template_dict)
-
-    except Exception as e:
-        logger.error(e)
-        email_repo.update(
-            db,
-            db_obj=email,
-            obj_in=EmailUpdate(delivered=False, extra_data=e.__str__()),
-        )
+            for recipient, template_dict in messages
+        ],
+    )
@@ -0,0 +1,201 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from backend.app.api.errors.error_strings import (
+    AGENT_EMPLOYEE_USER_NOT_SELECTED_ERROR,
+    ALREADY_EXISTS,
+    DOES_NOT_EXIST,
+    DUPLICATED_IN_BATCH,
+)
+from backend.app.core.settings import settings
+from backend.app.db.repositories.agent import agent_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.repositories.user_type import user_type as user_type_repo
+from backend.app.models.user import User
+from backend.app.schemas.email import UserCreationTemplateVariables
+from backend.app.schemas.user import (
+    AgentEmployeeUserCreateForm,
+    UserBulkReport,
+    UserBulkRowResult,
+    UserCreate,
+)
+from backend.app.services.csv_upload import read_csv_rows, validation_error_detail
+from backend.app.services.email import queue_emails_with_template
+from commonlib.validators.lasrra import validate_lasrra_id
+from commonlib.validators.phone import validate_phone_number
+from pydantic import EmailStr, ValidationError
+from sqlalchemy.orm import Session
+
+AGENT_SUPERVISOR = settings.AGENT_SUPERVISOR
+AGENT_OFFICER = settings.AGENT_OFFICER
+CREATE_ACCOUNT_TEMPLATE_ID = settings.CREATE_ACCOUNT_TEMPLATE_ID
+
+WelcomeEmail = Tuple[EmailStr, Dict[str, Any]]
+# a row of an upload, or its failed result when it does not even validate
+UserRow = Union[AgentEmployeeUserCreateForm, UserBulkRowResult]
+
+
+def parse_users_csv(content: bytes) -> List[UserRow]:
+    """
+    Parses a CSV upload with the header row
+    first_name,last_name,address,phone,email,password,lasrra_id,user_type_id,agent_id.
+    A row that fails validation is returned as its failed result, so that it gets
+    reported along with the others instead of failing the whole upload.
+    Raises a ValueError when the file is not UTF-8 encoded CSV, and a TooManyRowsError
+    when it has more than BULK_MAX_ROWS rows.
+    """
+    users_in: List[UserRow] = []
+    for row, values in enumerate(read_csv_rows(content)):
+        try:
+            users_in.append(AgentEmployeeUserCreateForm(**values))
+        except ValidationError as e:
+            users_in.append(
+                UserBulkRowResult(
+                    row=row,
+                    email=values.get("email") or "",
+                    success=False,
+                    detail=validation_error_detail(e),
+                )
+            )
+    return users_in
+
+
+def _normalize_user_row(user_in: UserRow) -> Tuple[UserRow, Optional[str]]:
+    if isinstance(user_in, UserBulkRowResult):
+        return user_in, user_in.detail
+    try:
+        lasrra_id = validate_lasrra_id(user_in.lasrra_id)
+        phone = validate_phone_number(user_in.phone)
+    except ValueError as e:
+        return user_in, str(e)
+    except IndexError:
+        # raised by validate_lasrra_id for an empty lasrra id
+        return user_in, "invalid lasrra id format"
+    return user_in.copy(update={"lasrra_id": lasrra_id, "phone": phone}), None
+
+
+def _check_user_row(
+    user_in: AgentEmployeeUserCreateForm,
+    *,
+    counts: Dict[str, Counter],
+    existing: Dict[str, Set[str]],
+    employee_user_type_ids: Set[int],
+    existing_agent_ids: Set[int],
+) -> Optional[str]:
+    for field_name in ("email", "lasrra_id", "phone"):
+        value = getattr(user_in, field_name)
+        if counts[field_name][value] > 1:
+            return DUPLICATED_IN_BATCH.format(f"user with {field_name} {value}")
+    for field_name in ("email", "lasrra_id", "phone"):
+        value = getattr(user_in, field_name)
+        if value in existing[field_name]:
+            return ALREADY_EXISTS.format(f"user with {field_name} {value}")
+    if user_in.user_type_id not in employee_user_type_ids:
+        return AGENT_EMPLOYEE_USER_NOT_SELECTED_ERROR
+    if user_in.agent_id not in existing_agent_ids:
+        return DOES_NOT_EXIST.format(f"agent with id {user_in.agent_id}")
+    return None
+
+
+def onboard_agent_employee_users(
+    db: Session,
+    *,
+    users_in: List[UserRow],
+    creator: User,
+    queue_welcome_emails: bool = True,
+) -> Tuple[UserBulkReport, List[WelcomeEmail]]:
+    """
+    Creates many agent employee users at once.
+    Rows given as a failed result, by parse_users_csv, are reported as they are.
+    Lasrra IDs and phone numbers are validated row by row, the email, lasrra_id and
+    phone uniqueness checks are one IN query each for the whole batch, and the valid
+    rows are inserted in chunks.
+    The welcome emails are queued in the same transaction as the users, unless
+    `queue_welcome_emails` is False.
+    Returns the report, with an entry for every input row in the order it was given,
+    along with the welcome emails for the users that were created.
+    """
+    normalized = [_normalize_user_row(user_in) for user_in in users_in]
+    valid_users_in = [user_in for user_in, detail in normalized if detail is None]
+
+    counts: Dict[str, Counter] = {}
+    existing: Dict[str, Set[str]] = {}
+    for field_name in ("email", "lasrra_id", "phone"):
+        counts[field_name] = Counter(
+            getattr(user_in, field_name) for user_in in valid_users_in
+        )
+        existing[field_name] = user_repo.get_existing_field_values(
+            db, field_name=field_name, field_values=list(counts[field_name])
+        )
+
+    employee_user_type_ids = {
+        user_type.id
+        for user_type in user_type_repo.get_multi_by_ids(
+            db, ids=list({user_in.user_type_id for user_in in valid_users_in})
+        )
+        if user_type.name in [AGENT_SUPERVISOR, AGENT_OFFICER]
+    }
+    existing_agent_ids = agent_repo.get_existing_field_values(
+        db,
+        field_name="id",
+        field_values=list({user_in.agent_id for user_in in valid_users_in}),
+    )
+
+    results: List[UserBulkRowResult] = []
+    users_to_create: List[UserCreate] = []
+    for row, (user_in, detail) in enumerate(normalized):
+        if detail is None:
+            detail = _check_user_row(
+                user_in,
+                counts=counts,
+                existing=existing,
+                employee_user_type_ids=employee_user_type_ids,
+                existing_agent_ids=existing_agent_ids,
+            )
+        results.append(
+            UserBulkRowResult(
+                row=row, email=user_in.email, success=False, detail=detail
+            )
+        )
+        if detail is None:
+            users_to_create.append(
+                UserCreate(**user_in.dict(), created_by_id=creator.id)
+            )
+
+    created = user_repo.bulk_create(db, objs_in=users_to_create)
+
+    welcome_emails: List[WelcomeEmail] = []
+    for result, (user_in, _) in zip(results, normalized):
+        if result.detail is not None:
+            continue
+        result.id = created.get(result.email)
+        result.success = result.id is not None
+        if not result.success:
+            # another request inserted the same email, lasrra_id or phone after our checks ran
+            result.detail = ALREADY_EXISTS.format(
+                f"user with email {user_in.email}, lasrra_id {user_in.lasrra_id} "
+                f"or phone {user_in.phone}"
+            )
+            continue
+        welcome_emails.append(
+            (
+                user_in.email,
+                UserCreationTemplateVariables(
+                    name=f"{user_in.first_name} {user_in.last_name}"
+                ).dict(),
+            )
+        )
+
+    if queue_welcome_emails:
+        queue_emails_with_template(
+            db, template_id=CREATE_ACCOUNT_TEMPLATE_ID, messages=welcome_emails
+        )
+    db.commit()
+
+    succeeded = sum(1 for result in results if result.success)
+    return (
+        UserBulkReport(
+            succeeded=succeeded, failed=len(results) - succeeded, results=results
+        ),
+        welcome_emails,
+    )
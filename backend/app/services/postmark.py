@@ -0,0 +1,180 @@
+import asyncio
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import httpx
+import requests
+from backend.app.core.settings import settings
+from postmarker import core
+from postmarker.exceptions import ClientError
+
+POSTMARK_API_TOKEN = settings.POSTMARK_API_TOKEN
+POSTMARK_API_URL = settings.POSTMARK_API_URL
+POSTMARK_CONNECT_TIMEOUT_SECONDS = settings.POSTMARK_CONNECT_TIMEOUT_SECONDS
+POSTMARK_TIMEOUT_SECONDS = settings.POSTMARK_TIMEOUT_SECONDS
+POSTMARK_MAX_CONNECTIONS = settings.POSTMARK_MAX_CONNECTIONS
+# Postmark accepts at most 500 messages per batch request
+POSTMARK_BATCH_SIZE = 500
+
+SERVER_TOKEN_HEADER = "X-Postmark-Server-Token"
+ACCOUNT_TOKEN_HEADER = "X-Postmark-Account-Token"
+
+
+class PostmarkClient(core.PostmarkClient):
+    """
+    postmarker's client, with the API root read from the settings instead of being
+    fixed to api.postmarkapp.com, so that it can be pointed at a fake server.
+
+    Its requests go through a keep-alive pool of at most `max_connections`
+    connections, shared by every thread using the client. Once they are all busy,
+    further requests wait for one to be released, which caps the number of requests
+    in flight.
+    """
+
+    def __init__(
+        self,
+        *args,
+        api_url: str = POSTMARK_API_URL,
+        max_connections: int = POSTMARK_MAX_CONNECTIONS,
+        **kwargs,
+    ):
+        kwargs.setdefault(
+            "timeout", (POSTMARK_CONNECT_TIMEOUT_SECONDS, POSTMARK_TIMEOUT_SECONDS)
+        )
+        super().__init__(*args, **kwargs)
+        self.api_url = api_url
+        self.max_connections = max_connections
+        # created up front, postmarker creates it on first use, which races
+        # when several threads make their first request at the same time
+        self._session = self._create_session()
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_connections,
+            pool_block=True,
+            max_retries=self.max_retries,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def call(self, method, endpoint, token_type="server", data=None, **kwargs):
+        if token_type == "account":
+            header, token = ACCOUNT_TOKEN_HEADER, self.account_token
+        else:
+            header, token = SERVER_TOKEN_HEADER, self.server_token
+        return self._call(
+            method, self.api_url, endpoint, data, {header: token}, **kwargs
+        )
+
+    def send_with_template(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        return self.call("POST", "email/withTemplate", data=message)
+
+    def send_batch_with_templates(
+        self, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Sends up to POSTMARK_BATCH_SIZE templated messages in one request.
+        Postmark answers with one result per message, in the order they were sent.
+        """
+        return self.call(
+            "POST", "email/batchWithTemplates", data={"Messages": messages}
+        )
+
+    def close(self):
+        self._session.close()
+
+
+class AsyncPostmarkClient:
+    """
+    The asyncio counterpart of PostmarkClient, for sending from coroutines without
+    tying up a thread per request. It has the same pool, limits and timeouts, and
+    raises postmarker's ClientError for the responses Postmark rejects.
+    """
+
+    def __init__(
+        self,
+        server_token: str,
+        *,
+        api_url: str = POSTMARK_API_URL,
+        max_connections: int = POSTMARK_MAX_CONNECTIONS,
+        connect_timeout: float = POSTMARK_CONNECT_TIMEOUT_SECONDS,
+        timeout: float = POSTMARK_TIMEOUT_SECONDS,
+    ):
+        assert server_token, "You have to provide token to use Postmark API"
+        self.max_connections = max_connections
+        # httpx's own connection limit leaves requests waiting on a released
+        # keep-alive connection hanging, so requests are capped here instead,
+        # which keeps the pool from ever growing past max_connections
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client = httpx.AsyncClient(
+            base_url=api_url,
+            headers={"Accept": "application/json", SERVER_TOKEN_HEADER: server_token},
+            limits=httpx.Limits(
+                max_connections=None, max_keepalive_connections=max_connections
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        )
+
+    async def call(self, method: str, endpoint: str, data: Any = None) -> Any:
+        # created on first use, so that it belongs to the loop the client runs on
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_connections)
+        async with self._semaphore:
+            response = await self._client.request(method, endpoint, json=data)
+        if response.is_error:
+            try:
+                error = response.json()
+            except ValueError:
+                response.raise_for_status()
+            raise ClientError(
+                "[{}] {}".format(error["ErrorCode"], error["Message"]),
+                error_code=error["ErrorCode"],
+            )
+        return response.json()
+
+    async def send_with_template(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.call("POST", "email/withTemplate", data=message)
+
+    async def send_batch_with_templates(
+        self, messages: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return await self.call(
+            "POST", "email/batchWithTemplates", data={"Messages": messages}
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+@lru_cache()
+def get_postmark_client() -> PostmarkClient:
+    """
+    Returns the process-wide client, so that every sender in the process shares
+    one connection pool.
+    """
+    return PostmarkClient(server_token=POSTMARK_API_TOKEN)
+
+
+_async_postmark_client: Optional[AsyncPostmarkClient] = None
+
+
+def get_async_postmark_client() -> AsyncPostmarkClient:
+    """
+    Returns the process-wide async client. Its connections belong to the event loop
+    that first uses them, so it is closed with close_async_postmark_client when the
+    application shuts down.
+    """
+    global _async_postmark_client
+    if _async_postmark_client is None:
+        _async_postmark_client = AsyncPostmarkClient(POSTMARK_API_TOKEN)
+    return _async_postmark_client
+
+
+async def close_async_postmark_client():
+    global _async_postmark_client
+    if _async_postmark_client is not None:
+        await _async_postmark_client.aclose()
+        _async_postmark_client = None
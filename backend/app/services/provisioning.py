@@ -0,0 +1,150 @@
+from collections import Counter
+from typing import List, Optional, Set, Union
+
+from backend.app.api.errors.error_strings import (
+    ALREADY_EXISTS,
+    DOES_NOT_EXIST,
+    DUPLICATED_IN_BATCH,
+)
+from backend.app.db.repositories.agent import agent_repo
+from backend.app.db.repositories.device import device_repo
+from backend.app.models.user import User
+from backend.app.schemas.device import (
+    DeviceBulkReport,
+    DeviceBulkRowResult,
+    DeviceCreate,
+    DeviceInBody,
+)
+from backend.app.services.csv_upload import read_csv_rows, validation_error_detail
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+# a row of an upload, or its failed result when it does not even validate
+DeviceRow = Union[DeviceInBody, DeviceBulkRowResult]
+
+
+def parse_devices_csv(content: bytes) -> List[DeviceRow]:
+    """
+    Parses a CSV upload with the header row name,mac_id,agent_id.
+    A row that fails validation is returned as its failed result, so that it gets
+    reported along with the others instead of failing the whole upload.
+    Raises a ValueError when the file is not UTF-8 encoded CSV, and a TooManyRowsError
+    when it has more than BULK_MAX_ROWS rows.
+    """
+    devices_in: List[DeviceRow] = []
+    for row, values in enumerate(read_csv_rows(content)):
+        try:
+            devices_in.append(DeviceInBody(**values))
+        except ValidationError as e:
+            devices_in.append(
+                DeviceBulkRowResult(
+                    row=row,
+                    mac_id=values.get("mac_id") or "",
+                    name=values.get("name") or "",
+                    success=False,
+                    detail=validation_error_detail(e),
+                )
+            )
+    return devices_in
+
+
+def _check_device_row(
+    device_in: DeviceInBody,
+    *,
+    mac_id_counts: Counter,
+    name_counts: Counter,
+    existing_mac_ids: Set[str],
+    existing_names: Set[str],
+    existing_agent_ids: Set[int],
+) -> Optional[str]:
+    if mac_id_counts[device_in.mac_id] > 1:
+        return DUPLICATED_IN_BATCH.format(f"device with mac id {device_in.mac_id}")
+    if name_counts[device_in.name] > 1:
+        return DUPLICATED_IN_BATCH.format(f"device with name {device_in.name}")
+    if device_in.mac_id in existing_mac_ids:
+        return ALREADY_EXISTS.format(f"device with mac id {device_in.mac_id}")
+    if device_in.name in existing_names:
+        return ALREADY_EXISTS.format(f"device with name {device_in.name}")
+    if device_in.agent_id not in existing_agent_ids:
+        return DOES_NOT_EXIST.format(f"agent with id {device_in.agent_id}")
+    return None
+
+
+def provision_devices(
+    db: Session, *, devices_in: List[DeviceRow], creator: User
+) -> DeviceBulkReport:
+    """
+    Creates many devices at once.
+    Rows given as a failed result, by parse_devices_csv, are reported as they are.
+    The mac_id and name uniqueness checks and the agent lookup are one IN query each
+    for the whole batch, and the valid rows are inserted in chunks.
+    Every input row gets an entry in the report, in the order it was given.
+    """
+    valid_devices_in = [
+        device_in for device_in in devices_in if isinstance(device_in, DeviceInBody)
+    ]
+    mac_id_counts = Counter(device_in.mac_id for device_in in valid_devices_in)
+    name_counts = Counter(device_in.name for device_in in valid_devices_in)
+
+    existing_mac_ids = device_repo.get_existing_field_values(
+        db, field_name="mac_id", field_values=list(mac_id_counts)
+    )
+    existing_names = device_repo.get_existing_field_values(
+        db, field_name="name", field_values=list(name_counts)
+    )
+    existing_agent_ids = agent_repo.get_existing_field_values(
+        db,
+        field_name="id",
+        field_values=list({device_in.agent_id for device_in in valid_devices_in}),
+    )
+
+    results: List[DeviceBulkRowResult] = []
+    devices_to_create: List[DeviceCreate] = []
+    for row, device_in in enumerate(devices_in):
+        if isinstance(device_in, DeviceBulkRowResult):
+            results.append(device_in)
+            continue
+        detail = _check_device_row(
+            device_in,
+            mac_id_counts=mac_id_counts,
+            name_counts=name_counts,
+            existing_mac_ids=existing_mac_ids,
+            existing_names=existing_names,
+            existing_agent_ids=existing_agent_ids,
+        )
+        results.append(
+            DeviceBulkRowResult(
+                row=row,
+                mac_id=device_in.mac_id,
+                name=device_in.name,
+                success=False,
+                detail=detail,
+            )
+        )
+        if detail is None:
+            devices_to_create.append(
+                DeviceCreate(
+                    mac_id=device_in.mac_id,
+                    name=device_in.name,
+                    creator_id=creator.id,
+                    agent_id=device_in.agent_id,
+                )
+            )
+
+    created = device_repo.bulk_create(db, objs_in=devices_to_create)
+
+    for result in results:
+        if result.detail is not None:
+            continue
+        result.id = created.get(result.mac_id)
+        result.success = result.id is not None
+        if not result.success:
+            # another request inserted the same mac_id or name after our checks ran
+            result.detail = ALREADY_EXISTS.format(
+                f"device with mac id {result.mac_id} or name {result.name}"
+            )
+
+    succeeded = sum(1 for result in results if result.success)
+    return DeviceBulkReport(
+        succeeded=succeeded, failed=len(results) - succeeded, results=results
+    )
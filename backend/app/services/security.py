@@ -1,6 +1,10 @@
 import hashlib
+import multiprocessing
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from typing import List, Optional
 
 from backend.app.core.settings import settings
 from itsdangerous import URLSafeSerializer
@@ -10,6 +14,10 @@ from pydantic import EmailStr
 
 RESET_TOKEN_EXPIRE_MINUTES = settings.RESET_TOKEN_EXPIRE_MINUTES
 SECRET_KEY = settings.SECRET_KEY
+PASSWORD_HASHING_WORKERS = settings.PASSWORD_HASHING_WORKERS
+
+# below this many passwords, handing them to the worker processes costs more than it saves
+PARALLEL_HASHING_THRESHOLD = 8
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -22,6 +30,46 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def get_password_hashes(passwords: List[str]) -> List[str]:
+    """
+    Hashes the passwords in the given order, spreading the bcrypt work across CPU cores.
+    """
+    if len(passwords) < PARALLEL_HASHING_THRESHOLD:
+        return [get_password_hash(password) for password in passwords]
+
+    return list(get_password_hashing_pool().map(get_password_hash, passwords))
+
+
+_password_hashing_pool: Optional[ProcessPoolExecutor] = None
+_password_hashing_pool_lock = threading.Lock()
+
+
+def get_password_hashing_pool() -> ProcessPoolExecutor:
+    """
+    The worker processes are shared by the whole process, and started by the first
+    bulk upload that needs them, so they are shut down with
+    shutdown_password_hashing_pool when the application stops.
+    They are spawned rather than forked, since forking a process that is running
+    other threads can leave the children holding locks nobody will release.
+    """
+    global _password_hashing_pool
+    with _password_hashing_pool_lock:
+        if _password_hashing_pool is None:
+            _password_hashing_pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASHING_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _password_hashing_pool
+
+
+def shutdown_password_hashing_pool():
+    global _password_hashing_pool
+    with _password_hashing_pool_lock:
+        if _password_hashing_pool is not None:
+            _password_hashing_pool.shutdown()
+            _password_hashing_pool = None
+
+
 def get_api_key_hash(api_key: str) -> str:
     return hashlib.pbkdf2_hmac(
         "sha256",
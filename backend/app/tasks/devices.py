@@ -1,24 +1,48 @@
 import time
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
 import pika
 from pika.adapters.blocking_connection import BlockingChannel
 from backend.app.core.settings import settings
+from backend.app.db.repositories.device_notification import device_notification_repo
+from backend.app.db.session import SessionLocal
+from backend.app.models.device_notification import DeviceNotification
+from backend.app.services.device_updates import (
+    DEVICE_METADATA_INVALIDATED,
+    DEVICE_UPDATES_EXCHANGE,
+)
 from loguru import logger
+from sqlalchemy.orm import Session
 
 # parameters = pika.URLParameters(settings.RABBIT_MQ_URI)
 # connection = pika.BlockingConnection(parameters=parameters)
 # channel = connection.channel()
 
-MAX_SEND_NOTIF_ATTEMPTS = 3
+DEVICE_NOTIFICATION_RELAY_BATCH_SIZE = settings.DEVICE_NOTIFICATION_RELAY_BATCH_SIZE
+DEVICE_NOTIFICATION_RELAY_POLL_SECONDS = settings.DEVICE_NOTIFICATION_RELAY_POLL_SECONDS
+DEVICE_NOTIFICATION_RETENTION_DAYS = settings.DEVICE_NOTIFICATION_RETENTION_DAYS
+DEVICE_NOTIFICATION_PRUNE_SECONDS = settings.DEVICE_NOTIFICATION_PRUNE_SECONDS
 
 
 class ConnectionManager:
+    """
+    Holds the relay's connection to the broker. Nothing connects until the channel
+    is first asked for, so importing this module never waits on the broker.
+    """
+
     def __init__(self) -> None:
         self._connection = None
         self._channel: Optional[BlockingChannel] = None
         self.default_sleep_duration = 5
         self.sleep_duration = self.default_sleep_duration
-        self.initialize_connection()
+
+    @property
+    def is_connected(self) -> bool:
+        return (
+            self._channel is not None
+            and self._channel.is_open
+            and self._connection.is_open
+        )
 
     @property
     def channel(self):
@@ -43,7 +67,7 @@ class ConnectionManager:
                 connection = pika.BlockingConnection(parameters=parameters)
                 channel = connection.channel()
                 channel.exchange_declare(
-                    exchange="device_updates", exchange_type="direct"
+                    exchange=DEVICE_UPDATES_EXCHANGE, exchange_type="direct"
                 )
                 channel.confirm_delivery()
                 self._channel = channel
@@ -60,30 +84,113 @@ class ConnectionManager:
 connection_manager = ConnectionManager()
 
 
-def send_notification_to_devices(
-    mac_id: str, notification_body: str, attempts_left: int = MAX_SEND_NOTIF_ATTEMPTS
-):
-    if attempts_left < 0:
-        logger.info(f"Failed to deliver to {mac_id}")
-        return
+def relay_device_notifications(
+    db: Session,
+    channel: Optional[BlockingChannel],
+    *,
+    batch_size: int = DEVICE_NOTIFICATION_RELAY_BATCH_SIZE,
+) -> int:
+    """
+    Claims up to `batch_size` unsent notifications from the outbox and publishes them
+    to the device_updates exchange, marking each one as sent once the broker has
+    confirmed it. Identical notifications for the same device are published once,
+    with the id of the newest one as the version header. The mac_ids sent are then
+    broadcast to every API process, to drop their cached metadata.
+    When a publish fails, the rest of the batch stays in the outbox for the next run.
+    Returns the number of notifications sent, 0 once the outbox is drained or the
+    broker is failing.
+    """
+    notifications = device_notification_repo.claim_pending(db, limit=batch_size)
+    sent = 0
+    sent_mac_ids: Set[str] = set()
 
-    if settings.DEBUG:
-        logger.info(f"Mock Sent update to device {mac_id}")
-    else:
-        try:
-            channel = connection_manager.channel
-            if not channel:
-                logger.error(
-                    f"Unable to use rabbit mq to push update to device {mac_id}"
-                )
-            else:
+    by_message: Dict[Tuple[str, str], List[DeviceNotification]] = {}
+    for notification in notifications:
+        by_message.setdefault((notification.mac_id, notification.body), []).append(
+            notification
+        )
+
+    for (mac_id, body), duplicates in by_message.items():
+        if settings.DEBUG:
+            logger.info(f"Mock Sent update to device {mac_id}")
+        else:
+            try:
+                # the channel is in confirm mode, so this returns once the broker
+                # has taken the message and raises if it refuses it
                 channel.basic_publish(
-                    exchange="device_updates",
+                    exchange=DEVICE_UPDATES_EXCHANGE,
                     routing_key=mac_id,
-                    body=notification_body,
+                    body=body,
+                    properties=pika.BasicProperties(
+                        headers={"version": duplicates[-1].id}
+                    ),
                 )
+            except Exception as e:
+                logger.error(f"Failed to deliver to {mac_id}: {e}")
+                break
+        device_notification_repo.mark_as_sent(db, db_objs=duplicates)
+        sent += len(duplicates)
+        sent_mac_ids.add(mac_id)
+    db.commit()
+    if sent_mac_ids and not settings.DEBUG:
+        _broadcast_invalidation(channel, sent_mac_ids)
+    return sent
+
+
+def _broadcast_invalidation(channel: BlockingChannel, mac_ids: Set[str]):
+    # the metadata versions already keep the caches right after a change is
+    # committed, so a broadcast that fails is logged rather than retried
+    try:
+        channel.basic_publish(
+            exchange=DEVICE_UPDATES_EXCHANGE,
+            routing_key=DEVICE_METADATA_INVALIDATED,
+            body="\n".join(sorted(mac_ids)),
+        )
+    except Exception as e:
+        logger.error(f"Failed to broadcast metadata invalidation: {e}")
+
+
+def prune_device_notifications(
+    db: Session,
+    *,
+    retention_days: int = DEVICE_NOTIFICATION_RETENTION_DAYS,
+    batch_size: int = DEVICE_NOTIFICATION_RELAY_BATCH_SIZE,
+) -> int:
+    """
+    Deletes up to `batch_size` notifications that were sent more than
+    `retention_days` ago, keeping the newest one of each device, in one transaction.
+    Returns the number of rows deleted, 0 once nothing is left to prune.
+    """
+    sent_before = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    deleted = device_notification_repo.delete_sent(
+        db, sent_before=sent_before, limit=batch_size
+    )
+    db.commit()
+    return deleted
+
+
+def run_device_notification_relay(*, once: bool = False):
+    """
+    Drains the outbox, then polls it every DEVICE_NOTIFICATION_RELAY_POLL_SECONDS.
+    Every DEVICE_NOTIFICATION_PRUNE_SECONDS, the notifications sent long enough ago
+    are pruned as well.
+    Any number of relays can run side by side.
+    """
+    prune_at = time.monotonic()
+    while True:
+        db = SessionLocal()
+        try:
+            channel = None if settings.DEBUG else connection_manager.channel
+            while relay_device_notifications(db, channel):
+                pass
+            if once or time.monotonic() >= prune_at:
+                prune_at = time.monotonic() + DEVICE_NOTIFICATION_PRUNE_SECONDS
+                while prune_device_notifications(db):
+                    pass
         except Exception as e:
-            logger.info(e)
-            send_notification_to_devices(
-                mac_id, notification_body, attempts_left=attempts_left - 1
-            )
+            logger.error(e)
+        finally:
+            db.close()
+        if once:
+            return
+        time.sleep(DEVICE_NOTIFICATION_RELAY_POLL_SECONDS)
@@ -0,0 +1,116 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.email import email_repo
+from backend.app.db.session import SessionLocal
+from backend.app.models.email import Email
+from backend.app.services.email import is_success_response
+from backend.app.services.postmark import (
+    POSTMARK_BATCH_SIZE,
+    PostmarkClient,
+    get_postmark_client,
+)
+from loguru import logger
+from sqlalchemy.orm import Session
+
+DEFAULT_EMAIL_SENDER = settings.DEFAULT_EMAIL_SENDER
+EMAIL_MAX_ATTEMPTS = settings.EMAIL_MAX_ATTEMPTS
+EMAIL_RETRY_BACKOFF_SECONDS = settings.EMAIL_RETRY_BACKOFF_SECONDS
+EMAIL_DISPATCH_POLL_SECONDS = settings.EMAIL_DISPATCH_POLL_SECONDS
+
+
+def _mark_as_delivered(email: Email):
+    email.attempts += 1
+    email.delivered = True
+    email.next_attempt_at = None
+
+
+def _give_up(email: Email, error: str):
+    email.attempts += 1
+    email.extra_data = error
+    logger.error(f"giving up on email {email.id} to {email.recipient}: {error}")
+    email.next_attempt_at = None
+
+
+def _retry_later(email: Email, error: str):
+    if email.attempts + 1 >= EMAIL_MAX_ATTEMPTS:
+        _give_up(email, error)
+    else:
+        email.attempts += 1
+        email.extra_data = error
+        backoff = EMAIL_RETRY_BACKOFF_SECONDS * 2 ** (email.attempts - 1)
+        email.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=backoff)
+
+
+def dispatch_pending_emails(
+    db: Session, client: PostmarkClient, *, batch_size: int = POSTMARK_BATCH_SIZE
+) -> int:
+    """
+    Claims up to `batch_size` due emails from the outbox and sends them with a single
+    Postmark batch request. Emails Postmark rejects, or all of them when the request
+    itself fails, are retried with an exponential backoff until EMAIL_MAX_ATTEMPTS.
+    Emails whose template id or variables can not be read are given up on without
+    being sent, as retrying them would not help.
+    Returns the number of emails claimed, 0 once the outbox has nothing due.
+    """
+    emails = email_repo.claim_pending(db, limit=batch_size)
+    if not emails:
+        db.commit()
+        return 0
+
+    emails_to_send: List[Email] = []
+    messages: List[Dict[str, Any]] = []
+    for email in emails:
+        try:
+            message = {
+                "TemplateId": int(email.template_id),
+                "TemplateModel": json.loads(email.template_dict),
+                "From": email.sender,
+                "To": email.recipient,
+            }
+        except (TypeError, ValueError) as e:
+            _give_up(email, f"malformed email: {e}")
+            continue
+        emails_to_send.append(email)
+        messages.append(message)
+
+    try:
+        responses = client.send_batch_with_templates(messages) if messages else []
+    except Exception as e:
+        logger.error(e)
+        responses = [{"Message": e.__str__(), "ErrorCode": None} for _ in messages]
+
+    for email, response in zip(emails_to_send, responses):
+        if is_success_response(response):
+            _mark_as_delivered(email)
+        else:
+            _retry_later(email, response["Message"])
+    db.commit()
+
+    if settings.DEBUG:
+        logger.info("***EMAIL BATCH****")
+        logger.info(f"Recipients : {[email.recipient for email in emails]}")
+    return len(emails)
+
+
+def run_email_dispatcher(*, once: bool = False):
+    """
+    Drains the outbox, then polls it every EMAIL_DISPATCH_POLL_SECONDS.
+    Any number of dispatchers can run side by side.
+    """
+    client = get_postmark_client()
+    while True:
+        db = SessionLocal()
+        try:
+            while dispatch_pending_emails(db, client):
+                pass
+        except Exception as e:
+            logger.error(e)
+        finally:
+            db.close()
+        if once:
+            return
+        time.sleep(EMAIL_DISPATCH_POLL_SECONDS)
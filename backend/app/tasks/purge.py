@@ -0,0 +1,55 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.session import SessionLocal
+from loguru import logger
+from sqlalchemy.orm import Session
+
+SOFT_DELETE_RETENTION_DAYS = settings.SOFT_DELETE_RETENTION_DAYS
+PURGE_BATCH_SIZE = settings.PURGE_BATCH_SIZE
+PURGE_POLL_SECONDS = settings.PURGE_POLL_SECONDS
+
+
+def purge_deleted_rows(
+    db: Session,
+    *,
+    retention_days: int = SOFT_DELETE_RETENTION_DAYS,
+    batch_size: int = PURGE_BATCH_SIZE,
+) -> int:
+    """
+    Deletes for good up to `batch_size` devices and `batch_size` users that were soft
+    deleted more than `retention_days` ago, in one transaction.
+    Returns the number of rows purged, 0 once nothing is left to purge.
+    """
+    deleted_before = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    # devices first, their creators can only be purged once they are gone
+    devices = device_repo.purge_deleted(
+        db, deleted_before=deleted_before, limit=batch_size
+    )
+    users = user_repo.purge_deleted(db, deleted_before=deleted_before, limit=batch_size)
+    db.commit()
+    if devices or users:
+        logger.info(f"purged {len(devices)} devices and {len(users)} users")
+    return len(devices) + len(users)
+
+
+def run_purge(*, once: bool = False):
+    """
+    Purges every row that is old enough, then checks again every PURGE_POLL_SECONDS.
+    Any number of purges can run side by side.
+    """
+    while True:
+        db = SessionLocal()
+        try:
+            while purge_deleted_rows(db):
+                pass
+        except Exception as e:
+            logger.error(e)
+        finally:
+            db.close()
+        if once:
+            return
+        time.sleep(PURGE_POLL_SECONDS)
@@ -0,0 +1,99 @@
+"""
+Measures updates per second through the user and device activate/deactivate flows,
+with the previous generic update, with the update followed by a refresh, and with the
+single `UPDATE ... RETURNING` the flows now use.
+
+    python -m backend.benchmarks.bench_activation_updates --rows 200
+
+Each row is deactivated and activated again (or the other way round), so the users
+and devices end up as they were. The previous update, which ran jsonable_encoder over
+the row to find its fields, is reproduced here to compare against.
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+import backend.app.main  # noqa: F401, maps every model
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.session import SessionLocal
+from backend.app.models.device import Device
+from backend.app.models.user import User
+from commonlib.repositories import Base
+from fastapi.encoders import jsonable_encoder
+
+UPDATE = Base.update
+
+
+def _previous_update(self, db, *, db_obj, obj_in: Dict[str, Any], **_):
+    obj_data = jsonable_encoder(db_obj)
+    for field in obj_data:
+        if field in obj_in:
+            setattr(db_obj, field, obj_in[field])
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+
+def _refreshing_update(self, db, *, db_obj, obj_in: Dict[str, Any], **_):
+    return UPDATE(self, db, db_obj=db_obj, obj_in=obj_in, refresh=True)
+
+
+MODES: Dict[str, Callable] = {
+    "jsonable_encoder + refresh": _previous_update,
+    "refresh": _refreshing_update,
+    "returning": UPDATE,
+}
+
+
+def _toggle(rows: List[Any], activate: Callable, deactivate: Callable) -> float:
+    start = time.perf_counter()
+    for row in rows:
+        if row.is_active:
+            deactivate(row)
+            activate(row)
+        else:
+            activate(row)
+            deactivate(row)
+    return 2 * len(rows) / (time.perf_counter() - start)
+
+
+def run(rows: int) -> None:
+    db = SessionLocal()
+    try:
+        users = db.query(User).limit(rows).all()
+        devices = db.query(Device).limit(rows).all()
+        if not users or not devices:
+            raise SystemExit("there are no users or devices to update")
+
+        print(f"updates per second over {len(users)} users and {len(devices)} devices")
+        for mode, update in MODES.items():
+            Base.update = update
+            try:
+                users_rate = _toggle(
+                    users,
+                    lambda user: user_repo.activate(db, db_obj=user),
+                    lambda user: user_repo.deactivate(db, db_obj=user),
+                )
+                devices_rate = _toggle(
+                    devices,
+                    lambda device: device_repo.activate_device(db, device_obj=device),
+                    lambda device: device_repo.deactivate_device(db, device_obj=device),
+                )
+            finally:
+                Base.update = UPDATE
+            print(f"  {mode:<27} users {users_rate:>7.0f}/s  devices {devices_rate:>7.0f}/s")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rows)
+
+
+if __name__ == "__main__":
+    main()
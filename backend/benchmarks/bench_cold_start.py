@@ -0,0 +1,95 @@
+"""
+Measures how long API processes take from being spawned to accepting connections,
+seeding with the DataInitializer replay and with the bootstrap.
+
+    python -m backend.benchmarks.bench_cold_start --processes 8 --starts 3
+
+Every start spawns `--processes` uvicorn processes at once, like a host restarting
+its workers, and waits for all of them to listen. The bootstrap is timed both on a
+database it has to seed and on one it seeded already; to get the former, the seed
+marker is deleted before each start, the default users are left in place.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import List
+
+from backend.app.db.session import engine
+
+MODES = [
+    ("initializer", "initializer", False),
+    ("bootstrap, seeding", "bootstrap", True),
+    ("bootstrap, already seeded", "bootstrap", False),
+]
+
+
+def _is_listening(port: int) -> bool:
+    try:
+        socket.create_connection(("127.0.0.1", port), timeout=1).close()
+        return True
+    except OSError:
+        return False
+
+
+def _start(mode: str, ports: List[int]) -> float:
+    env = dict(os.environ, DB_BOOTSTRAP_MODE=mode)
+    start = time.perf_counter()
+    workers = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "backend.app.main:app",
+                "--port",
+                str(port),
+                "--log-level",
+                "warning",
+            ],
+            env=env,
+        )
+        for port in ports
+    ]
+    try:
+        waiting = set(ports)
+        deadline = start + 120
+        while waiting and time.perf_counter() < deadline:
+            waiting = {port for port in waiting if not _is_listening(port)}
+            time.sleep(0.01)
+        if waiting:
+            raise RuntimeError(f"{len(waiting)} processes did not start listening")
+        return time.perf_counter() - start
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+
+
+def run(processes: int, starts: int, port: int) -> None:
+    ports = list(range(port, port + processes))
+    print(f"seconds until {processes} processes listen, best of {starts}")
+    for name, mode, unseed in MODES:
+        timings = []
+        for _ in range(starts):
+            if unseed:
+                with engine.begin() as connection:
+                    connection.execute("DELETE FROM seed_version")
+            timings.append(_start(mode, ports))
+        print(f"  {name:<26} {min(timings):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--starts", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    run(args.processes, args.starts, args.port)
+
+
+if __name__ == "__main__":
+    main()
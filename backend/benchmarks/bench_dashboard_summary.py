@@ -0,0 +1,188 @@
+"""
+Compares loading an agent's dashboard through the agent profile, and counting across
+the fleet through the listings, with reading the summaries agent_summary keeps.
+
+    python -m backend.benchmarks.bench_dashboard_summary --devices 20000 --officers 2000
+
+A new agent is given `--devices` devices, half of them with an officer assigned, and
+`--officers` officers, all written with multi-row statements so that the time the
+triggers add to them shows. The requests go through a TestClient in this process as
+the default superuser. The agent and everything it was given are deleted at the end.
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.repositories.user_type import user_type as user_type_repo
+from backend.app.db.session import SessionLocal
+from backend.app.main import app
+from backend.app.models.agent import Agent
+from backend.app.models.device import Device, device_user_link
+from backend.app.models.user import User
+from backend.app.schemas.device import DeviceCreate
+from backend.app.services.security import get_password_hash
+from sqlalchemy.dialects.postgresql import insert
+from starlette.testclient import TestClient
+
+AGENT = settings.AGENT
+AGENT_OFFICER = settings.AGENT_OFFICER
+API_URL_PREFIX = settings.API_URL_PREFIX
+FIRST_SUPERUSER_EMAIL = settings.FIRST_SUPERUSER_EMAIL
+
+
+def _time(call: Callable[[], object], repeat: int) -> float:
+    call()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _timed(name: str, call: Callable[[], object]):
+    start = time.perf_counter()
+    result = call()
+    print(f"  {name:<38} {(time.perf_counter() - start) * 1000:>8.1f} ms")
+    return result
+
+
+def _seed(db, superuser: User, devices: int, officers: int) -> Agent:
+    agent = Agent(
+        name=f"bench agent {time.time()}",
+        email=f"bench{time.time_ns()}@example.com",
+        address="bench",
+        user_type_id=user_type_repo.get_by_name(db, name=AGENT).id,
+    )
+    db.add(agent)
+    db.commit()
+
+    officer_type = user_type_repo.get_by_name(db, name=AGENT_OFFICER)
+    hashed_password = get_password_hash("password")
+    user_rows = [
+        {
+            "first_name": "bench",
+            "last_name": str(n),
+            "email": f"bench{agent.id}.{n}@example.com",
+            "phone": f"bench{agent.id}.{n}",
+            "lasrra_id": f"bench{agent.id}.{n}",
+            "hashed_password": hashed_password,
+            "address": "bench",
+            "is_active": True,
+            "agent_id": agent.id,
+            "user_type_id": officer_type.id,
+        }
+        for n in range(officers)
+    ]
+    inserted = _timed(
+        f"insert {officers} officers",
+        lambda: db.execute(insert(User).values(user_rows).returning(User.id)),
+    )
+    user_ids = [user_id for user_id, in inserted]
+    db.commit()
+
+    created = _timed(
+        f"insert {devices} devices",
+        lambda: device_repo.bulk_create(
+            db,
+            objs_in=[
+                DeviceCreate(
+                    name=f"bench{agent.id}.{n}",
+                    mac_id=f"bench{agent.id}.{n}",
+                    creator_id=superuser.id,
+                    agent_id=agent.id,
+                )
+                for n in range(devices)
+            ],
+        ),
+    )
+    device_ids = sorted(created.values())
+    _timed(
+        f"link {len(device_ids) // 2} devices",
+        lambda: device_repo.bulk_add_assigned_users(
+            db,
+            pairs=[
+                (device_id, user_ids[n % len(user_ids)])
+                for n, device_id in enumerate(device_ids[::2])
+            ],
+        ),
+    )
+    db.commit()
+    return agent
+
+
+def _delete(db, agent: Agent):
+    device_ids = db.query(Device.id).filter(Device.agent_id == agent.id)
+    db.execute(
+        device_user_link.delete().where(device_user_link.c.device_id.in_(device_ids))
+    )
+    db.query(Device).filter(Device.agent_id == agent.id).delete(synchronize_session=False)
+    db.query(User).filter(User.agent_id == agent.id).delete(synchronize_session=False)
+    db.delete(agent)
+    db.commit()
+
+
+def _time_requests(
+    client: TestClient,
+    headers: Dict[str, str],
+    pages: Dict[str, List[str]],
+    requests: int,
+):
+    for name, urls in pages.items():
+        for url in urls:
+            client.get(url, headers=headers).raise_for_status()
+        load = lambda: [client.get(url, headers=headers) for url in urls]  # noqa: E731
+        print(f"  {name:<38} {_time(load, requests):>8.1f} ms")
+
+
+def run(devices: int, officers: int, requests: int) -> None:
+    db = SessionLocal()
+    superuser = user_repo.get_by_email(db, email=FIRST_SUPERUSER_EMAIL)
+    if superuser is None:
+        raise SystemExit("the default superuser does not exist, run the bootstrap first")
+    headers = {"Authorization": f"Token {superuser.generate_jwt()}"}
+    print("seeding, with the agent_summary triggers")
+    agent = _seed(db, superuser, devices, officers)
+    try:
+        client = TestClient(app)
+        print(f"one agent's dashboard, mean of {requests}")
+        _time_requests(
+            client,
+            headers,
+            {
+                "agent profile": [f"{API_URL_PREFIX}/agents/agent_profile/{agent.id}"],
+                "agent summary": [f"{API_URL_PREFIX}/agents/agent_summary/{agent.id}"],
+            },
+            requests,
+        )
+        print(f"the fleet's dashboard, mean of {requests}")
+        _time_requests(
+            client,
+            headers,
+            {
+                "devices, users and agents listings": [
+                    f"{API_URL_PREFIX}/devices/",
+                    f"{API_URL_PREFIX}/users/all/",
+                    f"{API_URL_PREFIX}/agents/all_agents",
+                ],
+                "system summary": [f"{API_URL_PREFIX}/agents/summary"],
+            },
+            requests,
+        )
+    finally:
+        _delete(db, agent)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=20000)
+    parser.add_argument("--officers", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=10)
+    args = parser.parse_args()
+    run(args.devices, args.officers, args.requests)
+
+
+if __name__ == "__main__":
+    main()
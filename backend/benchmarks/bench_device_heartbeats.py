@@ -0,0 +1,124 @@
+"""
+Compares writing every heartbeat of a fleet as it arrives, one UPDATE and commit each,
+with buffering them and writing them all in one flush, as the heartbeat endpoint does.
+
+    python -m backend.benchmarks.bench_device_heartbeats --devices 50000 --rounds 3
+
+`--devices` devices are inserted for a new agent with INSERT ... SELECT over
+generate_series, and every round has each of them send one heartbeat. The agent
+and its devices are deleted at the end.
+"""
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+import backend.app.db.base  # noqa: F401, maps every model
+from backend.app.core.settings import settings
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.repositories.user_type import user_type as user_type_repo
+from backend.app.db.session import SessionLocal
+from backend.app.services.device_heartbeats import DeviceHeartbeatBuffer
+from sqlalchemy.orm import Session
+
+AGENT = settings.AGENT
+FIRST_SUPERUSER_EMAIL = settings.FIRST_SUPERUSER_EMAIL
+MARKER = "benchheartbeat"
+
+
+def _seed(db: Session, devices: int) -> int:
+    superuser = user_repo.get_by_email(db, email=FIRST_SUPERUSER_EMAIL)
+    agent_id = db.execute(
+        "INSERT INTO agent (name, email, address, user_type_id, created_by_id) "
+        "VALUES (:marker, :marker || '@example.com', 'bench', :user_type_id, "
+        ":creator_id) RETURNING id",
+        {
+            "marker": f"{MARKER} {time.time_ns()}",
+            "user_type_id": user_type_repo.get_by_name(db, name=AGENT).id,
+            "creator_id": superuser.id,
+        },
+    ).scalar()
+    db.execute(
+        "INSERT INTO device (name, mac_id, is_active, creator_id, agent_id) "
+        "SELECT :marker || '-' || :agent_id || '-' || n, "
+        ":marker || '-' || :agent_id || '-' || n, true, :creator_id, :agent_id "
+        "FROM generate_series(1, :devices) n",
+        {
+            "marker": MARKER,
+            "agent_id": agent_id,
+            "creator_id": superuser.id,
+            "devices": devices,
+        },
+    )
+    db.commit()
+    db.execute("ANALYZE device")
+    return agent_id
+
+
+def _delete(db: Session, agent_id: int):
+    db.execute("DELETE FROM device WHERE agent_id = :id", {"id": agent_id})
+    db.execute("DELETE FROM agent WHERE id = :id", {"id": agent_id})
+    db.commit()
+
+
+def _write_each(db: Session, mac_ids: List[str]) -> float:
+    start = time.perf_counter()
+    for mac_id in mac_ids:
+        db.execute(
+            "UPDATE device SET last_seen_at = :seen_at, battery_level = :battery_level "
+            "WHERE mac_id = :mac_id",
+            {
+                "seen_at": datetime.now(timezone.utc),
+                "battery_level": 50,
+                "mac_id": mac_id,
+            },
+        )
+        db.commit()
+    return time.perf_counter() - start
+
+
+def _buffer_and_flush(mac_ids: List[str]) -> Tuple[float, float]:
+    buffer = DeviceHeartbeatBuffer(max_size=len(mac_ids))
+    start = time.perf_counter()
+    for mac_id in mac_ids:
+        buffer.record(mac_id, datetime.now(timezone.utc), battery_level=50)
+    recorded = time.perf_counter()
+    updated = buffer.flush()
+    assert updated == len(mac_ids), updated
+    return recorded - start, time.perf_counter() - recorded
+
+
+def run(devices: int, rounds: int) -> None:
+    db = SessionLocal()
+    agent_id = _seed(db, devices)
+    mac_ids = [
+        mac_id
+        for mac_id, in db.execute(
+            "SELECT mac_id FROM device WHERE agent_id = :id", {"id": agent_id}
+        )
+    ]
+    try:
+        print(f"{devices} heartbeats a round, {rounds} rounds")
+        print(f"  {'round':<8} {'each written':>14} {'buffered':>12} {'flushed':>12}")
+        for n in range(1, rounds + 1):
+            each = _write_each(db, mac_ids)
+            recorded, flushed = _buffer_and_flush(mac_ids)
+            print(
+                f"  {n:<8} {each * 1000:>11.0f} ms {recorded * 1000:>9.0f} ms "
+                f"{flushed * 1000:>9.0f} ms"
+            )
+    finally:
+        _delete(db, agent_id)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    run(args.devices, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Holds thousands of idle device update streams open against one API worker and
+reports what they cost it: memory per connection, CPU while idle, and whether every
+stream keeps receiving its keep-alives.
+
+    python -m backend.benchmarks.bench_device_update_connections --connections 10000
+
+The worker is started as a uvicorn subprocess. The connections are spread over the
+active devices already in the database, so at least one device has to be active.
+API key checks are switched off for the worker, since hashing a key per connection
+would only measure how long it takes to open them. Both this process and the worker
+need a file descriptor limit above the number of connections (ulimit -n).
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from backend.app.core.settings import settings
+from backend.app.db.session import engine
+
+API_URL_PREFIX = settings.API_URL_PREFIX
+KEEPALIVE_SECONDS = 5
+CONNECTING_AT_ONCE = 200
+
+
+def _worker_usage(pid: int) -> Tuple[int, float]:
+    """Returns the worker's resident memory in KB and its CPU time in seconds."""
+    with open(f"/proc/{pid}/status") as status:
+        rss_kb = next(int(line.split()[1]) for line in status if line.startswith("VmRSS"))
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return rss_kb, cpu_seconds
+
+
+def _start_worker(port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        API_KEY_AUTH_ENABLED="false",
+        DEVICE_UPDATES_KEEPALIVE_SECONDS=str(KEEPALIVE_SECONDS),
+    )
+    worker = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "backend.app.main:app",
+            "--port",
+            str(port),
+            "--backlog",
+            "4096",
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline and worker.poll() is None:
+        try:
+            asyncio.run(asyncio.open_connection("127.0.0.1", port))
+            return worker
+        except OSError:
+            time.sleep(0.2)
+    worker.kill()
+    raise RuntimeError("the worker did not start listening")
+
+
+async def _open_stream(port: int, mac_id: str, limit: asyncio.Semaphore):
+    async with limit:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            (
+                f"GET {API_URL_PREFIX}/devices/{mac_id}/updates HTTP/1.1\r\n"
+                f"Host: 127.0.0.1\r\nX-API-KEY: benchmark\r\n\r\n"
+            ).encode()
+        )
+        headers = await reader.readuntil(b"\r\n\r\n")
+        if not headers.startswith(b"HTTP/1.1 200"):
+            raise RuntimeError(headers.split(b"\r\n", 1)[0].decode())
+        return reader, writer
+
+
+async def _keeps_receiving(reader: asyncio.StreamReader) -> bool:
+    try:
+        await asyncio.wait_for(reader.readuntil(b"\n\n"), KEEPALIVE_SECONDS * 2)
+        return True
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return False
+
+
+async def _hold(port: int, pid: int, mac_ids: List[str], connections: int, hold: float):
+    rss_before, _ = _worker_usage(pid)
+    limit = asyncio.Semaphore(CONNECTING_AT_ONCE)
+    start = time.perf_counter()
+    streams = await asyncio.gather(
+        *(
+            _open_stream(port, mac_ids[i % len(mac_ids)], limit)
+            for i in range(connections)
+        )
+    )
+    connect_seconds = time.perf_counter() - start
+
+    rss_connected, cpu_connected = _worker_usage(pid)
+    hold_start = time.perf_counter()
+    alive = connections
+    while time.perf_counter() - hold_start < hold:
+        alive = sum(
+            await asyncio.gather(*(_keeps_receiving(reader) for reader, _ in streams))
+        )
+    held_seconds = time.perf_counter() - hold_start
+    rss_held, cpu_held = _worker_usage(pid)
+
+    for _, writer in streams:
+        writer.close()
+
+    print(f"{connections} connections over {len(mac_ids)} devices")
+    print(f"opened in {connect_seconds:.1f}s")
+    print(
+        f"worker memory {rss_before / 1024:.0f} MB -> {rss_held / 1024:.0f} MB, "
+        f"{(rss_connected - rss_before) / connections:.1f} KB per connection"
+    )
+    print(
+        f"worker CPU while idle {100 * (cpu_held - cpu_connected) / held_seconds:.1f}% "
+        f"over {held_seconds:.0f}s"
+    )
+    print(f"{alive}/{connections} streams still receiving keep-alives")
+
+
+def run(connections: int, devices: int, hold: float, port: int) -> None:
+    with engine.connect() as connection:
+        mac_ids = [
+            mac_id
+            for mac_id, in connection.execute(
+                "SELECT mac_id FROM device WHERE is_active LIMIT %(devices)s",
+                {"devices": devices},
+            )
+        ]
+    if not mac_ids:
+        raise SystemExit("there are no active devices to listen for")
+
+    worker = _start_worker(port)
+    try:
+        asyncio.run(_hold(port, worker.pid, mac_ids, connections, hold))
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument(
+        "--hold", type=float, default=30, help="seconds to keep the streams open"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    run(args.connections, args.devices, args.hold, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Measures how the cost of the device_user lookups behind `user.devices` and
+`device.assigned_users` grows with the size of the link table, with and without the
+(device_id, user_id) primary key and the (user_id, device_id) index.
+
+    python -m backend.benchmarks.bench_device_user_lookup --sizes 10000 100000 1000000 5000000
+
+The rows go into a temporary copy of the table, so the benchmark can be pointed at any
+database the application can connect to without touching its data.
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from backend.app.db.session import engine
+
+USERS_PER_DEVICE = 4
+LOOKUPS = 200
+
+
+def _time_lookups(connection, query: str, keys: List[int]) -> float:
+    start = time.perf_counter()
+    for key in keys:
+        connection.execute(query, {"key": key}).fetchall()
+    return (time.perf_counter() - start) / len(keys) * 1000
+
+
+def run(size: int) -> None:
+    devices = max(size // USERS_PER_DEVICE, 1)
+    with engine.connect() as connection:
+        connection.execute("DROP TABLE IF EXISTS bench_device_user")
+        connection.execute(
+            "CREATE TEMPORARY TABLE bench_device_user (device_id integer, user_id integer)"
+        )
+        # every device gets USERS_PER_DEVICE users, and every user a handful of devices
+        connection.execute(
+            """
+            INSERT INTO bench_device_user
+            SELECT n / %(per_device)s, (n::bigint * 7919) %% %(devices)s
+            FROM generate_series(0, %(size)s - 1) AS n
+            """,
+            {"per_device": USERS_PER_DEVICE, "devices": devices, "size": size},
+        )
+        connection.execute("ANALYZE bench_device_user")
+
+        keys = [random.randrange(devices) for _ in range(LOOKUPS)]
+        by_device = "SELECT user_id FROM bench_device_user WHERE device_id = %(key)s"
+        by_user = "SELECT device_id FROM bench_device_user WHERE user_id = %(key)s"
+
+        before = (
+            _time_lookups(connection, by_device, keys),
+            _time_lookups(connection, by_user, keys),
+        )
+        connection.execute(
+            "ALTER TABLE bench_device_user ADD PRIMARY KEY (device_id, user_id)"
+        )
+        connection.execute(
+            "CREATE INDEX ON bench_device_user (user_id, device_id)"
+        )
+        connection.execute("ANALYZE bench_device_user")
+        after = (
+            _time_lookups(connection, by_device, keys),
+            _time_lookups(connection, by_user, keys),
+        )
+        connection.execute("DROP TABLE bench_device_user")
+
+    print(
+        f"{size:>10} | {before[0]:>12.3f} | {after[0]:>12.3f} "
+        f"| {before[1]:>12.3f} | {after[1]:>12.3f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    args = parser.parse_args()
+
+    print("milliseconds per lookup, averaged over", LOOKUPS, "random keys")
+    print(
+        f"{'rows':>10} | {'device, bare':>12} | {'device, pk':>12} "
+        f"| {'user, bare':>12} | {'user, index':>12}"
+    )
+    for size in args.sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Times the listing endpoints against whatever rows are in the database, rendered with
+orjson and with the standard library json module, and compares `to_json` encoding
+the mapped columns against jsonable_encoder introspecting the whole row.
+
+    python -m backend.benchmarks.bench_listing_endpoints --requests 20
+
+The requests go through a TestClient in this process, as the default superuser, so
+the timings are the application's and not the network's. The listings return every
+row, so load the database with devices and users first for the numbers to mean much.
+"""
+import argparse
+import time
+from typing import Callable, Dict
+
+from backend.app.api import responses
+from backend.app.core.settings import settings
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.session import SessionLocal
+from backend.app.main import app
+from backend.app.models.user import User
+from fastapi.encoders import jsonable_encoder
+from starlette.testclient import TestClient
+
+API_URL_PREFIX = settings.API_URL_PREFIX
+FIRST_SUPERUSER_EMAIL = settings.FIRST_SUPERUSER_EMAIL
+
+LISTINGS = {
+    "devices": f"{API_URL_PREFIX}/devices/",
+    "users": f"{API_URL_PREFIX}/users/all/",
+    "agents": f"{API_URL_PREFIX}/agents/all_agents",
+}
+
+
+def _time(call: Callable[[], object], repeat: int) -> float:
+    call()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _time_listings(client: TestClient, headers: Dict[str, str], requests: int):
+    for name, url in LISTINGS.items():
+        response = client.get(url, headers=headers)
+        response.raise_for_status()
+        rows, size = len(response.json()), len(response.content)
+        print(
+            f"  {name:<8} {rows:>6} rows {size / 1024:>8.0f} KB "
+            f"{_time(lambda: client.get(url, headers=headers), requests):>8.1f} ms"
+        )
+
+
+def run(requests: int) -> None:
+    db = SessionLocal()
+    try:
+        superuser = user_repo.get_by_email(db, email=FIRST_SUPERUSER_EMAIL)
+        if superuser is None:
+            raise SystemExit("the default superuser does not exist, run the bootstrap first")
+        headers = {"Authorization": f"Token {superuser.generate_jwt()}"}
+
+        users = db.query(User).all()
+        print(f"to_json over {len(users)} users")
+        print(
+            "  jsonable_encoder(row) "
+            f"{_time(lambda: [jsonable_encoder(user) for user in users], requests):>8.1f} ms"
+        )
+        print(
+            "  to_json()             "
+            f"{_time(lambda: [user.to_json() for user in users], requests):>8.1f} ms"
+        )
+    finally:
+        db.close()
+
+    client = TestClient(app)
+    orjson = responses.orjson
+    if orjson is not None:
+        print("listings rendered with orjson")
+        _time_listings(client, headers, requests)
+    responses.orjson = None
+    try:
+        print("listings rendered with json")
+        _time_listings(client, headers, requests)
+    finally:
+        responses.orjson = orjson
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+    run(args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Measures how many emails per second the Postmark clients get through against a local
+stand-in for the API, from a new client per email, as the routes used to send them,
+to the shared pooled client, the async client and batch requests.
+
+    python -m backend.benchmarks.bench_postmark_client --emails 2000 --concurrency 10
+
+The stand-in answers over plain HTTP on localhost, so a new connection costs a TCP
+handshake but no TLS one; against api.postmarkapp.com the gap between a new client
+per email and the pooled ones is wider than measured here.
+"""
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from backend.app.services.postmark import (
+    POSTMARK_BATCH_SIZE,
+    AsyncPostmarkClient,
+    PostmarkClient,
+)
+from backend.tests.fake_postmark import FakePostmarkServer
+
+SERVER_TOKEN = "benchmark"
+
+
+def _messages(count: int) -> List[Dict[str, Any]]:
+    return [
+        {
+            "TemplateId": 1,
+            "TemplateModel": {"name": f"user {i}"},
+            "From": "sender@example.com",
+            "To": f"user{i}@example.com",
+        }
+        for i in range(count)
+    ]
+
+
+def _client(url: str, concurrency: int) -> PostmarkClient:
+    return PostmarkClient(
+        server_token=SERVER_TOKEN, api_url=url, max_connections=concurrency
+    )
+
+
+def client_per_email(url: str, messages, concurrency: int):
+    def send(message):
+        client = _client(url, 1)
+        try:
+            client.send_with_template(message)
+        finally:
+            client.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, messages))
+
+
+def shared_client(url: str, messages, concurrency: int):
+    client = _client(url, concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client.send_with_template, messages))
+    client.close()
+
+
+def async_client(url: str, messages, concurrency: int):
+    async def send_all():
+        client = AsyncPostmarkClient(
+            SERVER_TOKEN, api_url=url, max_connections=concurrency
+        )
+        try:
+            await asyncio.gather(*map(client.send_with_template, messages))
+        finally:
+            await client.aclose()
+
+    asyncio.run(send_all())
+
+
+def batches(url: str, messages, concurrency: int):
+    client = _client(url, concurrency)
+    for start in range(0, len(messages), POSTMARK_BATCH_SIZE):
+        client.send_batch_with_templates(messages[start : start + POSTMARK_BATCH_SIZE])
+    client.close()
+
+
+SENDERS: Dict[str, Callable] = {
+    "client per email": client_per_email,
+    "shared client": shared_client,
+    "async client": async_client,
+    "batch requests": batches,
+}
+
+
+def run(emails: int, concurrency: int) -> None:
+    fake = FakePostmarkServer().start()
+    try:
+        messages = _messages(emails)
+        print(f"{emails} emails, {concurrency} at a time")
+        print(f"{'sender':<20}{'emails/s':>12}{'connections':>14}")
+        for name, send in SENDERS.items():
+            fake.connections = 0
+            start = time.perf_counter()
+            send(fake.url, messages, concurrency)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<20}{emails / elapsed:>12.0f}{fake.connections:>14}")
+    finally:
+        fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    run(args.emails, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
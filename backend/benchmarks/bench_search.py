@@ -0,0 +1,164 @@
+"""
+Times the search queries over a seeded dataset of a million devices, with the
+pg_trgm indexes and with the planner kept off them, as a scan of every row would be.
+
+    python -m backend.benchmarks.bench_search --devices 1000000 --users 200000 --agents 50
+
+The devices and users are inserted with INSERT ... SELECT over generate_series,
+spread evenly over `--agents` new agents, and deleted again at the end. Every search
+runs through the repositories, the same queries the search endpoints run, once for
+the whole fleet and once scoped to one agent.
+"""
+import argparse
+import time
+from typing import Callable, List
+
+import backend.app.db.base  # noqa: F401, maps every model
+from backend.app.core.settings import settings
+from backend.app.db.repositories.agent import agent_repo
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.repositories.user_type import user_type as user_type_repo
+from backend.app.db.session import SessionLocal
+from backend.app.services.security import get_password_hash
+from sqlalchemy.orm import Session
+
+AGENT = settings.AGENT
+AGENT_OFFICER = settings.AGENT_OFFICER
+FIRST_SUPERUSER_EMAIL = settings.FIRST_SUPERUSER_EMAIL
+MARKER = "benchsearch"
+SEARCHES = [
+    ("devices, mac id prefix", device_repo, "3a:7f"),
+    ("devices, misspelt name", device_repo, "kiosk-lekki-0042"),
+    ("users, email prefix", user_repo, f"{MARKER}.officer.12345"),
+    ("users, misspelt name", user_repo, "Adebayo Okonkwo 1234"),
+    ("agents, name prefix", agent_repo, f"{MARKER} agent 1"),
+]
+
+
+def _seed(db: Session, devices: int, users: int, agents: int) -> List[int]:
+    superuser = user_repo.get_by_email(db, email=FIRST_SUPERUSER_EMAIL)
+    agent_ids = [
+        agent_id
+        for agent_id, in db.execute(
+            "INSERT INTO agent (name, email, address, user_type_id, created_by_id) "
+            "SELECT :marker || ' agent ' || n, :marker || n || '@example.com', "
+            "'bench', :user_type_id, :creator_id FROM generate_series(1, :agents) n "
+            "RETURNING id",
+            {
+                "marker": MARKER,
+                "user_type_id": user_type_repo.get_by_name(db, name=AGENT).id,
+                "creator_id": superuser.id,
+                "agents": agents,
+            },
+        )
+    ]
+    # mac ids are hex pairs derived from n, names read like the ones operators type
+    db.execute(
+        "INSERT INTO device (name, mac_id, is_active, creator_id, agent_id) "
+        "SELECT 'kiosk-' || (ARRAY['ikeja', 'lekki', 'yaba', 'surulere'])[n % 4 + 1] "
+        "|| '-' || lpad(n::text, 7, '0') || '-' || :marker, "
+        "substr(md5(n::text), 1, 2) || ':' || substr(md5(n::text), 3, 2) || ':' || "
+        "substr(md5(n::text), 5, 2) || ':' || lpad(to_hex(n), 8, '0'), "
+        "n % 3 = 0, :creator_id, (:agent_ids)[n % :agents + 1] "
+        "FROM generate_series(1, :devices) n",
+        {
+            "marker": MARKER,
+            "creator_id": superuser.id,
+            "agent_ids": agent_ids,
+            "agents": agents,
+            "devices": devices,
+        },
+    )
+    db.execute(
+        "INSERT INTO \"user\" (first_name, last_name, email, phone, lasrra_id, "
+        "hashed_password, address, is_active, agent_id, user_type_id) "
+        "SELECT (ARRAY['Adebayo', 'Chioma', 'Emeka', 'Funke'])[n % 4 + 1], "
+        "(ARRAY['Okonkwo', 'Adeyemi', 'Balogun', 'Nwosu'])[n / 4 % 4 + 1] || ' ' || n, "
+        ":marker || '.officer.' || n || '@example.com', "
+        "'+234' || lpad(n::text, 10, '0'), :marker || lpad(n::text, 10, '0'), "
+        ":hashed_password, 'bench', true, (:agent_ids)[n % :agents + 1], "
+        ":user_type_id FROM generate_series(1, :users) n",
+        {
+            "marker": MARKER,
+            "hashed_password": get_password_hash("password"),
+            "agent_ids": agent_ids,
+            "agents": agents,
+            "user_type_id": user_type_repo.get_by_name(db, name=AGENT_OFFICER).id,
+            "users": users,
+        },
+    )
+    db.commit()
+    db.execute("ANALYZE device")
+    db.execute('ANALYZE "user"')
+    db.execute("ANALYZE agent")
+    return agent_ids
+
+
+def _delete(db: Session, agent_ids: List[int]):
+    db.execute("DELETE FROM device WHERE agent_id = ANY(:ids)", {"ids": agent_ids})
+    db.execute('DELETE FROM "user" WHERE agent_id = ANY(:ids)', {"ids": agent_ids})
+    db.execute("DELETE FROM agent WHERE id = ANY(:ids)", {"ids": agent_ids})
+    db.commit()
+
+
+def _time(call: Callable[[], object], repeat: int) -> float:
+    call()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _time_searches(db: Session, agent_id: int, repeat: int):
+    for name, repo, text in SEARCHES:
+        timings = [
+            _time(
+                lambda: repo.search(
+                    db, text=text, agent_id=scope, page=1, page_size=20
+                ),
+                repeat,
+            )
+            for scope in (None, agent_id)
+        ]
+        print(f"  {name:<26} {timings[0]:>10.1f} ms {timings[1]:>10.1f} ms")
+
+
+def run(devices: int, users: int, agents: int, repeat: int) -> None:
+    db = SessionLocal()
+    start = time.perf_counter()
+    agent_ids = _seed(db, devices, users, agents)
+    print(
+        f"seeded {devices} devices and {users} users over {agents} agents "
+        f"in {time.perf_counter() - start:.0f}s"
+    )
+    try:
+        header = f"  {'':<26} {'fleet':>13} {'one agent':>13}"
+        print(f"with the trigram indexes, mean of {repeat}")
+        print(header)
+        _time_searches(db, agent_ids[0], repeat)
+
+        # the page still has to be ranked, so what the indexes save is the scan
+        db.execute("SET enable_bitmapscan = off")
+        db.execute("SET enable_indexscan = off")
+        print(f"scanning every row, mean of {repeat}")
+        print(header)
+        _time_searches(db, agent_ids[0], repeat)
+        db.rollback()
+    finally:
+        _delete(db, agent_ids)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.devices, args.users, args.agents, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Measures requests per second through the process launcher for a matrix of worker
+counts and threadpool sizes.
+
+    python -m backend.benchmarks.bench_server_workers --workers 1 2 4 8 --threadpools 5 20
+
+Each combination starts `python -m backend.app.commands.serve`, then keeps
+`--connections` keep-alive connections busy requesting `--path` for `--duration`
+seconds. The default path, the readiness check, runs a query on the threadpool like
+most endpoints do without needing credentials. The load comes from this process,
+so on a machine with few cores it competes with the workers for them.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from backend.app.core.settings import settings
+
+API_URL_PREFIX = settings.API_URL_PREFIX
+
+
+def _start_server(port: int, workers: int, threadpool: int) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "backend.app.commands.serve",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+            "--threadpool-size",
+            str(threadpool),
+            "--max-requests",
+            "0",
+        ],
+        env=dict(os.environ, DB_BOOTSTRAP_MODE="off"),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            # the master listens before its workers have started
+            time.sleep(1 + workers * 0.5)
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("the server did not start listening")
+
+
+async def _client(port: int, path: str, until: float, latencies: List[float]):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode()
+    try:
+        while time.perf_counter() < until:
+            start = time.perf_counter()
+            writer.write(request)
+            headers = await reader.readuntil(b"\r\n\r\n")
+            length = next(
+                int(line.split(b":")[1])
+                for line in headers.split(b"\r\n")
+                if line.lower().startswith(b"content-length")
+            )
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def _load(
+    port: int, path: str, connections: int, duration: float
+) -> Tuple[List[float], float]:
+    latencies: List[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(_client(port, path, start + duration, latencies) for _ in range(connections))
+    )
+    # requests still in flight when the time is up are waited for
+    return latencies, time.perf_counter() - start
+
+
+def _measure(
+    port: int, workers: int, threadpool: int, path: str, connections: int, duration: float
+) -> Tuple[float, float, float]:
+    server = _start_server(port, workers, threadpool)
+    try:
+        asyncio.run(_load(port, path, connections, 1))
+        latencies, elapsed = asyncio.run(_load(port, path, connections, duration))
+    finally:
+        server.terminate()
+        server.wait()
+    latencies.sort()
+    return (
+        len(latencies) / elapsed,
+        latencies[len(latencies) // 2] * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+    )
+
+
+def run(
+    workers: List[int],
+    threadpools: List[int],
+    path: str,
+    connections: int,
+    duration: float,
+    port: int,
+) -> None:
+    print(f"{connections} connections on {path} for {duration:.0f}s, {os.cpu_count()} CPUs")
+    print(f"  {'workers':>7} {'threads':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for worker_count in workers:
+        for threadpool in threadpools:
+            rate, p50, p99 = _measure(
+                port, worker_count, threadpool, path, connections, duration
+            )
+            print(
+                f"  {worker_count:>7} {threadpool:>7} {rate:>8.0f} {p50:>8.1f} {p99:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threadpools", type=int, nargs="+", default=[5, 20])
+    parser.add_argument("--path", default=f"{API_URL_PREFIX}/health/ready")
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    run(
+        args.workers,
+        args.threadpools,
+        args.path,
+        args.connections,
+        args.duration,
+        args.port,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Set
+
+INACTIVE_RECIPIENT_ERRORCODE = 406
+
+
+class FakePostmarkServer:
+    """
+    A local stand-in for the Postmark API, serving email/withTemplate and
+    email/batchWithTemplates.
+    It records every batch it receives, rejects the messages sent to
+    `failing_recipients`, and answers every request with a 500 while `is_down` is set.
+    """
+
+    def __init__(self):
+        self.batches: List[List[Dict[str, Any]]] = []
+        self.failing_recipients: Set[str] = set()
+        self.is_down = False
+        self.connections = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/"
+
+    @property
+    def sent_messages(self) -> List[Dict[str, Any]]:
+        return [message for batch in self.batches for message in batch]
+
+    def start(self) -> "FakePostmarkServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _respond_to_batch(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.batches.append(messages)
+        return [
+            {
+                "ErrorCode": INACTIVE_RECIPIENT_ERRORCODE,
+                "Message": "You tried to send to a recipient that has been marked "
+                "as inactive.",
+            }
+            if message["To"] in self.failing_recipients
+            else {
+                "ErrorCode": 0,
+                "Message": "OK",
+                "MessageID": str(uuid.uuid4()),
+                "To": message["To"],
+            }
+            for message in messages
+        ]
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keeps connections open between requests, like the real API
+            protocol_version = "HTTP/1.1"
+            # the headers and body go out in separate writes, which Nagle's algorithm
+            # would hold back until the client acknowledges the first one
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                fake.connections += 1
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if fake.is_down:
+                    self._reply(500, {"ErrorCode": 500, "Message": "Server error"})
+                elif not self.headers.get("X-Postmark-Server-Token"):
+                    self._reply(401, {"ErrorCode": 10, "Message": "No API token"})
+                elif self.path == "/email/batchWithTemplates":
+                    self._reply(200, fake._respond_to_batch(body["Messages"]))
+                elif self.path == "/email/withTemplate":
+                    self._reply(200, fake._respond_to_batch([body])[0])
+                else:
+                    self._reply(404, {"ErrorCode": 404, "Message": "Not Found"})
+
+            def _reply(self, status: int, payload: Any):
+                content = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
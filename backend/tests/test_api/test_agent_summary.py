@@ -0,0 +1,128 @@
+from typing import Dict
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.models.agent import Agent
+from backend.app.models.device import Device, device_user_link
+from backend.app.models.user import User
+from backend.app.models.user_type import UserType
+from backend.tests.utils import (
+    create_agent,
+    create_device,
+    create_user_with_type,
+    generate_header_from_user_obj,
+    get_default_superuser,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_200_OK, HTTP_403_FORBIDDEN
+
+AGENT_MANAGER = settings.AGENT_MANAGER
+AGENT_OFFICER = settings.AGENT_OFFICER
+AGENT_SUPERVISOR = settings.AGENT_SUPERVISOR
+API_URL_PREFIX = settings.API_URL_PREFIX
+
+
+def _count(db: Session, agent_id: int) -> Dict[str, int]:
+    """Counts what agent_summary keeps, the slow way."""
+    devices = db.query(Device).filter(
+        Device.agent_id == agent_id, Device.deleted.isnot(True)
+    )
+    users = (
+        db.query(User)
+        .join(UserType)
+        .filter(User.agent_id == agent_id, User.deleted.isnot(True))
+    )
+    return {
+        "agent_id": agent_id,
+        "active_devices": devices.filter(Device.is_active.is_(True)).count(),
+        "inactive_devices": devices.filter(Device.is_active.isnot(True)).count(),
+        "unassigned_devices": devices.filter(
+            ~exists().where(device_user_link.c.device_id == Device.id)
+        ).count(),
+        "officers": users.filter(UserType.name == AGENT_OFFICER).count(),
+        "supervisors": users.filter(UserType.name == AGENT_SUPERVISOR).count(),
+    }
+
+
+def _create_employee(db: Session, type_: str, agent_id: int) -> User:
+    user = create_user_with_type(db, type_)
+    return user_repo.update(db, db_obj=user, obj_in={"agent_id": agent_id})
+
+
+def test_agent_summary_follows_devices_links_and_employees(
+    client: TestClient, db: Session
+):
+    agent, other_agent = create_agent(db), create_agent(db)
+    officers = [_create_employee(db, AGENT_OFFICER, agent.id) for _ in range(3)]
+    supervisor = _create_employee(db, AGENT_SUPERVISOR, agent.id)
+    devices = [create_device(db, agent_id=agent.id, active=False) for _ in range(4)]
+    device_repo.activate_device(db, device_obj=devices[0])
+    device_repo.add_assigned_users(db, device_obj=devices[1], user_objs=officers[:2])
+    device_repo.add_assigned_user(db, device_obj=devices[2], user_obj=officers[2])
+    device_repo.remove_assigned_user(db, device_obj=devices[1], user_obj=officers[0])
+    device_repo.remove_assigned_user(db, device_obj=devices[2], user_obj=officers[2])
+    device_repo.update(db, db_obj=devices[3], obj_in={"agent_id": other_agent.id})
+    user_repo.update(db, db_obj=officers[2], obj_in={"agent_id": other_agent.id})
+    user_repo.update(db, db_obj=supervisor, obj_in={"deleted": True})
+
+    superuser = get_default_superuser(db)
+    for agent_id in (agent.id, other_agent.id):
+        r = client.get(
+            f"{API_URL_PREFIX}/agents/agent_summary/{agent_id}",
+            headers=generate_header_from_user_obj(superuser),
+        )
+        assert r.status_code == HTTP_200_OK
+        assert r.json() == _count(db, agent_id)
+
+    assert r.json() == {
+        "agent_id": other_agent.id,
+        "active_devices": 0,
+        "inactive_devices": 1,
+        "unassigned_devices": 1,
+        "officers": 1,
+        "supervisors": 0,
+    }
+
+
+def test_manager_can_only_view_their_own_agent_summary(
+    client: TestClient, db: Session
+):
+    agent, other_agent = create_agent(db), create_agent(db)
+    manager = user_repo.activate(
+        db, db_obj=_create_employee(db, AGENT_MANAGER, agent.id)
+    )
+
+    r = client.get(
+        f"{API_URL_PREFIX}/agents/agent_summary/{other_agent.id}",
+        headers=generate_header_from_user_obj(manager),
+    )
+    assert r.status_code == HTTP_403_FORBIDDEN
+
+    r = client.get(
+        f"{API_URL_PREFIX}/agents/agent_summary/{agent.id}",
+        headers=generate_header_from_user_obj(manager),
+    )
+    assert r.status_code == HTTP_200_OK
+
+
+def test_system_summary_adds_up_every_agent(client: TestClient, db: Session):
+    agent = create_agent(db)
+    create_device(db, agent_id=agent.id)
+    _create_employee(db, AGENT_OFFICER, agent.id)
+
+    r = client.get(
+        f"{API_URL_PREFIX}/agents/summary",
+        headers=generate_header_from_user_obj(get_default_superuser(db)),
+    )
+
+    assert r.status_code == HTTP_200_OK
+    summary = r.json()
+    agent_ids = [agent_id for agent_id, in db.query(Agent.id)]
+    assert summary.pop("agents") == len(agent_ids)
+    counts = [_count(db, agent_id) for agent_id in agent_ids]
+    assert summary == {
+        counter: sum(count[counter] for count in counts) for counter in summary
+    }
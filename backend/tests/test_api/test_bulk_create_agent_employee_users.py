@@ -0,0 +1,183 @@
+import csv
+import io
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.repositories.user_type import user_type as user_type_repo
+from backend.app.models.email import Email
+from backend.app.services.onboarding import (
+    onboard_agent_employee_users,
+    parse_users_csv,
+)
+from backend.tests.utils import (
+    create_agent,
+    generate_header_from_user_obj,
+    generate_user_payload,
+    get_agent_employee_user,
+    get_default_superuser,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_403_FORBIDDEN,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+AGENT_MANAGER = settings.AGENT_MANAGER
+
+
+def generate_agent_employee_payload(db: Session, agent_id: int):
+    officer_type = user_type_repo.get_by_name(db, name=AGENT_OFFICER)
+    return {
+        **generate_user_payload(),
+        "user_type_id": officer_type.id,
+        "agent_id": agent_id,
+    }
+
+
+def test_bulk_create_agent_employee_users_as_superuser(
+    db: Session, client: TestClient
+):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    users_data = [generate_agent_employee_payload(db, agent.id) for _ in range(10)]
+
+    r = client.post(
+        "/api/users/bulk_create_agent_employee_users",
+        json=users_data,
+        headers=generate_header_from_user_obj(superuser),
+    )
+    resp_body = r.json()
+
+    assert HTTP_200_OK <= r.status_code <= HTTP_201_CREATED
+    assert resp_body["succeeded"] == 10
+    assert resp_body["failed"] == 0
+
+    for user_data, result in zip(users_data, resp_body["results"]):
+        assert result["success"]
+        user = user_repo.get_by_email(db, email=user_data["email"])
+        assert user
+        assert user.id == result["id"]
+        assert user.agent_id == agent.id
+        assert user.created_by_id == superuser.id
+        assert user.user_type.name == AGENT_OFFICER
+        assert user.verify_password(user_data["password"])
+        welcome_email = db.query(Email).filter(Email.recipient == user.email).first()
+        assert welcome_email
+        # queued in the outbox for the email dispatcher
+        assert welcome_email.next_attempt_at is not None
+
+
+def test_bulk_create_agent_employee_users_reports_failures_per_row(
+    db: Session, client: TestClient
+):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    manager_type = user_type_repo.get_by_name(db, name=AGENT_MANAGER)
+    existing_user = get_agent_employee_user(db)
+    duplicated_email_payload = generate_agent_employee_payload(db, agent.id)
+    users_data = [
+        generate_agent_employee_payload(db, agent.id),
+        {**generate_agent_employee_payload(db, agent.id), "email": existing_user.email},
+        duplicated_email_payload,
+        {
+            **generate_agent_employee_payload(db, agent.id),
+            "email": duplicated_email_payload["email"],
+        },
+        {**generate_agent_employee_payload(db, agent.id), "lasrra_id": "LA0000000001"},
+        {**generate_agent_employee_payload(db, agent.id), "phone": "12"},
+        {
+            **generate_agent_employee_payload(db, agent.id),
+            "user_type_id": manager_type.id,
+        },
+        generate_agent_employee_payload(db, -1),
+    ]
+
+    r = client.post(
+        "/api/users/bulk_create_agent_employee_users",
+        json=users_data,
+        headers=generate_header_from_user_obj(superuser),
+    )
+    resp_body = r.json()
+
+    assert HTTP_200_OK <= r.status_code <= HTTP_201_CREATED
+    assert resp_body["succeeded"] == 1
+    assert resp_body["failed"] == 7
+    results = resp_body["results"]
+    assert results[0]["success"]
+    assert "already exists" in results[1]["detail"]
+    assert "more than once" in results[2]["detail"]
+    assert "more than once" in results[3]["detail"]
+    assert "invalid lasrra id" in results[4]["detail"]
+    assert "invalid phone number" in results[5]["detail"]
+    assert "Supervisor" in results[6]["detail"]
+    assert "does not exist" in results[7]["detail"]
+    assert not user_repo.get_by_email(db, email=duplicated_email_payload["email"])
+
+
+def test_bulk_create_agent_employee_users_with_too_many_rows_is_rejected(
+    db: Session, client: TestClient
+):
+    agent = create_agent(db)
+    users_data = [
+        generate_agent_employee_payload(db, agent.id)
+        for _ in range(settings.BULK_MAX_ROWS + 1)
+    ]
+
+    r = client.post(
+        "/api/users/bulk_create_agent_employee_users",
+        json=users_data,
+        headers=generate_header_from_user_obj(get_default_superuser(db)),
+    )
+
+    assert r.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+    assert user_repo.get_by_email(db, email=users_data[0]["email"]) is None
+
+
+def test_bulk_create_agent_employee_users_as_agent_employee_is_forbidden(
+    db: Session, client: TestClient
+):
+    agent_employee = get_agent_employee_user(db)
+    users_data = [generate_agent_employee_payload(db, agent_employee.agent_id or 1)]
+
+    r = client.post(
+        "/api/users/bulk_create_agent_employee_users",
+        json=users_data,
+        headers=generate_header_from_user_obj(agent_employee),
+    )
+
+    assert r.status_code == HTTP_403_FORBIDDEN
+    assert not user_repo.get_by_email(db, email=users_data[0]["email"])
+
+
+def test_onboarding_from_csv_reports_malformed_rows(db: Session):
+    agent = create_agent(db)
+    rows = [
+        generate_agent_employee_payload(db, agent.id),
+        {**generate_agent_employee_payload(db, agent.id), "email": "not-an-email"},
+        {**generate_agent_employee_payload(db, agent.id), "agent_id": "not-an-id"},
+        {**generate_agent_employee_payload(db, agent.id), "lasrra_id": ""},
+    ]
+    content = io.StringIO()
+    writer = csv.DictWriter(content, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+
+    report, welcome_emails = onboard_agent_employee_users(
+        db,
+        users_in=parse_users_csv(content.getvalue().encode()),
+        creator=get_default_superuser(db),
+    )
+
+    assert report.succeeded == 1
+    assert [result.row for result in report.results] == [0, 1, 2, 3]
+    assert [result.email for result in report.results] == [
+        row["email"] for row in rows
+    ]
+    assert report.results[1].detail.startswith("email")
+    assert report.results[2].detail.startswith("agent_id")
+    assert "invalid lasrra id" in report.results[3].detail
+    assert [email for email, _ in welcome_emails] == [rows[0]["email"]]
@@ -0,0 +1,161 @@
+from typing import List
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.session import engine
+from backend.app.models.device import Device
+from backend.app.models.device_notification import DeviceNotification
+from backend.app.models.device_user_change import (
+    DEVICE_USER_MODIFIED,
+    DEVICE_USER_REMOVED,
+    DeviceUserChange,
+)
+from backend.tests.utils import (
+    create_agent,
+    create_device,
+    create_user_with_type,
+    get_superuser_auth_header,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+AGENT_SUPERVISOR = settings.AGENT_SUPERVISOR
+AGENT_MANAGER = settings.AGENT_MANAGER
+API_URL_PREFIX = settings.API_URL_PREFIX
+
+
+def _pending_notifications(db: Session, device: Device) -> int:
+    return (
+        db.query(DeviceNotification)
+        .filter(
+            DeviceNotification.mac_id == device.mac_id,
+            DeviceNotification.sent_at.is_(None),
+        )
+        .count()
+    )
+
+
+def test_users_are_moved_and_unassigned_in_one_transaction(
+    client: TestClient, db: Session
+):
+    shared, other = create_device(db), create_device(db)
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    supervisor = create_user_with_type(db, AGENT_SUPERVISOR)
+    manager = create_user_with_type(db, AGENT_MANAGER)
+    device_repo.add_assigned_users(db, device_obj=shared, user_objs=[officer, supervisor])
+    device_repo.add_assigned_users(db, device_obj=other, user_objs=[officer, manager])
+    notified = {d.id: _pending_notifications(db, d) for d in (shared, other)}
+    agent = create_agent(db)
+
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, *_):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        r = client.post(
+            f"{API_URL_PREFIX}/users/change_agent/{agent.id}",
+            json=[officer.id, supervisor.id, manager.id, 0],
+            headers=get_superuser_auth_header(db),
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert r.status_code == HTTP_200_OK
+    report = r.json()
+    assert (report["succeeded"], report["failed"]) == (2, 2)
+    assert [result["success"] for result in report["results"]] == [
+        True,
+        True,
+        False,
+        False,
+    ]
+
+    for user in (officer, supervisor, manager):
+        db.refresh(user)
+    assert officer.agent_id == supervisor.agent_id == agent.id
+    assert manager.agent_id != agent.id
+
+    assert len([s for s in statements if s.startswith("DELETE FROM device_user")]) == 1
+    assert not device_repo.has_assigned_user(db, device_id=shared.id, user_id=officer.id)
+    assert not device_repo.has_assigned_user(
+        db, device_id=shared.id, user_id=supervisor.id
+    )
+    assert device_repo.has_assigned_user(db, device_id=other.id, user_id=manager.id)
+    # the move is in the change log, ahead of the unlink it led to
+    changes = [
+        change
+        for change, in db.query(DeviceUserChange.change)
+        .filter(
+            DeviceUserChange.device_id == shared.id,
+            DeviceUserChange.user_id == officer.id,
+        )
+        .order_by(DeviceUserChange.id)
+    ]
+    assert changes[-2:] == [DEVICE_USER_MODIFIED, DEVICE_USER_REMOVED]
+    # one notification per device, however many of its users moved
+    assert _pending_notifications(db, shared) == notified[shared.id] + 1
+    assert _pending_notifications(db, other) == notified[other.id] + 1
+
+
+def test_a_user_already_with_the_agent_keeps_their_devices(
+    client: TestClient, db: Session
+):
+    device = create_device(db)
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    agent = create_agent(db)
+    user_repo.set_agent_id(db, user_ids=[officer.id], agent_id=agent.id)
+    db.commit()
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=officer)
+
+    r = client.post(
+        f"{API_URL_PREFIX}/users/{officer.id}/change_agent/{agent.id}",
+        headers=get_superuser_auth_header(db),
+    )
+
+    assert r.status_code == HTTP_200_OK
+    assert r.json()["agent_id"] == agent.id
+    assert device_repo.has_assigned_user(db, device_id=device.id, user_id=officer.id)
+
+
+def test_only_agent_employees_can_change_agent(client: TestClient, db: Session):
+    manager = create_user_with_type(db, AGENT_MANAGER)
+    agent = create_agent(db)
+    headers = get_superuser_auth_header(db)
+
+    r = client.post(
+        f"{API_URL_PREFIX}/users/{manager.id}/change_agent/{agent.id}", headers=headers
+    )
+    assert r.status_code == HTTP_403_FORBIDDEN
+
+    r = client.post(
+        f"{API_URL_PREFIX}/users/change_agent/0", json=[manager.id], headers=headers
+    )
+    assert r.status_code == HTTP_404_NOT_FOUND
+
+
+def test_changing_the_agent_of_too_many_users_is_rejected(
+    client: TestClient, db: Session
+):
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    agent = create_agent(db)
+
+    r = client.post(
+        f"{API_URL_PREFIX}/users/change_agent/{agent.id}",
+        json=[officer.id] * (settings.BULK_MAX_ROWS + 1),
+        headers=get_superuser_auth_header(db),
+    )
+
+    assert r.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+    db.refresh(officer)
+    assert officer.agent_id != agent.id
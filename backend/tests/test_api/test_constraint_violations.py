@@ -0,0 +1,95 @@
+from typing import List
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.session import engine
+from backend.tests.utils import (
+    create_agent,
+    generate_user_payload,
+    get_superuser_auth_header,
+    random_string,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+
+API_URL_PREFIX = settings.API_URL_PREFIX
+
+
+def record_statements(client: TestClient, *args, **kwargs):
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, *_):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        return client.post(*args, **kwargs), statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_a_duplicate_device_is_rejected_by_its_constraint(
+    client: TestClient, db: Session
+):
+    agent = create_agent(db)
+    device = {"mac_id": random_string(), "name": random_string(), "agent_id": agent.id}
+    headers = get_superuser_auth_header(db)
+
+    r = client.post(f"{API_URL_PREFIX}/devices/", json=device, headers=headers)
+    assert r.status_code == HTTP_200_OK
+
+    r, statements = record_statements(
+        client,
+        f"{API_URL_PREFIX}/devices/",
+        json={**device, "name": random_string()},
+        headers=headers,
+    )
+    assert r.status_code == HTTP_400_BAD_REQUEST
+    assert r.json()["errors"][0]["message"] == (
+        f"device with mac id {device['mac_id']} already exists"
+    )
+    # no lookup of the device before the insert
+    assert not [s for s in statements if s.startswith("SELECT") and "FROM device" in s]
+
+    r = client.post(
+        f"{API_URL_PREFIX}/devices/",
+        json={**device, "mac_id": random_string()},
+        headers=headers,
+    )
+    assert r.json()["errors"][0]["message"] == (
+        f"device with name {device['name']} already exists"
+    )
+
+
+def test_a_device_for_a_missing_agent_is_rejected_by_its_foreign_key(
+    client: TestClient, db: Session
+):
+    r = client.post(
+        f"{API_URL_PREFIX}/devices/",
+        json={"mac_id": random_string(), "name": random_string(), "agent_id": 0},
+        headers=get_superuser_auth_header(db),
+    )
+
+    assert r.status_code == HTTP_400_BAD_REQUEST
+    assert r.json()["errors"][0]["message"] == "agent with id 0 does not exist"
+
+
+def test_a_user_reusing_a_phone_is_rejected_by_its_constraint(
+    client: TestClient, db: Session
+):
+    user = {**generate_user_payload(), "agent_id": create_agent(db).id}
+    headers = get_superuser_auth_header(db)
+    url = f"{API_URL_PREFIX}/users/create_agent_manager_user"
+
+    assert client.post(url, json=user, headers=headers).status_code == HTTP_200_OK
+    duplicate = {**generate_user_payload(), "agent_id": user["agent_id"]}
+    duplicate["phone"] = user["phone"]
+    r = client.post(url, json=duplicate, headers=headers)
+
+    assert r.status_code == HTTP_400_BAD_REQUEST
+    assert r.json()["errors"][0]["message"] == (
+        f"user with phone {user['phone']} already exists"
+    )
+    assert user_repo.get_by_email(db, email=duplicate["email"]) is None
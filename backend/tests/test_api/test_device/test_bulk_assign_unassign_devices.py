@@ -0,0 +1,180 @@
+from collections import Counter
+from typing import List
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.schemas.device import DeviceCreate
+from backend.app.models.device_notification import DeviceNotification
+from backend.tests.utils import (
+    create_agent,
+    create_user_with_type,
+    generate_header_from_user_obj,
+    get_agent_employee_user,
+    get_default_superuser,
+    random_string,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_403_FORBIDDEN,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+AGENT_SUPERVISOR = settings.AGENT_SUPERVISOR
+
+
+def create_active_device(db: Session, creator_id: int, agent_id: int):
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=random_string(),
+            name=random_string(),
+            creator_id=creator_id,
+            agent_id=agent_id,
+        ),
+    )
+    return device_repo.activate_device(db, device_obj=device)
+
+
+def queued_notifications(db: Session, mac_ids: List[str]) -> Counter:
+    return Counter(
+        mac_id
+        for mac_id, in db.query(DeviceNotification.mac_id).filter(
+            DeviceNotification.mac_id.in_(mac_ids)
+        )
+    )
+
+
+def test_bulk_assign_and_unassign_devices(db: Session, client: TestClient):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    devices = [create_active_device(db, superuser.id, agent.id) for _ in range(2)]
+    officers = [create_user_with_type(db, AGENT_OFFICER) for _ in range(3)]
+    assignments = [
+        {"device_id": device.id, "user_id": officer.id}
+        for device in devices
+        for officer in officers
+    ]
+    mac_ids = [device.mac_id for device in devices]
+
+    r = client.post(
+        "/api/devices/assign/bulk",
+        json=assignments,
+        headers=generate_header_from_user_obj(superuser),
+    )
+    resp_body = r.json()
+
+    assert HTTP_200_OK <= r.status_code <= HTTP_201_CREATED
+    assert resp_body["succeeded"] == 6
+    assert resp_body["failed"] == 0
+    assert queued_notifications(db, mac_ids) == Counter(mac_ids)
+    for device in devices:
+        db.refresh(device)
+        assert set(device.assigned_users) == set(officers)
+
+    # assigning pairs that are already linked changes nothing and notifies no device
+    r = client.post(
+        "/api/devices/assign/bulk",
+        json=assignments,
+        headers=generate_header_from_user_obj(superuser),
+    )
+    assert r.json()["succeeded"] == 6
+    assert queued_notifications(db, mac_ids) == Counter(mac_ids)
+    for device in devices:
+        db.refresh(device)
+        assert len(device.assigned_users) == 3
+
+    r = client.post(
+        "/api/devices/unassign/bulk",
+        json=assignments[:2],
+        headers=generate_header_from_user_obj(superuser),
+    )
+    resp_body = r.json()
+
+    assert HTTP_200_OK <= r.status_code <= HTTP_201_CREATED
+    assert resp_body["succeeded"] == 2
+    assert queued_notifications(db, mac_ids) == Counter(mac_ids + [devices[0].mac_id])
+    db.refresh(devices[0])
+    db.refresh(devices[1])
+    assert devices[0].assigned_users == [officers[2]]
+    assert len(devices[1].assigned_users) == 3
+
+
+def test_bulk_assign_devices_reports_failures_per_row(
+    db: Session, client: TestClient
+):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    device = create_active_device(db, superuser.id, agent.id)
+    inactive_device = device_repo.deactivate_device(
+        db, device_obj=create_active_device(db, superuser.id, agent.id)
+    )
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    supervisor = create_user_with_type(db, AGENT_SUPERVISOR)
+    duplicated_officer = create_user_with_type(db, AGENT_OFFICER)
+    assignments = [
+        {"device_id": device.id, "user_id": officer.id},
+        {"device_id": device.id, "user_id": supervisor.id},
+        {"device_id": inactive_device.id, "user_id": officer.id},
+        {"device_id": -1, "user_id": officer.id},
+        {"device_id": device.id, "user_id": -1},
+        {"device_id": device.id, "user_id": duplicated_officer.id},
+        {"device_id": device.id, "user_id": duplicated_officer.id},
+    ]
+
+    r = client.post(
+        "/api/devices/assign/bulk",
+        json=assignments,
+        headers=generate_header_from_user_obj(superuser),
+    )
+    resp_body = r.json()
+
+    assert HTTP_200_OK <= r.status_code <= HTTP_201_CREATED
+    assert resp_body["succeeded"] == 1
+    assert resp_body["failed"] == 6
+    results = resp_body["results"]
+    assert results[0]["success"]
+    assert "not an agent Officer" in results[1]["detail"]
+    assert "not active" in results[2]["detail"]
+    assert "not found" in results[3]["detail"]
+    assert "not found" in results[4]["detail"]
+    assert "more than once" in results[5]["detail"]
+    db.refresh(device)
+    assert device.assigned_users == [officer]
+
+
+def test_bulk_assign_and_unassign_with_too_many_pairs_is_rejected(
+    db: Session, client: TestClient
+):
+    superuser = get_default_superuser(db)
+    device = create_active_device(db, superuser.id, create_agent(db).id)
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    assignments = [{"device_id": device.id, "user_id": officer.id}] * (
+        settings.BULK_MAX_ROWS + 1
+    )
+
+    for url in ("/api/devices/assign/bulk", "/api/devices/unassign/bulk"):
+        r = client.post(
+            url, json=assignments, headers=generate_header_from_user_obj(superuser)
+        )
+        assert r.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+
+    db.refresh(device)
+    assert device.assigned_users == []
+
+
+def test_bulk_assign_devices_as_agent_employee_is_forbidden(
+    db: Session, client: TestClient
+):
+    agent_employee = get_agent_employee_user(db)
+
+    r = client.post(
+        "/api/devices/assign/bulk",
+        json=[{"device_id": 1, "user_id": agent_employee.id}],
+        headers=generate_header_from_user_obj(agent_employee),
+    )
+
+    assert r.status_code == HTTP_403_FORBIDDEN
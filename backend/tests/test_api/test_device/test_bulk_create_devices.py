@@ -0,0 +1,208 @@
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_403_FORBIDDEN,
+    HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+from backend.app.core.settings import settings
+from backend.tests.utils import (
+    create_agent,
+    generate_header_from_user_obj,
+    get_agent_employee_user,
+    get_default_superuser,
+    random_string,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from backend.app.db.repositories.device import device_repo
+from backend.app.schemas.device import DeviceCreate
+
+
+def test_bulk_create_devices_as_superuser(db: Session, client: TestClient):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    devices_data = [
+        {"mac_id": random_string(), "name": random_string(), "agent_id": agent.id}
+        for _ in range(5)
+    ]
+
+    r = client.post(
+        "/api/devices/bulk",
+        json=devices_data,
+        headers=generate_header_from_user_obj(superuser),
+    )
+    resp_body = r.json()
+
+    assert HTTP_200_OK <= r.status_code <= HTTP_201_CREATED
+    assert resp_body["succeeded"] == 5
+    assert resp_body["failed"] == 0
+
+    for device_data, result in zip(devices_data, resp_body["results"]):
+        assert result["success"]
+        assert result["mac_id"] == device_data["mac_id"]
+        device = device_repo.get(db, id=result["id"])
+        assert device
+        assert device.agent_id == agent.id
+        assert device.creator_id == superuser.id
+
+
+def test_bulk_create_devices_reports_failures_per_row(
+    db: Session, client: TestClient
+):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    existing_device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=random_string(),
+            name=random_string(),
+            creator_id=superuser.id,
+            agent_id=agent.id,
+        ),
+    )
+    duplicated_mac_id = random_string()
+    devices_data = [
+        {"mac_id": random_string(), "name": random_string(), "agent_id": agent.id},
+        {
+            "mac_id": existing_device.mac_id,
+            "name": random_string(),
+            "agent_id": agent.id,
+        },
+        {"mac_id": duplicated_mac_id, "name": random_string(), "agent_id": agent.id},
+        {"mac_id": duplicated_mac_id, "name": random_string(), "agent_id": agent.id},
+        {"mac_id": random_string(), "name": random_string(), "agent_id": -1},
+    ]
+
+    r = client.post(
+        "/api/devices/bulk",
+        json=devices_data,
+        headers=generate_header_from_user_obj(superuser),
+    )
+    resp_body = r.json()
+
+    assert HTTP_200_OK <= r.status_code <= HTTP_201_CREATED
+    assert resp_body["succeeded"] == 1
+    assert resp_body["failed"] == 4
+    assert [result["success"] for result in resp_body["results"]] == [
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]
+    assert "already exists" in resp_body["results"][1]["detail"]
+    assert "more than once" in resp_body["results"][2]["detail"]
+    assert "does not exist" in resp_body["results"][4]["detail"]
+    assert not device_repo.mac_id_exists(db, duplicated_mac_id)
+
+
+def test_bulk_create_devices_from_csv(db: Session, client: TestClient):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    mac_ids = [random_string() for _ in range(3)]
+    csv_content = "name,mac_id,agent_id\n" + "".join(
+        f"{random_string()},{mac_id},{agent.id}\n" for mac_id in mac_ids
+    )
+
+    r = client.post(
+        "/api/devices/bulk/csv",
+        files={"devices_csv": ("devices.csv", csv_content, "text/csv")},
+        headers=generate_header_from_user_obj(superuser),
+    )
+    resp_body = r.json()
+
+    assert HTTP_200_OK <= r.status_code <= HTTP_201_CREATED
+    assert resp_body["succeeded"] == 3
+    for mac_id in mac_ids:
+        assert device_repo.mac_id_exists(db, mac_id)
+
+
+def test_bulk_create_devices_from_csv_reports_malformed_rows(
+    db: Session, client: TestClient
+):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    mac_ids = [random_string() for _ in range(3)]
+    csv_content = (
+        "name,mac_id,agent_id\n"
+        f"{random_string()},{mac_ids[0]},{agent.id}\n"
+        f"{random_string()},{mac_ids[1]},not-an-id\n"
+        f"{random_string()},{mac_ids[2]}\n"
+    )
+
+    r = client.post(
+        "/api/devices/bulk/csv",
+        files={"devices_csv": ("devices.csv", csv_content, "text/csv")},
+        headers=generate_header_from_user_obj(superuser),
+    )
+    resp_body = r.json()
+
+    assert r.status_code == HTTP_200_OK
+    assert resp_body["succeeded"] == 1
+    assert [result["row"] for result in resp_body["results"]] == [0, 1, 2]
+    assert [result["mac_id"] for result in resp_body["results"]] == mac_ids
+    assert resp_body["results"][1]["detail"].startswith("agent_id")
+    assert not resp_body["results"][2]["success"]
+    assert device_repo.mac_id_exists(db, mac_ids[0])
+    assert not device_repo.mac_id_exists(db, mac_ids[1])
+
+
+def test_bulk_create_devices_from_a_file_which_is_not_utf8(
+    db: Session, client: TestClient
+):
+    r = client.post(
+        "/api/devices/bulk/csv",
+        files={"devices_csv": ("devices.csv", "name,mac_id\n\xe9".encode("latin-1"))},
+        headers=generate_header_from_user_obj(get_default_superuser(db)),
+    )
+
+    assert r.status_code == HTTP_400_BAD_REQUEST
+
+
+def test_bulk_create_devices_with_too_many_rows_is_rejected(
+    db: Session, client: TestClient
+):
+    agent = create_agent(db)
+    devices_data = [
+        {"mac_id": random_string(), "name": random_string(), "agent_id": agent.id}
+        for _ in range(settings.BULK_MAX_ROWS + 1)
+    ]
+    headers = generate_header_from_user_obj(get_default_superuser(db))
+
+    r = client.post("/api/devices/bulk", json=devices_data, headers=headers)
+
+    assert r.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+    assert not device_repo.mac_id_exists(db, devices_data[0]["mac_id"])
+
+    csv_content = "name,mac_id,agent_id\n" + "".join(
+        "{name},{mac_id},{agent_id}\n".format(**device_data)
+        for device_data in devices_data
+    )
+    r = client.post(
+        "/api/devices/bulk/csv",
+        files={"devices_csv": ("devices.csv", csv_content, "text/csv")},
+        headers=headers,
+    )
+
+    assert r.status_code == HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert not device_repo.mac_id_exists(db, devices_data[0]["mac_id"])
+
+
+def test_bulk_create_devices_as_agent_employee_is_forbidden(
+    db: Session, client: TestClient
+):
+    agent_employee = get_agent_employee_user(db)
+    devices_data = [
+        {"mac_id": random_string(), "name": random_string(), "agent_id": 1}
+    ]
+
+    r = client.post(
+        "/api/devices/bulk",
+        json=devices_data,
+        headers=generate_header_from_user_obj(agent_employee),
+    )
+
+    assert r.status_code == HTTP_403_FORBIDDEN
@@ -0,0 +1,140 @@
+from typing import Generator
+from unittest import mock
+
+import pytest
+from backend.app.api.routes import device as device_routes
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.device_notification import device_notification_repo
+from backend.app.db.session import SessionLocal
+from backend.app.schemas.device import DeviceCreate
+from backend.app.services.device_metadata_cache import device_metadata_cache
+from backend.tests.utils import (
+    activate_user,
+    create_agent,
+    create_user_with_type,
+    generate_header_from_user_obj,
+    get_default_superuser,
+    random_string,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_200_OK, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+
+
+@pytest.fixture
+def db() -> Generator:
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def get_metadata(client: TestClient, mac_id: str):
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", False):
+        return client.get("/api/devices/{}/metadata".format(mac_id))
+
+
+def test_cached_metadata_is_rebuilt_once_the_device_changes(
+    db: Session, client: TestClient
+):
+    superuser = get_default_superuser(db)
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=random_string(),
+            name=random_string(),
+            creator_id=superuser.id,
+            agent_id=create_agent(db).id,
+        ),
+    )
+    device = device_repo.activate_device(db, device_obj=device)
+    users = [create_user_with_type(db, AGENT_OFFICER) for _ in range(2)]
+    device_repo.add_assigned_users(db, device_obj=device, user_objs=users)
+
+    first = get_metadata(client, device.mac_id)
+    hits = device_metadata_cache.stats().hits
+    assert get_metadata(client, device.mac_id).content == first.content
+    assert device_metadata_cache.stats().hits == hits + 1
+
+    device_notification_repo.queue(db, mac_ids=[device.mac_id])
+    device_repo.remove_assigned_user(db, device_obj=device, user_obj=users[0])
+
+    r = get_metadata(client, device.mac_id)
+    assert r.status_code == HTTP_200_OK
+    assert [user["id"] for user in r.json()["assigned_users"]] == [users[1].id]
+
+    device_notification_repo.queue(db, mac_ids=[device.mac_id])
+    device_repo.deactivate_device(db, device_obj=device)
+
+    assert get_metadata(client, device.mac_id).status_code == HTTP_403_FORBIDDEN
+
+
+def test_metadata_cache_stats_are_only_for_superusers(db: Session, client: TestClient):
+    officer = activate_user(db, create_user_with_type(db, AGENT_OFFICER))
+    r = client.get(
+        "/api/devices/metadata/cache", headers=generate_header_from_user_obj(officer)
+    )
+    assert r.status_code == HTTP_403_FORBIDDEN
+
+    superuser = get_default_superuser(db)
+    r = client.get(
+        "/api/devices/metadata/cache", headers=generate_header_from_user_obj(superuser)
+    )
+    assert r.status_code == HTTP_200_OK
+    assert r.json()["max_size"] == device_metadata_cache.max_size
+
+
+def test_cached_metadata_follows_a_change_of_user_type(db: Session, client: TestClient):
+    superuser = get_default_superuser(db)
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=random_string(),
+            name=random_string(),
+            creator_id=superuser.id,
+            agent_id=create_agent(db).id,
+        ),
+    )
+    device = device_repo.activate_device(db, device_obj=device)
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=officer)
+    version = get_metadata(client, device.mac_id).json()["version"]
+
+    r = client.get(
+        "/api/users/grant_superuser_status/{}".format(officer.id),
+        headers=generate_header_from_user_obj(superuser),
+    )
+    assert r.status_code == HTTP_200_OK
+
+    # the change is in the device user change log, and the cached copy is dropped
+    assert get_metadata(client, device.mac_id).json()["version"] > version
+
+
+def test_cached_metadata_is_not_served_for_an_old_mac_id(
+    db: Session, client: TestClient
+):
+    superuser = get_default_superuser(db)
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=random_string(),
+            name=random_string(),
+            creator_id=superuser.id,
+            agent_id=create_agent(db).id,
+        ),
+    )
+    device = device_repo.activate_device(db, device_obj=device)
+    old_mac_id = device.mac_id
+    assert get_metadata(client, old_mac_id).status_code == HTTP_200_OK
+
+    r = client.put(
+        "/api/devices/{}".format(device.id),
+        headers=generate_header_from_user_obj(superuser),
+        json={"mac_id": random_string()},
+    )
+    assert r.status_code == HTTP_200_OK
+
+    assert get_metadata(client, old_mac_id).status_code == HTTP_404_NOT_FOUND
+    assert get_metadata(client, r.json()["mac_id"]).status_code == HTTP_200_OK
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from backend.app.api.routes import device as device_routes
+from backend.app.core.settings import settings
+from backend.app.services.device_heartbeats import (
+    DeviceHeartbeatBuffer,
+    device_heartbeat_buffer,
+)
+from backend.tests.utils import (
+    activate_user,
+    create_agent,
+    create_device,
+    create_user_with_type,
+    generate_header_from_user_obj,
+    get_default_superuser,
+    random_string,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_200_OK, HTTP_202_ACCEPTED, HTTP_403_FORBIDDEN
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+API_URL_PREFIX = settings.API_URL_PREFIX
+
+
+def send_heartbeat(client: TestClient, mac_id: str, **status):
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", False):
+        return client.post(f"{API_URL_PREFIX}/devices/{mac_id}/heartbeat", json=status)
+
+
+def test_heartbeats_are_written_on_the_next_flush(client: TestClient, db: Session):
+    agent = create_agent(db)
+    online_device = create_device(db, agent_id=agent.id)
+    offline_device = create_device(db, agent_id=agent.id)
+
+    r = send_heartbeat(client, online_device.mac_id, battery_level=80, app_version="2.1")
+    assert r.status_code == HTTP_202_ACCEPTED
+    assert send_heartbeat(client, online_device.mac_id).status_code == HTTP_202_ACCEPTED
+
+    db.refresh(online_device)
+    assert online_device.last_seen_at is None
+
+    assert device_heartbeat_buffer.flush() >= 1
+    db.refresh(online_device)
+    assert online_device.last_seen_at is not None
+    # the second heartbeat left the status out, so the first one's is kept
+    assert (online_device.battery_level, online_device.app_version) == (80, "2.1")
+
+    r = client.get(
+        f"{API_URL_PREFIX}/agents/agent_devices_status/{agent.id}",
+        headers=generate_header_from_user_obj(get_default_superuser(db)),
+    )
+    assert r.status_code == HTTP_200_OK
+    status = r.json()
+    assert (status["online"], status["offline"]) == (1, 1)
+    assert [(d["id"], d["online"]) for d in status["devices"]] == [
+        (offline_device.id, False),
+        (online_device.id, True),
+    ]
+
+
+def test_an_older_heartbeat_does_not_overwrite_a_newer_one(db: Session):
+    device = create_device(db)
+    now = datetime.now(timezone.utc)
+    buffer = DeviceHeartbeatBuffer()
+
+    buffer.record(device.mac_id, now, battery_level=50)
+    buffer.flush()
+    buffer.record(device.mac_id, now - timedelta(seconds=30), battery_level=90)
+    buffer.record(random_string(), now)
+
+    assert buffer.flush() == 0
+    db.refresh(device)
+    assert (device.last_seen_at, device.battery_level) == (now, 50)
+
+
+def test_a_full_buffer_drops_heartbeats_of_new_devices(db: Session):
+    now = datetime.now(timezone.utc)
+    buffer = DeviceHeartbeatBuffer(max_size=1)
+
+    assert buffer.record("first", now)
+    assert buffer.record("first", now + timedelta(seconds=1))
+    assert not buffer.record("second", now)
+    assert (len(buffer), buffer.dropped) == (1, 1)
+
+
+def test_officers_can_not_view_their_agents_devices_status(
+    client: TestClient, db: Session
+):
+    officer = activate_user(db, create_user_with_type(db, AGENT_OFFICER))
+
+    r = client.get(
+        f"{API_URL_PREFIX}/agents/agent_devices_status/{create_agent(db).id}",
+        headers=generate_header_from_user_obj(officer),
+    )
+
+    assert r.status_code == HTTP_403_FORBIDDEN
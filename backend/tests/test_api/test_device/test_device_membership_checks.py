@@ -0,0 +1,84 @@
+from typing import List
+from unittest import mock
+
+from backend.app.api.routes import device as device_routes
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.session import engine
+from backend.tests.utils import (
+    activate_user,
+    create_device,
+    create_user_with_type,
+    generate_header_from_user_obj,
+    random_string,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_200_OK, HTTP_403_FORBIDDEN
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+API_URL_PREFIX = settings.API_URL_PREFIX
+
+
+def test_assigned_users_are_added_and_removed_without_loading_the_others(
+    db: Session,
+):
+    device = create_device(db)
+    kept, removed = (create_user_with_type(db, AGENT_OFFICER) for _ in range(2))
+
+    device_repo.add_assigned_users(db, device_obj=device, user_objs=[kept, removed])
+    # adding a user twice is not an error
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=kept)
+    device_repo.remove_assigned_user(db, device_obj=device, user_obj=removed)
+
+    assert device_repo.has_assigned_user(db, device_id=device.id, user_id=kept.id)
+    assert not device_repo.has_assigned_user(
+        db, device_id=device.id, user_id=removed.id
+    )
+    assert [user.id for user in device.assigned_users] == [kept.id]
+
+
+def test_an_officer_of_another_agent_gets_the_device_only_while_assigned(
+    client: TestClient, db: Session
+):
+    device = create_device(db)
+    officer = activate_user(db, create_user_with_type(db, AGENT_OFFICER))
+    headers = generate_header_from_user_obj(officer)
+
+    r = client.get(f"{API_URL_PREFIX}/devices/{device.id}", headers=headers)
+    assert r.status_code == HTTP_403_FORBIDDEN
+
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=officer)
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, *_):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        r = client.get(f"{API_URL_PREFIX}/devices/{device.id}", headers=headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert r.status_code == HTTP_200_OK
+    assert any("EXISTS" in statement for statement in statements)
+
+
+def test_only_an_assigned_device_user_is_updated_through_the_device(
+    client: TestClient, db: Session
+):
+    device = create_device(db)
+    assigned, other = (create_user_with_type(db, AGENT_OFFICER) for _ in range(2))
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=assigned)
+
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", False):
+        responses = [
+            client.put(
+                f"{API_URL_PREFIX}/devices/{device.mac_id}/device_users/{user.id}",
+                json={"password": random_string()},
+            )
+            for user in (assigned, other)
+        ]
+
+    assert responses[0].status_code == HTTP_200_OK
+    assert responses[1].status_code == HTTP_403_FORBIDDEN
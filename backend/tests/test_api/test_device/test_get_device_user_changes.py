@@ -0,0 +1,118 @@
+from typing import Generator
+from unittest import mock
+
+import pytest
+from backend.app.api.routes import device as device_routes
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.session import SessionLocal
+from backend.app.schemas.device import DeviceCreate
+from backend.tests.utils import (
+    create_agent,
+    create_user_with_type,
+    get_default_superuser,
+    random_string,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_200_OK, HTTP_403_FORBIDDEN
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+
+
+@pytest.fixture
+def db() -> Generator:
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def device(db: Session):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=random_string(),
+            name=random_string(),
+            creator_id=superuser.id,
+            agent_id=agent.id,
+        ),
+    )
+    return device_repo.activate_device(db, device_obj=device)
+
+
+def get_changes(client: TestClient, mac_id: str, since: int):
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", False):
+        r = client.get(
+            "/api/devices/{}/users/changes".format(mac_id), params={"since": since}
+        )
+    assert r.status_code == HTTP_200_OK
+    return r.json()
+
+
+def test_device_user_changes_only_include_what_changed_since_the_version(
+    db: Session, client: TestClient, device
+):
+    kept, modified, removed = [
+        create_user_with_type(db, AGENT_OFFICER) for _ in range(3)
+    ]
+    device_repo.add_assigned_users(db, device_obj=device, user_objs=[kept, modified])
+    device_repo.bulk_add_assigned_users(db, pairs=[(device.id, removed.id)])
+    db.commit()
+
+    first_sync = get_changes(client, device.mac_id, 0)
+    assert [user["id"] for user in first_sync["users"]] == sorted(
+        [kept.id, modified.id, removed.id]
+    )
+    assert first_sync["removed_user_ids"] == []
+
+    added = create_user_with_type(db, AGENT_OFFICER)
+    user_repo.activate(db, db_obj=modified)
+    device_repo.remove_assigned_user(db, device_obj=device, user_obj=removed)
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=added)
+
+    second_sync = get_changes(client, device.mac_id, first_sync["version"])
+    assert second_sync["version"] > first_sync["version"]
+    assert {user["id"]: user["is_active"] for user in second_sync["users"]} == {
+        modified.id: True,
+        added.id: added.is_active,
+    }
+    assert second_sync["removed_user_ids"] == [removed.id]
+
+    up_to_date = get_changes(client, device.mac_id, second_sync["version"])
+    assert up_to_date == {
+        "version": second_sync["version"],
+        "users": [],
+        "removed_user_ids": [],
+    }
+
+
+def test_device_user_changes_are_at_least_as_new_as_the_metadata_version(
+    db: Session, client: TestClient, device
+):
+    user = create_user_with_type(db, AGENT_OFFICER)
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=user)
+
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", False):
+        r = client.get("/api/devices/{}/metadata".format(device.mac_id))
+    version = r.json()["version"]
+
+    assert get_changes(client, device.mac_id, version)["users"] == []
+    user_repo.update(db, db_obj=user, obj_in={"address": random_string()})
+    assert [u["id"] for u in get_changes(client, device.mac_id, version)["users"]] == [
+        user.id
+    ]
+
+
+def test_device_user_changes_with_invalid_api_key_raises_403(
+    client: TestClient, device
+):
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", True):
+        r = client.get(
+            "/api/devices/{}/users/changes".format(device.mac_id),
+            headers={"X-API-KEY": "Some Invalid API Key"},
+        )
+    assert r.status_code == HTTP_403_FORBIDDEN
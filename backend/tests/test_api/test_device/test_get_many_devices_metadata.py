@@ -0,0 +1,107 @@
+from typing import Generator, List
+from unittest import mock
+
+import pytest
+from backend.app.api.errors.error_strings import INACTIVE_DEVICE_ERROR
+from backend.app.api.routes import device as device_routes
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.session import SessionLocal, engine
+from backend.app.models.device import Device
+from backend.tests.utils import (
+    create_device,
+    create_user_with_type,
+    random_string,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_403_FORBIDDEN,
+    HTTP_422_UNPROCESSABLE_ENTITY,
+)
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+DEVICE_METADATA_BATCH_MAX_SIZE = settings.DEVICE_METADATA_BATCH_MAX_SIZE
+
+
+@pytest.fixture
+def db() -> Generator:
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def create_device_with_users(db: Session, *, active: bool = True) -> Device:
+    device = create_device(db, active=active)
+    users = [create_user_with_type(db, AGENT_OFFICER) for _ in range(2)]
+    return device_repo.add_assigned_users(db, device_obj=device, user_objs=users)
+
+
+def get_many_metadata(client: TestClient, mac_ids: List[str]):
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", False):
+        return client.post("/api/devices/metadata:batch", json={"mac_ids": mac_ids})
+
+
+def count_statements(client: TestClient, mac_ids: List[str]) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        assert get_many_metadata(client, mac_ids).status_code == HTTP_200_OK
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+def test_many_devices_metadata_matches_single_device_metadata(
+    db: Session, client: TestClient
+):
+    devices = [create_device_with_users(db) for _ in range(2)]
+    inactive = create_device_with_users(db, active=False)
+    missing = random_string()
+
+    r = get_many_metadata(
+        client, [device.mac_id for device in devices] + [inactive.mac_id, missing]
+    )
+
+    assert r.status_code == HTTP_200_OK
+    body = r.json()
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", False):
+        for device in devices:
+            single = client.get("/api/devices/{}/metadata".format(device.mac_id))
+            assert body["metadata"][device.mac_id] == single.json()
+    assert set(body["errors"]) == {inactive.mac_id, missing}
+    assert body["errors"][inactive.mac_id] == INACTIVE_DEVICE_ERROR
+
+
+def test_many_devices_metadata_takes_the_same_queries_for_any_number_of_devices(
+    db: Session, client: TestClient
+):
+    devices = [create_device_with_users(db) for _ in range(5)]
+
+    one = count_statements(client, [devices[0].mac_id])
+    five = count_statements(client, [device.mac_id for device in devices])
+
+    assert one == five
+
+
+def test_many_devices_metadata_rejects_batches_over_the_limit(client: TestClient):
+    r = get_many_metadata(
+        client, [random_string() for _ in range(DEVICE_METADATA_BATCH_MAX_SIZE + 1)]
+    )
+    assert r.status_code == HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_many_devices_metadata_with_invalid_api_key_raises_403(client: TestClient):
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", True):
+        r = client.post(
+            "/api/devices/metadata:batch",
+            json={"mac_ids": [random_string()]},
+            headers={"X-API-KEY": "Some Invalid API Key"},
+        )
+    assert r.status_code == HTTP_403_FORBIDDEN
@@ -0,0 +1,21 @@
+from unittest import mock
+
+from backend.app.api.routes import device as device_routes
+from backend.tests.utils import random_string
+from fastapi.testclient import TestClient
+from starlette.status import HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+
+
+def test_stream_device_updates_with_invalid_api_key_raises_403(client: TestClient):
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", True):
+        r = client.get(
+            "/api/devices/{}/updates".format(random_string()),
+            headers={"X-API-KEY": "Some Invalid API Key"},
+        )
+    assert r.status_code == HTTP_403_FORBIDDEN
+
+
+def test_stream_updates_for_non_existent_device_raises_404(client: TestClient):
+    with mock.patch.object(device_routes, "API_KEY_AUTH_ENABLED", False):
+        r = client.get("/api/devices/{}/updates".format("some-random-mac-id"))
+    assert r.status_code == HTTP_404_NOT_FOUND
@@ -17,6 +17,7 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.session import Session
 from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.device_notification import device_notification_repo
 
 import random
 
@@ -47,6 +48,29 @@ def test_update_device_as_device_creator(db: Session, client: TestClient):
     assert device.id == r.json()["id"]
 
 
+def test_update_device_notifies_both_the_old_and_the_new_mac_id(
+    db: Session, client: TestClient
+):
+    user = get_default_agent_user(db)
+    old_mac_id = random_string()
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(mac_id=old_mac_id, creator_id=user.id, agent_id=user.id),
+    )
+    old_version = device_notification_repo.get_version(db, mac_id=old_mac_id)
+
+    new_mac_id = random_string(10)
+    r = client.put(
+        "/api/devices/{}".format(device.id),
+        headers=generate_header_from_user_obj(user),
+        json={"mac_id": new_mac_id},
+    )
+
+    assert r.status_code == HTTP_200_OK
+    assert device_notification_repo.get_version(db, mac_id=old_mac_id) > old_version
+    assert device_notification_repo.get_version(db, mac_id=new_mac_id) > 0
+
+
 def test_update_device_with_invalid_id_gives_404_status(
     db: Session, client: TestClient
 ):
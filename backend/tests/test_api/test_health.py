@@ -0,0 +1,13 @@
+from backend.app.core.settings import settings
+from backend.app.services.device_updates import device_update_hub
+from fastapi.testclient import TestClient
+from starlette.status import HTTP_200_OK
+
+API_URL_PREFIX = settings.API_URL_PREFIX
+
+
+def test_readiness_reports_the_database_and_broker(client: TestClient):
+    r = client.get(f"{API_URL_PREFIX}/health/ready")
+
+    assert r.status_code == HTTP_200_OK
+    assert r.json() == {"database": True, "broker": device_update_hub.broker_ready}
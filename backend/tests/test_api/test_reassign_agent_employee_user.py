@@ -1,11 +1,10 @@
+from backend.app.core.settings import settings
 from backend.app.schemas.device import DeviceCreate
 from backend.tests.utils import (
+    create_agent,
+    create_user_with_type,
     generate_header_from_user_obj,
-    get_default_agent_employee_user,
-    get_default_agent_user,
-    create_agent_user,
     get_default_superuser,
-    create_agent_employee_user,
     random_string,
 )
 from fastapi.testclient import TestClient
@@ -13,19 +12,21 @@ from sqlalchemy.orm import Session
 
 from starlette.status import (
     HTTP_200_OK,
-    HTTP_400_BAD_REQUEST,
     HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
 )
 
 from backend.app.db.repositories.user import user_repo
 from backend.app.db.repositories.device import device_repo
 
+AGENT_OFFICER = settings.AGENT_OFFICER
+
 
 def test_can_not_reassign_without_superuser_credentials(
     client: TestClient, db: Session
 ):
-    agent_employee = get_default_agent_employee_user(db)
-    agent = get_default_agent_user(db)
+    agent_employee = create_user_with_type(db, AGENT_OFFICER)
+    agent = create_agent(db)
 
     r = client.post("/api/users/{}/change_agent/{}".format(agent_employee.id, agent.id))
 
@@ -33,8 +34,8 @@ def test_can_not_reassign_without_superuser_credentials(
 
 
 def test_reassigning_works_with_superuser_credentials(client: TestClient, db: Session):
-    agent_employee = create_agent_employee_user(db)
-    agent = get_default_agent_user(db)
+    agent_employee = create_user_with_type(db, AGENT_OFFICER)
+    agent = create_agent(db)
 
     r = client.post(
         "/api/users/{}/change_agent/{}".format(agent_employee.id, agent.id),
@@ -42,6 +43,7 @@ def test_reassigning_works_with_superuser_credentials(client: TestClient, db: Se
     )
 
     assert r.status_code == HTTP_200_OK
+    assert r.json()["agent_id"] == agent.id
 
     agent_employee = user_repo.get(db, id=agent_employee.id)
     db.refresh(agent_employee)
@@ -49,19 +51,20 @@ def test_reassigning_works_with_superuser_credentials(client: TestClient, db: Se
     assert agent_employee.agent_id == agent.id
 
 
-def test_can_not_reassign_agent_employee_to_non_agent_user(
+def test_can_not_reassign_agent_employee_to_unknown_agent(
     client: TestClient, db: Session
 ):
-    agent_employee = create_agent_employee_user(db)
+    agent_employee = create_user_with_type(db, AGENT_OFFICER)
     original_agent_employee_agent_id = agent_employee.agent_id
-    supposed_agent = get_default_superuser(db)
+    unknown_agent_id = create_agent(db).id + 1000
 
     r = client.post(
-        "/api/users/{}/change_agent/{}".format(agent_employee.id, supposed_agent.id),
+        "/api/users/{}/change_agent/{}".format(agent_employee.id, unknown_agent_id),
         headers=generate_header_from_user_obj(get_default_superuser(db)),
     )
 
-    assert r.status_code == HTTP_403_FORBIDDEN
+    assert r.status_code == HTTP_404_NOT_FOUND
+    assert "errors" in r.json()
 
     agent_employee = user_repo.get(db, id=agent_employee.id)
     db.refresh(agent_employee)
@@ -73,7 +76,7 @@ def test_can_not_reassign_user_who_is_not_agent_employee(
     client: TestClient, db: Session
 ):
     user_to_reassign = get_default_superuser(db)
-    agent = get_default_agent_user(db)
+    agent = create_agent(db)
 
     original_user_to_reassign_agent_id = user_to_reassign.agent_id
 
@@ -90,55 +93,72 @@ def test_can_not_reassign_user_who_is_not_agent_employee(
     assert user_to_reassign.agent_id == original_user_to_reassign_agent_id
 
 
-def test_can_not_assign_agent_employee_to_self(client: TestClient, db: Session):
-    agent_employee = create_agent_employee_user(db)
-    original_agent_employee_agent_id = agent_employee.agent_id
-    user_to_reassign = agent_employee
-
-    r = client.post(
-        "/api/users/{}/change_agent/{}".format(user_to_reassign.id, agent_employee.id),
-        headers=generate_header_from_user_obj(get_default_superuser(db)),
-    )
-
-    assert r.status_code == HTTP_400_BAD_REQUEST
-    assert "errors" in r.json()
-
-    agent_employee = user_repo.get(db, id=agent_employee.id)
-    db.refresh(agent_employee)
-    assert agent_employee
-    assert agent_employee.agent_id == original_agent_employee_agent_id
-
-
 def test_reassignment_of_agent_removes_all_the_devices_previosly_assigned_to_device_user(
     client: TestClient, db: Session
 ):
-    agent_employee = create_agent_employee_user(db)
-    agent = get_default_agent_user(db)
-    agent_employee.agent_id = agent.id
-
-    agent_employee = user_repo.update(db, db_obj=agent_employee, obj_in={})
-    db.refresh(agent_employee)
+    agent_employee = create_user_with_type(db, AGENT_OFFICER)
+    agent = create_agent(db)
+    agent_employee = user_repo.update(
+        db, db_obj=agent_employee, obj_in={"agent_id": agent.id}
+    )
 
-    assert agent_employee
     assert agent_employee.agent_id == agent.id
 
     device = device_repo.create(
-        db, obj_in=DeviceCreate(mac_id=random_string(), creator_id=agent.id,agent_id=agent.id)
+        db,
+        obj_in=DeviceCreate(
+            mac_id=random_string(),
+            creator_id=get_default_superuser(db).id,
+            agent_id=agent.id,
+        ),
     )
     device_repo.add_assigned_user(db, device_obj=device, user_obj=agent_employee)
 
     agent_employee = user_repo.get(db, id=agent_employee.id)
     assert len(agent_employee.devices) == 1
 
-    new_agent = create_agent_user(db)
+    new_agent = create_agent(db)
 
     r = client.post(
         "/api/users/{}/change_agent/{}".format(agent_employee.id, new_agent.id),
         headers=generate_header_from_user_obj(get_default_superuser(db)),
     )
 
+    assert r.status_code == HTTP_200_OK
+
     agent_employee = user_repo.get(db, id=agent_employee.id)
     db.refresh(agent_employee)
     assert agent_employee
     assert agent_employee.agent_id == new_agent.id
     assert len(agent_employee.devices) == 0
+
+
+def test_reassigning_to_the_current_agent_keeps_the_devices(
+    client: TestClient, db: Session
+):
+    agent_employee = create_user_with_type(db, AGENT_OFFICER)
+    agent = create_agent(db)
+    agent_employee = user_repo.update(
+        db, db_obj=agent_employee, obj_in={"agent_id": agent.id}
+    )
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=random_string(),
+            creator_id=get_default_superuser(db).id,
+            agent_id=agent.id,
+        ),
+    )
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=agent_employee)
+
+    r = client.post(
+        "/api/users/{}/change_agent/{}".format(agent_employee.id, agent.id),
+        headers=generate_header_from_user_obj(get_default_superuser(db)),
+    )
+
+    assert r.status_code == HTTP_200_OK
+
+    agent_employee = user_repo.get(db, id=agent_employee.id)
+    db.refresh(agent_employee)
+    assert agent_employee.agent_id == agent.id
+    assert len(agent_employee.devices) == 1
@@ -0,0 +1,39 @@
+import json
+from typing import Generator
+
+import pytest
+from backend.app.api.responses import FastJSONResponse, dumps
+from backend.app.db.session import SessionLocal
+from backend.app.main import app
+from backend.app.models.user import User
+from backend.tests.utils import get_default_superuser
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def db() -> Generator:
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def test_dumps_renders_what_the_json_module_would():
+    content = {"name": "Adébáyọ̀", "ids": [1, 2], "active": True, "agent": None}
+    assert json.loads(dumps(content)) == content
+
+
+def test_to_dict_reads_only_the_mapped_columns(db: Session):
+    user = get_default_superuser(db)
+
+    as_dict = user.to_dict()
+
+    assert set(as_dict) == {column.key for column in User.__table__.columns}
+    assert as_dict["email"] == user.email
+    assert user.to_json()["created_at"] == user.created_at.isoformat()
+
+
+def test_routes_respond_with_the_fast_json_response_class():
+    routes = [route for route in app.routes if isinstance(route, APIRoute)]
+    assert routes
+    assert {route.response_class for route in routes} == {FastJSONResponse}
@@ -0,0 +1,95 @@
+from backend.app.core.settings import settings
+from backend.app.db.repositories.user import user_repo
+from backend.tests.utils import (
+    create_agent,
+    create_device,
+    create_user_with_type,
+    generate_header_from_user_obj,
+    get_default_superuser,
+    random_string,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_200_OK, HTTP_422_UNPROCESSABLE_ENTITY
+
+AGENT_MANAGER = settings.AGENT_MANAGER
+AGENT_OFFICER = settings.AGENT_OFFICER
+API_URL_PREFIX = settings.API_URL_PREFIX
+
+
+def test_devices_are_found_by_mac_id_prefix_a_page_at_a_time(
+    client: TestClient, db: Session
+):
+    agent = create_agent(db)
+    prefix = random_string(12)
+    devices = [
+        create_device(db, agent_id=agent.id, mac_id=prefix + random_string(8))
+        for _ in range(3)
+    ]
+    headers = generate_header_from_user_obj(get_default_superuser(db))
+
+    pages = [
+        client.get(
+            f"{API_URL_PREFIX}/search/devices",
+            params={"q": prefix, "page": page, "page_size": 2},
+            headers=headers,
+        )
+        for page in (1, 2)
+    ]
+
+    assert [r.status_code for r in pages] == [HTTP_200_OK, HTTP_200_OK]
+    first, second = (r.json() for r in pages)
+    assert first["has_more"] and not second["has_more"]
+    assert sorted(
+        device["id"] for device in first["results"] + second["results"]
+    ) == sorted(device.id for device in devices)
+    assert first["results"][0]["agent_name"] == agent.name
+
+
+def test_users_are_found_by_a_misspelt_name(client: TestClient, db: Session):
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    misspelt = officer.last_name[:-1] + ("a" if officer.last_name[-1] != "a" else "b")
+
+    r = client.get(
+        f"{API_URL_PREFIX}/search/users",
+        params={"q": misspelt},
+        headers=generate_header_from_user_obj(get_default_superuser(db)),
+    )
+
+    assert r.status_code == HTTP_200_OK
+    assert officer.id in [user["id"] for user in r.json()["results"]]
+
+
+def test_managers_only_find_their_own_agents_rows(client: TestClient, db: Session):
+    agent, other_agent = create_agent(db), create_agent(db)
+    manager = create_user_with_type(db, AGENT_MANAGER)
+    manager = user_repo.update(
+        db, db_obj=manager, obj_in={"agent_id": agent.id, "is_active": True}
+    )
+    mac_id = random_string()
+    own_device = create_device(db, agent_id=agent.id, mac_id=mac_id + "a")
+    create_device(db, agent_id=other_agent.id, mac_id=mac_id + "b")
+    headers = generate_header_from_user_obj(manager)
+
+    r = client.get(
+        f"{API_URL_PREFIX}/search/devices", params={"q": mac_id}, headers=headers
+    )
+    assert r.status_code == HTTP_200_OK
+    assert [device["id"] for device in r.json()["results"]] == [own_device.id]
+
+    r = client.get(
+        f"{API_URL_PREFIX}/search/agents",
+        params={"q": other_agent.name},
+        headers=headers,
+    )
+    assert r.status_code == HTTP_200_OK
+    assert r.json()["results"] == []
+
+
+def test_search_text_needs_two_characters(client: TestClient, db: Session):
+    r = client.get(
+        f"{API_URL_PREFIX}/search/users",
+        params={"q": "a"},
+        headers=generate_header_from_user_obj(get_default_superuser(db)),
+    )
+    assert r.status_code == HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,60 @@
+from typing import Generator
+
+import pytest
+from backend.app.api.serializers import (
+    serialize_agent,
+    serialize_device,
+    serialize_user,
+)
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.session import SessionLocal
+from backend.app.schemas.agent import AgentInResponse
+from backend.app.schemas.device import DeviceCreate, DeviceInDB
+from backend.app.schemas.user import SlimUserInResponse, UserInResponse
+from backend.tests.utils import (
+    create_agent,
+    create_user_with_type,
+    get_default_superuser,
+    random_string,
+)
+from sqlalchemy.orm import Session
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+
+
+@pytest.fixture
+def db() -> Generator:
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def test_serialized_rows_are_what_the_response_schemas_would_render(db: Session):
+    superuser = get_default_superuser(db)
+    agent = create_agent(db)
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=random_string(),
+            name=random_string(),
+            creator_id=superuser.id,
+            agent_id=agent.id,
+        ),
+    )
+    device = device_repo.add_assigned_user(db, device_obj=device, user_obj=officer)
+
+    serialized_device = serialize_device(device, agent_name=agent.name)
+    assert DeviceInDB(**serialized_device).dict() == serialized_device
+    assert [
+        SlimUserInResponse(**user).dict() for user in serialized_device["assigned_users"]
+    ] == serialized_device["assigned_users"]
+    assert serialized_device["assigned_users"][0]["id"] == officer.id
+
+    serialized_user = serialize_user(officer, agent_name=agent.name)
+    assert UserInResponse(**serialized_user).dict() == serialized_user
+    assert serialized_user["is_superuser"] is False
+
+    serialized_agent = serialize_agent(agent)
+    assert AgentInResponse(**serialized_agent).dict() == serialized_agent
@@ -0,0 +1,103 @@
+from backend.app.core.settings import settings
+from backend.app.db.repositories.agent_summary import agent_summary_repo
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.models.device import Device
+from backend.app.models.user import User
+from backend.tests.utils import (
+    create_agent,
+    create_device,
+    create_user_with_type,
+    generate_user_payload,
+    get_superuser_auth_header,
+)
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+from starlette.status import HTTP_200_OK, HTTP_404_NOT_FOUND
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+API_URL_PREFIX = settings.API_URL_PREFIX
+
+
+def test_a_deleted_device_is_hidden_and_its_mac_id_reusable(
+    client: TestClient, db: Session
+):
+    agent = create_agent(db)
+    device = create_device(db, agent_id=agent.id, active=False)
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=officer)
+    counts = agent_summary_repo.get_counts(db, agent_id=agent.id)
+    headers = get_superuser_auth_header(db)
+
+    r = client.delete(f"{API_URL_PREFIX}/devices/{device.id}", headers=headers)
+
+    assert r.status_code == HTTP_200_OK
+    r = client.get(f"{API_URL_PREFIX}/devices/{device.id}", headers=headers)
+    assert r.status_code == HTTP_404_NOT_FOUND
+    db.refresh(device)
+    assert device.deleted and device.deleted_at is not None
+    assert not device_repo.has_assigned_user(
+        db, device_id=device.id, user_id=officer.id
+    )
+    assert agent_summary_repo.get_counts(db, agent_id=agent.id) == {
+        **counts,
+        "inactive_devices": counts["inactive_devices"] - 1,
+    }
+
+    r = client.post(
+        f"{API_URL_PREFIX}/devices/",
+        json={"mac_id": device.mac_id, "name": device.name, "agent_id": agent.id},
+        headers=headers,
+    )
+    assert r.status_code == HTTP_200_OK
+    assert device_repo.get_by_field(
+        db, field_name="mac_id", field_value=device.mac_id
+    ).id == r.json()["id"]
+
+
+def test_a_deleted_user_is_unassigned_and_can_sign_up_again(
+    client: TestClient, db: Session
+):
+    device = create_device(db)
+    officer = create_user_with_type(db, AGENT_OFFICER)
+    device_repo.add_assigned_user(db, device_obj=device, user_obj=officer)
+    headers = get_superuser_auth_header(db)
+
+    r = client.delete(f"{API_URL_PREFIX}/users/{officer.id}", headers=headers)
+
+    assert r.status_code == HTTP_200_OK
+    assert user_repo.get(db, id=officer.id) is None
+    assert user_repo.get_by_email(db, email=officer.email) is None
+    assert not device_repo.has_assigned_user(
+        db, device_id=device.id, user_id=officer.id
+    )
+
+    user = {
+        **generate_user_payload(),
+        "email": officer.email,
+        "phone": officer.phone,
+        "agent_id": create_agent(db).id,
+    }
+    r = client.post(
+        f"{API_URL_PREFIX}/users/create_agent_manager_user", json=user, headers=headers
+    )
+    assert r.status_code == HTTP_200_OK
+    assert user_repo.get_by_email(db, email=officer.email).id != officer.id
+
+
+def test_lookups_go_through_the_partial_indexes(db: Session):
+    db.execute("SET LOCAL enable_seqscan = off")
+    for query, index in (
+        (user_repo.query(db).filter(User.email == "x"), "ix_user_email_not_deleted"),
+        (
+            device_repo.query(db).filter(Device.agent_id == 0),
+            "ix_device_agent_id_not_deleted",
+        ),
+    ):
+        statement = query.statement.compile(
+            dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+        )
+        plan = "\n".join(row for row, in db.execute(f"EXPLAIN {statement}"))
+        assert index in plan
+    db.rollback()
@@ -1,6 +1,6 @@
 from backend.app.api.dependencies.authentication import AGENT
 from backend.app.api.routes.user_types import SUPERUSER_USER_TYPE, AGENT
-from backend.app.db.repositories.user import USER_TYPES
+from backend.app.db.repositories.user import USER_TYPES, user_repo
 from backend.app.schemas.user_type import UserTypeCreate
 from backend.app.db.repositories.user_type import user_type as user_type_repo
 from fastapi.testclient import TestClient
@@ -115,6 +115,33 @@ def test_deleting_of_user_type_which_has_reference_to_users(
     assert user_type
 
 
+def test_deleted_users_do_not_hold_on_to_their_user_type(
+    client: TestClient, db: Session
+):
+    name = random_string()
+    r = client.post(
+        "/api/user_types/", json={"name": name}, headers=get_superuser_auth_header(db)
+    )
+    assert r.status_code == HTTP_200_OK
+    user_type = user_type_repo.get_by_name(db, name=name)
+    user, deleted_user = (create_user_with_type(db, type_=name) for _ in range(2))
+    user_repo.soft_delete(db, db_obj=deleted_user)
+
+    r = client.get(
+        f"/api/user_types/{user_type.id}/all_users",
+        headers=get_superuser_auth_header(db),
+    )
+    assert r.status_code == HTTP_200_OK
+    assert [user_in["id"] for user_in in r.json()] == [user.id]
+
+    user_repo.soft_delete(db, db_obj=user)
+    r = client.delete(
+        f"/api/user_types/{user_type.id}", headers=get_superuser_auth_header(db)
+    )
+    assert r.status_code == HTTP_200_OK
+    assert user_type_repo.get_by_name(db, name=name) is None
+
+
 def test_updating_of_usertype_with_agent_employee_fails(
     client: TestClient, db: Session
 ) -> None:
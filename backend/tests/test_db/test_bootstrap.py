@@ -0,0 +1,90 @@
+from typing import Generator, List
+
+import pytest
+from backend.app.core.settings import settings
+from backend.app.db import bootstrap as bootstrap_module
+from backend.app.db.bootstrap import bootstrap, get_default_users
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.session import SessionLocal, engine
+from backend.app.models.seed_version import SeedVersion
+from backend.tests.utils import (
+    random_email,
+    random_lasrra_id,
+    random_phone,
+    random_string,
+)
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+FIRST_SUPERUSER_EMAIL = settings.FIRST_SUPERUSER_EMAIL
+
+
+@pytest.fixture
+def db() -> Generator:
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements() -> Generator:
+    executed: List[str] = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_seeded_database_is_recognised_with_one_query(
+    db: Session, statements: List[str]
+):
+    bootstrap(db)
+    statements.clear()
+
+    assert not bootstrap(db)
+    assert len(statements) == 1
+    assert user_repo.get_by_email(db, email=FIRST_SUPERUSER_EMAIL).is_superuser
+
+
+def test_new_default_user_is_seeded_active_and_only_once(db: Session, monkeypatch):
+    password = random_string()
+    new_user = (
+        AGENT_OFFICER,
+        {
+            "first_name": random_string(),
+            "last_name": random_string(),
+            "address": random_string(),
+            "phone": random_phone(),
+            "email": random_email(),
+            "password": password,
+            "lasrra_id": random_lasrra_id(),
+        },
+    )
+    monkeypatch.setattr(
+        bootstrap_module, "get_default_users", lambda: get_default_users() + [new_user]
+    )
+
+    assert bootstrap(db)
+    assert not bootstrap(db)
+
+    user = user_repo.get_by_email(db, email=new_user[1]["email"])
+    assert user.is_active
+    assert user.user_type.name == AGENT_OFFICER
+    assert user.verify_password(password)
+
+
+def test_default_users_that_exist_are_left_alone(db: Session):
+    bootstrap(db)
+    superuser = user_repo.get_by_email(db, email=FIRST_SUPERUSER_EMAIL)
+    hashed_password = superuser.hashed_password
+
+    db.query(SeedVersion).delete()
+    db.commit()
+
+    assert bootstrap(db)
+    db.refresh(superuser)
+    assert superuser.hashed_password == hashed_password
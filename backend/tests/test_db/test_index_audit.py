@@ -0,0 +1,43 @@
+from backend.app.db.index_audit import (
+    FOREIGN_KEY,
+    collect_lookups,
+    find_missing_indexes,
+)
+from backend.app.db.session import SessionLocal
+
+
+def test_collect_lookups_finds_repository_filters():
+    lookups = {(lookup.table, lookup.column) for lookup in collect_lookups()}
+
+    # Device.agent_id == agent_id
+    assert ("device", "agent_id") in lookups
+    # self.get_by_field(db, field_name="hashed_key", ...) inside the api key repository
+    assert ("apikey", "hashed_key") in lookups
+    # reset_token_repo.get_by_field(db, field_name="token", ...) inside a route
+    assert ("passwordresettoken", "token") in lookups
+
+
+def test_collect_lookups_skips_lines_marked_as_not_a_lookup():
+    lookups = {(lookup.table, lookup.column) for lookup in collect_lookups()}
+
+    # Device.last_seen_at >= online_since, selected along with the devices
+    assert ("device", "last_seen_at") not in lookups
+
+
+def test_collect_lookups_includes_foreign_keys():
+    foreign_keys = {
+        (lookup.table, lookup.column)
+        for lookup in collect_lookups()
+        if lookup.source == FOREIGN_KEY
+    }
+
+    assert ("user", "user_type_id") in foreign_keys
+    assert ("userhistory", "user_id") in foreign_keys
+
+
+def test_every_lookup_is_indexed_after_migrations():
+    db = SessionLocal()
+    try:
+        assert find_missing_indexes(db) == {}
+    finally:
+        db.close()
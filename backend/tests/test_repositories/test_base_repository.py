@@ -0,0 +1,94 @@
+from typing import Generator, List
+
+import pytest
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.db.session import SessionLocal, engine
+from backend.tests.utils import (
+    create_agent_employee_user,
+    create_device,
+    random_string,
+)
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+
+@pytest.fixture
+def db() -> Generator:
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements() -> Generator:
+    executed: List[str] = []
+
+    def record(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_update_with_returning_loads_the_row_it_wrote(
+    db: Session, statements: List[str]
+):
+    user = create_agent_employee_user(db)
+    statements.clear()
+
+    user_repo.deactivate(db=db, db_obj=user)
+
+    assert not user.is_active
+    assert user.updated_at is not None
+    assert not inspect(user).expired_attributes
+    # the change log locks the user's devices, but the user is never read back
+    assert not any(
+        statement.lstrip().startswith("SELECT") and 'FROM "user"' in statement
+        for statement in statements
+    )
+    other_db = SessionLocal()
+    try:
+        assert not user_repo.get(other_db, id=user.id).is_active
+    finally:
+        other_db.close()
+
+
+def test_update_without_refresh_leaves_the_row_to_load_on_access(
+    db: Session, statements: List[str]
+):
+    device = create_device(db)
+    name = random_string()
+    statements.clear()
+
+    device_repo.update(db, db_obj=device, obj_in={"name": name}, refresh=False)
+
+    assert not any(statement.lstrip().startswith("SELECT") for statement in statements)
+    assert "name" in inspect(device).expired_attributes
+    assert device.name == name
+
+
+def test_update_ignores_fields_that_are_not_columns(db: Session):
+    device = create_device(db)
+    name = random_string()
+
+    device_repo.update(db, db_obj=device, obj_in={"assigned_users": None, "name": name})
+
+    assert device.name == name
+    assert device.assigned_users == []
+
+
+def test_update_with_returning_fails_for_a_row_deleted_meanwhile(db: Session):
+    device = create_device(db)
+    other_db = SessionLocal()
+    try:
+        device_repo.remove(other_db, id=device.id)
+    finally:
+        other_db.close()
+
+    with pytest.raises(StaleDataError):
+        device_repo.update(
+            db, db_obj=device, obj_in={"name": random_string()}, returning=True
+        )
@@ -1,5 +1,4 @@
 from backend.app.models.device import Device
-from backend.app.db.errors import DBViolationError
 from backend.tests.utils import (
     create_agent_employee_user,
     create_agent_user,
@@ -9,6 +8,7 @@ from backend.tests.utils import (
     get_default_superuser,
     random_string,
 )
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from backend.app.db.repositories.device import device_repo
 from backend.app.db.repositories.user import user_repo
@@ -59,7 +59,7 @@ def test_create_device_with_same_mac_id_throws_exception(db: Session):
 
     assert len(users_created_devices) == 1 + len(initial_user_created_devices)
 
-    with pytest.raises(DBViolationError):
+    with pytest.raises(IntegrityError):
         new_device = device_repo.create(db, obj_in=device_obj)
 
 
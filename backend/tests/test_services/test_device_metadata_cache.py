@@ -0,0 +1,53 @@
+from backend.app.services.device_metadata_cache import DeviceMetadataCache
+
+
+def test_cache_only_serves_the_version_it_was_built_at():
+    cache = DeviceMetadataCache(max_size=10)
+    cache.put("mac", 1, b"v1", generation=cache.generation)
+
+    assert cache.get("mac", 1) == b"v1"
+    assert cache.get("mac", 2) is None
+
+    cache.put("mac", 2, b"v2", generation=cache.generation)
+    assert cache.get("mac", 1) is None
+    assert cache.get("mac", 2) == b"v2"
+    assert cache.stats().size == 1
+
+
+def test_cache_evicts_the_least_recently_used_device():
+    cache = DeviceMetadataCache(max_size=2)
+    for mac_id in ("a", "b"):
+        cache.put(mac_id, 1, mac_id.encode(), generation=cache.generation)
+
+    cache.get("a", 1)
+    cache.put("c", 1, b"c", generation=cache.generation)
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == b"a"
+    assert cache.get("c", 1) == b"c"
+
+
+def test_entries_built_across_an_invalidation_are_not_kept():
+    cache = DeviceMetadataCache(max_size=10)
+    cache.put("kept", 1, b"kept", generation=cache.generation)
+    generation = cache.generation
+
+    cache.invalidate(["mac"])
+    cache.put("mac", 1, b"stale", generation=generation)
+
+    assert cache.get("mac", 1) is None
+    assert cache.get("kept", 1) == b"kept"
+    cache.invalidate(["kept"])
+    assert cache.get("kept", 1) is None
+
+
+def test_cache_counts_hits_and_misses():
+    cache = DeviceMetadataCache(max_size=10)
+    cache.get("mac", 1)
+    cache.put("mac", 1, b"v1", generation=cache.generation)
+    cache.get("mac", 1)
+    cache.get("mac", 1)
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size, stats.max_size) == (2, 1, 1, 10)
+    assert stats.hit_ratio == 2 / 3
@@ -0,0 +1,53 @@
+import asyncio
+
+from backend.app.services.device_updates import (
+    DEVICE_UPDATED_EVENT,
+    DeviceUpdate,
+    DeviceUpdateHub,
+)
+
+
+def test_update_is_formatted_as_a_server_sent_event():
+    assert DeviceUpdate(7, " ").to_event() == (
+        f"event: {DEVICE_UPDATED_EVENT}\nid: 7\ndata:  \n\n"
+    )
+    assert DeviceUpdate(None, "a\nb").to_event() == (
+        f"event: {DEVICE_UPDATED_EVENT}\ndata: a\ndata: b\n\n"
+    )
+
+
+def test_hub_streams_the_latest_update_to_every_listener_of_a_device():
+    hub = DeviceUpdateHub()
+    disconnected = False
+
+    async def is_disconnected():
+        return disconnected
+
+    async def listen():
+        stream = hub.stream("mac", is_disconnected=is_disconnected, keepalive_seconds=0.05)
+        first = await stream.__anext__()
+        second = await stream.__anext__()
+        return first, second, stream
+
+    async def run():
+        nonlocal disconnected
+        listeners = [asyncio.ensure_future(listen()) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert hub.connections == 3
+
+        # only the newest of the updates a listener has not read yet is kept
+        hub.publish("mac", DeviceUpdate(1, " "))
+        hub.publish("mac", DeviceUpdate(2, " "))
+        hub.publish("other mac", DeviceUpdate(3, " "))
+        results = await asyncio.gather(*listeners)
+
+        for first, second, _ in results:
+            assert first == DeviceUpdate(2, " ").to_event()
+            assert second == ": keep-alive\n\n"
+
+        disconnected = True
+        for _, _, stream in results:
+            assert [event async for event in stream] == []
+        assert hub.connections == 0
+
+    asyncio.run(run())
@@ -0,0 +1,85 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from backend.app.core.settings import settings
+from backend.app.services.email import is_success_response
+from backend.app.services.postmark import AsyncPostmarkClient, PostmarkClient
+from backend.tests.utils import random_email, random_string
+from postmarker.exceptions import ClientError
+
+CREATE_ACCOUNT_TEMPLATE_ID = settings.CREATE_ACCOUNT_TEMPLATE_ID
+DEFAULT_EMAIL_SENDER = settings.DEFAULT_EMAIL_SENDER
+
+
+@pytest.fixture
+def postmark(fake_postmark):
+    fake_postmark.batches.clear()
+    fake_postmark.failing_recipients.clear()
+    fake_postmark.is_down = False
+    fake_postmark.connections = 0
+    return fake_postmark
+
+
+def welcome_message(recipient: str):
+    return {
+        "TemplateId": CREATE_ACCOUNT_TEMPLATE_ID,
+        "TemplateModel": {"email": recipient},
+        "From": DEFAULT_EMAIL_SENDER,
+        "To": recipient,
+    }
+
+
+def test_client_reuses_its_connections(postmark):
+    max_connections = 3
+    client = PostmarkClient(
+        server_token=random_string(),
+        api_url=postmark.url,
+        max_connections=max_connections,
+    )
+    messages = [welcome_message(random_email()) for _ in range(30)]
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        responses = list(executor.map(client.send_with_template, messages))
+    client.close()
+
+    assert all(is_success_response(response) for response in responses)
+    assert len(postmark.sent_messages) == len(messages)
+    assert postmark.connections <= max_connections
+
+
+def test_async_client_sends_over_a_bounded_pool(postmark):
+    max_connections = 3
+    messages = [welcome_message(random_email()) for _ in range(30)]
+
+    async def send_all():
+        client = AsyncPostmarkClient(
+            random_string(), api_url=postmark.url, max_connections=max_connections
+        )
+        try:
+            return await asyncio.gather(
+                *(client.send_with_template(message) for message in messages)
+            )
+        finally:
+            await client.aclose()
+
+    responses = asyncio.run(send_all())
+
+    assert all(is_success_response(response) for response in responses)
+    assert len(postmark.sent_messages) == len(messages)
+    assert postmark.connections <= max_connections
+
+
+def test_async_client_raises_client_error(postmark):
+    postmark.is_down = True
+
+    async def send():
+        client = AsyncPostmarkClient(random_string(), api_url=postmark.url)
+        try:
+            await client.send_with_template(welcome_message(random_email()))
+        finally:
+            await client.aclose()
+
+    with pytest.raises(ClientError) as error:
+        asyncio.run(send())
+    assert error.value.error_code == 500
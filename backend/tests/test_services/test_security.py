@@ -4,6 +4,11 @@ from backend.app.services.security import (
     decode_reset_token,
     verify_api_key,
     get_api_key_hash,
+    get_password_hashes,
+    get_password_hashing_pool,
+    PARALLEL_HASHING_THRESHOLD,
+    shutdown_password_hashing_pool,
+    verify_password,
 )
 from backend.tests.utils import random_email
 import pytest
@@ -43,3 +48,17 @@ def test_verify_api_key_with_valid_hash_returns_true():
 
 def test_verify_api_key_with_invalid_hash_returns_false():
     assert not verify_api_key("some-api-key", "some-invalid-bcrypt-hash")
+
+
+def test_password_hashes_share_one_pool_until_shut_down():
+    passwords = [str(i) for i in range(PARALLEL_HASHING_THRESHOLD)]
+    try:
+        pool = get_password_hashing_pool()
+        hashes = get_password_hashes(passwords)
+        assert get_password_hashing_pool() is pool
+    finally:
+        shutdown_password_hashing_pool()
+
+    assert all(verify_password(p, h) for p, h in zip(passwords, hashes))
+    assert get_password_hashing_pool() is not pool
+    shutdown_password_hashing_pool()
@@ -0,0 +1,186 @@
+from typing import Dict, Generator, List, Set, Tuple
+
+import pytest
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device_notification import device_notification_repo
+from backend.app.db.session import SessionLocal
+from backend.app.models.device_notification import DeviceNotification
+from backend.app.tasks import devices
+from backend.app.tasks.devices import (
+    DEVICE_METADATA_INVALIDATED,
+    DEVICE_UPDATES_EXCHANGE,
+    ConnectionManager,
+    prune_device_notifications,
+    relay_device_notifications,
+)
+from backend.tests.utils import random_string
+from pika.exceptions import NackError
+from sqlalchemy.orm import Session
+
+
+class FakeChannel:
+    """
+    Stands in for a pika channel in confirm mode, refusing the messages routed to
+    `nacked_mac_ids` the way the broker would.
+    """
+
+    def __init__(self):
+        self.published: List[Tuple[str, str, str]] = []
+        self.nacked_mac_ids: Set[str] = set()
+        self.versions: Dict[str, int] = {}
+
+    def basic_publish(
+        self, exchange: str, routing_key: str, body: str, properties=None
+    ):
+        if routing_key in self.nacked_mac_ids:
+            raise NackError([])
+        self.published.append((exchange, routing_key, body))
+        if properties is not None:
+            self.versions[routing_key] = properties.headers["version"]
+
+
+@pytest.fixture
+def db() -> Generator:
+    # the relay runs in its own process with its own session
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def channel(monkeypatch) -> FakeChannel:
+    monkeypatch.setattr(settings, "DEBUG", False)
+    return FakeChannel()
+
+
+def drain_outbox(db: Session, channel: FakeChannel):
+    while relay_device_notifications(db, channel):
+        pass
+
+
+def test_queued_notifications_are_only_visible_once_committed(db: Session):
+    mac_id = random_string()
+    device_notification_repo.queue(db, mac_ids=[mac_id])
+
+    other_db = SessionLocal()
+    try:
+        claimed = device_notification_repo.claim_pending(other_db, limit=1000)
+        assert mac_id not in {notification.mac_id for notification in claimed}
+        other_db.rollback()
+
+        db.commit()
+        claimed = device_notification_repo.claim_pending(other_db, limit=1000)
+        assert mac_id in {notification.mac_id for notification in claimed}
+    finally:
+        other_db.close()
+
+
+def test_relay_publishes_each_device_once_and_marks_rows_sent(
+    db: Session, channel: FakeChannel
+):
+    mac_ids = [random_string() for _ in range(3)]
+    device_notification_repo.queue(db, mac_ids=mac_ids)
+    device_notification_repo.queue(db, mac_ids=mac_ids[:1])
+    notifications = device_notification_repo.queue(db, mac_ids=mac_ids[:1])
+    db.commit()
+
+    drain_outbox(db, channel)
+
+    published = [
+        (exchange, mac_id) for exchange, mac_id, _ in channel.published if mac_id in mac_ids
+    ]
+    assert sorted(published) == sorted(
+        (DEVICE_UPDATES_EXCHANGE, mac_id) for mac_id in mac_ids
+    )
+    db.refresh(notifications[0])
+    assert notifications[0].sent_at is not None
+    # the duplicates went out as one message, versioned with the newest of them
+    assert channel.versions[mac_ids[0]] == notifications[0].id
+
+
+def test_nacked_notifications_stay_in_the_outbox(db: Session, channel: FakeChannel):
+    mac_id = random_string()
+    channel.nacked_mac_ids.add(mac_id)
+    (notification,) = device_notification_repo.queue(db, mac_ids=[mac_id])
+    db.commit()
+
+    drain_outbox(db, channel)
+    db.refresh(notification)
+
+    assert notification.sent_at is None
+
+    channel.nacked_mac_ids.clear()
+    drain_outbox(db, channel)
+    db.refresh(notification)
+
+    assert notification.sent_at is not None
+    assert [body for _, routed_to, body in channel.published if routed_to == mac_id] == [
+        notification.body
+    ]
+
+
+def test_relay_broadcasts_the_devices_it_sent_to_every_process(
+    db: Session, channel: FakeChannel
+):
+    mac_ids = [random_string() for _ in range(2)]
+    device_notification_repo.queue(db, mac_ids=mac_ids)
+    db.commit()
+
+    drain_outbox(db, channel)
+
+    invalidated = set()
+    for exchange, routing_key, body in channel.published:
+        if routing_key == DEVICE_METADATA_INVALIDATED:
+            assert exchange == DEVICE_UPDATES_EXCHANGE
+            invalidated.update(body.split("\n"))
+    assert invalidated >= set(mac_ids)
+
+
+def test_pruning_keeps_the_newest_notification_of_each_device(
+    db: Session, channel: FakeChannel
+):
+    mac_ids = [random_string() for _ in range(2)]
+    older = device_notification_repo.queue(db, mac_ids=mac_ids[:1])
+    newest = device_notification_repo.queue(db, mac_ids=mac_ids)
+    (pending,) = device_notification_repo.queue(db, mac_ids=mac_ids[1:])
+    db.commit()
+    channel.nacked_mac_ids.add(mac_ids[1])
+    drain_outbox(db, channel)
+    versions = [
+        device_notification_repo.get_version(db, mac_id=mac_id) for mac_id in mac_ids
+    ]
+
+    # a negative retention makes every notification sent so far old enough
+    while prune_device_notifications(db, retention_days=-1):
+        pass
+
+    remaining = {
+        notification.id
+        for notification in db.query(DeviceNotification).filter(
+            DeviceNotification.mac_id.in_(mac_ids)
+        )
+    }
+    # the unsent notification stays, and so does the newest sent one of each device
+    assert remaining == {newest[0].id, newest[1].id, pending.id}
+    assert older[0].id not in remaining
+    assert [
+        device_notification_repo.get_version(db, mac_id=mac_id) for mac_id in mac_ids
+    ] == versions
+
+
+def test_connection_manager_connects_when_the_channel_is_first_needed(monkeypatch):
+    attempts = []
+
+    def connect(parameters):
+        attempts.append(parameters)
+        raise ConnectionError("the broker is down")
+
+    monkeypatch.setattr(devices.pika, "BlockingConnection", connect)
+    monkeypatch.setattr(ConnectionManager, "sleep", lambda self: None)
+
+    manager = ConnectionManager()
+    assert not attempts
+    assert not manager.is_connected
+
+    assert manager.channel is None
+    assert attempts
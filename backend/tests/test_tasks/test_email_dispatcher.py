@@ -0,0 +1,202 @@
+from datetime import datetime, timedelta, timezone
+from typing import Generator
+
+import pytest
+from backend.app.core.settings import settings
+from backend.app.db.repositories.email import email_repo
+from backend.app.db.session import SessionLocal
+from backend.app.services.email import (
+    queue_email_with_template,
+    queue_emails_with_template,
+)
+from backend.app.services.postmark import PostmarkClient
+from backend.app.tasks.emails import dispatch_pending_emails
+from backend.tests.utils import random_email, random_string
+from sqlalchemy.orm import Session
+
+CREATE_ACCOUNT_TEMPLATE_ID = settings.CREATE_ACCOUNT_TEMPLATE_ID
+EMAIL_MAX_ATTEMPTS = settings.EMAIL_MAX_ATTEMPTS
+
+
+@pytest.fixture
+def db() -> Generator:
+    # the dispatcher runs in its own process with its own session
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def postmark_client(fake_postmark) -> PostmarkClient:
+    fake_postmark.batches.clear()
+    fake_postmark.failing_recipients.clear()
+    fake_postmark.is_down = False
+    return PostmarkClient(server_token=random_string(), api_url=fake_postmark.url)
+
+
+def drain_outbox(db: Session, client: PostmarkClient, batch_size: int = 500):
+    while dispatch_pending_emails(db, client, batch_size=batch_size):
+        pass
+
+
+def queue_welcome_email(db: Session, recipient: str):
+    email = queue_email_with_template(
+        db,
+        template_id=CREATE_ACCOUNT_TEMPLATE_ID,
+        template_dict={"name": recipient},
+        recipient=recipient,
+    )
+    db.commit()
+    return email
+
+
+def test_queued_email_goes_with_the_transaction_it_was_queued_in(
+    db: Session, postmark_client: PostmarkClient, fake_postmark
+):
+    rolled_back, committed = random_email(), random_email()
+    queue_email_with_template(
+        db,
+        template_id=CREATE_ACCOUNT_TEMPLATE_ID,
+        template_dict={"name": rolled_back},
+        recipient=rolled_back,
+    )
+    db.rollback()
+    queue_welcome_email(db, committed)
+
+    drain_outbox(db, postmark_client)
+
+    sent_to = [m["To"] for m in fake_postmark.sent_messages]
+    assert committed in sent_to
+    assert rolled_back not in sent_to
+
+
+def test_queued_email_is_sent_by_the_dispatcher(
+    db: Session, postmark_client: PostmarkClient, fake_postmark
+):
+    recipient = random_email()
+    email = queue_welcome_email(db, recipient)
+
+    assert not email.delivered
+    assert email.next_attempt_at is not None
+    assert not fake_postmark.sent_messages
+
+    drain_outbox(db, postmark_client)
+    db.refresh(email)
+
+    assert email.delivered
+    assert email.attempts == 1
+    assert email.next_attempt_at is None
+    [message] = [m for m in fake_postmark.sent_messages if m["To"] == recipient]
+    assert message["TemplateId"] == CREATE_ACCOUNT_TEMPLATE_ID
+    assert message["TemplateModel"] == {"name": recipient}
+
+
+def test_dispatcher_sends_emails_in_batches(
+    db: Session, postmark_client: PostmarkClient, fake_postmark
+):
+    drain_outbox(db, postmark_client)
+    fake_postmark.batches.clear()
+    recipients = [random_email() for _ in range(5)]
+    queue_emails_with_template(
+        db,
+        template_id=CREATE_ACCOUNT_TEMPLATE_ID,
+        messages=[(recipient, {"name": recipient}) for recipient in recipients],
+    )
+    db.commit()
+
+    drain_outbox(db, postmark_client, batch_size=2)
+
+    assert [len(batch) for batch in fake_postmark.batches] == [2, 2, 1]
+    assert [m["To"] for m in fake_postmark.sent_messages] == recipients
+
+
+def test_rejected_email_is_retried_with_backoff_until_it_runs_out_of_attempts(
+    db: Session, postmark_client: PostmarkClient, fake_postmark
+):
+    recipient = random_email()
+    fake_postmark.failing_recipients.add(recipient)
+    email = queue_welcome_email(db, recipient)
+
+    drain_outbox(db, postmark_client)
+    db.refresh(email)
+
+    assert not email.delivered
+    assert email.attempts == 1
+    assert email.next_attempt_at > datetime.now(timezone.utc)
+    assert "inactive" in email.extra_data
+
+    # the retry is not due yet, so it is not sent again
+    drain_outbox(db, postmark_client)
+    db.refresh(email)
+    assert email.attempts == 1
+
+    email_repo.update(
+        db,
+        db_obj=email,
+        obj_in={
+            "attempts": EMAIL_MAX_ATTEMPTS - 1,
+            "next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1),
+        },
+    )
+    drain_outbox(db, postmark_client)
+    db.refresh(email)
+
+    assert not email.delivered
+    assert email.attempts == EMAIL_MAX_ATTEMPTS
+    assert email.next_attempt_at is None
+
+
+def test_every_claimed_email_is_retried_when_postmark_is_down(
+    db: Session, postmark_client: PostmarkClient, fake_postmark
+):
+    fake_postmark.is_down = True
+    emails = [queue_welcome_email(db, random_email()) for _ in range(3)]
+
+    drain_outbox(db, postmark_client)
+
+    for email in emails:
+        db.refresh(email)
+        assert not email.delivered
+        assert email.attempts == 1
+        assert email.next_attempt_at is not None
+
+
+def test_malformed_email_is_given_up_on_without_holding_up_the_batch(
+    db: Session, postmark_client: PostmarkClient, fake_postmark
+):
+    malformed, valid = (queue_welcome_email(db, random_email()) for _ in range(2))
+    email_repo.update(db, db_obj=malformed, obj_in={"template_dict": "{not json"})
+
+    drain_outbox(db, postmark_client)
+    db.refresh(malformed)
+    db.refresh(valid)
+
+    assert valid.delivered
+    assert not malformed.delivered
+    assert malformed.next_attempt_at is None
+    assert "malformed" in malformed.extra_data
+    assert malformed.recipient not in [m["To"] for m in fake_postmark.sent_messages]
+
+
+def test_claimed_emails_are_skipped_by_other_dispatchers(
+    db: Session, postmark_client: PostmarkClient
+):
+    drain_outbox(db, postmark_client)
+    emails = [queue_welcome_email(db, random_email()) for _ in range(4)]
+    first_dispatcher_db, second_dispatcher_db = SessionLocal(), SessionLocal()
+    try:
+        first_claim = email_repo.claim_pending(first_dispatcher_db, limit=2)
+        second_claim = email_repo.claim_pending(second_dispatcher_db, limit=10)
+
+        assert len(first_claim) == 2
+        assert {email.id for email in first_claim}.isdisjoint(
+            email.id for email in second_claim
+        )
+        assert {email.id for email in first_claim + second_claim} == {
+            email.id for email in emails
+        }
+    finally:
+        first_dispatcher_db.rollback()
+        second_dispatcher_db.rollback()
+        first_dispatcher_db.close()
+        second_dispatcher_db.close()
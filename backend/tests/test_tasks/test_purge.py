@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+from backend.app.core.settings import settings
+from backend.app.db.repositories.device import device_repo
+from backend.app.db.repositories.user import user_repo
+from backend.app.models.device import Device
+from backend.app.models.user import User
+from backend.app.schemas.device import DeviceCreate
+from backend.app.tasks.purge import purge_deleted_rows
+from backend.tests.utils import (
+    create_agent,
+    create_user_with_type,
+    get_default_superuser,
+    random_string,
+)
+from sqlalchemy.orm import Session
+
+AGENT_OFFICER = settings.AGENT_OFFICER
+
+
+def _deleted_days_ago(db: Session, model, db_obj, days: int):
+    db.query(model).filter(model.id == db_obj.id).update(
+        {"deleted_at": datetime.now(timezone.utc) - timedelta(days=days)},
+        synchronize_session=False,
+    )
+    db.commit()
+
+
+def test_only_rows_deleted_before_the_retention_window_are_purged(db: Session):
+    old_officer, new_officer, creator = (
+        create_user_with_type(db, AGENT_OFFICER) for _ in range(3)
+    )
+    devices = [
+        device_repo.create(
+            db,
+            obj_in=DeviceCreate(
+                mac_id=random_string(),
+                name=random_string(),
+                creator_id=creator_id,
+                agent_id=create_agent(db).id,
+            ),
+        )
+        for creator_id in (get_default_superuser(db).id, creator.id)
+    ]
+    old_device = devices[0]
+    for user in (old_officer, new_officer, creator):
+        user_repo.soft_delete(db, db_obj=user)
+    device_repo.soft_delete(db, db_obj=old_device)
+    for model, db_obj in (
+        (User, old_officer),
+        (User, creator),
+        (Device, old_device),
+    ):
+        _deleted_days_ago(db, model, db_obj, days=31)
+    user_ids = [user.id for user in (old_officer, new_officer, creator)]
+    device_ids = [device.id for device in devices]
+
+    while purge_deleted_rows(db, retention_days=30):
+        pass
+
+    remaining_users = {id for id, in db.query(User.id).filter(User.id.in_(user_ids))}
+    # the creator of a device is kept for the device's sake
+    assert remaining_users == set(user_ids[1:])
+    remaining_devices = {
+        id for id, in db.query(Device.id).filter(Device.id.in_(device_ids))
+    }
+    assert remaining_devices == {device_ids[1]}
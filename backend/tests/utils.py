@@ -1,12 +1,18 @@
 from backend.app.api.routes.users import AGENT_EMPLOYEE_TYPE
 import random
 import string
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from backend.app.core.settings import settings
+from backend.app.db.repositories.agent import agent_repo
+from backend.app.db.repositories.device import device_repo
 from backend.app.db.repositories.user import user_repo
 from backend.app.db.repositories.user_type import user_type as user_type_repo
+from backend.app.models.agent import Agent as AgentModel
+from backend.app.models.device import Device
 from backend.app.models.user import User
+from backend.app.schemas.agent import AgentCreate
+from backend.app.schemas.device import DeviceCreate
 from backend.app.schemas.user import UserCreate
 from sqlalchemy.orm import Session
 
@@ -108,6 +114,40 @@ def create_agent_employee_user(db: Session) -> User:
     return activate_user(db, user)
 
 
+def create_agent(db: Session) -> AgentModel:
+    user_type = user_type_repo.get_by_name(db, name=AGENT)
+    return agent_repo.create(
+        db,
+        obj_in=AgentCreate(
+            name=random_string(),
+            email=random_email(),
+            address=random_string(),
+            user_type_id=user_type.id,
+        ),
+    )
+
+
+def create_device(
+    db: Session,
+    *,
+    agent_id: Optional[int] = None,
+    mac_id: Optional[str] = None,
+    active: bool = True,
+) -> Device:
+    device = device_repo.create(
+        db,
+        obj_in=DeviceCreate(
+            mac_id=mac_id or random_string(),
+            name=random_string(),
+            creator_id=get_default_superuser(db).id,
+            agent_id=agent_id if agent_id is not None else create_agent(db).id,
+        ),
+    )
+    if active:
+        device = device_repo.activate_device(db, device_obj=device)
+    return device
+
+
 def create_superuser_user(db: Session) -> User:
     user = create_user_with_type(db=db, type_=SUPERUSER_USER_TYPE)
     return activate_user(db, user)
@@ -1,3 +1,6 @@
+import re
+from typing import Dict, Optional
+
 from sqlalchemy.exc import IntegrityError
 from starlette.requests import Request
 from starlette.responses import JSONResponse
@@ -5,11 +8,45 @@ from starlette.status import HTTP_400_BAD_REQUEST
 
 DEBUG = False
 
+# constraint name -> the message a violation of it is answered with, "{}" standing
+# for the offending value, filled in by register_constraint_messages
+CONSTRAINT_MESSAGES: Dict[str, str] = {}
+
+# postgres details unique and foreign key violations as
+# Key (column)=(value) already exists. / is not present in table "table".
+KEY_DETAIL_REGEX = re.compile(r"^Key \(.*?\)=\((.*)\) (?:already exists|is not present)")
+
+
+def register_constraint_messages(messages: Dict[str, str]) -> None:
+    CONSTRAINT_MESSAGES.update(messages)
+
+
+def get_constraint_message(exc: IntegrityError) -> Optional[str]:
+    """
+    Returns the registered message for the constraint `exc` violated, with the value
+    that violated it, or None when that constraint has no message registered.
+    Lets a write rely on the constraint instead of looking for a conflicting row first.
+    """
+    diag = getattr(exc.orig, "diag", None)
+    if diag is None:
+        return None
+    message = CONSTRAINT_MESSAGES.get(diag.constraint_name)
+    if message is None:
+        return None
+    match = KEY_DETAIL_REGEX.match(diag.message_detail or "")
+    return message.format(match.group(1) if match else "")
+
 
 def db_error_handler(
     _: Request,
     exc: IntegrityError,
 ) -> JSONResponse:
+    message = get_constraint_message(exc)
+    if message is not None:
+        return JSONResponse(
+            {"errors": [{"message": message}]}, status_code=HTTP_400_BAD_REQUEST
+        )
+
     detail = exc.detail if exc.detail else "an error occured."
     debug_detail = exc._message() if DEBUG else None
 
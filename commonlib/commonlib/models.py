@@ -1,5 +1,5 @@
-from typing import Any, Dict
-from fastapi.encoders import jsonable_encoder
+from datetime import date
+from typing import Any, Dict, Tuple
 
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
 from sqlalchemy.sql import func
@@ -17,5 +17,26 @@ class Base:
     def __tablename__(cls) -> str:
         return cls.__name__.lower()
 
+    @classmethod
+    def column_keys(cls) -> Tuple[str, ...]:
+        """The attribute names of the mapped columns, looked up once per class."""
+        keys = cls.__dict__.get("_column_keys")
+        if keys is None:
+            keys = tuple(attr.key for attr in cls.__mapper__.column_attrs)
+            cls._column_keys = keys
+        return keys
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the mapped columns of the row, read straight from their attributes.
+        Relationships are left out, and so is the ORM's own state.
+        """
+        return {key: getattr(self, key) for key in self.column_keys()}
+
     def to_json(self) -> Dict[str, Any]:
-        return jsonable_encoder(self)
+        # the columns only hold integers, strings, booleans and datetimes, so the
+        # datetimes are all that is left to convert
+        return {
+            key: value.isoformat() if isinstance(value, date) else value
+            for key, value in self.to_dict().items()
+        }
@@ -1,10 +1,12 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, List, Optional, Set, Type, TypeVar, Union
 
 from sqlalchemy.exc import IntegrityError
 
-from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import and_, func
 from commonlib.models import Base as BaseDeclarativeClass
 
 
@@ -25,29 +27,45 @@ class Base(Generic[ModelType]):
         """
         self.model = model
 
+    def query(self, db: Session) -> Query:
+        """
+        Queries the model, leaving out the soft deleted rows of the models that have a
+        `deleted` column. Every read method below goes through it.
+        """
+        query = db.query(self.model)
+        if "deleted" in self.model.__table__.c:
+            # NOT deleted, the predicate of the partial indexes
+            query = query.filter(~self.model.deleted)
+        return query
+
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+        return self.query(db).filter(self.model.id == id).first()
 
     def get_multi(
         self, db: Session, *, skip: int = 0, limit: int = 100
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return self.query(db).offset(skip).limit(limit).all()
 
     def get_multi_by_ids(self, db: Session, *, ids: List[int]) -> List[ModelType]:
         in_condition = self.model.id.in_(ids)
-        return db.query(self.model).filter(in_condition)
+        return self.query(db).filter(in_condition)
 
     def get_all(self, db: Session) -> List[ModelType]:
-        return db.query(self.model).all()
+        return self.query(db).all()
 
-    def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = jsonable_encoder(obj_in)
+    def create(
+        self, db: Session, *, obj_in: Union[CreateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        obj_in_data = obj_in if isinstance(obj_in, dict) else obj_in.dict()
         db_obj = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
         try:
             db.commit()
             db.refresh(db_obj)
         except IntegrityError as e:
+            # the session stays usable, callers rely on the constraints rather than
+            # looking for conflicting rows first
+            db.rollback()
             e.add_detail("an error occured while trying to create " + str(e.params))
             raise e
         return db_obj
@@ -56,35 +74,121 @@ class Base(Generic[ModelType]):
         self, db: Session, *, field_name: str, field_value: str
     ) -> ModelType:
         return (
-            db.query(self.model)
+            self.query(db)
             .filter(getattr(self.model, field_name) == field_value)
             .first()
         )
 
+    def get_existing_field_values(
+        self, db: Session, *, field_name: str, field_values: List[Any]
+    ) -> Set[Any]:
+        """
+        Returns the subset of `field_values` that already exist in the column
+        `field_name`, using a single `IN` query instead of one lookup per value.
+        """
+        if not field_values:
+            return set()
+        column = getattr(self.model, field_name)
+        rows = self.query(db).with_entities(column).filter(
+            column.in_(set(field_values))
+        )
+        return {value for value, in rows}
+
     def update(
         self,
         db: Session,
         *,
         db_obj: ModelType,
-        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        refresh: bool = True,
+        returning: bool = False
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
+        """
+        Sets the mapped columns found in `obj_in` on `db_obj` and commits.
+
+        * `refresh`: reloads the row after the commit, which is only needed when the
+          caller reads values the database computed, like a `func.now()` assigned to
+          an attribute. Otherwise the expired attributes load on first access anyway.
+        * `returning`: writes the columns with a single `UPDATE ... RETURNING` instead
+          of flushing the object, and loads the row from what it returns, so the
+          update costs one round trip and no refresh. Changes made to `db_obj` outside
+          of `obj_in` are still flushed on commit, but are overwritten on the object
+          by the returned row, so they should go through `obj_in` instead.
+        """
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        column_keys = self.model.column_keys()
+        values = {key: update_data[key] for key in column_keys if key in update_data}
+        if returning:
+            return self._update_returning(db, db_obj=db_obj, values=values)
+        for field, value in values.items():
+            setattr(db_obj, field, value)
         db.add(db_obj)
         try:
             db.commit()
-            db.refresh(db_obj)
+            if refresh:
+                db.refresh(db_obj)
+        except IntegrityError as e:
+            # like create, so that the session stays usable
+            db.rollback()
+            e.add_detail("An error occured while trying to update " + str(e.params))
+            raise e
+        return db_obj
+
+    def _update_returning(
+        self, db: Session, *, db_obj: ModelType, values: Dict[str, Any]
+    ) -> ModelType:
+        mapper = self.model.__mapper__
+        column_attrs = list(mapper.column_attrs)
+        # the values are keyed by attribute, which need not be the column's name
+        column_values = {
+            mapper.column_attrs[key].columns[0]: value for key, value in values.items()
+        }
+        identity = mapper.primary_key_from_instance(db_obj)
+        statement = (
+            mapper.local_table.update()
+            .where(
+                and_(
+                    *(
+                        column == value
+                        for column, value in zip(mapper.primary_key, identity)
+                    )
+                )
+            )
+            .values(column_values)
+            .returning(*(attr.columns[0] for attr in column_attrs))
+        )
+        try:
+            row = db.execute(statement).first()
+            if row is None:
+                raise StaleDataError(
+                    f"{self.model.__name__} with primary key {identity} no longer exists"
+                )
+            db.commit()
         except IntegrityError as e:
+            # like create, so that the session stays usable
+            db.rollback()
             e.add_detail("An error occured while trying to update " + str(e.params))
             raise e
+        except StaleDataError:
+            db.rollback()
+            raise
+        # the commit expired the object, the returned row is what it now holds
+        for attr, value in zip(column_attrs, row):
+            set_committed_value(db_obj, attr.key, value)
         return db_obj
 
+    def soft_delete(self, db: Session, *, db_obj: ModelType) -> ModelType:
+        """
+        Marks the row as deleted, and when, and commits. The read methods leave it
+        out from then on, while the rows that refer to it stay valid.
+        """
+        return self._update_returning(
+            db, db_obj=db_obj, values={"deleted": True, "deleted_at": func.now()}
+        )
+
     def remove(self, db: Session, *, id: int) -> ModelType:
         obj = db.query(self.model).get(id)
         db.delete(obj)
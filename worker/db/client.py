@@ -1,5 +1,7 @@
 from config import MONGO_DB_NAME, MONGO_DB_URI
 from pymongo import MongoClient
 
-client = MongoClient(host=MONGO_DB_URI)
+# connect=False leaves connecting to the first operation, so importing this
+# module never waits on Mongo
+client = MongoClient(host=MONGO_DB_URI, connect=False)
 database = client[MONGO_DB_NAME]
@@ -1,7 +1,6 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 from pydantic import BaseModel
 from datetime import datetime
-from db.client import database
 from pymongo import ASCENDING, DESCENDING
 
 
@@ -10,6 +9,11 @@ class Base(BaseModel):
     def __collectionname__(cls):
         return cls.__name__.lower()
 
+    @classmethod
+    def __indexes__(cls) -> List[List[Tuple[str, int]]]:
+        # created by the repository's ensure_indexes, once the worker is connected
+        return []
+
 
 class Log(Base):
     user_id: int
@@ -19,6 +23,6 @@ class Log(Base):
     extra_data: Any
     logged_at: datetime
 
-
-database[Log.__collectionname__()].create_index([("device_id", ASCENDING)])
-database[Log.__collectionname__()].create_index([("user_id", ASCENDING)])
+    @classmethod
+    def __indexes__(cls) -> List[List[Tuple[str, int]]]:
+        return [[("device_id", ASCENDING)], [("user_id", ASCENDING)]]
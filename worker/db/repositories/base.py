@@ -15,6 +15,10 @@ class Base(Generic[ModelType]):
         self.model = model
         self.collection = db.get_collection(model.__collectionname__())
 
+    def ensure_indexes(self):
+        for keys in self.model.__indexes__():
+            self.collection.create_index(keys)
+
     def get_multiple(self, *, conditions={}) -> Cursor:
         return self.collection.find(conditions)
 
@@ -61,13 +61,29 @@ def message_callback(
         logger.error(e)
 
 
-current_retry_seconds = DEFAULT_RABBIT_MQ_CONNECTION_RETRY_SECONDS / 2
-max_retry_seconds = 60
-while True:
-    current_retry_seconds = min(max_retry_seconds, current_retry_seconds * 2)
-    try:
-        connect_to_rabbitmq(message_callback)
-    except Exception as e:
-        logger.error(e)
-        logger.info(f"re attempting connection in {current_retry_seconds} seconds")
-        time.sleep(current_retry_seconds)
+def run_worker():
+    """
+    Consumes logs until stopped, reconnecting with a growing delay whenever Mongo or
+    the broker cannot be reached. The log indexes are ensured before consuming, so a
+    worker started while Mongo is unreachable waits for it instead of taking logs
+    off the queue.
+    """
+    current_retry_seconds = DEFAULT_RABBIT_MQ_CONNECTION_RETRY_SECONDS / 2
+    max_retry_seconds = 60
+    indexes_ensured = False
+    while True:
+        current_retry_seconds = min(max_retry_seconds, current_retry_seconds * 2)
+        try:
+            if not indexes_ensured:
+                log_repository.ensure_indexes()
+                indexes_ensured = True
+                logger.info(" [*] Log indexes are in place")
+            connect_to_rabbitmq(message_callback)
+        except Exception as e:
+            logger.error(e)
+            logger.info(f"re attempting connection in {current_retry_seconds} seconds")
+            time.sleep(current_retry_seconds)
+
+
+if __name__ == "__main__":
+    run_worker()
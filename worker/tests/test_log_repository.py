@@ -29,3 +29,13 @@ def test_create_log():
     assert log.log_class == "USER_LOG_IN"
     assert log.level == "INFO"
     assert "ip" in log.extra_data
+
+
+def test_ensure_indexes_creates_the_model_indexes():
+    log_repository.ensure_indexes()
+
+    indexed = [
+        list(index["key"].items()) for index in log_repository.collection.list_indexes()
+    ]
+    for keys in Log.__indexes__():
+        assert keys in indexed